@@ -1,14 +1,28 @@
+import os
+import threading
+import time
 import cv2
 import numpy as np
 # Importe aus den PySide6-Bibliotheken (für Layout, GUI-Elemente, etc.)
 from PySide6.QtWidgets import QMainWindow, QWidget, QPushButton, QLabel, QComboBox, QStatusBar, QMessageBox, QSlider
 from PySide6.QtWidgets import QVBoxLayout, QHBoxLayout, QSizePolicy 
-from PySide6.QtGui import QPixmap, QImage , QPainter, QColor, QAction
-from PySide6.QtCore import QTimer, Qt, QRect
+from PySide6.QtGui import QPixmap, QImage , QPainter, QColor, QAction, QActionGroup
+from PySide6.QtCore import QTimer, Qt, QRect, QEvent
 # Importe der Manager-Klassen
 from cameramanager import CameraManager
 from classifiermanager import ClassifierManager
 from filemanager import FileManager
+from exportmanager import CropExporter
+from capturemanager import CaptureManager
+from recordingmanager import VideoRecorder
+from cpugovernor import CpuGovernor
+from gallerymanager import GalleryManager
+from eventstore import EventStore
+from tuningpreview import ProgressivePreview, STAGE_FULL
+from cascadescheduler import CascadeScheduler, merge_results
+import boxops
+from profiler import profiler
+from metrics import metrics
 
 # Hauptklasse App für GUI
 class App(QMainWindow):
@@ -18,10 +32,20 @@ class App(QMainWindow):
     Attribute: camera_manager (CameraManager): Instanz des CameraManagers.
                classifier_manager (ClassifierManager): Instanz des ClassifierManagers.
                file_manager (FileManager): Instanz des FileManager.
+               capture_manager (CaptureManager): Screenshots und Serienaufnahmen im Hintergrund.
+               recorder (VideoRecorder): Laufende Videoaufnahme oder None.
+               governor (CpuGovernor): Regler für CPU-Budget/Bildrate oder None.
+               gallery (GalleryManager): Galerie eines Bildordners mit Vorbereitung im Hintergrund.
+               event_store (EventStore): Speicher der Erkennungsergebnisse pro Frame oder None.
                central_widget (QWidget): Zentrales Widget der Anwendung.
                status (QStatusBar): Statusleiste der Anwendung.
+               preview_stage_label (QLabel): Angezeigte Stufe der Vorschau (Vorschau/Volle Auflösung).
+               preview (ProgressivePreview): Grob-zu-fein-Vorschau des geladenen Bildes beim Einstellen der Regler.
+               mask_drawing (tuple): Polygon, das gerade gezeichnet wird ("include"/"exclude", Punkte) oder None.
+               scheduler (CascadeScheduler): Mehrere Klassifizierer reihum im Live-Modus oder None.
                
                image_display (QLabel): Anzeigebereich für Bilder/Kamera.
+               gallery_strip (QLabel): Vorschaubilder der Galerie (nur im Galerie-Modus sichtbar).
                animation_label (QLabel): Anzeigebereich für die Beispielanimation.
                camera_selector (QComboBox): Dropdown-Menü für die Auswahl der Kamera.
                mode_selector (QComboBox): Dropdown-Menü für die Auswahl des Modus.
@@ -45,18 +69,28 @@ class App(QMainWindow):
                animation_timer (QTimer): Timer für die Beispielanimation.
                
                current_frame (np.ndarray): Aktueller Frame.
-               static_image (np.ndarray): Statisches Bild.
+               static_image (np.ndarray): Statisches Bild (bei verkleinert geladenen Dateien in Anzeigegröße).
+               static_gray (np.ndarray): Verkleinert dekodiertes Graustufenbild für die Erkennung oder None.
                is_nightmode (bool): Nachtmodus-Status.
     
     Methoden:   __init__()
-                toggle_fullscreen(), toggle_nightmode() 
+                toggle_fullscreen(), toggle_nightmode(), toggle_motion_gate(checked), set_cpu_budget(cpu_share, target_fps),
+                toggle_latency_tuner(checked), toggle_orientation_passes(checked),
+                toggle_scale_map(checked), learn_scale_map(), remove_scale_map(),
+                toggle_mask(checked), start_mask_polygon(kind), finish_mask_polygon(), remove_mask(), draw_mask_overlay(frame),
+                eventFilter(watched, event), toggle_multi_cascade(checked),
+                toggle_profiling(checked), save_profiling_trace(), start_profiling_snapshot(kind),
                 show_help(), show_about(), 
                 load_stylesheet(filename),
                 change_mode(text), change_classifier(text), load_predefined_classifier(classifier_id), load_custom_classifier(),
+                train_classifier(), update_training_status(), toggle_crop_export(checked),
+                save_screenshot(), choose_capture_folder(), toggle_capture_format(checked), start_burst(), save_recent_frames(),
+                toggle_recording(checked), toggle_metrics_endpoint(checked), toggle_event_store(checked),
+                open_gallery(), show_gallery_image(entry), next_gallery_image(), previous_gallery_image(),
                 refresh_camera_list(), start_camera(), stop_camera(), start_stop_camera(checked), 
                 load_image_from_file(), reset_image(), load_reset_file(checked), 
                 animation(), draw_haar_filter(), 
-                update_frame().
+                load_static_image(file_path), detect_objects(frame, t_start, scale), detect_gallery_objects(frame), update_frame().
     """
     # Initialisiert die GUI und die Manager-Instanzen.
     def __init__(self):
@@ -111,6 +145,111 @@ class App(QMainWindow):
         self.nightmode_action.triggered.connect(self.toggle_nightmode)
         view_menu.addAction(self.nightmode_action)
 
+        self.motion_gate_action = QAction("Bewegungsfilter", self)
+        self.motion_gate_action.setCheckable(True)
+        self.motion_gate_action.triggered.connect(self.toggle_motion_gate)
+        view_menu.addAction(self.motion_gate_action)
+
+        self.orientation_action = QAction("Gespiegelt und gedreht suchen (±20°)", self)
+        self.orientation_action.setCheckable(True)
+        self.orientation_action.triggered.connect(self.toggle_orientation_passes)
+        view_menu.addAction(self.orientation_action)
+
+        scale_map_menu = view_menu.addMenu("Perspektive (fest montierte Kamera)")
+        self.scale_map_action = QAction("Maßstab pro Bildstreifen verwenden", self)
+        self.scale_map_action.setCheckable(True)
+        self.scale_map_action.triggered.connect(self.toggle_scale_map)
+        scale_map_menu.addAction(self.scale_map_action)
+        scale_map_learn_action = QAction("Maßstab neu lernen (300 Frames)", self)
+        scale_map_learn_action.triggered.connect(self.learn_scale_map)
+        scale_map_menu.addAction(scale_map_learn_action)
+        scale_map_remove_action = QAction("Maßstab löschen", self)
+        scale_map_remove_action.triggered.connect(self.remove_scale_map)
+        scale_map_menu.addAction(scale_map_remove_action)
+
+        mask_menu = view_menu.addMenu("Erkennungsbereiche")
+        self.mask_action = QAction("Bereiche verwenden", self)
+        self.mask_action.setCheckable(True)
+        self.mask_action.triggered.connect(self.toggle_mask)
+        mask_menu.addAction(self.mask_action)
+        mask_include_action = QAction("Einschlussbereich zeichnen", self)
+        mask_include_action.triggered.connect(lambda: self.start_mask_polygon("include"))
+        mask_menu.addAction(mask_include_action)
+        mask_exclude_action = QAction("Ausschlussbereich zeichnen", self)
+        mask_exclude_action.triggered.connect(lambda: self.start_mask_polygon("exclude"))
+        mask_menu.addAction(mask_exclude_action)
+        mask_remove_action = QAction("Bereiche löschen", self)
+        mask_remove_action.triggered.connect(self.remove_mask)
+        mask_menu.addAction(mask_remove_action)
+
+        self.multi_cascade_action = QAction("Gesicht + Oberkörper + Ganzkörper (reihum)", self)
+        self.multi_cascade_action.setCheckable(True)
+        self.multi_cascade_action.triggered.connect(self.toggle_multi_cascade)
+        view_menu.addAction(self.multi_cascade_action)
+
+        self.latency_tuner_action = QAction("Latenz-Budget 50 ms", self)
+        self.latency_tuner_action.setCheckable(True)
+        self.latency_tuner_action.triggered.connect(self.toggle_latency_tuner)
+        view_menu.addAction(self.latency_tuner_action)
+
+        governor_menu = view_menu.addMenu("CPU-Budget")
+        governor_group = QActionGroup(self)
+        for text, cpu_share, target_fps in (("Aus", None, None), ("CPU 25 %", 0.25, None), ("CPU 50 %", 0.5, None),
+                                            ("CPU 75 %", 0.75, None), ("15 FPS", None, 15), ("5 FPS", None, 5)):
+            action = QAction(text, self)
+            action.setCheckable(True)
+            action.setChecked(text == "Aus")
+            action.triggered.connect(lambda checked, c=cpu_share, f=target_fps: self.set_cpu_budget(c, f))
+            governor_group.addAction(action)
+            governor_menu.addAction(action)
+
+        export_menu = menu_bar.addMenu("Export")
+        self.crop_export_action = QAction("Ausschnitte exportieren", self)
+        self.crop_export_action.setCheckable(True)
+        self.crop_export_action.triggered.connect(self.toggle_crop_export)
+        export_menu.addAction(self.crop_export_action)
+        export_menu.addSeparator()
+        capture_folder_action = QAction("Screenshot-Ordner wählen...", self)
+        capture_folder_action.triggered.connect(self.choose_capture_folder)
+        export_menu.addAction(capture_folder_action)
+        self.capture_jpeg_action = QAction("Screenshots als JPEG", self)
+        self.capture_jpeg_action.setCheckable(True)
+        self.capture_jpeg_action.triggered.connect(self.toggle_capture_format)
+        export_menu.addAction(self.capture_jpeg_action)
+        burst_action = QAction("Serienaufnahme (30 Frames)", self)
+        burst_action.triggered.connect(self.start_burst)
+        export_menu.addAction(burst_action)
+        window_action = QAction("Letzte 2 Sekunden speichern", self)
+        window_action.triggered.connect(self.save_recent_frames)
+        export_menu.addAction(window_action)
+        export_menu.addSeparator()
+        self.recording_action = QAction("Video aufnehmen", self)
+        self.recording_action.setCheckable(True)
+        self.recording_action.triggered.connect(self.toggle_recording)
+        export_menu.addAction(self.recording_action)
+        self.event_store_action = QAction("Ereignisse speichern", self)
+        self.event_store_action.setCheckable(True)
+        self.event_store_action.triggered.connect(self.toggle_event_store)
+        export_menu.addAction(self.event_store_action)
+        export_menu.addSeparator()
+        self.metrics_action = QAction("Metriken bereitstellen (localhost:9464)", self)
+        self.metrics_action.setCheckable(True)
+        self.metrics_action.triggered.connect(self.toggle_metrics_endpoint)
+        export_menu.addAction(self.metrics_action)
+
+        gallery_menu = menu_bar.addMenu("Galerie")
+        gallery_open_action = QAction("Ordner öffnen...", self)
+        gallery_open_action.triggered.connect(self.open_gallery)
+        gallery_menu.addAction(gallery_open_action)
+        gallery_next_action = QAction("Nächstes Bild", self)
+        gallery_next_action.setShortcut("Right")
+        gallery_next_action.triggered.connect(self.next_gallery_image)
+        gallery_menu.addAction(gallery_next_action)
+        gallery_previous_action = QAction("Vorheriges Bild", self)
+        gallery_previous_action.setShortcut("Left")
+        gallery_previous_action.triggered.connect(self.previous_gallery_image)
+        gallery_menu.addAction(gallery_previous_action)
+
         help_menu = menu_bar.addMenu("Info")
         help_action = QAction("Kurzanleitung",self)
         help_action.triggered.connect(self.show_help)
@@ -119,6 +258,21 @@ class App(QMainWindow):
         about_action = QAction("Über", self)
         about_action.triggered.connect(self.show_about)
         help_menu.addAction(about_action)
+        profiling_menu = help_menu.addMenu("Profiling")
+        self.profiling_action = QAction("Aufzeichnen", self)
+        self.profiling_action.setCheckable(True)
+        self.profiling_action.setChecked(profiler.enabled) # Umgebungsvariable HAAR_PROFILE
+        self.profiling_action.triggered.connect(self.toggle_profiling)
+        profiling_menu.addAction(self.profiling_action)
+        trace_action = QAction("Chrome-Trace speichern", self)
+        trace_action.triggered.connect(self.save_profiling_trace)
+        profiling_menu.addAction(trace_action)
+        cprofile_action = QAction("cProfile (10 s)", self)
+        cprofile_action.triggered.connect(lambda: self.start_profiling_snapshot("cprofile"))
+        profiling_menu.addAction(cprofile_action)
+        tracemalloc_action = QAction("tracemalloc (10 s)", self)
+        tracemalloc_action.triggered.connect(lambda: self.start_profiling_snapshot("tracemalloc"))
+        profiling_menu.addAction(tracemalloc_action)
         end_action = QAction("Beenden", self)
         end_action.triggered.connect(self.close)
         help_menu.addAction(end_action)
@@ -130,6 +284,8 @@ class App(QMainWindow):
         debug_layout.addLayout(main_layout) 
         self.status = QStatusBar() 
         debug_layout.addWidget(self.status)
+        self.preview_stage_label = QLabel("") # Stufe der Vorschau beim Einstellen der Regler (rechts in der Statusleiste)
+        self.status.addPermanentWidget(self.preview_stage_label)
         
         # Kamera- und Bildanzeigebereich
         self.image_display = QLabel("Anzeigebereich für Bilder/Kamera")
@@ -139,6 +295,12 @@ class App(QMainWindow):
         self.image_display.setMinimumSize(300,300)
         main_layout.addWidget(self.image_display)
 
+        # Vorschaubilder der Galerie (unterhalb des Hauptbereichs, nur im Galerie-Modus sichtbar)
+        self.gallery_strip = QLabel()
+        self.gallery_strip.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.gallery_strip.setVisible(False)
+        debug_layout.insertWidget(1, self.gallery_strip)
+
         # Kontrollbereich Layout (rechts vom Bildanzeigebereich)
         control_panel = QVBoxLayout()
 
@@ -269,7 +431,7 @@ class App(QMainWindow):
 
         self.btn_train_classifier = QPushButton("Klassifizierer Trainieren")
         self.btn_train_classifier.setEnabled(False)
-        #self.btn_train_classifier.clicked.connect(self.classifier_manager.train_classifier)
+        self.btn_train_classifier.clicked.connect(self.train_classifier)
         buttons_layout.addWidget(self.btn_train_classifier)
 
         self.btn_screenshot = QPushButton("Screenshot")
@@ -302,9 +464,49 @@ class App(QMainWindow):
         self.animation_timer.timeout.connect(self.animation)
         self.animation_timer.start(50)  # Animationsgeschwindigkeit in ms
 
+        # Timer für die Fortschrittsanzeige des Trainings
+        self.train_timer = QTimer(self)
+        self.train_timer.timeout.connect(self.update_training_status)
+
+        # Timer für die Kostenschätzung eines geladenen Klassifizierers
+        self.cost_timer = QTimer(self)
+        self.cost_timer.timeout.connect(self.update_cost_estimate)
+
         # Variablen
         self.current_frame = None # Aktueller Frame
         self.static_image = None # Statisches Bild
+        self.static_gray = None # Verkleinertes Graustufenbild für die Erkennung (None = Erkennung im static_image)
+        self.static_gray_scale = 1 # Verkleinerungsfaktor von static_gray gegenüber dem Original
+        self.static_display_scale = 1.0 # Verhältnis Original / static_image
+        self.static_path = None # Pfad des geladenen Bildes (für den Export in voller Auflösung)
+        self.train_thread = None # Hintergrund-Thread des Trainings
+        self.train_message = "" # Letzte Fortschrittsmeldung des Trainings
+        self.train_result = None # Ergebnis des Trainings (Pfad zur XML-Datei)
+        self.cost_thread = None # Hintergrund-Thread der Kostenschätzung
+        self.cost_message = None # Ergebnis der Kostenschätzung für die Statusleiste
+        self.crop_exporter = None # Export der erkannten Objekte als Ausschnitte (None = aus)
+        self.static_image_exported = False # Ausschnitte des geladenen Bildes bereits exportiert
+        self.capture_manager = CaptureManager() # Screenshots und Serienaufnahmen im Hintergrund
+        self.recorder = None # Videoaufnahme der annotierten Frames (None = aus)
+        self.event_store = None # Erkennungsergebnisse pro Frame speichern (None = aus)
+        self.governor = None # Regler für CPU-Budget/Bildrate (None = aus)
+        self.last_objects = () # Letztes Erkennungsergebnis (für Frames ohne Erkennung)
+        self.last_results = [] # Letztes Ergebnis als Paare (classifier_id, Objekte) für Ereignisspeicher
+        self.last_labels = None # Klassifizierer-ID pro Objekt in last_objects (nur bei mehreren Klassifizierern)
+        self.t_detected = 0.0 # Ende der Erkennung im aktuellen Frame (für die Kosten des Zeichnens)
+        self.gallery = GalleryManager(self.classifier_manager) # Galerie eines Bildordners (Vorbereitung im Hintergrund)
+        self.preview = ProgressivePreview(self.classifier_manager) # Schnelle Vorschau, Verfeinerung im Hintergrund
+        self.preview_pipeline = None # Durchläufe, Maßstab und Bereiche, mit denen die Vorschau zuletzt erkannt hat
+        self.mask_drawing = None # Polygon, das gerade gezeichnet wird (None = kein Zeichenmodus)
+        self.scheduler = None # Mehrere Klassifizierer reihum im Live-Modus (None = nur der ausgewählte)
+        self.image_display.installEventFilter(self) # Mausklicks zum Zeichnen der Erkennungsbereiche
+        self.image_display.setFocusPolicy(Qt.FocusPolicy.ClickFocus) # Escape bricht das Zeichnen ab
+        self.gallery_active = False # Bilder kommen aus der Galerie
+        self.gallery_objects = None # Erkennungsergebnis des aktuellen Galeriebildes (None = noch nicht ausgewertet)
+        self.gallery_params = None # Parameter-Schnappschuss, mit dem gallery_objects berechnet wurde
+        self.gallery_pipeline = None # Durchläufe, Maßstab und Bereiche, mit denen die Galerie zuletzt ausgewertet hat
+        metrics.start_from_environment() # Dauerbetrieb: HAAR_METRICS_PORT bzw. HAAR_METRICS_FILE
+        self.metrics_action.setChecked(metrics.server is not None)
 
         # Kameraliste bei Programmstart aktualisieren
         self.btn_refresh_cameras.click() # Simuliert Klick des Kameras aktualisieren Buttons
@@ -413,6 +615,483 @@ class App(QMainWindow):
         self.is_nightmode = not self.is_nightmode  # Nachtmodus-Status umschalten 
         
     
+    # Schaltet den Bewegungsfilter vor der Objekterkennung ein oder aus.
+    def toggle_motion_gate(self, checked):
+        """
+        Schaltet den Bewegungsfilter ein (Erkennung nur bei Bewegung bzw. in bewegten Bereichen) oder aus.
+
+        Parameter: checked (bool): Status der Menüaktion.
+        """
+        try:
+            gate = self.classifier_manager.get_motion_gate()
+            if not checked and gate is not None:
+                stats = gate.get_stats()
+                self.status.showMessage(f"Bewegungsfilter aus: {stats['skip_ratio']:.0%} der Frames ohne Erkennung.")
+            else:
+                self.status.showMessage("Bewegungsfilter an: Erkennung nur bei Bewegung, alle 5 s vollständig.")
+            self.classifier_manager.set_motion_gate(checked)
+        except Exception as e:
+            print(f"Fehler beim Umschalten des Bewegungsfilters: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Schaltet die gespiegelten und gedrehten Durchläufe ein oder aus.
+    def toggle_orientation_passes(self, checked):
+        """
+        Schaltet zusätzliche Durchläufe ein (horizontal gespiegelt für Profilgesichter und um ±20° gedreht, parallel
+        ausgeführt) oder aus.
+
+        Parameter: checked (bool): Status der Menüaktion.
+        """
+        try:
+            orientation = self.classifier_manager.orientation
+            if not checked and orientation is not None:
+                stats = orientation.get_stats()
+                self.status.showMessage(f"Zusätzliche Durchläufe aus (zuletzt {stats['wall_ms']:.0f} ms pro Frame).")
+            elif checked:
+                self.status.showMessage("Zusätzliche Durchläufe an: um ±20° gedreht, Profilgesichter auch gespiegelt.")
+            self.classifier_manager.set_orientation_passes(checked, mirror=True, angles=(20,))
+        except Exception as e:
+            print(f"Fehler beim Umschalten der Durchläufe: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Schaltet die streifenweise Suche mit dem Maßstab der aktuellen Kamera ein oder aus.
+    def toggle_scale_map(self, checked):
+        """
+        Verwendet den gespeicherten Maßstab der aktuellen Kamera (erwartete Objektgröße pro Bildstreifen) oder schaltet
+        ihn aus. Ohne gespeicherten Maßstab wird zuerst aus 300 Frames gelernt.
+
+        Parameter: checked (bool): Status der Menüaktion.
+        """
+        try:
+            camera = self.camera_selector.currentText()
+            if not checked:
+                scale_map = self.classifier_manager.scale_map
+                if scale_map is not None and scale_map.counters["banded"]:
+                    self.status.showMessage(f"Maßstab aus (zuletzt {scale_map.get_stats()['banded_ms']:.0f} ms pro Frame).")
+                self.classifier_manager.set_scale_map(camera, False)
+                return
+            scale_map = self.classifier_manager.set_scale_map(camera)
+            if scale_map is not None and scale_map.bands is None:
+                scale_map.start_learning(300, camera)
+                self.status.showMessage(f"Kein Maßstab für {camera}: lerne aus den nächsten 300 Frames.")
+            elif scale_map is not None:
+                self.status.showMessage(f"Maßstab für {camera}: {len(scale_map.bands)} Streifen.")
+        except Exception as e:
+            print(f"Fehler beim Umschalten des Maßstabs: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Lernt den Maßstab der aktuellen Kamera neu.
+    def learn_scale_map(self):
+        """
+        Lernt den Maßstab der aktuellen Kamera aus den Objekten der nächsten 300 Frames (vollständige Suche) und speichert ihn.
+        """
+        try:
+            camera = self.camera_selector.currentText()
+            self.classifier_manager.set_scale_map(camera, learn_frames=300)
+            self.scale_map_action.setChecked(True)
+            self.status.showMessage(f"Lerne Maßstab für {camera} aus den nächsten 300 Frames...")
+        except Exception as e:
+            print(f"Fehler beim Lernen des Maßstabs: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Löscht den gespeicherten Maßstab der aktuellen Kamera.
+    def remove_scale_map(self):
+        """
+        Löscht den gespeicherten Maßstab der aktuellen Kamera und schaltet die streifenweise Suche aus.
+        """
+        try:
+            camera = self.camera_selector.currentText()
+            scale_map = self.classifier_manager.scale_map or self.classifier_manager.set_scale_map(camera)
+            if scale_map is not None:
+                scale_map.remove(camera)
+            self.classifier_manager.set_scale_map(camera, False)
+            self.scale_map_action.setChecked(False)
+            self.status.showMessage(f"Maßstab für {camera} gelöscht.")
+        except Exception as e:
+            print(f"Fehler beim Löschen des Maßstabs: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Schaltet die Ein- und Ausschlussbereiche der aktuellen Kamera und des aktuellen Klassifizierers ein oder aus.
+    def toggle_mask(self, checked):
+        """
+        Verwendet die gespeicherten Bereiche der aktuellen Kamera für den aktuellen Klassifizierer: gesucht wird nur in den
+        Einschlussbereichen, Treffer in Ausschlussbereichen werden verworfen.
+
+        Parameter: checked (bool): Status der Menüaktion.
+        """
+        try:
+            camera = self.camera_selector.currentText()
+            classifier_id = self.classifier_manager.current_classifier
+            if not checked:
+                mask = self.classifier_manager.masks.get(classifier_id)
+                if mask is not None and mask.counters["frames"]:
+                    stats = mask.get_stats()
+                    self.status.showMessage(f"Bereiche aus (zuletzt {stats['skipped_fraction']:.0%} der Pixel ausgelassen, "
+                                            f"{stats['ms']:.0f} ms pro Frame).")
+                self.classifier_manager.set_mask(camera, classifier_id, False)
+                self.mask_drawing = None
+                return
+            mask = self.classifier_manager.set_mask(camera, classifier_id)
+            if mask is not None and mask.is_empty():
+                self.status.showMessage(f"Keine Bereiche für {camera}/{classifier_id}: Ansicht > Erkennungsbereiche > zeichnen.")
+            elif mask is not None:
+                self.status.showMessage(f"Bereiche für {camera}/{classifier_id}: {len(mask.include)} Einschluss, "
+                                        f"{len(mask.exclude)} Ausschluss.")
+        except Exception as e:
+            print(f"Fehler beim Umschalten der Bereiche: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Startet das Zeichnen eines Polygons im Anzeigebereich.
+    def start_mask_polygon(self, kind):
+        """
+        Startet das Zeichnen eines Ein- oder Ausschlussbereichs: Linksklick setzt einen Eckpunkt, Doppelklick oder
+        Rechtsklick schließt das Polygon und speichert es, Escape bricht ab.
+
+        Parameter: kind (str): "include" (Einschluss) oder "exclude" (Ausschluss).
+        """
+        try:
+            if not self.mask_action.isChecked():
+                self.mask_action.setChecked(True)
+                self.toggle_mask(True)
+            self.mask_drawing = (kind, [])
+            self.image_display.setFocus()
+            name = "Einschlussbereich" if kind == "include" else "Ausschlussbereich"
+            self.status.showMessage(f"{name}: Eckpunkte anklicken, Doppel- oder Rechtsklick schließt, Escape bricht ab.")
+        except Exception as e:
+            print(f"Fehler beim Zeichnen des Bereichs: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Schließt das gezeichnete Polygon und speichert die Bereiche.
+    def finish_mask_polygon(self):
+        """
+        Übernimmt das gezeichnete Polygon (mindestens drei Eckpunkte) und speichert die Bereiche der aktuellen Kamera
+        für den aktuellen Klassifizierer.
+        """
+        try:
+            kind, points = self.mask_drawing
+            self.mask_drawing = None
+            camera = self.camera_selector.currentText()
+            classifier_id = self.classifier_manager.current_classifier
+            mask = self.classifier_manager.masks.get(classifier_id) or self.classifier_manager.set_mask(camera, classifier_id)
+            if mask is None or not mask.add_polygon(points, kind):
+                self.status.showMessage("Bereich verworfen (mindestens drei Eckpunkte).")
+                return
+            mask.save(camera, classifier_id)
+            self.status.showMessage(f"Bereiche für {camera}/{classifier_id} gespeichert: {len(mask.include)} Einschluss, "
+                                    f"{len(mask.exclude)} Ausschluss.")
+        except Exception as e:
+            print(f"Fehler beim Speichern des Bereichs: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Löscht die gespeicherten Bereiche der aktuellen Kamera und des aktuellen Klassifizierers.
+    def remove_mask(self):
+        """
+        Löscht die Ein- und Ausschlussbereiche der aktuellen Kamera für den aktuellen Klassifizierer und schaltet sie aus.
+        """
+        try:
+            camera = self.camera_selector.currentText()
+            classifier_id = self.classifier_manager.current_classifier
+            mask = self.classifier_manager.masks.get(classifier_id) or self.classifier_manager.set_mask(camera, classifier_id)
+            if mask is not None:
+                mask.clear()
+                mask.save(camera, classifier_id)
+            self.classifier_manager.set_mask(camera, classifier_id, False)
+            self.mask_action.setChecked(False)
+            self.mask_drawing = None
+            self.status.showMessage(f"Bereiche für {camera}/{classifier_id} gelöscht.")
+        except Exception as e:
+            print(f"Fehler beim Löschen der Bereiche: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Zeichnet die Bereiche und das aktuell gezeichnete Polygon in den Frame.
+    def draw_mask_overlay(self, frame):
+        """
+        Zeichnet die Bereiche des aktuellen Klassifizierers (Einschluss hellblau, Ausschluss rot) und das Polygon,
+        das gerade gezeichnet wird (gelb).
+
+        Parameter: frame (np.ndarray): RGB-Frame (wird verändert).
+        """
+        mask = self.classifier_manager.masks.get(self.classifier_manager.current_classifier)
+        if mask is not None:
+            mask.draw(frame, include_color=(0, 200, 255), exclude_color=(255, 0, 0))
+        if self.mask_drawing is not None and self.mask_drawing[1]:
+            height, width = frame.shape[:2]
+            points = np.round(np.asarray(self.mask_drawing[1]) * (width, height)).astype(np.int32)
+            cv2.polylines(frame, [points], False, (255, 255, 0), 2)
+            for x, y in points:
+                cv2.circle(frame, (int(x), int(y)), 4, (255, 255, 0), -1)
+
+
+    # Nimmt Mausklicks und Tasten im Anzeigebereich beim Zeichnen der Bereiche entgegen.
+    def eventFilter(self, watched, event):
+        """
+        Rechnet Klicks im Anzeigebereich in relative Bildkoordinaten um (das Bild ist zentriert und skaliert).
+
+        Parameter: watched (QObject): Objekt, für das das Ereignis bestimmt ist.
+                   event (QEvent): Ereignis.
+        """
+        if watched is self.image_display and self.mask_drawing is not None:
+            if event.type() == QEvent.Type.KeyPress and event.key() == Qt.Key.Key_Escape:
+                self.mask_drawing = None
+                self.status.showMessage("Zeichnen abgebrochen.")
+                return True
+            if event.type() == QEvent.Type.MouseButtonDblClick or (event.type() == QEvent.Type.MouseButtonPress
+                                                                     and event.button() == Qt.MouseButton.RightButton):
+                self.finish_mask_polygon()
+                return True
+            if event.type() == QEvent.Type.MouseButtonPress and event.button() == Qt.MouseButton.LeftButton:
+                pixmap = self.image_display.pixmap()
+                if pixmap is None or pixmap.isNull():
+                    return True
+                offset_x = (self.image_display.width() - pixmap.width()) / 2 # Zentrierte Ausrichtung
+                offset_y = (self.image_display.height() - pixmap.height()) / 2
+                position = event.position()
+                x = (position.x() - offset_x) / pixmap.width()
+                y = (position.y() - offset_y) / pixmap.height()
+                if 0 <= x <= 1 and 0 <= y <= 1:
+                    self.mask_drawing[1].append((x, y))
+                return True
+        return super().eventFilter(watched, event)
+
+
+    # Schaltet die gleichzeitige Erkennung mehrerer Klassifizierer im Live-Modus ein oder aus.
+    def toggle_multi_cascade(self, checked):
+        """
+        Erkennt im Live-Modus Gesichter in jedem Frame, Oberkörper in jedem 3. und Ganzkörper in jedem 6. Frame
+        (Versätze so verteilt, dass kein Frame alle Klassifizierer trägt). Ergebnisse werden bis zum nächsten
+        Durchlauf gehalten und in eigenen Farben gezeichnet.
+
+        Parameter: checked (bool): Status der Menüaktion.
+        """
+        try:
+            if not checked:
+                if self.scheduler is not None and self.scheduler.counters["frames"]:
+                    stats = self.scheduler.get_stats()
+                    self.status.showMessage(f"Mehrere Klassifizierer aus (zuletzt {stats['mean_ms']:.0f} ms im Mittel, "
+                                            f"höchstens {stats['max_ms']:.0f} ms pro Frame).")
+                self.scheduler = None
+                return
+            self.scheduler = CascadeScheduler(self.classifier_manager)
+            self.scheduler.add("face", cadence=1, priority=2, color=(0, 255, 0)) # Farben im RGB-Frame
+            self.scheduler.add("upperbody", cadence=3, priority=1, color=(255, 160, 0))
+            self.scheduler.add("fullbody", cadence=6, priority=0, color=(200, 0, 255))
+            self.status.showMessage("Reihum: Gesicht (grün) jeden Frame, Oberkörper (orange) jeden 3., Ganzkörper (violett) jeden 6.")
+        except Exception as e:
+            print(f"Fehler beim Umschalten der Klassifizierer: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Schaltet die Aufzeichnung der Abschnitte (Profiler) ein oder aus.
+    def toggle_profiling(self, checked):
+        """
+        Schaltet die Aufzeichnung von Bildaufnahme, Umwandlung, Erkennung, Zeichnen und Anzeige pro Frame ein oder aus.
+
+        Parameter: checked (bool): Status der Menüaktion.
+        """
+        profiler.enabled = checked
+        if checked:
+            self.status.showMessage("Profiling an: Abschnitte werden aufgezeichnet (Info->Profiling->Chrome-Trace speichern).")
+        else:
+            summary = profiler.summary()
+            text = ", ".join(f"{name} {values['mean_ms']:.1f} ms" for name, values in summary.items())
+            self.status.showMessage(f"Profiling aus. Mittelwerte: {text}" if text else "Profiling aus.")
+
+
+    # Speichert die aufgezeichneten Abschnitte als Chrome-Trace.
+    def save_profiling_trace(self):
+        """
+        Speichert die aufgezeichneten Abschnitte als Chrome-Trace (JSON) im Ordner ~/.haarcascades/profiles.
+        """
+        if not profiler.events:
+            self.status.showMessage("Keine Abschnitte aufgezeichnet (Info->Profiling->Aufzeichnen).")
+            return
+        path = profiler.export_chrome_trace()
+        if path:
+            self.status.showMessage(f"Chrome-Trace gespeichert: {path} ({len(profiler.events)} Abschnitte)")
+        else:
+            self.status.showMessage("Fehler beim Speichern des Chrome-Trace.")
+
+
+    # Startet eine zeitlich begrenzte cProfile- oder tracemalloc-Messung der laufenden Schleife.
+    def start_profiling_snapshot(self, kind):
+        """
+        Startet eine Messung über 10 Sekunden; die Datei wird nach Ablauf von update_frame() geschrieben.
+
+        Parameter: kind (str): "cprofile" oder "tracemalloc".
+        """
+        started = profiler.start_cprofile(10.0) if kind == "cprofile" else profiler.start_tracemalloc(10.0)
+        if started:
+            self.status.showMessage(f"{kind} läuft für 10 Sekunden...")
+        else:
+            self.status.showMessage(f"{kind} läuft bereits.")
+
+
+    # Schaltet den Latenz-Regler für scaleFactor und minSize ein oder aus.
+    def toggle_latency_tuner(self, checked):
+        """
+        Schaltet den Latenz-Regler ein (scaleFactor und minSize werden an ein Budget von 50 ms angepasst,
+        zuletzt verwendete Einstellungen dieses Rechners werden übernommen) oder aus.
+
+        Parameter: checked (bool): Status der Menüaktion.
+        """
+        try:
+            tuner = self.classifier_manager.enable_latency_tuner(50.0, enabled=checked)
+            if checked and tuner is None:
+                self.latency_tuner_action.setChecked(False)
+                self.status.showMessage("Fehler: Latenz-Regler konnte nicht aktiviert werden.")
+                return
+            self.status.showMessage("Latenz-Regler an (Budget 50 ms)." if checked else "Latenz-Regler aus.")
+        except Exception as e:
+            print(f"Fehler beim Umschalten des Latenz-Reglers: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Stellt das CPU-Budget bzw. die Ziel-Bildrate ein.
+    def set_cpu_budget(self, cpu_share=None, target_fps=None):
+        """
+        Aktiviert den Regler für ein CPU-Budget oder eine Ziel-Bildrate (beides None: Regler aus).
+        Im Leerlauf (30 s ohne Objekt) wird die Bildrate zusätzlich gesenkt.
+
+        Parameter: cpu_share (float): Anteil der gesamten CPU (0 bis 1).
+                   target_fps (float): Ziel-Bildrate.
+        """
+        try:
+            if self.governor is not None:
+                self.governor.close() # OpenCV-Threads zurücksetzen
+                self.governor = None
+            base_interval = 50 if self.mode_selector.currentText() == "file" else 10
+            if cpu_share is None and target_fps is None:
+                self.status.showMessage("CPU-Budget aus.")
+                if self.timer.isActive():
+                    self.timer.setInterval(base_interval)
+                return
+            self.governor = CpuGovernor(cpu_share, target_fps)
+            interval = self.governor.restart(base_interval)
+            if self.timer.isActive():
+                self.timer.setInterval(interval)
+            self.status.showMessage(self.governor.describe())
+        except Exception as e:
+            print(f"Fehler beim Einstellen des CPU-Budgets: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Schaltet den Export der erkannten Objekte als Ausschnitte ein oder aus.
+    def toggle_crop_export(self, checked):
+        """
+        Schaltet den Export der erkannten Objekte als Ausschnitte ein (Zielordner wird einmal abgefragt) oder aus.
+
+        Parameter: checked (bool): Status der Menüaktion.
+        """
+        try:
+            if checked:
+                folder = self.file_manager.open_folder("Zielordner für Ausschnitte auswählen")
+                if not folder:
+                    self.crop_export_action.setChecked(False)
+                    return
+                self.crop_exporter = CropExporter(folder, self.classifier_manager.current_classifier)
+                self.static_image_exported = False
+                self.status.showMessage(f"Export der Ausschnitte nach {folder} gestartet.")
+            elif self.crop_exporter is not None:
+                exporter, self.crop_exporter = self.crop_exporter, None
+                stats = exporter.close()
+                self.status.showMessage(f"Export beendet: {stats['writer']['written']} Ausschnitte gespeichert, "
+                                        f"{stats['duplicates']} Duplikate, {stats['writer']['dropped']} verworfen.")
+        except Exception as e:
+            print(f"Fehler beim Umschalten des Exports: {str(e)}") # Debug-Ausgabe in Konsole
+            self.status.showMessage(f"Fehler beim Umschalten des Exports: {str(e)}") # Statusnachricht in Statusleiste
+
+
+    # Startet oder beendet die Videoaufnahme der annotierten Frames.
+    def toggle_recording(self, checked):
+        """
+        Startet die Videoaufnahme (Video und Erkennungsprotokoll im Screenshot-Ordner) oder beendet sie.
+
+        Parameter: checked (bool): Status der Menüaktion.
+        """
+        try:
+            if checked:
+                path = os.path.join(self.capture_manager.output_dir, time.strftime("aufnahme_%Y%m%d-%H%M%S.mp4"))
+                self.recorder = VideoRecorder(path)
+                self.status.showMessage(f"Aufnahme nach {path} gestartet.")
+            elif self.recorder is not None:
+                recorder, self.recorder = self.recorder, None
+                stats = recorder.close()
+                self.status.showMessage(f"Aufnahme beendet: {stats['frames']} Frames gespeichert, "
+                                        f"{stats['dropped']} verworfen.")
+        except Exception as e:
+            print(f"Fehler beim Umschalten der Aufnahme: {str(e)}") # Debug-Ausgabe in Konsole
+            self.status.showMessage(f"Fehler beim Umschalten der Aufnahme: {str(e)}") # Statusnachricht in Statusleiste
+            self.recording_action.setChecked(False)
+
+
+    # Schaltet das Speichern der Erkennungsergebnisse ein oder aus.
+    def toggle_event_store(self, checked):
+        """
+        Speichert im Live-Modus das Ergebnis jedes Frames (Zeitstempel, Kamera, Klassifizierer, Rechtecke) in
+        ~/.haarcascades/events bzw. beendet das Speichern und zeigt die Höchstbelegung der letzten Stunde an.
+
+        Parameter: checked (bool): Status der Menüaktion.
+        """
+        try:
+            if checked and self.event_store is None:
+                self.event_store = EventStore()
+                self.status.showMessage(f"Ereignisse werden gespeichert in {self.event_store.root}")
+            elif not checked and self.event_store is not None:
+                store = self.event_store
+                self.event_store = None
+                store.close()
+                now = time.time()
+                timestamp, count = store.peak_occupancy(now - 3600, now)
+                stats = store.get_stats()
+                peak = f", Höchstwert der letzten Stunde: {count} Objekte um {time.strftime('%H:%M:%S', time.localtime(timestamp))}" if timestamp else ""
+                self.status.showMessage(f"Ereignisse gespeichert: {stats['written']} Frames, {stats['dropped']} verworfen{peak}.")
+        except Exception as e:
+            print(f"Fehler beim Umschalten des Ereignisspeichers: {str(e)}") # Debug-Ausgabe in Konsole
+            self.status.showMessage(f"Fehler beim Umschalten des Ereignisspeichers: {str(e)}") # Statusnachricht in Statusleiste
+            self.event_store_action.setChecked(False)
+
+
+    # Stellt die Metriken über einen HTTP-Endpunkt auf localhost bereit oder beendet ihn.
+    def toggle_metrics_endpoint(self, checked):
+        """
+        Startet den OpenMetrics-Endpunkt http://127.0.0.1:9464/metrics (z. B. für Prometheus) oder beendet ihn.
+        Für den Dauerbetrieb auch über HAAR_METRICS_PORT bzw. HAAR_METRICS_FILE beim Start.
+
+        Parameter: checked (bool): Status der Menüaktion.
+        """
+        try:
+            if checked:
+                if not metrics.serve(9464):
+                    raise OSError("Port 9464 nicht verfügbar")
+                self.status.showMessage("Metriken unter http://127.0.0.1:9464/metrics")
+            else:
+                metrics.stop_server()
+                self.status.showMessage("Metrik-Endpunkt beendet.")
+        except Exception as e:
+            print(f"Fehler beim Umschalten des Metrik-Endpunkts: {str(e)}") # Debug-Ausgabe in Konsole
+            self.status.showMessage(f"Fehler beim Umschalten des Metrik-Endpunkts: {str(e)}") # Statusnachricht in Statusleiste
+            self.metrics_action.setChecked(False)
+
+
+    # Beendet laufende Hintergrundaufgaben beim Schließen des Fensters.
+    def closeEvent(self, event):
+        try:
+            if self.crop_exporter is not None:
+                self.crop_exporter.close() # Wartende Ausschnitte schreiben und Manifest schließen
+                self.crop_exporter = None
+            self.capture_manager.close() # Wartende Screenshots schreiben
+            if self.recorder is not None:
+                self.recorder.close() # Wartende Frames schreiben, Video und Protokoll schließen
+                self.recorder = None
+            self.gallery.close() # Vorbereitung der Galeriebilder abbrechen
+            self.classifier_manager.shutdown() # Thread-Pools der Erkennung und der zusätzlichen Durchläufe beenden
+            profiler.close() # Laufende Messungen beenden, ggf. Trace schreiben (HAAR_PROFILE=<Pfad>.json)
+            metrics.close() # Endpunkt beenden, Metrik-Datei ein letztes Mal schreiben
+            if self.event_store is not None:
+                self.event_store.close() # Wartende Ereignisse und offene Minuten schreiben
+                self.event_store = None
+        except Exception as e:
+            print(f"Fehler beim Beenden der Hintergrundaufgaben: {str(e)}") # Debug-Ausgabe in Konsole
+        super().closeEvent(event)
+
+
     # Zeigt ein Dialogfeld mit einer Kurzanleitung an (erreichbar über Menü->Info->Kurzanleitung)
     def show_help(self):
         QMessageBox.about(self, "Kurzanleitung",  "Kamera und Modus auswählen und auf Live-Kamera Starten klicken.\n\nAlternativ Modus auf 'file' setzen und Bild Laden.\n\nObjekte werden automatisch erkannt, markiert und gezählt.\n\nVortrainierte als auch eigene Klassifizierer können geladen werden.\n\nDazu einfach den entsprechenden Button klicken und die XML-Datei auswählen.\n\nViel Spaß!")
@@ -485,6 +1164,7 @@ class App(QMainWindow):
         """
         try:
             self.btn_choose_classifier.setEnabled(False)
+            self.btn_train_classifier.setEnabled(False)
             self.slider_custom_scaleFactor.setEnabled(False)
             self.slider_custom_minNeighbors.setEnabled(False)
             self.slider_custom_minSize.setEnabled(False)
@@ -504,12 +1184,15 @@ class App(QMainWindow):
             elif text == "Eigener Klassifizierer":
                 self.classifier_manager.current_classifier ="custom"
                 self.btn_choose_classifier.setEnabled(True)
+                self.btn_train_classifier.setEnabled(self.train_thread is None)
                 self.slider_custom_scaleFactor.setEnabled(True)
                 self.slider_custom_minNeighbors.setEnabled(True)
                 self.slider_custom_minSize.setEnabled(True)
                 self.custom_classifier_label.setText("Datei auswählen...")
             else:
                 self.classifier_manager.load_classifier("face")
+            if self.mask_action.isChecked(): # Bereiche gelten pro Klassifizierer
+                self.classifier_manager.set_mask(self.camera_selector.currentText(), self.classifier_manager.current_classifier)
         except Exception as e:
             print(f"Fehler beim Ändern des Klassifizierers: {str(e)}") # Debug-Ausgabe in Konsole
             self.status.showMessage(f"Fehler beim Ändern des Klassifizierers: {str(e)}") # Statusnachricht in Statusleiste
@@ -524,35 +1207,127 @@ class App(QMainWindow):
         """
         try:
             self.classifier_manager.load_classifier(classifier_id)
-            self.slider_custom_scaleFactor.blockSignals(True)
-            self.slider_custom_minNeighbors.blockSignals(True)
-            self.slider_custom_minSize.blockSignals(True)
-            self.slider_custom_scaleFactor.setValue(int(self.classifier_manager.classifiers[classifier_id]["scaleFactor"]*10))
-            self.label_custom_scaleFactor.setText(f"scaleFactor: {self.classifier_manager.classifiers[classifier_id]['scaleFactor']}")
-            self.slider_custom_minNeighbors.setValue(self.classifier_manager.classifiers[classifier_id]["minNeighbors"])
-            self.label_custom_minNeighbors.setText(f"minNeighbors: {self.classifier_manager.classifiers[classifier_id]['minNeighbors']}")
-            self.slider_custom_minSize.setValue(self.classifier_manager.classifiers[classifier_id]["minSize"][0])
-            self.label_custom_minSize.setText(f"minSize: {self.classifier_manager.classifiers[classifier_id]['minSize'][0]}")
-            self.slider_custom_scaleFactor.blockSignals(False)
-            self.slider_custom_minNeighbors.blockSignals(False)
-            self.slider_custom_minSize.blockSignals(False)
+            self.show_classifier_parameters(classifier_id)
             self.status.showMessage(f"Vordefinierter Klassifizierer {classifier_id} geladen.")
         except Exception as e:
             print(f"Fehler beim Laden des vordefinierten Klassifizierers: {str(e)}") # Debug-Ausgabe in Konsole
             self.status.showMessage(f"Fehler beim Laden des vordefinierten Klassifizierers: {str(e)}") # Statusnachricht in Statusleiste
             
 
+    # Zeigt die Parameter eines Klassifizierers an den Slidern an, ohne sie erneut zu setzen.
+    def show_classifier_parameters(self, classifier_id):
+        """
+        Stellt Slider und Beschriftungen auf scaleFactor, minNeighbors und minSize eines Klassifizierers
+        (z. B. nach dem Laden oder nach einer Änderung durch den Latenz-Regler).
+
+        Parameter: classifier_id (str): ID des Klassifizierers.
+        """
+        classifier_info = self.classifier_manager.classifiers[classifier_id]
+        self.slider_custom_scaleFactor.blockSignals(True)
+        self.slider_custom_minNeighbors.blockSignals(True)
+        self.slider_custom_minSize.blockSignals(True)
+        self.slider_custom_scaleFactor.setValue(int(classifier_info["scaleFactor"]*10))
+        self.label_custom_scaleFactor.setText(f"scaleFactor: {classifier_info['scaleFactor']}")
+        self.slider_custom_minNeighbors.setValue(classifier_info["minNeighbors"])
+        self.label_custom_minNeighbors.setText(f"minNeighbors: {classifier_info['minNeighbors']}")
+        self.slider_custom_minSize.setValue(classifier_info["minSize"][0])
+        self.label_custom_minSize.setText(f"minSize: {classifier_info['minSize'][0]}")
+        self.slider_custom_scaleFactor.blockSignals(False)
+        self.slider_custom_minNeighbors.blockSignals(False)
+        self.slider_custom_minSize.blockSignals(False)
+
+
     # Lädt benutzerdefinierten Klassifizierer aus einer Datei.
     def load_custom_classifier(self):
         try:
             classifier_name = self.classifier_manager.load_custom_classifier()
             self.custom_classifier_label.setText(classifier_name)
-            self.status.showMessage(f"Benutzerdefinierter Klassifizierer {classifier_name} geladen.")
+            message = f"Benutzerdefinierter Klassifizierer {classifier_name} geladen."
+            self.status.showMessage(message)
+            if self.classifier_manager.classifiers["custom"]["file"] and self.cost_thread is None:
+                # Geschätzte Kosten im Vergleich zum Gesichtsklassifizierer (Kostenmodell, 640x480); die erste
+                # Schätzung kalibriert das Modell einige Sekunden lang und läuft deshalb im Hintergrund
+                def run():
+                    custom_ms = self.classifier_manager.estimate_cost("custom")
+                    face_ms = self.classifier_manager.estimate_cost("face")
+                    if custom_ms is not None and face_ms is not None:
+                        self.cost_message = f"{message} Geschätzt {custom_ms:.0f} ms pro Bild bei 640x480 (Gesicht: {face_ms:.0f} ms)."
+
+                self.cost_message = None
+                self.cost_thread = threading.Thread(target=run, daemon=True)
+                self.cost_thread.start()
+                self.cost_timer.start(200)
         except Exception as e:
             print(f"Fehler beim Laden des benutzerdefinierten Klassifizierers: {str(e)}") # Debug-Ausgabe in Konsole
             self.status.showMessage(f"Fehler beim Laden des benutzerdefinierten Klassifizierers: {str(e)}") # Statusnachricht in Statusleiste
             
 
+    # Zeigt die Kostenschätzung an, sobald sie im Hintergrund berechnet wurde.
+    def update_cost_estimate(self):
+        try:
+            if self.cost_thread is not None and self.cost_thread.is_alive():
+                return
+
+            self.cost_timer.stop()
+            self.cost_thread = None
+            if self.cost_message:
+                self.status.showMessage(self.cost_message)
+        except Exception as e:
+            print(f"Fehler beim Anzeigen der Kostenschätzung: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Startet das Training eines eigenen Klassifizierers im Hintergrund.
+    def train_classifier(self):
+        """
+        Fragt die Ordner mit positiven Beispielen und Negativbildern sowie den Zielpfad ab und startet das Training
+        in einem Hintergrund-Thread. Fortschritt und Zeiten pro Stufe werden in der Statusleiste angezeigt.
+        """
+        try:
+            positive_dir = self.file_manager.open_folder("Ordner mit positiven Beispielen auswählen")
+            negative_dir = self.file_manager.open_folder("Ordner mit Negativbildern auswählen") if positive_dir else None
+            output_path = self.file_manager.save_file_classifier() if negative_dir else None
+            if not output_path:
+                self.status.showMessage("Training abgebrochen.")
+                return
+
+            def progress(message):
+                self.train_message = message # Nur merken, die Statusleiste wird im GUI-Thread aktualisiert
+
+            def run():
+                self.train_result = self.classifier_manager.train_classifier(positive_dir, negative_dir, output_path,
+                                                                             progress=progress, load=False)
+
+            self.train_result = None
+            self.train_message = "Training wird gestartet..."
+            self.btn_train_classifier.setEnabled(False)
+            self.train_thread = threading.Thread(target=run, daemon=True)
+            self.train_thread.start()
+            self.train_timer.start(500)
+        except Exception as e:
+            print(f"Fehler beim Starten des Trainings: {str(e)}") # Debug-Ausgabe in Konsole
+            self.status.showMessage(f"Fehler beim Starten des Trainings: {str(e)}") # Statusnachricht in Statusleiste
+
+
+    # Zeigt den Fortschritt des Trainings an und übernimmt den Klassifizierer nach dem Ende.
+    def update_training_status(self):
+        try:
+            if self.train_thread is not None and self.train_thread.is_alive():
+                self.status.showMessage(f"Training: {self.train_message}")
+                return
+
+            self.train_timer.stop()
+            self.train_thread = None
+            self.btn_train_classifier.setEnabled(self.classifier_manager.current_classifier == "custom")
+            if self.train_result:
+                # Erst hier im GUI-Thread übernehmen, nicht im Trainings-Thread
+                self.custom_classifier_label.setText(self.classifier_manager.use_custom_classifier(self.train_result))
+                self.status.showMessage(f"Training abgeschlossen: {self.train_result}")
+            else:
+                self.status.showMessage("Training fehlgeschlagen oder abgebrochen.")
+        except Exception as e:
+            print(f"Fehler beim Anzeigen des Trainingsfortschritts: {str(e)}") # Debug-Ausgabe in Konsole
+
+
     # Aktualisiert die Liste der verfügbaren Kameras.
     def refresh_camera_list(self):
         """
@@ -599,7 +1374,7 @@ class App(QMainWindow):
             self.camera_manager.start_camera(camera_index)
             print(f"Kamera {camera_index} erfolgreich gestartet.")
             self.status.showMessage(f"Kamera {camera_index} erfolgreich gestartet.")
-            self.timer.start(10)  # Update alle 10 ms
+            self.timer.start(self.governor.restart(10) if self.governor is not None else 10)  # Update alle 10 ms (bzw. laut Regler)
         except Exception as e:
             self.animation_label.setText(f"Kamera konnte nicht gestartet werden: {str(e)}") 
             self.status.showMessage(f"Kamera-Fehler: {str(e)}")
@@ -667,10 +1442,12 @@ class App(QMainWindow):
             self.status.showMessage("Bild wird geladen...") # Statusnachricht in Statusleiste
             file_path = self.file_manager.open_file_picture() # Aufruf der Methode zum Öffnen einer Datei aus dem FileManager
             if file_path:
-                self.static_image = self.file_manager.load_image(file_path) # Aufruf der Methode zum Laden eines Bildes aus dem FileManager
-                self.static_image = cv2.cvtColor(self.static_image, cv2.COLOR_BGR2RGB) # OpenCV (standard) BGR, Umwandlung in RGB
+                if not self.load_static_image(file_path): # Verkleinert laden (Graustufen für die Erkennung, Farbe in Anzeigegröße)
+                    self.status.showMessage(f"Fehler: Bild {file_path} konnte nicht geladen werden.")
+                    return
+                self.static_image_exported = False
                 self.btn_start_camera.setEnabled(False)
-                self.timer.start(50) # Update alle 50 ms
+                self.timer.start(self.governor.restart(50) if self.governor is not None else 50) # Update alle 50 ms (bzw. laut Regler)
                 self.status.showMessage(f"Bild {file_path} erfolgreich geladen.") # Statusnachricht in Statusleiste
                 print(f"Bild {file_path} erfolgreich geladen.") # Debug-Ausgabe in Konsole
 
@@ -679,6 +1456,30 @@ class App(QMainWindow):
             print(f"Fehler beim Laden des Bildes: {str(e)}") # Debug-Ausgabe in Konsole
         
 
+    # Lädt ein Bild verkleinert für Anzeige und Erkennung.
+    def load_static_image(self, file_path):
+        """
+        Lädt ein Bild verkleinert: ein Graustufenbild für die Erkennung (Faktor aus minSize und Fenstergröße des
+        Klassifizierers) und ein Farbbild in Größe des Anzeigebereichs. Das Original wird erst beim Export geladen.
+
+        Parameter: file_path (str): Pfad zur Bilddatei.
+        Rückgabe: True, wenn das Bild geladen wurde, sonst False.
+        """
+        classifier_id = self.classifier_manager.current_classifier
+        loaded = self.file_manager.load_image_reduced(file_path, self.classifier_manager.classifiers[classifier_id]["minSize"],
+                                                      self.classifier_manager.get_window_size(classifier_id),
+                                                      (self.image_display.width(), self.image_display.height()))
+        if loaded is None:
+            return False
+        self.static_image = loaded["display"]
+        self.static_gray = loaded["gray"]
+        self.static_gray_scale = loaded["gray_scale"]
+        self.static_display_scale = loaded["display_scale"]
+        self.static_path = file_path
+        self.preview.set_image(self.static_gray, self.static_gray_scale)
+        return True
+
+
     # Setzt das Bild zurück.
     def reset_image(self):
         """
@@ -696,6 +1497,13 @@ class App(QMainWindow):
             self.btn_load_image.setText("Bild Laden")
             self.status.showMessage("Bild wird zurückgesetzt...")
             self.static_image = None # Bild löschen
+            self.static_gray = None
+            self.preview_stage_label.setText("")
+            self.static_path = None
+            if self.gallery_active: # Galerie beenden und Cache freigeben
+                self.gallery_active = False
+                self.gallery.clear()
+                self.gallery_strip.setVisible(False)
             self.timer.stop() # Timer stoppen (keine Frames mehr aktualisieren)
             self.btn_screenshot.setEnabled(False)
             self.image_display.clear() # Bildanzeige leeren
@@ -727,20 +1535,138 @@ class App(QMainWindow):
             print(f"Fehler beim Laden/Zurücksetzen des Bildes: {str(e)}") # Debug-Ausgabe in Konsole
         
 
+    # Öffnet einen Bildordner als Galerie.
+    def open_gallery(self):
+        """
+        Öffnet einen Bildordner als Galerie (Blättern mit den Pfeiltasten). Die Nachbarbilder werden im Hintergrund
+        dekodiert und ausgewertet, sodass der Wechsel ohne Wartezeit möglich ist.
+        """
+        try:
+            if self.mode_selector.currentText() == "live" and self.timer.isActive():
+                self.status.showMessage("Bitte zuerst die Kamera stoppen.")
+                return
+            folder = self.file_manager.open_folder("Bildordner für die Galerie auswählen")
+            if not folder:
+                return
+            count = self.gallery.open(folder, self.classifier_manager.snapshot_params())
+            if not count:
+                self.status.showMessage(f"Keine Bilder in {folder} gefunden.")
+                return
+
+            self.mode_selector.setCurrentText("file") # Galeriebilder werden wie geladene Bilder angezeigt
+            self.btn_refresh_cameras.setEnabled(False)
+            self.camera_selector.setEnabled(False)
+            self.mode_selector.setEnabled(False)
+            self.classifier_selector.setEnabled(False)
+            self.btn_load_image.setChecked(True)
+            self.btn_load_image.setProperty("status","stop")
+            self.btn_load_image.style().unpolish(self.btn_load_image)
+            self.btn_load_image.style().polish(self.btn_load_image)
+            self.btn_load_image.setText("Bild Reset")
+            self.btn_start_camera.setEnabled(False)
+            self.gallery_active = True
+            self.gallery_strip.setVisible(True)
+            self.show_gallery_image(self.gallery.goto(0))
+            self.timer.start(self.governor.restart(50) if self.governor is not None else 50)
+        except Exception as e: # Fehlerbehandlung
+            self.status.showMessage(f"Fehler beim Öffnen der Galerie: {str(e)}")
+            print(f"Fehler beim Öffnen der Galerie: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Zeigt ein Bild der Galerie an.
+    def show_gallery_image(self, entry):
+        """
+        Übernimmt ein Bild der Galerie als aktuelles Bild und aktualisiert die Vorschaubilder.
+
+        Parameter: entry (dict): Eintrag aus GalleryManager.get() oder None.
+        """
+        try:
+            if entry is None:
+                self.status.showMessage("Fehler: Bild konnte nicht geladen werden.")
+                return
+            self.static_image = entry["image"].copy() # Kopie, da die Rechtecke in das Bild gezeichnet werden
+            self.static_gray = None # Galeriebilder werden in voller Auflösung ausgewertet
+            self.static_path = entry["path"]
+            self.static_image_exported = False
+            self.gallery_objects = entry["objects"]
+            self.gallery_params = self.gallery.params
+            strip = self.gallery.thumbnail_strip()
+            if strip is not None:
+                strip = np.ascontiguousarray(strip)
+                q_image = QImage(strip.data, strip.shape[1], strip.shape[0], 3 * strip.shape[1], QImage.Format.Format_RGB888)
+                self.gallery_strip.setPixmap(QPixmap.fromImage(q_image))
+            prepared = " (im Voraus ausgewertet)" if entry["objects"] is not None else ""
+            self.status.showMessage(f"Bild {self.gallery.index + 1}/{len(self.gallery.files)}: "
+                                    f"{os.path.basename(entry['path'])}{prepared}")
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Anzeigen des Galeriebildes: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Wechselt zum nächsten Bild der Galerie.
+    def next_gallery_image(self):
+        if self.gallery_active:
+            self.show_gallery_image(self.gallery.next())
+
+
+    # Wechselt zum vorherigen Bild der Galerie.
+    def previous_gallery_image(self):
+        if self.gallery_active:
+            self.show_gallery_image(self.gallery.previous())
+
+
     # Erstellt einen Screenshot des aktuellen Frames.
     def save_screenshot(self):
         """
-        Speichert einen Screenshot des aktuellen Frames.
+        Speichert einen Screenshot des aktuellen Frames im Screenshot-Ordner.
+        Kodieren und Schreiben laufen im Hintergrund, die Anzeige wird nicht blockiert.
         """
         try:
-            self.status.showMessage("Screenshot wird gespeichert...")
-            
-            if self.file_manager.save_screenshot(self.current_frame): # Aufruf der Methode zum Speichern eines Screenshots aus dem FileManager
-                self.status.showMessage("Screenshot erfolgreich gespeichert.")
+            # Aktueller annotierter Frame (BGR) aus update_frame; im Modus file liegt er nicht im Ringpuffer
+            path = self.capture_manager.screenshot(self.current_frame)
+            if path:
+                self.status.showMessage(f"Screenshot wird gespeichert: {path}")
             else:
                 self.status.showMessage("Fehler: Screenshot konnte nicht gespeichert werden.")
         except Exception as e: # Fehlerbehandlung
             print(f"Fehler beim Speichern des Screenshots: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Wählt den Zielordner für Screenshots und Serienaufnahmen.
+    def choose_capture_folder(self):
+        try:
+            folder = self.file_manager.open_folder("Zielordner für Screenshots auswählen")
+            if folder:
+                self.capture_manager.configure(output_dir=folder)
+                self.status.showMessage(f"Screenshots werden in {folder} gespeichert.")
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Auswählen des Screenshot-Ordners: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Schaltet das Format der Screenshots zwischen PNG und JPEG um.
+    def toggle_capture_format(self, checked):
+        self.capture_manager.configure(extension=".jpg" if checked else ".png")
+        self.status.showMessage(f"Screenshots werden als {'JPEG' if checked else 'PNG'} gespeichert.")
+
+
+    # Startet eine Serienaufnahme der nächsten Frames.
+    def start_burst(self):
+        try:
+            if self.current_frame is None:
+                self.status.showMessage("Fehler: Kein Bild für die Serienaufnahme vorhanden.")
+                return
+            self.capture_manager.start_burst(30)
+            self.status.showMessage(f"Serienaufnahme (30 Frames) nach {self.capture_manager.output_dir} gestartet.")
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Starten der Serienaufnahme: {str(e)}") # Debug-Ausgabe in Konsole
+
+
+    # Speichert die Frames der letzten Sekunden aus dem Ringpuffer.
+    def save_recent_frames(self):
+        try:
+            count = self.capture_manager.save_window(2.0)
+            self.status.showMessage(f"{count} Frames der letzten 2 Sekunden werden nach {self.capture_manager.output_dir} gespeichert.")
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Speichern der letzten Frames: {str(e)}") # Debug-Ausgabe in Konsole
             
         
     # Aktualisiert den scaleFactor des Klassifizierers basierend auf dem Slider-Wert.
@@ -770,82 +1696,217 @@ class App(QMainWindow):
             print(f"Fehler beim Aktualisieren von minSize: {str(e)}") # Debug-Ausgabe in Konsole    
             
 
+    # Erkennt Objekte im Frame (mit Regler nur in jedem n-ten Frame).
+    def detect_objects(self, frame, t_start, scale=1.0):
+        """
+        Erkennt Objekte im Frame. Ist der Regler aktiv, läuft die Erkennung nur in jedem n-ten Frame
+        (sonst wird das letzte Ergebnis verwendet) und die Kosten von Bildaufnahme und Erkennung werden eingetragen.
+
+        Parameter: frame (np.ndarray): Aktueller Frame.
+                   t_start (float): Beginn des Frames (time.perf_counter()).
+                   scale (float): Verkleinerungsfaktor des Frames gegenüber dem Original (Rechtecke in Pixeln des Originals).
+        """
+        if self.gallery_active and self.mode_selector.currentText() == "file":
+            t_detect = time.perf_counter()
+            objects = self.detect_gallery_objects(frame)
+            self.record_detection(t_start, t_detect)
+            return objects
+        if self.scheduler is not None and self.mode_selector.currentText() == "live": # Mehrere Klassifizierer reihum
+            def detect():
+                self.last_results = self.scheduler.step(frame, scale)
+                objects, self.last_labels = merge_results(self.last_results)
+                return objects
+        else:
+            def detect():
+                classifier_id = self.classifier_manager.current_classifier
+                objects = self.classifier_manager.detect_faces(frame, classifier_id, scale)
+                self.last_results, self.last_labels = [(classifier_id, objects)], None
+                return objects
+        if self.governor is None:
+            self.last_objects = detect()
+            return self.last_objects
+
+        t_detect = time.perf_counter()
+        self.governor.record("capture", (t_detect - t_start) * 1000)
+        if self.governor.should_detect():
+            self.last_objects = detect()
+            self.governor.record("detect", (time.perf_counter() - t_detect) * 1000)
+        else:
+            metrics.inc("frames_dropped", (("reason", "skipped"),)) # Letztes Ergebnis wird weiterverwendet
+        self.t_detected = time.perf_counter()
+        return self.last_objects
+
+
+    # Trägt die Kosten eines Frames ein, dessen Objekte nicht über den Regler ermittelt wurden (Galerie, Vorschau).
+    def record_detection(self, t_start, t_detect):
+        """
+        Trägt die Kosten von Bildaufnahme und Abfrage der Objekte beim Regler ein und merkt das Ende der Erkennung,
+        damit die Kosten des Zeichnens in update_frame() nicht ab einem veralteten Zeitpunkt gemessen werden.
+
+        Parameter: t_start (float): Beginn des Frames (time.perf_counter()).
+                   t_detect (float): Beginn der Abfrage der Objekte (time.perf_counter()).
+        """
+        if self.governor is not None:
+            self.governor.record("capture", (t_detect - t_start) * 1000)
+            self.governor.record("detect", (time.perf_counter() - t_detect) * 1000)
+        self.t_detected = time.perf_counter()
+
+
+    # Liefert die Objekte des aktuellen Galeriebildes (im Voraus ausgewertet oder einmalig erkannt).
+    def detect_gallery_objects(self, frame):
+        """
+        Liefert die Objekte des aktuellen Galeriebildes. Das Ergebnis der Vorbereitung wird verwendet, solange die
+        Parameter unverändert sind. Sonst wertet die Galerie das Bild (und die Nachbarbilder) im Hintergrund neu aus
+        und bis dahin bleibt das Bild ohne Rechtecke; der GUI-Thread erkennt nicht selbst. Ein Wechsel der
+        zusätzlichen Durchläufe, des Maßstabs oder der Bereiche verwirft die vorbereiteten Ergebnisse.
+
+        Parameter: frame (np.ndarray): Aktuelles Galeriebild.
+        """
+        params = self.classifier_manager.snapshot_params()
+        pipeline = self.classifier_manager.detection_state(params.classifier_id)
+        if pipeline != self.gallery_pipeline: # Andere Erkennung bei gleichen Parametern: neu auswerten
+            self.gallery_pipeline = pipeline
+            self.gallery.invalidate()
+            self.gallery_objects = None
+        self.gallery.set_params(params) # Nach einer Slider-Änderung die Nachbarbilder neu auswerten
+        if self.gallery_objects is None or self.gallery_params != params:
+            objects = self.gallery.objects(self.gallery.index) # None, solange die Auswertung im Hintergrund läuft
+            if objects is None:
+                self.last_objects = boxops.as_boxes(None)
+                return self.last_objects
+            self.gallery_objects = objects
+            self.gallery_params = params
+        self.last_objects = self.gallery_objects
+        return self.last_objects
+
+
     # Holt ein Frame von der Kamera und zeigt es in der GUI an. 
     def update_frame(self):
         """
         Lädt den aktuellen Frame, auf grundlage das Aktuellen Modus(live/file) und erkennt Objekte und zeigt Sie in der GUI an.
         """
         try:
+            t_start = time.perf_counter()
             if self.mode_selector.currentText() == "live": # Abfrage des aktuellen Modus, wenn Modus "live", dann
-                frame, ret = self.camera_manager.get_frame() # Frame von Kamera holen mit Aufruf aus CameraManager
+                with profiler.span("capture"):
+                    frame, ret = self.camera_manager.get_frame() # Frame von Kamera holen mit Aufruf aus CameraManager
                 if not ret: # Wenn Kamera keine Frames mehr liefert/disconnected, stoppe Kamera und aktualisiere Kamera-Liste
+                    metrics.inc("camera_reconnects")
                     self.stop_camera()
                     self.refresh_camera_list()
                     self.btn_start_camera.setChecked(False)
                     return  
                 
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) # OpenCV (standard) BGR, Umwandlung in RGB
+                metrics.inc("frames_captured")
+                with profiler.span("convert"):
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) # OpenCV (standard) BGR, Umwandlung in RGB
                 self.current_frame = frame
 
                 # Objekterkennung
-                objects = self.classifier_manager.detect_faces(frame, self.classifier_manager.current_classifier) # Aufruf der Methode zur Objekterkennung aus dem ClassifierManager
+                objects = self.detect_objects(frame, t_start) # Aufruf der Objekterkennung (ggf. nur jeden n-ten Frame laut Regler)
+                if self.crop_exporter is not None: # Ausschnitte vor dem Zeichnen der Rechtecke übergeben
+                    self.crop_exporter.process(frame, objects, rgb=True, source=self.camera_selector.currentText(),
+                                               labels=self.last_labels)
+                if self.event_store is not None: # Nur im Live-Modus (ein geladenes Bild würde pro Timer-Takt erneut gezählt)
+                    for classifier_id, found in self.last_results: # Eine Zeile pro Klassifizierer mit seiner ID
+                        self.event_store.append(found, classifier_id, self.camera_selector.currentText())
                 self.num_objects = len(objects) # Anzahl der erkannten Objekte
                 self.object_count_label.setText(f"<a style=\"text-decoration:none;\" href=\"http://www.easteregg.com\"> {self.num_objects} </a>")
                     
                 # Zeichne grüne Rechtecke um erkannte Gesichter
-                for (x, y, w, h) in objects:
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2) # Zeichne grünes Rechteck um Objekt
+                with profiler.span("draw", objects=len(objects)):
+                    if self.scheduler is not None: # Gehaltene Ergebnisse in der Farbe ihres Klassifizierers
+                        self.scheduler.draw(frame)
+                    else:
+                        boxops.draw(frame, objects, (0, 255, 0), 2) # Alle Rechtecke mit einem Aufruf
+                    self.draw_mask_overlay(frame)
                 
                 # Anzeige des Frames im Anzeigebereich
-                height, width, channel = frame.shape # Größe des Frames
-                aspect_ratio = height/width # Seitenverhältnis
-                bytes_per_line = 3 * width  # 3 Kanäle pro Pixel (RGB)
-
-                q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format.Format_RGB888) # Erstelle QImage aus Frame 
-                pixmap = QPixmap.fromImage(q_image) # Erstelle Pixmap aus QImage
-
-                # Logik für das Skalieren des Bildes
-                i_h = self.image_display.height() # Höhe des QLabel(image_display)
-                w_asp = int(i_h * (width/height)) # Berechne Breite des Bildes basierend auf Höhe und Seitenverhältnis
-                if(w_asp <= self.image_display.width()): 
-                    i_w = w_asp 
-                else:
-                    i_w = self.image_display.width()
-                    i_h = int(i_w * aspect_ratio)
-                scaled_pixmap = pixmap.scaled(i_w,i_h) 
-                self.image_display.setPixmap(scaled_pixmap) # Setze Pixmap in QLabel(image_display)
+                with profiler.span("display"):
+                    height, width, channel = frame.shape # Größe des Frames
+                    aspect_ratio = height/width # Seitenverhältnis
+                    bytes_per_line = 3 * width  # 3 Kanäle pro Pixel (RGB)
+
+                    q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format.Format_RGB888) # Erstelle QImage aus Frame 
+                    pixmap = QPixmap.fromImage(q_image) # Erstelle Pixmap aus QImage
+
+                    # Logik für das Skalieren des Bildes
+                    i_h = self.image_display.height() # Höhe des QLabel(image_display)
+                    w_asp = int(i_h * (width/height)) # Berechne Breite des Bildes basierend auf Höhe und Seitenverhältnis
+                    if(w_asp <= self.image_display.width()): 
+                        i_w = w_asp 
+                    else:
+                        i_w = self.image_display.width()
+                        i_h = int(i_w * aspect_ratio)
+                    scaled_pixmap = pixmap.scaled(i_w,i_h) 
+                    self.image_display.setPixmap(scaled_pixmap) # Setze Pixmap in QLabel(image_display)
                 
             elif self.mode_selector.currentText() == "file": # Abfrage des aktuellen Modus, wenn Modus "live", dann
                 
-                frame = self.static_image 
+                # Verkleinert geladenes Bild: bei geändertem minSize das Graustufenbild mit passendem Faktor neu dekodieren
+                if self.static_gray is not None:
+                    classifier_id = self.classifier_manager.current_classifier
+                    factor = self.file_manager.choose_reduction(self.classifier_manager.classifiers[classifier_id]["minSize"],
+                                                                self.classifier_manager.get_window_size(classifier_id))
+                    if factor != self.static_gray_scale:
+                        with profiler.span("capture", path=self.static_path, factor=factor):
+                            self.load_static_image(self.static_path)
+
+                frame = self.static_image.copy() # Kopie, damit Rechtecke früherer Stufen nicht im Bild bleiben
                 self.current_frame = frame
-
-                # Objekterkennung
-                objects = self.classifier_manager.detect_faces(frame, self.classifier_manager.current_classifier)
+                metrics.inc("frames_captured")
+
+                # Objekterkennung (im verkleinerten Graustufenbild, Rechtecke in Pixeln des Originals)
+                stage = None
+                if self.static_gray is not None:
+                    # Grob-zu-fein: nur nach Änderung der Regler, erst verkleinert, dann volle Auflösung im Hintergrund
+                    pipeline = self.classifier_manager.detection_state()
+                    if pipeline != self.preview_pipeline: # Andere Durchläufe, Maßstab oder Bereiche: neu erkennen
+                        self.preview_pipeline = pipeline
+                        self.preview.refresh()
+                    t_detect = time.perf_counter()
+                    original_objects, stage = self.preview.poll(self.classifier_manager.snapshot_params())
+                    original_objects = original_objects if original_objects is not None else ()
+                    self.record_detection(t_start, t_detect) # detect_objects() läuft hier nicht
+                    objects = boxops.remap(original_objects, 1 / self.static_display_scale) # In Pixel der Anzeige
+                    self.preview_stage_label.setText(stage or "")
+                else:
+                    original_objects = objects = self.detect_objects(frame, t_start)
+                if self.crop_exporter is not None and not self.static_image_exported and stage in (None, STAGE_FULL): # Jedes Bild nur einmal, nicht aus der Vorschau
+                    if self.static_gray is not None: # Ausschnitte aus dem Original (nur für den Export in voller Auflösung laden)
+                        original = self.file_manager.load_image(self.static_path)
+                        if original is not None:
+                            self.crop_exporter.process(original, original_objects, rgb=False, source=self.static_path)
+                        del original
+                    else:
+                        self.crop_exporter.process(frame, objects, rgb=True, source="file")
+                    self.static_image_exported = True
                 self.num_objects = len(objects) # Anzahl der erkannten Objekte
                 self.object_count_label.setText(f"<a style=\"text-decoration:none;\" href=\"http://www.easteregg.com\"> {self.num_objects} </a>")
                     
                 # Zeichne grüne Rechtecke um erkannte Gesichter
-                for (x, y, w, h) in objects:
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2) # Zeichne grünes Rechteck um Objekt
-
-                height, width, channel = frame.shape # Größe des Frames
-                aspect_ratio = height/width # Seitenverhältnis
-                bytes_per_line = 3 * width  # 3 Kanäle pro Pixel (RGB)
-
-                q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format.Format_RGB888) # Erstelle QImage aus Frame 
-                pixmap = QPixmap.fromImage(q_image) # Erstelle Pixmap aus QImage
-
-                # Logik für das Skalieren des Bildes
-                i_h = self.image_display.height() # Höhe des QLabel(image_display)
-                w_asp = int(i_h * (width/height)) # Berechne Breite des Bildes basierend auf Höhe und Seitenverhältnis
-                if(w_asp <= self.image_display.width()): 
-                    i_w = w_asp 
-                else:
-                    i_w = self.image_display.width()
-                    i_h = int(i_w * aspect_ratio)
-                scaled_pixmap = pixmap.scaled(i_w,i_h) 
-                self.image_display.setPixmap(scaled_pixmap) # Setze Pixmap in QLabel(image_display)         
+                with profiler.span("draw", objects=len(objects)):
+                    boxops.draw(frame, objects, (0, 255, 0), 2) # Alle Rechtecke mit einem Aufruf
+                    self.draw_mask_overlay(frame)
+
+                with profiler.span("display"):
+                    height, width, channel = frame.shape # Größe des Frames
+                    aspect_ratio = height/width # Seitenverhältnis
+                    bytes_per_line = 3 * width  # 3 Kanäle pro Pixel (RGB)
+
+                    q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format.Format_RGB888) # Erstelle QImage aus Frame 
+                    pixmap = QPixmap.fromImage(q_image) # Erstelle Pixmap aus QImage
+
+                    # Logik für das Skalieren des Bildes
+                    i_h = self.image_display.height() # Höhe des QLabel(image_display)
+                    w_asp = int(i_h * (width/height)) # Berechne Breite des Bildes basierend auf Höhe und Seitenverhältnis
+                    if(w_asp <= self.image_display.width()): 
+                        i_w = w_asp 
+                    else:
+                        i_w = self.image_display.width()
+                        i_h = int(i_w * aspect_ratio)
+                    scaled_pixmap = pixmap.scaled(i_w,i_h) 
+                    self.image_display.setPixmap(scaled_pixmap) # Setze Pixmap in QLabel(image_display)         
                 
 
             # Screenshot-Button aktivieren, wenn Frame vorhanden
@@ -853,10 +1914,41 @@ class App(QMainWindow):
                 self.btn_screenshot.setEnabled(True)
             else:
                 self.btn_screenshot.setEnabled(False)
-            self.current_frame = cv2.cvtColor(self.current_frame, cv2.COLOR_RGB2BGR) # OpenCV (standard) BGR, Umwandlung in RGB
-            # Zeichne grüne Rechtecke um erkannte Gesichter
-            for (x, y, w, h) in objects:
-                cv2.rectangle(self.current_frame, (x, y), (x + w, y + h), (0, 255, 0), 2) # Zeichne grünes Rechteck um Objekt
+            with profiler.span("convert"):
+                self.current_frame = cv2.cvtColor(self.current_frame, cv2.COLOR_RGB2BGR) # OpenCV (standard) BGR, Umwandlung in RGB (Rechtecke sind bereits gezeichnet)
+            with profiler.span("export"):
+                live = self.mode_selector.currentText() == "live"
+                if live: # Im Modus file wäre jeder Takt eine neue Kopie desselben Bildes
+                    self.capture_manager.push(self.current_frame) # Ringpuffer und laufende Serienaufnahme (ohne Kopie)
+                if self.recorder is not None:
+                    labels = self.last_labels if live else None
+                    self.recorder.write(self.current_frame, objects, labels=labels) # Kehrt sofort zurück, bei Überlast wird verworfen
+
+            # Änderungen des Latenz-Reglers anzeigen
+            if self.classifier_manager.latency_tuner is not None:
+                for change in self.classifier_manager.latency_tuner.pop_changes():
+                    if change["classifier"] == self.classifier_manager.current_classifier:
+                        self.show_classifier_parameters(change["classifier"]) # Slider auf die neuen Werte stellen
+                    self.status.showMessage(f"Latenz-Regler: {self.classifier_manager.latency_tuner.describe(change)}")
+
+            # Ergebnis des Lernens des Maßstabs anzeigen (auch zu wenige Objekte)
+            scale_map = self.classifier_manager.scale_map
+            if scale_map is not None:
+                for result in scale_map.pop_results():
+                    self.status.showMessage(scale_map.describe(result))
+
+            # Regler: Kosten eintragen, einmal pro Periode Timer-Intervall anpassen und Entscheidung anzeigen
+            if self.governor is not None:
+                self.governor.record("draw", (time.perf_counter() - self.t_detected) * 1000) # Zeichnen, Anzeige, Export
+                if self.governor.end_frame(len(objects)):
+                    self.timer.setInterval(self.governor.interval_ms)
+                    self.status.showMessage(self.governor.describe())
+
+            # Profiler: Frame abschließen, abgelaufene cProfile-/tracemalloc-Messung schreiben
+            written = profiler.tick()
+            if written:
+                self.status.showMessage(f"Profil gespeichert: {written}")
         except Exception as e: # Fehlerbehandlung
+            metrics.inc("frames_dropped", (("reason", "error"),))
             print(f"Fehler beim Aktualisieren des Frames: {str(e)}") # Debug-Ausgabe in Konsole
             
\ No newline at end of file
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+import cv2
+from atomicfile import atomic_write
+from boundedexecutor import BoundedExecutor
+
+
+# Schreibt Bilder im Hintergrund (Kodierung und Dateizugriff außerhalb des aufrufenden Threads).
+class AsyncImageWriter:
+    """
+    Schreibt Bilder im Hintergrund auf einem begrenzten Thread-Pool.
+    Ist der Pool ausgelastet, wird der Auftrag verworfen und gezählt, statt den aufrufenden Thread
+    (Kamera/GUI) zu blockieren. cv2.imencode gibt den GIL frei, daher laufen mehrere Worker parallel.
+    """
+
+    # Initialisiert den Writer.
+    def __init__(self, workers=2, max_pending=32, png_compression=3, jpeg_quality=95):
+        """
+        Initialisiert den Writer.
+        :param workers: Anzahl der Worker-Threads.
+        :param max_pending: Anzahl der zusätzlich wartenden Aufträge (danach wird verworfen).
+        :param png_compression: PNG-Kompression 0 (schnell, groß) bis 9 (langsam, klein).
+        :param jpeg_quality: JPEG-Qualität 0 bis 100.
+        """
+
+        self.executor = BoundedExecutor(workers, max_pending)
+        self.png_compression = png_compression
+        self.jpeg_quality = jpeg_quality
+        self.lock = threading.Lock()
+        self.counters = {"accepted": 0, "written": 0, "dropped": 0, "errors": 0, "bytes": 0, "encode_ms": 0.0}
+
+    # Liefert die Kodierungsparameter für eine Dateiendung.
+    def _encode_params(self, extension):
+        if extension in (".jpg", ".jpeg"):
+            return [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)]
+        if extension == ".png":
+            return [cv2.IMWRITE_PNG_COMPRESSION, int(self.png_compression)]
+        return []
+
+    # Übergibt ein Bild zum Schreiben.
+    def write(self, path, image, rgb=False, on_done=None):
+        """
+        Übergibt ein Bild zum Schreiben (kehrt sofort zurück).
+        Das Bild darf danach nicht mehr verändert werden (ggf. vorher kopieren).
+        :param path: Zielpfad (Format über die Dateiendung).
+        :param image: Bild als NumPy-Array (BGR, bei rgb=True RGB).
+        :param rgb: True, wenn das Bild in RGB vorliegt (wird im Worker umgewandelt).
+        :param on_done: Optionale Funktion on_done(path, bytes), wird nach erfolgreichem Schreiben im Worker aufgerufen.
+        :return: True, wenn der Auftrag angenommen wurde, False, wenn er verworfen wurde.
+        """
+
+        future = self.executor.submit(self._write, path, image, rgb, on_done, blocking=False)
+        with self.lock:
+            if future is None:
+                self.counters["dropped"] += 1
+                return False
+            self.counters["accepted"] += 1
+        return True
+
+    # Kodiert und schreibt ein Bild (läuft im Worker).
+    def _write(self, path, image, rgb, on_done):
+        try:
+            t0 = time.perf_counter()
+            if rgb:
+                image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            extension = os.path.splitext(path)[1].lower()
+            ok, data = cv2.imencode(extension, image, self._encode_params(extension))
+            encode_ms = (time.perf_counter() - t0) * 1000
+            if not ok:
+                raise ValueError(f"Kodierung fehlgeschlagen: {path}")
+
+            with atomic_write(path, "wb") as file: # Halbe Dateien sind für andere Programme nie sichtbar
+                file.write(data.tobytes())
+
+            with self.lock:
+                self.counters["written"] += 1
+                self.counters["bytes"] += len(data)
+                self.counters["encode_ms"] += encode_ms
+            if on_done is not None:
+                on_done(path, len(data))
+        except Exception as e: # Fehlerbehandlung
+            with self.lock:
+                self.counters["errors"] += 1
+            print(f"Fehler beim Schreiben von {path}: {e}")
+
+    # Liefert die Zähler des Writers.
+    def get_stats(self):
+        """
+        :return: Dictionary mit angenommenen, geschriebenen, verworfenen und fehlerhaften Aufträgen,
+                 geschriebenen Bytes und mittlerer Kodierzeit in ms.
+        """
+
+        with self.lock:
+            stats = dict(self.counters)
+        stats["pending"] = stats["accepted"] - stats["written"] - stats["errors"]
+        stats["encode_ms"] = round(stats["encode_ms"] / max(stats["written"], 1), 2)
+        return stats
+
+    # Beendet den Writer.
+    def close(self, wait=True):
+        """
+        Beendet den Writer.
+        :param wait: Auf noch wartende Aufträge warten (sonst werden sie verworfen).
+        :return: get_stats()
+        """
+
+        self.executor.shutdown(wait=wait, cancel_pending=not wait)
+        return self.get_stats()
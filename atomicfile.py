@@ -0,0 +1,60 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+_umask = None # umask des Prozesses (beim ersten Aufruf von current_umask() ermittelt)
+_umask_lock = threading.Lock()
+
+
+# Liefert die umask des Prozesses.
+def current_umask():
+    """
+    Ermittelt die umask einmalig: unter Linux aus /proc/self/status, ohne sie zu verändern; sonst über os.umask(), das
+    die umask kurz setzt und sofort zurücksetzt.
+    :return: umask (z. B. 0o022)
+    """
+
+    global _umask
+    with _umask_lock:
+        if _umask is None:
+            try:
+                with open("/proc/self/status", "r", encoding="ascii") as file:
+                    for line in file:
+                        if line.startswith("Umask:"):
+                            _umask = int(line.split()[1], 8)
+                            break
+            except (OSError, ValueError):
+                pass
+            if _umask is None:
+                _umask = os.umask(0o022)
+                os.umask(_umask)
+        return _umask
+
+
+# Schreibt eine Datei über eine eindeutige temporäre Datei im Zielordner.
+@contextmanager
+def atomic_write(path, mode="w", encoding=None, prefix="."):
+    """
+    Liefert eine zum Schreiben geöffnete temporäre Datei im Zielordner (Ordner wird bei Bedarf angelegt). Nach dem
+    Block erhält sie die üblichen Rechte (0666 ohne umask, mkstemp legt sie mit 0600 an) und ersetzt path atomar:
+    Leser sehen nie eine halb geschriebene Datei, mehrere Schreiber kommen sich nicht in die Quere. Bei einem Fehler
+    wird die temporäre Datei gelöscht und path bleibt unverändert.
+    :param path: Zieldatei.
+    :param mode: "w" (Text) oder "wb" (binär).
+    :param encoding: Kodierung im Textmodus (z. B. "utf-8").
+    :param prefix: Anfang des temporären Namens (Standard: versteckt, z. B. für überwachte Ordner).
+    :return: Kontextmanager, der das Dateiobjekt liefert
+    """
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    handle, tmp_path = tempfile.mkstemp(dir=directory, prefix=prefix, suffix=".tmp")
+    try:
+        with os.fdopen(handle, mode, encoding=encoding) as file:
+            yield file
+        os.chmod(tmp_path, 0o666 & ~current_umask())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
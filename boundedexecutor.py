@@ -0,0 +1,60 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Thread-Pool mit begrenzter Anzahl an gleichzeitig angenommenen Aufträgen.
+class BoundedExecutor:
+    """
+    Thread-Pool mit begrenzter Anzahl an gleichzeitig angenommenen Aufträgen.
+    Ist das Limit erreicht, wartet submit() auf einen freien Platz (oder gibt bei blocking=False None zurück).
+    """
+
+    # Initialisiert den Thread-Pool.
+    def __init__(self, max_workers, max_pending):
+        """
+        Initialisiert den Thread-Pool.
+        :param max_workers: Anzahl der Worker-Threads.
+        :param max_pending: Anzahl der Aufträge, die zusätzlich in der Warteschlange stehen dürfen.
+        """
+
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="haar-worker")
+        self.slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    # Übergibt einen Auftrag an den Thread-Pool.
+    def submit(self, fn, *args, blocking=True, timeout=None):
+        """
+        Übergibt einen Auftrag an den Thread-Pool.
+        :param fn: Auszuführende Funktion.
+        :param args: Argumente der Funktion.
+        :param blocking: Auf einen freien Platz warten (True) oder sofort zurückkehren (False).
+        :param timeout: Maximale Wartezeit in Sekunden (nur bei blocking=True).
+        :return: Future des Auftrags oder None, falls kein Platz frei war.
+        """
+
+        if blocking:
+            acquired = self.slots.acquire(timeout=timeout)
+        else:
+            acquired = self.slots.acquire(blocking=False)
+        if not acquired:
+            return None
+
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception: # Platz wieder freigeben, wenn der Pool bereits beendet wurde
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda f: self.slots.release())
+        return future
+
+    # Beendet den Thread-Pool.
+    def shutdown(self, wait=True, cancel_pending=True):
+        """
+        Beendet den Thread-Pool.
+        :param wait: Auf laufende Aufträge warten.
+        :param cancel_pending: Noch nicht gestartete Aufträge verwerfen (sonst werden sie noch ausgeführt).
+        :return: None
+        """
+
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_pending)
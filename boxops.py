@@ -0,0 +1,301 @@
+import cv2
+import numpy as np
+
+# Alle Funktionen arbeiten auf Arrays (N, 4) mit Rechtecken (x, y, w, h) wie von detectMultiScale.
+# Die Berechnungen laufen vektorisiert über alle Rechtecke bzw. Paare; Schleifen gibt es nur über die
+# behaltenen Rechtecke (Soft-NMS, Fusion), nie über alle Rechtecke. NMS und Gruppierung übernimmt OpenCV
+# (cv2.dnn.NMSBoxes, cv2.groupRectangles), das bei vielen Rechtecken schneller ist als jede Paarmatrix.
+
+
+# Wandelt ein Ergebnis von detectMultiScale (Tupel, Liste oder Array) in ein Array (N, 4) um.
+def as_boxes(objects, dtype=np.int32):
+    """
+    :param objects: Rechtecke (x, y, w, h) oder None.
+    :param dtype: Datentyp des Ergebnisses.
+    :return: NumPy-Array (N, 4)
+    """
+
+    if objects is None:
+        return np.empty((0, 4), dtype=dtype)
+    return np.asarray(objects, dtype=dtype).reshape(-1, 4)
+
+
+# Berechnet die IoU-Matrix zweier Mengen von Rechtecken.
+def iou_matrix(a, b=None):
+    """
+    :param a: Array (N, 4).
+    :param b: Array (M, 4) (Standard: a).
+    :return: Array (N, M) mit Schnittfläche / Vereinigungsfläche aller Paare.
+    """
+
+    a = as_boxes(a, np.float32)
+    b = a if b is None else as_boxes(b, np.float32)
+    inter = _intersection(a, b)
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :]
+    union -= inter
+    np.maximum(union, 1e-9, out=union)
+    return np.divide(inter, union, out=inter)
+
+
+# Berechnet die Schnittflächen aller Paare (float32 und Zwischenergebnisse in place: wenig Speicherverkehr bei großen N).
+def _intersection(a, b):
+    width = np.minimum((a[:, 0] + a[:, 2])[:, None], (b[:, 0] + b[:, 2])[None, :])
+    width -= np.maximum(a[:, 0, None], b[None, :, 0])
+    np.maximum(width, 0, out=width)
+    height = np.minimum((a[:, 1] + a[:, 3])[:, None], (b[:, 1] + b[:, 3])[None, :])
+    height -= np.maximum(a[:, 1, None], b[None, :, 1])
+    np.maximum(height, 0, out=height)
+    width *= height
+    return width
+
+
+# Berechnet die IoU eines Rechtecks mit vielen Rechtecken.
+def _iou_one(box, boxes, areas):
+    width = np.minimum(box[0] + box[2], boxes[:, 0] + boxes[:, 2]) - np.maximum(box[0], boxes[:, 0])
+    height = np.minimum(box[1] + box[3], boxes[:, 1] + boxes[:, 3]) - np.maximum(box[1], boxes[:, 1])
+    inter = np.clip(width, 0, None) * np.clip(height, 0, None)
+    return inter / np.maximum(box[2] * box[3] + areas - inter, 1e-9)
+
+
+# Prüft, welche Rechtecke sich mit mindestens einem Rechteck einer zweiten Menge überschneiden.
+def intersects(a, b):
+    """
+    :param a: Array (N, 4).
+    :param b: Array (M, 4).
+    :return: Bool-Array (N,), True für jedes Rechteck aus a mit einer echten Überschneidung (Fläche > 0) in b.
+    """
+
+    a, b = as_boxes(a, np.float32), as_boxes(b, np.float32)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros(len(a), dtype=bool)
+    return (_intersection(a, b) > 0).any(axis=1)
+
+
+# Non-Maximum-Suppression.
+def nms(boxes, scores=None, iou_threshold=0.3, order=None):
+    """
+    Behält von überlappenden Rechtecken jeweils das mit der höchsten Bewertung (cv2.dnn.NMSBoxes; bei gleicher
+    Bewertung gewinnt das frühere Rechteck).
+    :param boxes: Array (N, 4).
+    :param scores: Bewertungen (N,) (Standard: Fläche, größere Rechtecke zuerst).
+    :param iou_threshold: Rechtecke mit größerer IoU zu einem behaltenen Rechteck werden verworfen.
+    :param order: Optionale Reihenfolge der Indizes nach Priorität (hat Vorrang vor scores).
+    :return: Indizes der behaltenen Rechtecke in Reihenfolge der Priorität.
+    """
+
+    boxes = as_boxes(boxes, np.float64)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+    if order is None:
+        areas = boxes[:, 2] * boxes[:, 3]
+        order = np.argsort(-(areas if scores is None else np.asarray(scores, dtype=np.float64)), kind="stable")
+    order = np.asarray(order, dtype=np.int64)
+
+    # NMSBoxes verlangt Bewertungen > 0: Rang als Bewertung (N für den ersten, 1 für den letzten Index von order),
+    # Indizes außerhalb von order bekommen 0 und werden verworfen
+    rank = np.zeros(len(boxes), dtype=np.float32)
+    rank[order] = np.arange(len(order), 0, -1)
+    return np.asarray(cv2.dnn.NMSBoxes(boxes, rank, 0.0, iou_threshold), dtype=np.int64).reshape(-1)
+
+
+# Soft-NMS: senkt die Bewertung überlappender Rechtecke, statt sie zu verwerfen.
+def soft_nms(boxes, scores, sigma=0.5, iou_threshold=0.3, score_threshold=0.001, method="gaussian"):
+    """
+    :param boxes: Array (N, 4).
+    :param scores: Bewertungen (N,).
+    :param sigma: Breite der Gauß-Gewichtung (method="gaussian").
+    :param iou_threshold: Ab dieser IoU wird die Bewertung gesenkt (method="linear").
+    :param score_threshold: Rechtecke mit kleinerer Bewertung werden verworfen.
+    :param method: "gaussian" oder "linear".
+    :return: (Indizes der behaltenen Rechtecke, neue Bewertungen) in absteigender Reihenfolge der Bewertung.
+    """
+
+    boxes = as_boxes(boxes, np.float64)
+    scores = np.asarray(scores, dtype=np.float64).copy()
+    areas = boxes[:, 2] * boxes[:, 3]
+    remaining = np.flatnonzero(scores >= score_threshold)
+    keep, kept_scores = [], []
+    while len(remaining):
+        best = np.argmax(scores[remaining])
+        i = remaining[best]
+        keep.append(i)
+        kept_scores.append(scores[i])
+        remaining = np.delete(remaining, best)
+        iou = _iou_one(boxes[i], boxes[remaining], areas[remaining])
+        if method == "gaussian":
+            scores[remaining] *= np.exp(-(iou ** 2) / sigma)
+        else:
+            scores[remaining] *= np.where(iou > iou_threshold, 1 - iou, 1.0)
+        remaining = remaining[scores[remaining] >= score_threshold]
+    return np.array(keep, dtype=np.int64), np.array(kept_scores)
+
+
+# Weighted Box Fusion: fasst überlappende Rechtecke zu einem gewichteten Mittel zusammen.
+def weighted_box_fusion(boxes, scores=None, iou_threshold=0.55):
+    """
+    Bildet Cluster wie NMS (Rechteck mit der höchsten Bewertung und alle mit größerer IoU) und ersetzt jeden Cluster
+    durch das mit den Bewertungen gewichtete Mittel seiner Koordinaten (statt nur das beste Rechteck zu behalten).
+    :param boxes: Array (N, 4).
+    :param scores: Bewertungen (N,) (Standard: alle 1).
+    :param iou_threshold: Mindest-IoU für die Zugehörigkeit zu einem Cluster.
+    :return: (Array (M, 4) int32 der zusammengefassten Rechtecke, mittlere Bewertung (M,), Größe der Cluster (M,))
+    """
+
+    boxes = as_boxes(boxes, np.float64)
+    scores = np.ones(len(boxes)) if scores is None else np.asarray(scores, dtype=np.float64)
+    areas = boxes[:, 2] * boxes[:, 3]
+    order = np.argsort(-scores, kind="stable")
+    fused, fused_scores, counts = [], [], []
+    while len(order):
+        i = order[0]
+        members = order[_iou_one(boxes[i], boxes[order], areas[order]) > iou_threshold]
+        members = members if len(members) else order[:1]
+        weights = scores[members]
+        corners = np.concatenate([boxes[members, :2], boxes[members, :2] + boxes[members, 2:]], axis=1)
+        x0, y0, x1, y1 = (corners * weights[:, None]).sum(axis=0) / max(weights.sum(), 1e-9)
+        fused.append([x0, y0, x1 - x0, y1 - y0])
+        fused_scores.append(weights.mean())
+        counts.append(len(members))
+        order = order[~np.isin(order, members)]
+    return (np.round(np.array(fused, dtype=np.float64)).astype(np.int32).reshape(-1, 4),
+            np.array(fused_scores), np.array(counts, dtype=np.int64))
+
+
+# Fasst ähnliche Rechtecke mit cv2.groupRectangles zusammen.
+def group_similar(boxes, eps=0.2, min_neighbors=0):
+    """
+    Fasst ähnliche Rechtecke mit cv2.groupRectangles zusammen: zwei Rechtecke sind ähnlich, wenn alle Kanten weniger
+    als eps * (mittlere Seitenlänge des kleineren) voneinander entfernt sind; Gruppen (transitiv) werden gemittelt und
+    kleine Rechtecke innerhalb größerer, stärkerer Gruppen entfernt.
+    Mit min_neighbors=0 bleiben auch Einzeltreffer erhalten (groupRectangles(boxes + boxes, 1, eps)).
+    :param boxes: Array (N, 4).
+    :param eps: Toleranz (wie in OpenCV, Standard 0.2).
+    :param min_neighbors: Gruppen mit höchstens so vielen Rechtecken werden verworfen.
+    :return: (Array (M, 4) int32, Anzahl der Rechtecke pro Gruppe (M,))
+    """
+
+    boxes = as_boxes(boxes)
+    if len(boxes) == 0:
+        return np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.int64)
+    if min_neighbors == 0: # Jedes Rechteck doppelt übergeben, die Anzahlen sind dann doppelt so groß
+        merged, weights = cv2.groupRectangles(np.concatenate([boxes, boxes]), 1, eps)
+        counts = np.asarray(weights, dtype=np.int64).reshape(-1) // 2
+    else:
+        merged, weights = cv2.groupRectangles(boxes, min_neighbors, eps)
+        counts = np.asarray(weights, dtype=np.int64).reshape(-1)
+    return as_boxes(merged), counts
+
+
+# Schneidet Rechtecke an den Bildrändern ab.
+def clip(boxes, width, height):
+    """
+    :param boxes: Array (N, 4).
+    :param width: Bildbreite.
+    :param height: Bildhöhe.
+    :return: Array (N, 4) innerhalb des Bildes (leere Rechtecke haben Breite bzw. Höhe 0).
+    """
+
+    boxes = as_boxes(boxes, np.int64)
+    x0 = np.clip(boxes[:, 0], 0, width)
+    y0 = np.clip(boxes[:, 1], 0, height)
+    x1 = np.clip(boxes[:, 0] + boxes[:, 2], 0, width)
+    y1 = np.clip(boxes[:, 1] + boxes[:, 3], 0, height)
+    return np.stack([x0, y0, x1 - x0, y1 - y0], axis=1).astype(np.int32)
+
+
+# Rechnet Rechtecke aus einem skalierten Bild oder Ausschnitt in das Ausgangsbild um.
+def remap(boxes, scale=1.0, offset=(0, 0)):
+    """
+    :param boxes: Array (N, 4) im skalierten Bild bzw. Ausschnitt.
+    :param scale: Faktor vom skalierten Bild zum Ausgangsbild (z. B. 4 bei Erkennung auf einem Viertel der Breite);
+                  Zahl oder (sx, sy).
+    :param offset: Position (x, y) des Ausschnitts im Ausgangsbild.
+    :return: Array (N, 4) int32 im Ausgangsbild.
+    """
+
+    boxes = as_boxes(boxes, np.float64)
+    sx, sy = (scale, scale) if np.isscalar(scale) else scale
+    boxes = boxes * [sx, sy, sx, sy] + [offset[0], offset[1], 0, 0]
+    return np.round(boxes).astype(np.int32)
+
+
+# Zeichnet alle Rechtecke mit einem Aufruf.
+def draw(image, boxes, color=(0, 255, 0), thickness=2):
+    """
+    Zeichnet alle Rechtecke mit einem Aufruf von cv2.polylines (statt einer Schleife mit cv2.rectangle).
+    :param image: Bild (wird verändert).
+    :param boxes: Array (N, 4).
+    :param color: Farbe.
+    :param thickness: Linienstärke.
+    :return: image
+    """
+
+    boxes = as_boxes(boxes)
+    if len(boxes):
+        x0, y0 = boxes[:, 0], boxes[:, 1]
+        x1, y1 = x0 + boxes[:, 2], y0 + boxes[:, 3]
+        corners = np.stack([np.stack([x0, y0], 1), np.stack([x1, y0], 1), np.stack([x1, y1], 1), np.stack([x0, y1], 1)], 1)
+        cv2.polylines(image, list(corners), True, color, thickness)
+    return image
+
+
+# Mikro-Benchmarks mit zufälligen Rechtecken (Gruppen um zufällige Mittelpunkte wie bei einer Erkennung).
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description="Nachbearbeitung von Rechtecken: Mikro-Benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10, 100, 1000, 3000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    # Erzeugt n Rechtecke in Gruppen von etwa 5 leicht verschobenen Rechtecken
+    def make_boxes(n):
+        centers = rng.uniform(50, 1870, (max(n // 5, 1), 2))
+        sizes = rng.uniform(30, 200, len(centers))
+        index = rng.integers(0, len(centers), n)
+        size = sizes[index] * rng.uniform(0.9, 1.1, n)
+        xy = centers[index] + rng.normal(0, 3, (n, 2)) - size[:, None] / 2
+        return np.column_stack([xy, size, size]).round().astype(np.int32)
+
+    def timed(fn):
+        fn()
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        return round((time.perf_counter() - t0) * 1000 / args.repeat, 3)
+
+    results = {}
+    for n in args.sizes:
+        boxes = make_boxes(n)
+        scores = rng.uniform(0, 1, n)
+        image = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        rects = boxes.tolist()
+
+        def draw_loop():
+            for (x, y, w, h) in boxes:
+                cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+
+        results[n] = {
+            "iou_matrix_ms": timed(lambda: iou_matrix(boxes)),
+            "nms_ms": timed(lambda: nms(boxes, scores)),
+            "cv2_dnn_nms_ms": timed(lambda: cv2.dnn.NMSBoxes(rects, scores.tolist(), 0.0, 0.3)),
+            "soft_nms_ms": timed(lambda: soft_nms(boxes, scores)),
+            "wbf_ms": timed(lambda: weighted_box_fusion(boxes, scores)),
+            "group_similar_ms": timed(lambda: group_similar(boxes)),
+            "cv2_groupRectangles_ms": timed(lambda: cv2.groupRectangles(rects + rects, 1, 0.2)),
+            "clip_remap_ms": timed(lambda: clip(remap(boxes, 2.0, (10, 10)), 1920, 1080)),
+            "draw_ms": timed(lambda: draw(image, boxes)),
+            "draw_loop_ms": timed(draw_loop),
+        }
+        # Übereinstimmung mit OpenCV
+        grouped, _ = group_similar(boxes)
+        reference, _ = cv2.groupRectangles(rects + rects, 1, 0.2)
+        results[n]["group_matches_cv2"] = sorted(map(tuple, grouped.tolist())) == sorted(map(tuple, np.asarray(reference).reshape(-1, 4).tolist()))
+        kept = nms(boxes, scores)
+        reference = np.asarray(cv2.dnn.NMSBoxes(rects, scores.tolist(), 0.0, 0.3)).reshape(-1)
+        results[n]["nms_matches_cv2"] = sorted(kept.tolist()) == sorted(reference.tolist())
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from collections import deque
+from asyncwriter import AsyncImageWriter
+
+
+# Speichert Screenshots und Serienaufnahmen im Hintergrund, ohne die Anzeige zu blockieren.
+class CaptureManager:
+    """
+    Speichert Screenshots und Serienaufnahmen der annotierten Frames im Hintergrund.
+    Zielordner und Namensschema werden vorab festgelegt (kein Dialog pro Screenshot). Ein kurzer Ringpuffer
+    hält die letzten Frames, damit auch ein Zeitfenster vor dem Auslösen gespeichert werden kann.
+    Kodierung (PNG-Kompression bzw. JPEG-Qualität) und Schreiben laufen im AsyncImageWriter.
+    """
+
+    # Initialisiert die Aufnahme.
+    def __init__(self, output_dir=None, prefix="screenshot", extension=".png", png_compression=3, jpeg_quality=95,
+                 ring_seconds=2.0, ring_frames=60, writer=None):
+        """
+        Initialisiert die Aufnahme.
+        :param output_dir: Zielordner (Standard: ~/Pictures/haarcascades).
+        :param prefix: Präfix der Dateinamen.
+        :param extension: Dateiformat (".png" oder ".jpg").
+        :param png_compression: PNG-Kompression 0 bis 9.
+        :param jpeg_quality: JPEG-Qualität 0 bis 100.
+        :param ring_seconds: Zeitraum, den der Ringpuffer abdeckt.
+        :param ring_frames: Maximale Anzahl der Frames im Ringpuffer (begrenzt den Speicher).
+        :param writer: Optionaler gemeinsamer AsyncImageWriter.
+        """
+
+        self.output_dir = output_dir or os.path.join(os.path.expanduser("~"), "Pictures", "haarcascades")
+        self.prefix = prefix
+        self.extension = extension
+        self.ring_seconds = ring_seconds
+        self.writer = writer or AsyncImageWriter(workers=2, max_pending=2 * ring_frames,
+                                                 png_compression=png_compression, jpeg_quality=jpeg_quality)
+        self.ring = deque(maxlen=ring_frames) # (Zeitstempel, Frame, RGB)
+        self.lock = threading.Lock()
+        self.burst_remaining = 0 # Noch zu speichernde Frames der laufenden Serienaufnahme
+        self.burst_until = 0.0 # Ende des laufenden Zeitfensters (time.time())
+        self.burst_id = None
+        self.index = 0
+
+    # Legt Zielordner, Format und Qualität fest.
+    def configure(self, output_dir=None, extension=None, png_compression=None, jpeg_quality=None):
+        """
+        Legt Zielordner, Format und Qualität fest (nur übergebene Werte werden geändert).
+        :return: None
+        """
+
+        if output_dir:
+            self.output_dir = output_dir
+        if extension:
+            self.extension = extension
+        if png_compression is not None:
+            self.writer.png_compression = png_compression
+        if jpeg_quality is not None:
+            self.writer.jpeg_quality = jpeg_quality
+
+    # Erstellt den nächsten Dateinamen.
+    def _next_path(self, timestamp, tag=""):
+        """
+        Namensschema: <Präfix>_<Datum>-<Uhrzeit>-<ms>[_<Serie>]_<laufende Nummer><Endung>
+        """
+
+        with self.lock:
+            self.index += 1
+            index = self.index
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(timestamp)) + f"-{int(timestamp * 1000) % 1000:03d}"
+        tag = f"_{tag}" if tag else ""
+        return os.path.join(self.output_dir, f"{self.prefix}_{stamp}{tag}_{index:05d}{self.extension}")
+
+    # Übergibt einen Frame an den Writer.
+    def _save(self, timestamp, frame, rgb, tag=""):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = self._next_path(timestamp, tag)
+        return path if self.writer.write(path, frame, rgb) else None
+
+    # Nimmt den aktuellen annotierten Frame entgegen (einmal pro angezeigtem Frame aufrufen).
+    def push(self, frame, rgb=False, timestamp=None):
+        """
+        Nimmt den aktuellen annotierten Frame entgegen: legt ihn im Ringpuffer ab und speichert ihn,
+        falls eine Serienaufnahme läuft. Es wird keine Kopie erstellt; der Frame darf danach nicht mehr verändert werden.
+        :param frame: Annotierter Frame (BGR, bei rgb=True RGB).
+        :param rgb: True, wenn der Frame in RGB vorliegt.
+        :param timestamp: Zeitstempel (Standard: aktuelle Zeit).
+        :return: None
+        """
+
+        if frame is None:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        self.ring.append((timestamp, frame, rgb))
+        if self.burst_remaining > 0 or timestamp <= self.burst_until:
+            self._save(timestamp, frame, rgb, self.burst_id)
+            self.burst_remaining = max(self.burst_remaining - 1, 0)
+
+    # Speichert einen Screenshot (kehrt sofort zurück).
+    def screenshot(self, frame=None, rgb=False):
+        """
+        Speichert einen Screenshot im Hintergrund.
+        :param frame: Zu speichernder Frame (Standard: letzter Frame aus push()).
+        :param rgb: True, wenn der übergebene Frame in RGB vorliegt.
+        :return: Pfad der Datei oder None, falls kein Frame vorhanden ist oder der Writer ausgelastet ist.
+        """
+
+        if frame is None:
+            if not self.ring:
+                return None
+            timestamp, frame, rgb = self.ring[-1]
+        else:
+            timestamp = time.time()
+        return self._save(timestamp, frame, rgb)
+
+    # Startet eine Serienaufnahme der nächsten N Frames.
+    def start_burst(self, count):
+        """
+        Speichert die nächsten count Frames aus push().
+        :param count: Anzahl der Frames.
+        :return: Kennung der Serie (Teil der Dateinamen).
+        """
+
+        self.burst_id = time.strftime("burst%H%M%S")
+        self.burst_remaining = int(count)
+        return self.burst_id
+
+    # Speichert ein Zeitfenster um den aktuellen Zeitpunkt.
+    def save_window(self, seconds_before=2.0, seconds_after=0.0):
+        """
+        Speichert alle Frames der letzten seconds_before Sekunden aus dem Ringpuffer und
+        (bei seconds_after > 0) die Frames der folgenden Sekunden.
+        :param seconds_before: Zeitraum vor dem Auslösen (höchstens ring_seconds bzw. Größe des Ringpuffers).
+        :param seconds_after: Zeitraum nach dem Auslösen.
+        :return: Anzahl der sofort übergebenen Frames aus dem Ringpuffer.
+        """
+
+        now = time.time()
+        self.burst_id = time.strftime("window%H%M%S")
+        start = now - min(seconds_before, self.ring_seconds)
+        saved = 0
+        for timestamp, frame, rgb in list(self.ring):
+            if timestamp >= start and self._save(timestamp, frame, rgb, self.burst_id):
+                saved += 1
+        self.burst_until = now + seconds_after
+        return saved
+
+    # Liefert die Zähler des Writers.
+    def get_stats(self):
+        """
+        :return: Zähler des AsyncImageWriter sowie Füllstand des Ringpuffers und laufende Serienaufnahme.
+        """
+
+        stats = self.writer.get_stats()
+        stats.update(ring=len(self.ring), burst_remaining=self.burst_remaining)
+        return stats
+
+    # Beendet die Aufnahme.
+    def close(self, wait=True):
+        """
+        Beendet die Aufnahme und wartet auf ausstehende Dateien.
+        :return: get_stats()
+        """
+
+        self.ring.clear()
+        self.writer.close(wait=wait)
+        return self.get_stats()
+
+
+# Misst den Einfluss des Speicherns auf eine Frame-Schleife mit fester Bildrate.
+if __name__ == "__main__":
+    import argparse
+    import json
+    import tempfile
+    import cv2
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Screenshot/Serienaufnahme im Hintergrund: Einfluss auf die Bildrate messen")
+    parser.add_argument("image", help="Beispielbild (wird als Kamerabild wiederholt)")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--burst", type=int, default=30, help="Anzahl der Frames der Serienaufnahme")
+    parser.add_argument("--format", default=".png", choices=[".png", ".jpg"])
+    args = parser.parse_args()
+
+    image = cv2.imread(args.image)
+    output_dir = tempfile.mkdtemp(prefix="capture-")
+    capture = CaptureManager(output_dir, extension=args.format)
+
+    # Frame-Schleife: pro Frame Kopie + Rechteck (wie die Annotation), nach 1 s Screenshot, nach 2 s Serie, nach 3 s Zeitfenster
+    interval, frame_times, t_start = 1.0 / args.fps, [], time.perf_counter()
+    blocking_ms = []
+    for i in range(int(args.fps * args.seconds)):
+        t0 = time.perf_counter()
+        frame = image.copy()
+        cv2.rectangle(frame, (10 + i % 50, 10), (110, 110), (0, 255, 0), 2)
+        capture.push(frame)
+        if i == int(args.fps):
+            capture.screenshot()
+        elif i == int(2 * args.fps):
+            capture.start_burst(args.burst)
+        elif i == int(3 * args.fps):
+            capture.save_window(1.0)
+        frame_times.append((time.perf_counter() - t0) * 1000)
+        time.sleep(max(interval - (time.perf_counter() - t0), 0))
+
+    # Zum Vergleich: synchrones Speichern im Frame-Thread
+    for _ in range(5):
+        t0 = time.perf_counter()
+        cv2.imwrite(os.path.join(output_dir, "sync" + args.format), image)
+        blocking_ms.append((time.perf_counter() - t0) * 1000)
+
+    stats = capture.close()
+    stats.update(loop_ms_p50=round(float(np.percentile(frame_times, 50)), 3),
+                 loop_ms_max=round(max(frame_times), 3),
+                 sync_imwrite_ms=round(float(np.median(blocking_ms)), 2),
+                 achieved_fps=round(len(frame_times) / (time.perf_counter() - t_start), 1),
+                 output_dir=output_dir)
+    print(json.dumps(stats))
@@ -0,0 +1,353 @@
+import json
+import os
+import platform
+import time
+import cv2
+import numpy as np
+from atomicfile import atomic_write
+from cascadecompiler import load_cascade
+from haarevaluator import HaarEvaluator
+
+# Datei mit den Kalibrierungen des Kostenmodells pro Rechner
+COSTMODEL_PATH = os.path.join(os.path.expanduser("~"), ".haarcascades", "costmodel.json")
+
+# Beispielbild für die Messung der Stufenanteile und die Kalibrierung (liegt dem Projekt bei)
+SAMPLE_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "face_animation.jpg")
+
+# Auflösungen für den Bericht (Breite, Höhe)
+REPORT_RESOLUTIONS = ((320, 240), (640, 480), (1280, 720), (1920, 1080))
+
+
+# Lädt das Beispielbild in einer bestimmten Breite als Graustufenbild.
+def sample_frame(width=200):
+    """
+    :param width: Breite des Bildes (Höhe im Seitenverhältnis 4:3).
+    :return: Graustufenbild oder None, falls das Beispielbild fehlt.
+    """
+
+    image = cv2.imread(SAMPLE_IMAGE, cv2.IMREAD_GRAYSCALE)
+    return cv2.resize(image, (width, width * 3 // 4), interpolation=cv2.INTER_AREA) if image is not None else None
+
+
+# Analysiert die Struktur eines Haar-Cascades.
+def analyze_cascade(xml_path, sample_frames=None, scaleFactor=1.1, minSize=(30, 30)):
+    """
+    Analysiert die Struktur eines Haar-Cascades: Stufen, schwache Klassifizierer, Features und Rechtecke pro Stufe.
+    Die erwarteten Rechtecksummen pro Fenster hängen davon ab, wie viele Fenster jede Stufe erreichen.
+    Mit Beispielbildern werden diese Anteile mit der NumPy-Engine gemessen, sonst wird angenommen,
+    dass jede Stufe die Hälfte der Fenster verwirft (Trainingsziel von opencv_traincascade: maxFalseAlarmRate 0.5).
+    :param xml_path: Pfad zur XML-Datei.
+    :param sample_frames: Optionale Beispielbilder (BGR oder Graustufen) für die Messung der Anteile.
+    :param scaleFactor: scaleFactor für die Messung.
+    :param minSize: minSize für die Messung.
+    :return: Dictionary mit window_size, stages (Liste pro Stufe), Summen und rect_ops_per_window.
+    """
+
+    cascade = load_cascade(xml_path)
+    num_stages = cascade.num_stages
+    weak_start = cascade.stage_weak_start
+    rects_per_feature = np.diff(cascade.feature_rect_start)
+
+    if sample_frames:
+        evaluator = HaarEvaluator(cascade)
+        windows, survivors = 0, np.zeros(num_stages)
+        for frame in sample_frames:
+            gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            evaluator.detectMultiScale(gray, scaleFactor, 0, minSize)
+            windows += evaluator.last_stats["windows"]
+            survivors += [stage["survivors"] for stage in evaluator.last_stats["stages"]]
+        reach = np.concatenate([[1.0], survivors[:-1] / max(windows, 1)])
+        reach_source = "gemessen"
+    else:
+        reach = 0.5 ** np.arange(num_stages)
+        reach_source = "angenommen"
+
+    stages = []
+    for s in range(num_stages):
+        nodes = np.arange(cascade.weak_node_start[weak_start[s]], cascade.weak_node_start[weak_start[s + 1]])
+        features = cascade.node_feature[nodes]
+        stages.append({"stage": s, "weak": int(weak_start[s + 1] - weak_start[s]), "nodes": len(nodes),
+                       "features": len(np.unique(features)), "rects": int(rects_per_feature[features].sum()),
+                       "tilted": int(cascade.feature_tilted[features].sum()), "reach": float(reach[s])})
+
+    rects = np.array([stage["rects"] for stage in stages], dtype=np.float64)
+    return {"path": xml_path, "window_size": cascade.window_size, "num_stages": num_stages,
+            "weak": int(weak_start[-1]), "features": int(len(rects_per_feature)), "rects": int(rects.sum()),
+            "tilted": bool(np.any(cascade.feature_tilted)), "reach_source": reach_source, "stages": stages,
+            # Pro Knoten: Rechtecksummen der Features + Varianz-Normierung (2 Summen) einmal pro Fenster
+            "rect_ops_per_window": float((rects * reach).sum() + 2)}
+
+
+# Zählt Stufen, Fensterpositionen und Pixel der Bildpyramide wie cv2.CascadeClassifier.
+def pyramid_windows(window_size, image_size, scaleFactor=1.1, minSize=(0, 0), maxSize=(0, 0)):
+    """
+    Zählt Stufen, Fensterpositionen und Pixel der Bildpyramide wie cv2.CascadeClassifier.detectMultiScale():
+    Schrittweite 2 Pixel unterhalb von Skalierung 2, sonst 1 Pixel; die Zeilen werden in Streifen aufgeteilt
+    (Anzahl aus der Breite der ersten Stufe / 32), deren auf die Schrittweite gerundete Höhe unten Zeilen
+    auslassen kann. Nicht nachgebildet: liegt keine Stufe zwischen minSize und maxSize, durchsucht OpenCV trotzdem
+    eine Stufe; hier ergibt das (0, 0, 0).
+    :param window_size: Fenstergröße des Cascades (Breite, Höhe).
+    :param image_size: Bildgröße (Breite, Höhe).
+    :param scaleFactor: Faktor zwischen zwei Stufen.
+    :param minSize: Minimale Objektgröße.
+    :param maxSize: Maximale Objektgröße, (0, 0) = unbegrenzt.
+    :return: (Anzahl der Stufen, Anzahl der Fensterpositionen, Pixel aller skalierten Bilder)
+    """
+
+    win_w, win_h = window_size
+    img_w, img_h = image_size
+    max_w, max_h = maxSize if maxSize[0] and maxSize[1] else (img_w, img_h)
+    scales = []
+    factor = 1.0
+    while True:
+        w, h = round(win_w * factor), round(win_h * factor)
+        if w > max_w or h > max_h or w > img_w or h > img_h:
+            break
+        if w >= minSize[0] and h >= minSize[1]:
+            scales.append(factor)
+        factor *= scaleFactor
+
+    levels, windows, pixels, stripes = 0, 0, 0, None
+    for factor in scales:
+        factor = np.float32(factor) # OpenCV speichert die Skalierungen als float
+        scaled_w, scaled_h = int(np.rint(np.float32(img_w) / factor)), int(np.rint(np.float32(img_h) / factor))
+        step = 1 if factor >= 2 else 2
+        work_w, work_h = max(scaled_w + 1 - win_w, 0), max(scaled_h + 1 - win_h, 0)
+        if stripes is None:
+            stripes = -(-work_w // 32)
+        stripe = max((work_h // step + stripes - 1) // max(stripes, 1), 1) * step
+        rows = min(stripes * stripe, work_h)
+        windows += -(-work_w // step) * -(-rows // step)
+        pixels += scaled_w * scaled_h
+        levels += 1
+    return levels, windows, pixels
+
+
+# Schätzt die Dauer der Erkennung aus der Struktur des Cascades und den Parametern.
+class CostModel:
+    """
+    Kostenmodell für detectMultiScale(): Dauer = a * Pixel der Pyramide + b * Rechtecksummen + c * Stufen der Pyramide.
+    Die Koeffizienten werden einmal pro Rechner mit einer kurzen Messung (calibrate()) bestimmt und gespeichert.
+    Die Kosten hängen auch vom Bildinhalt ab (wie viele Fenster späte Stufen erreichen); Kalibrierung und
+    Stufenanteile verwenden deshalb dieselben Beispielbilder, am besten typische Bilder der Anwendung.
+    """
+
+    # Initialisiert das Kostenmodell und lädt ggf. die Kalibrierung dieses Rechners.
+    def __init__(self, path=COSTMODEL_PATH, machine=None, sample_frames=None):
+        """
+        Initialisiert das Kostenmodell und lädt ggf. die Kalibrierung dieses Rechners.
+        :param path: Pfad der Kalibrierungsdatei (None = nicht speichern).
+        :param machine: Name des Rechners (Standard: platform.node()).
+        :param sample_frames: Beispielbilder (Graustufen) für Kalibrierung und Stufenanteile (Standard: face_animation.jpg).
+        """
+
+        self.path = path
+        self.machine = machine or platform.node() or "default"
+        self.sample_frames = sample_frames or [frame for frame in [sample_frame(640)] if frame is not None]
+        self.coefficients = None # (ms pro Pixel, ms pro Rechtecksumme, ms pro Stufe)
+        self.analyses = {} # Zwischenspeicher für analyze_cascade() pro Pfad
+        self.load()
+
+    # Liefert die (zwischengespeicherte) Analyse eines Cascades.
+    # Die Stufenanteile werden auf den verkleinerten Beispielbildern gemessen (etwa 0,3 s pro Cascade); sie unterscheiden
+    # sich zwischen Cascades stark (z. B. Lächeln gegenüber Ganzkörper) und bestimmen die Kosten pro Fenster.
+    def analysis(self, xml_path):
+        if xml_path not in self.analyses:
+            small = [cv2.resize(frame, (200, frame.shape[0] * 200 // frame.shape[1]), interpolation=cv2.INTER_AREA)
+                     for frame in self.sample_frames]
+            self.analyses[xml_path] = analyze_cascade(xml_path, small or None)
+        return self.analyses[xml_path]
+
+    # Berechnet die Merkmale des Modells für einen Aufruf.
+    def features(self, xml_path, image_size, scaleFactor=1.1, minSize=(30, 30), maxSize=(0, 0)):
+        """
+        :return: Array (Pixel der Pyramide, Rechtecksummen, Stufen der Pyramide) und Anzahl der Fensterpositionen.
+        """
+
+        analysis = self.analysis(xml_path)
+        levels, windows, pixels = pyramid_windows(analysis["window_size"], image_size, scaleFactor, minSize, maxSize)
+        return np.array([pixels, windows * analysis["rect_ops_per_window"], levels], dtype=np.float64), windows
+
+    # Schätzt die Dauer eines Aufrufs von detectMultiScale().
+    def predict_ms(self, xml_path, image_size, scaleFactor=1.1, minSize=(30, 30), maxSize=(0, 0)):
+        """
+        Schätzt die Dauer eines Aufrufs von detectMultiScale() auf diesem Rechner.
+        :return: Geschätzte Dauer in ms oder None, falls das Modell nicht kalibriert ist.
+        """
+
+        if self.coefficients is None:
+            return None
+        features, _ = self.features(xml_path, image_size, scaleFactor, minSize, maxSize)
+        return float(features @ self.coefficients)
+
+    # Kalibriert das Modell mit einer kurzen Messung.
+    def calibrate(self, xml_paths=None, repeat=2):
+        """
+        Kalibriert das Modell: misst detectMultiScale() für mehrere Cascades, Auflösungen und Parameter und
+        bestimmt die Koeffizienten mit nicht-negativen kleinsten Quadraten (relativer Fehler). Dauer: einige Sekunden.
+        :param xml_paths: Cascades für die Messung (Standard: Gesicht, Auge, Oberkörper aus cv2.data).
+        :param repeat: Wiederholungen pro Messung (es zählt die schnellste).
+        :return: Koeffizienten oder None, falls ein Fehler auftritt
+        """
+
+        try:
+            xml_paths = xml_paths or [cv2.data.haarcascades + name for name in
+                                      ("haarcascade_frontalface_default.xml", "haarcascade_eye.xml",
+                                       "haarcascade_upperbody.xml")]
+
+            rows, times = [], []
+            for xml_path in xml_paths:
+                cascade = cv2.CascadeClassifier(xml_path)
+                for frame in self.sample_frames:
+                    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                    for width in (320, gray.shape[1]):
+                        image = cv2.resize(gray, (width, gray.shape[0] * width // gray.shape[1]))
+                        for scaleFactor, minSize in ((1.1, 30), (1.2, 30), (1.1, 60)):
+                            best = float("inf")
+                            for _ in range(repeat):
+                                t0 = time.perf_counter()
+                                cascade.detectMultiScale(image, scaleFactor=scaleFactor, minNeighbors=3,
+                                                         minSize=(minSize, minSize))
+                                best = min(best, (time.perf_counter() - t0) * 1000)
+                            features, _ = self.features(xml_path, (image.shape[1], image.shape[0]), scaleFactor,
+                                                        (minSize, minSize))
+                            rows.append(features)
+                            times.append(best)
+
+            # Relativer Fehler: jede Zeile durch die gemessene Zeit teilen; negative Koeffizienten auf 0 setzen
+            a = np.array(rows) / np.array(times)[:, None]
+            scale = a.max(axis=0)
+            scale[scale == 0] = 1
+            active = np.ones(3, dtype=bool)
+            coefficients = np.zeros(3)
+            for _ in range(3):
+                solution, *_ = np.linalg.lstsq(a[:, active] / scale[active], np.ones(len(times)), rcond=None)
+                coefficients[:] = 0
+                coefficients[active] = solution / scale[active]
+                if np.all(coefficients >= 0):
+                    break
+                active &= coefficients > 0
+            self.coefficients = coefficients
+            predicted = np.array(rows) @ coefficients
+            self.calibration_error = float(np.median(np.abs(predicted - times) / np.array(times)))
+            self.save()
+            return coefficients
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Kalibrieren des Kostenmodells: {e}")
+            return None
+
+    # Lädt die Kalibrierung dieses Rechners.
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                entry = json.load(file).get(self.machine)
+            if entry:
+                self.coefficients = np.array(entry["coefficients"], dtype=np.float64)
+        except FileNotFoundError:
+            pass
+        except Exception as e: # Fehlerbehandlung (z. B. beschädigte Datei)
+            print(f"Fehler beim Lesen des Kostenmodells: {e}")
+
+    # Speichert die Kalibrierung dieses Rechners.
+    def save(self):
+        if not self.path or self.coefficients is None:
+            return
+        try:
+            data = {}
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as file:
+                    data = json.load(file)
+            data[self.machine] = {"coefficients": self.coefficients.tolist(), "time": round(time.time()),
+                                  "opencv": cv2.__version__, "threads": cv2.getNumThreads()}
+            with atomic_write(self.path, "w", encoding="utf-8") as file:
+                json.dump(data, file, indent=2)
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Speichern des Kostenmodells: {e}")
+
+
+# Erstellt einen Textbericht für einen Cascade.
+def format_report(analysis, model=None, params=((1.1, 30),), resolutions=REPORT_RESOLUTIONS):
+    """
+    Erstellt einen Textbericht: Struktur pro Stufe und geschätzte Kosten für Auflösungen und Parameter.
+    :param analysis: Ergebnis von analyze_cascade().
+    :param model: Kalibriertes CostModel oder None (dann nur Fensterpositionen und Rechtecksummen).
+    :param params: Liste von (scaleFactor, minSize).
+    :param resolutions: Liste von (Breite, Höhe).
+    :return: Bericht als String.
+    """
+
+    lines = [f"{os.path.basename(analysis['path'])}: Fenster {analysis['window_size'][0]}x{analysis['window_size'][1]}, "
+             f"{analysis['num_stages']} Stufen, {analysis['weak']} schwache Klassifizierer, {analysis['features']} Features, "
+             f"{analysis['rects']} Rechtecke" + (", mit gedrehten Features" if analysis["tilted"] else ""),
+             f"Rechtecksummen pro Fenster: {analysis['rect_ops_per_window']:.1f} erwartet "
+             f"(Anteile {analysis['reach_source']}), {analysis['rects'] + 2} höchstens",
+             "Stufe  schwach  Features  Rechtecke  erreicht"]
+    for stage in analysis["stages"]:
+        lines.append(f"{stage['stage']:5d}  {stage['weak']:7d}  {stage['features']:8d}  {stage['rects']:9d}  "
+                     f"{stage['reach']:8.4f}")
+    for scaleFactor, minSize in params:
+        for width, height in resolutions:
+            levels, windows, _ = pyramid_windows(analysis["window_size"], (width, height), scaleFactor, (minSize, minSize))
+            text = (f"{width}x{height}, scaleFactor {scaleFactor}, minSize {minSize}: {levels} Pyramidenstufen, "
+                    f"{windows} Fenster, {windows * analysis['rect_ops_per_window'] / 1e6:.1f} Mio. Rechtecksummen")
+            if model is not None and model.coefficients is not None:
+                text += f", geschätzt {model.predict_ms(analysis['path'], (width, height), scaleFactor, (minSize, minSize)):.1f} ms"
+            lines.append(text)
+    return "\n".join(lines)
+
+
+# Analysiert Cascades und vergleicht sie über die Kommandozeile.
+if __name__ == "__main__":
+    import argparse
+    from classifiermanager import ClassifierManager
+
+    parser = argparse.ArgumentParser(description="Kostenmodell und Strukturanalyse von Haar-Cascades")
+    parser.add_argument("cascades", nargs="*", help="XML-Dateien (Standard: alle eingebauten Klassifizierer)")
+    parser.add_argument("--calibrate", action="store_true", help="Kostenmodell für diesen Rechner (neu) kalibrieren")
+    parser.add_argument("--scale-factor", type=float, nargs="+", default=[1.1])
+    parser.add_argument("--min-size", type=int, default=30)
+    parser.add_argument("--sample", nargs="*", default=None,
+                        help="Typische Bilder der Anwendung für Kalibrierung und Stufenanteile (Standard: face_animation.jpg)")
+    parser.add_argument("--check", default=None, help="Bild zum Vergleich von Schätzung und Messung")
+    parser.add_argument("--summary", action="store_true", help="Nur Vergleichstabelle, keine Stufen")
+    args = parser.parse_args()
+
+    samples = [cv2.imread(path, cv2.IMREAD_GRAYSCALE) for path in args.sample] if args.sample else None
+    model = CostModel(sample_frames=samples)
+    if args.calibrate or model.coefficients is None:
+        t0 = time.perf_counter()
+        model.calibrate()
+        print(f"Kalibrierung: {time.perf_counter() - t0:.1f} s, mittlerer Fehler {model.calibration_error:.0%}, "
+              f"Koeffizienten {model.coefficients.tolist()}")
+
+    manager = ClassifierManager()
+    paths = args.cascades or [manager.get_classifier_path(cid) for cid in manager.classifiers if cid != "custom"]
+    check = cv2.imread(args.check, cv2.IMREAD_GRAYSCALE) if args.check else None
+
+    for path in paths:
+        try:
+            analysis = model.analysis(path)
+        except Exception as e: # Fehlerbehandlung (z. B. Datei fehlt oder ist kein Haar-Cascade)
+            print(f"Fehler beim Analysieren von {path}: {e}")
+            continue
+        params = [(scaleFactor, args.min_size) for scaleFactor in args.scale_factor]
+        if args.summary:
+            predicted = model.predict_ms(path, (640, 480), args.scale_factor[0], (args.min_size, args.min_size))
+            print(f"{os.path.basename(path):40s} {analysis['num_stages']:3d} Stufen {analysis['rects']:6d} Rechtecke "
+                  f"{analysis['rect_ops_per_window']:7.1f} Summen/Fenster  640x480: {predicted:7.1f} ms")
+        else:
+            print(format_report(analysis, model, params))
+        if check is not None:
+            cascade = cv2.CascadeClassifier(path)
+            for scaleFactor in args.scale_factor:
+                t0 = time.perf_counter()
+                cascade.detectMultiScale(check, scaleFactor=scaleFactor, minNeighbors=3, minSize=(args.min_size, args.min_size))
+                measured = (time.perf_counter() - t0) * 1000
+                predicted = model.predict_ms(path, (check.shape[1], check.shape[0]), scaleFactor, (args.min_size, args.min_size))
+                print(f"  Prüfung {os.path.basename(args.check)} scaleFactor {scaleFactor}: geschätzt {predicted:.1f} ms, "
+                      f"gemessen {measured:.1f} ms")
+        if not args.summary:
+            print()
+    manager.shutdown()
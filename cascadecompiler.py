@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import struct
+import time
+import numpy as np
+from atomicfile import atomic_write
+from haarevaluator import HaarCascade
+
+
+MAGIC = b"HAARC001" # Kennung und Version des Binärformats
+ALIGNMENT = 64 # Ausrichtung der Arrays in der Datei (Bytes)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "haarcascades") # Ablage der kompilierten Dateien
+
+
+# Liefert den Pfad der kompilierten Datei zu einer XML-Datei.
+def compiled_path_for(xml_path):
+    """
+    Liefert den Pfad der kompilierten Datei zu einer XML-Datei im Cache-Verzeichnis
+    (der Hash des vollständigen Pfads verhindert Kollisionen gleichnamiger Dateien).
+    :param xml_path: Pfad zur XML-Datei.
+    :return: Pfad zur .haarc-Datei.
+    """
+
+    xml_path = os.path.abspath(xml_path)
+    digest = hashlib.sha1(xml_path.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f"{os.path.splitext(os.path.basename(xml_path))[0]}-{digest}.haarc")
+
+
+# Schreibt einen Haar-Cascade in das kompakte Binärformat.
+def compile_cascade(xml_path, out_path=None):
+    """
+    Schreibt einen Haar-Cascade in das kompakte Binärformat.
+
+    Aufbau: MAGIC | Länge des Headers (uint32) | JSON-Header | Arrays (jeweils auf ALIGNMENT Bytes ausgerichtet).
+    Der Header enthält Fenstergröße, Größe und Änderungszeit der XML-Datei sowie dtype, Form und Offset jedes Arrays.
+
+    :param xml_path: Pfad zur XML-Datei.
+    :param out_path: Zielpfad (Standard: compiled_path_for(xml_path)).
+    :return: Pfad zur geschriebenen Datei.
+    """
+
+    out_path = out_path or compiled_path_for(xml_path)
+    stat = os.stat(xml_path)
+    cascade = HaarCascade.from_xml(xml_path)
+    arrays = {name: np.ascontiguousarray(array) for name, array in cascade.arrays().items()}
+
+    # Offsets relativ zum Beginn des Datenbereichs berechnen
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = {
+        "window_size": list(cascade.window_size),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "arrays": layout
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 4 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    # Mehrere Prozesse können denselben Cascade gleichzeitig kompilieren; Leser sehen nie eine halbe Datei
+    with atomic_write(out_path, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<I", len(header_bytes)))
+        file.write(header_bytes)
+        for name, array in arrays.items():
+            file.seek(data_start + layout[name]["offset"])
+            file.write(array.tobytes())
+        file.truncate(data_start + offset)
+    return out_path
+
+
+# Liest den Header einer kompilierten Datei.
+def read_header(path):
+    """
+    Liest den Header einer kompilierten Datei.
+    :param path: Pfad zur .haarc-Datei.
+    :return: (Header als Dictionary, Beginn des Datenbereichs)
+    """
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Keine kompilierte Cascade-Datei: {path}")
+        (header_length,) = struct.unpack("<I", file.read(4))
+        header = json.loads(file.read(header_length).decode("utf-8"))
+    data_start = -(-(len(MAGIC) + 4 + header_length) // ALIGNMENT) * ALIGNMENT
+    return header, data_start
+
+
+# Lädt eine kompilierte Datei per Memory-Mapping.
+def load_compiled(path):
+    """
+    Lädt eine kompilierte Datei per Memory-Mapping (die Arrays werden nicht kopiert,
+    mehrere Prozesse und Threads teilen sich dieselben Seiten im Speicher).
+    :param path: Pfad zur .haarc-Datei.
+    :return: HaarCascade
+    """
+
+    header, data_start = read_header(path)
+    mapped = np.memmap(path, dtype=np.uint8, mode="r")
+    arrays = {}
+    for name, info in header["arrays"].items():
+        dtype = np.dtype(info["dtype"])
+        count = int(np.prod(info["shape"]))
+        start = data_start + info["offset"]
+        arrays[name] = mapped[start:start + count * dtype.itemsize].view(dtype).reshape(info["shape"])
+    return HaarCascade(header["window_size"], arrays)
+
+
+# Prüft, ob eine kompilierte Datei zur aktuellen XML-Datei passt.
+def is_up_to_date(compiled_path, xml_path):
+    """
+    Prüft, ob eine kompilierte Datei zur aktuellen XML-Datei passt (Größe und Änderungszeit).
+    :param compiled_path: Pfad zur .haarc-Datei.
+    :param xml_path: Pfad zur XML-Datei.
+    :return: True, wenn die kompilierte Datei aktuell ist, sonst False.
+    """
+
+    try:
+        header, _ = read_header(compiled_path)
+        stat = os.stat(xml_path)
+        return header["source_size"] == stat.st_size and header["source_mtime_ns"] == stat.st_mtime_ns
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+# Lädt einen Haar-Cascade und bevorzugt dabei die kompilierte Form.
+def load_cascade(xml_path):
+    """
+    Lädt einen Haar-Cascade. Ist eine aktuelle kompilierte Datei vorhanden, wird sie per Memory-Mapping geladen,
+    sonst wird die XML-Datei gelesen und für den nächsten Aufruf kompiliert.
+    :param xml_path: Pfad zur XML-Datei (oder direkt zu einer .haarc-Datei).
+    :return: HaarCascade
+    """
+
+    if xml_path.endswith(".haarc"):
+        return load_compiled(xml_path)
+
+    compiled_path = compiled_path_for(xml_path)
+    if is_up_to_date(compiled_path, xml_path):
+        try:
+            return load_compiled(compiled_path)
+        except (OSError, ValueError) as e: # Beschädigte Datei: neu kompilieren
+            print(f"Fehler beim Laden der kompilierten Datei {compiled_path}: {e}")
+
+    try:
+        return load_compiled(compile_cascade(xml_path, compiled_path))
+    except OSError as e: # Kein Schreibrecht: XML direkt verwenden
+        print(f"Kompilierte Datei konnte nicht geschrieben werden: {e}")
+        return HaarCascade.from_xml(xml_path)
+
+
+# Misst die Ladezeiten von XML und kompilierter Datei.
+def benchmark(xml_path, repeat=5):
+    """
+    Misst die Ladezeiten von XML (NumPy-Parser und cv2.CascadeClassifier) und kompilierter Datei
+    sowie den Spitzenspeicher während des Ladens.
+    :param xml_path: Pfad zur XML-Datei.
+    :param repeat: Anzahl der Wiederholungen (Minimum wird verwendet).
+    :return: Dictionary mit Zeiten in ms, Spitzenspeicher in KiB und Dateigrößen in KiB.
+    """
+
+    import tracemalloc
+    import cv2
+
+    compiled_path = compile_cascade(xml_path)
+
+    def measure(load):
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            load()
+            times.append((time.perf_counter() - t0) * 1000)
+        tracemalloc.start()
+        load()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return min(times), peak / 1024
+
+    xml_ms, xml_peak = measure(lambda: HaarCascade.from_xml(xml_path))
+    compiled_ms, compiled_peak = measure(lambda: load_compiled(compiled_path))
+    opencv_ms, _ = measure(lambda: cv2.CascadeClassifier(xml_path))
+    return {
+        "cascade": os.path.basename(xml_path),
+        "xml_kib": round(os.path.getsize(xml_path) / 1024),
+        "compiled_kib": round(os.path.getsize(compiled_path) / 1024),
+        "xml_parse_ms": round(xml_ms, 2),
+        "opencv_load_ms": round(opencv_ms, 2),
+        "compiled_load_ms": round(compiled_ms, 3),
+        "xml_peak_kib": round(xml_peak),
+        "compiled_peak_kib": round(compiled_peak)
+    }
+
+
+# Kompiliert Cascades oder misst Ladezeiten über die Kommandozeile.
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Haar-Cascade-XML in ein kompaktes Binärformat kompilieren")
+    parser.add_argument("command", choices=["compile", "benchmark"])
+    parser.add_argument("xml", nargs="+", help="XML-Dateien")
+    parser.add_argument("--out", default=None, help="Zielpfad (nur bei einer XML-Datei)")
+    args = parser.parse_args()
+
+    for xml in args.xml:
+        if args.command == "compile":
+            print(f"{xml} -> {compile_cascade(xml, args.out)}")
+        else:
+            print(json.dumps(benchmark(xml)))
@@ -0,0 +1,237 @@
+import math
+import time
+from collections import deque
+import numpy as np
+import boxops
+
+
+# Verteilt mehrere Klassifizierer reihum auf die Frames (Live-Modus).
+class CascadeScheduler:
+    """
+    Führt mehrere Klassifizierer gleichzeitig aus, jeder mit eigenem Takt (cadence = jeder n-te Frame) und eigener
+    Priorität, z. B. Gesicht jeden Frame, Oberkörper jeden 3., Ganzkörper jeden 6. Frame. Das letzte Ergebnis eines
+    Klassifizierers wird bis zu seinem nächsten Durchlauf gehalten.
+    Damit nicht alle seltenen Klassifizierer im selben Frame laufen (Latenzspitze), erhält jeder einen Versatz (phase):
+    die Versätze werden so gewählt, dass die größte geplante Arbeit pro Frame minimal wird (teuerste Klassifizierer
+    zuerst, jeweils in die am wenigsten belasteten Frames). Die Kosten werden pro Klassifizierer gemessen (gleitender
+    Mittelwert); weichen sie um mehr als rebalance_threshold von der Planung ab, wird neu verteilt.
+    Mit budget_ms werden fällige Klassifizierer niedriger Priorität um einen Frame verschoben, wenn das Budget des
+    Frames sonst überschritten würde (höchstens einmal hintereinander, damit nichts ausgehungert wird).
+    """
+
+    # Initialisiert den Planer.
+    def __init__(self, classifier_manager, budget_ms=None, balance=True, rebalance_threshold=0.25, max_period=60):
+        """
+        Initialisiert den Planer.
+        :param classifier_manager: ClassifierManager (detect_faces() pro Klassifizierer).
+        :param budget_ms: Optionales Zeitbudget pro Frame in ms (None = nie verschieben).
+        :param balance: False: alle Versätze 0 (zum Vergleich, seltene Klassifizierer laufen im selben Frame).
+        :param rebalance_threshold: Relative Kostenabweichung, ab der neu verteilt wird.
+        :param max_period: Obergrenze der Planungsperiode (kgV der Takte) in Frames.
+        """
+
+        self.classifier_manager = classifier_manager
+        self.budget_ms = budget_ms
+        self.balance = balance
+        self.rebalance_threshold = rebalance_threshold
+        self.max_period = max_period
+        self.entries = {} # classifier_id -> Takt, Priorität, Versatz, Kosten, Farbe, letztes Ergebnis
+        self.frame_index = 0
+        self.deferred = set() # Im letzten Frame verschobene Klassifizierer
+        self.frame_ms = deque(maxlen=1000) # Arbeit der letzten Frames für Perzentile
+        self.counters = {"frames": 0, "runs": 0, "deferred": 0, "rebalances": 0, "ms": 0.0}
+
+    # Fügt einen Klassifizierer hinzu.
+    def add(self, classifier_id, cadence=1, priority=0, color=(0, 255, 0)):
+        """
+        :param classifier_id: ID des Klassifizierers.
+        :param cadence: Takt (1 = jeden Frame, 3 = jeden 3. Frame).
+        :param priority: Priorität (höher = läuft zuerst und wird zuletzt verschoben).
+        :param color: Farbe der Rechtecke (im Farbraum des Frames).
+        :return: None
+        """
+
+        self.entries[classifier_id] = {"cadence": max(int(cadence), 1), "priority": priority, "color": color, "phase": 0,
+                                       "cost_ms": None, "planned_ms": None, "objects": np.empty((0, 4), dtype=np.int32),
+                                       "frame": None, "runs": 0}
+        self._rebalance()
+
+    # Entfernt einen Klassifizierer.
+    def remove(self, classifier_id):
+        self.entries.pop(classifier_id, None)
+        self.deferred.discard(classifier_id)
+        self._rebalance()
+
+    # Verteilt die Versätze so, dass die größte geplante Arbeit pro Frame minimal wird.
+    def _rebalance(self):
+        if not self.entries:
+            return
+        period = 1
+        for entry in self.entries.values():
+            period = min(period * entry["cadence"] // math.gcd(period, entry["cadence"]), self.max_period)
+        load = [0.0] * period
+        order = sorted(self.entries.items(), key=lambda item: (-(item[1]["cost_ms"] or 1.0), -item[1]["priority"]))
+        for classifier_id, entry in order:
+            cost = entry["cost_ms"] or 1.0 # Noch nicht gemessen: gleiche Kosten annehmen
+            cadence = entry["cadence"]
+            if self.balance:
+                entry["phase"] = min(range(cadence), key=lambda phase: (max(load[phase::cadence]), phase))
+            else:
+                entry["phase"] = 0
+            for slot in range(entry["phase"], period, cadence):
+                load[slot] += cost
+            entry["planned_ms"] = entry["cost_ms"]
+        self.planned_load = load
+        self.counters["rebalances"] += 1
+
+    # Liefert die im aktuellen Frame fälligen Klassifizierer.
+    def due(self, frame_index=None):
+        """
+        :param frame_index: Frame-Nummer (Standard: aktueller Frame).
+        :return: Liste der fälligen IDs, verschobene zuerst, dann nach Priorität.
+        """
+
+        frame_index = self.frame_index if frame_index is None else frame_index
+        ids = [classifier_id for classifier_id, entry in self.entries.items()
+               if (frame_index - entry["phase"]) % entry["cadence"] == 0 or classifier_id in self.deferred]
+        return sorted(ids, key=lambda classifier_id: (classifier_id not in self.deferred, -self.entries[classifier_id]["priority"]))
+
+    # Führt die fälligen Klassifizierer aus und liefert alle gehaltenen Ergebnisse.
+    def step(self, frame, scale=1.0):
+        """
+        :param frame: Aktueller Frame.
+        :param scale: Verkleinerungsfaktor des Frames gegenüber dem Original (siehe detect_faces()).
+        :return: Gehaltene Ergebnisse aller Klassifizierer als Liste von Paaren (classifier_id, NumPy-Array (N, 4)).
+        """
+
+        t0 = time.perf_counter()
+        deferred, spent = set(), 0.0
+        for classifier_id in self.due():
+            entry = self.entries[classifier_id]
+            expected = entry["cost_ms"] or 0.0
+            if (self.budget_ms is not None and spent > 0 and spent + expected > self.budget_ms
+                    and classifier_id not in self.deferred): # Höchstens einmal hintereinander verschieben
+                deferred.add(classifier_id)
+                continue
+            t_run = time.perf_counter()
+            objects = self.classifier_manager.detect_faces(frame, classifier_id, scale)
+            elapsed = (time.perf_counter() - t_run) * 1000
+            spent += elapsed
+            if objects is not None:
+                entry["objects"] = boxops.as_boxes(objects)
+                entry["frame"] = self.frame_index
+            entry["runs"] += 1
+            entry["cost_ms"] = elapsed if entry["cost_ms"] is None else 0.8 * entry["cost_ms"] + 0.2 * elapsed
+            self.counters["runs"] += 1
+        self.deferred = deferred
+        self.counters["deferred"] += len(deferred)
+
+        # Kosten weichen von der Planung ab (oder wurden erstmals gemessen): neu verteilen
+        if any(entry["cost_ms"] is not None and (entry["planned_ms"] is None or
+               abs(entry["cost_ms"] - entry["planned_ms"]) > self.rebalance_threshold * entry["planned_ms"])
+               for entry in self.entries.values()):
+            self._rebalance()
+
+        elapsed = (time.perf_counter() - t0) * 1000
+        self.frame_ms.append(elapsed)
+        self.counters["frames"] += 1
+        self.counters["ms"] += elapsed
+        self.frame_index += 1
+        return self.results()
+
+    # Liefert die gehaltenen Ergebnisse pro Klassifizierer.
+    def results(self):
+        """
+        :return: Liste von Paaren (classifier_id, NumPy-Array (N, 4)) in der Reihenfolge von add().
+        """
+
+        return [(classifier_id, entry["objects"]) for classifier_id, entry in self.entries.items()]
+
+    # Liefert alle gehaltenen Objekte.
+    def objects(self, classifier_id=None):
+        """
+        :param classifier_id: Optional nur die Objekte dieses Klassifizierers.
+        :return: NumPy-Array (N, 4)
+        """
+
+        if classifier_id is not None:
+            return self.entries[classifier_id]["objects"]
+        if not self.entries:
+            return np.empty((0, 4), dtype=np.int32)
+        return np.concatenate([entry["objects"] for entry in self.entries.values()])
+
+    # Zeichnet die gehaltenen Objekte in der Farbe ihres Klassifizierers.
+    def draw(self, image, thickness=2):
+        """
+        :param image: Bild (wird verändert).
+        :return: None
+        """
+
+        for entry in self.entries.values():
+            boxops.draw(image, entry["objects"], entry["color"], thickness)
+
+    # Liefert die Zähler.
+    def get_stats(self):
+        """
+        :return: Dictionary mit Arbeit pro Frame (Mittel, p95, Maximum), Verschiebungen und Takt, Versatz und Kosten
+                 pro Klassifizierer.
+        """
+
+        frame_ms = np.asarray(self.frame_ms) if self.frame_ms else np.zeros(1)
+        return {"frames": self.counters["frames"], "runs": self.counters["runs"], "deferred": self.counters["deferred"],
+                "rebalances": self.counters["rebalances"],
+                "mean_ms": round(self.counters["ms"] / max(self.counters["frames"], 1), 1),
+                "p95_ms": round(float(np.percentile(frame_ms, 95)), 1), "max_ms": round(float(frame_ms.max()), 1),
+                "classifiers": {classifier_id: {"cadence": entry["cadence"], "priority": entry["priority"],
+                                                "phase": entry["phase"], "runs": entry["runs"],
+                                                "cost_ms": round(entry["cost_ms"] or 0.0, 1)}
+                                for classifier_id, entry in self.entries.items()}}
+
+
+# Fasst die Ergebnisse mehrerer Klassifizierer zusammen.
+def merge_results(results):
+    """
+    :param results: Liste von Paaren (classifier_id, Objekte) wie von CascadeScheduler.step().
+    :return: (alle Objekte als NumPy-Array (N, 4), Liste mit der Klassifizierer-ID pro Objekt)
+    """
+
+    boxes = [boxops.as_boxes(objects) for _, objects in results]
+    labels = [classifier_id for (classifier_id, _), found in zip(results, boxes) for _ in range(len(found))]
+    return (np.concatenate(boxes) if boxes else np.empty((0, 4), dtype=np.int32)), labels
+
+
+# Vergleicht die Arbeit pro Frame: alle Klassifizierer in jedem Frame, gleicher Versatz und verteilte Versätze.
+if __name__ == "__main__":
+    import argparse
+    import json
+    import cv2
+    from classifiermanager import ClassifierManager
+
+    parser = argparse.ArgumentParser(description="Mehrere Klassifizierer reihum: Arbeit pro Frame messen")
+    parser.add_argument("image", help="Testbild (wird als Kamerabild wiederholt)")
+    parser.add_argument("--plan", default="face:1:2,upperbody:3:1,fullbody:6:0",
+                        help="Klassifizierer mit Takt und Priorität, z. B. face:1:2,upperbody:3:1,fullbody:6:0")
+    parser.add_argument("--frames", type=int, default=36)
+    parser.add_argument("--size", default="640x480")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.split("x"))
+    frame = cv2.resize(cv2.imread(args.image), (width, height), interpolation=cv2.INTER_AREA)
+    plan = [(item.split(":")[0], int(item.split(":")[1]), int(item.split(":")[2])) for item in args.plan.split(",")]
+    manager = ClassifierManager()
+    for classifier_id, _, _ in plan: # Aufwärmen (Cascades laden)
+        manager.detect_faces(frame, classifier_id)
+
+    results = {}
+    for name, balance, every_frame in (("every_frame", True, True), ("same_phase", False, False), ("balanced", True, False)):
+        scheduler = CascadeScheduler(manager, balance=balance)
+        for classifier_id, cadence, priority in plan:
+            scheduler.add(classifier_id, 1 if every_frame else cadence, priority)
+        for _ in range(args.frames):
+            scheduler.step(frame)
+        stats = scheduler.get_stats()
+        results[name] = {key: stats[key] for key in ("mean_ms", "p95_ms", "max_ms", "runs")}
+        results[name]["phases"] = {classifier_id: entry["phase"] for classifier_id, entry in stats["classifiers"].items()}
+    results["cost_ms"] = {classifier_id: entry["cost_ms"] for classifier_id, entry in stats["classifiers"].items()}
+    manager.shutdown()
+    print(json.dumps({"frame": [width, height], "frames": args.frames, "plan": args.plan, **results}, indent=2))
@@ -0,0 +1,543 @@
+import glob
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from atomicfile import atomic_write
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".pgm", ".ppm", ".tif", ".tiff")
+
+# Grundformen der Haar-Features (Modus BASIC wie opencv_traincascade):
+# Name: (Zellen in x, Zellen in y, Liste der gewichteten Teilrechtecke als (x, y, w, h, Gewicht) in Zellen)
+# Das erste Rechteck überdeckt immer das ganze Feature mit Gewicht -1 (Konvention von OpenCV).
+HAAR_SHAPES = {
+    "haar_x2": (2, 1, [(0, 0, 2, 1, -1.0), (1, 0, 1, 1, 2.0)]),
+    "haar_y2": (1, 2, [(0, 0, 1, 2, -1.0), (0, 1, 1, 1, 2.0)]),
+    "haar_x3": (3, 1, [(0, 0, 3, 1, -1.0), (1, 0, 1, 1, 3.0)]),
+    "haar_y3": (1, 3, [(0, 0, 1, 3, -1.0), (0, 1, 1, 1, 3.0)]),
+    "haar_x2_y2": (2, 2, [(0, 0, 2, 2, -1.0), (0, 0, 1, 1, 2.0), (1, 1, 1, 1, 2.0)])
+}
+
+_worker_cache = {} # Geöffnete Memory-Maps pro Worker-Prozess (Pfad -> Array)
+
+
+# Zählt alle Haar-Features eines Fensters auf.
+def enumerate_features(window_size, step=1):
+    """
+    Zählt alle Haar-Features (Modus BASIC) eines Fensters auf.
+    :param window_size: Fenstergröße (Breite, Höhe).
+    :param step: Schrittweite für Position und Zellgröße (1 = alle Features wie opencv_traincascade).
+    :return: Array (F, 3, 5) mit bis zu drei Rechtecken (x, y, w, h, Gewicht) pro Feature (Gewicht 0 = unbenutzt).
+    """
+
+    win_w, win_h = window_size
+    features = []
+    for cells_x, cells_y, parts in HAAR_SHAPES.values():
+        for cell_w in range(1, win_w // cells_x + 1, step):
+            for cell_h in range(1, win_h // cells_y + 1, step):
+                for x in range(0, win_w - cells_x * cell_w + 1, step):
+                    for y in range(0, win_h - cells_y * cell_h + 1, step):
+                        rects = [(x + px * cell_w, y + py * cell_h, pw * cell_w, ph * cell_h, weight)
+                                 for px, py, pw, ph, weight in parts]
+                        rects += [(0, 0, 0, 0, 0.0)] * (3 - len(rects))
+                        features.append(rects)
+    return np.array(features, dtype=np.float64)
+
+
+# Erstellt die Koeffizientenmatrix, die Integralbilder in Feature-Werte umrechnet.
+def feature_matrix(features, window_size):
+    """
+    Erstellt die Koeffizientenmatrix, die flache Integralbilder in Feature-Werte umrechnet
+    (jede Rechtecksumme ist eine Kombination von vier Einträgen des Integralbilds).
+    :param features: Array (F, 3, 5) aus enumerate_features().
+    :param window_size: Fenstergröße (Breite, Höhe).
+    :return: Matrix ((Höhe + 1) * (Breite + 1), F) als float32.
+    """
+
+    stride = window_size[0] + 1
+    matrix = np.zeros(((window_size[1] + 1) * stride, len(features)), dtype=np.float32)
+    columns = np.arange(len(features))
+    for r in range(3):
+        used = features[:, r, 4] != 0
+        x, y, w, h = features[used, r, :4].astype(np.int64).T
+        weight, cols = features[used, r, 4], columns[used]
+        for offset, sign in ((y * stride + x, 1), (y * stride + x + w, -1),
+                             ((y + h) * stride + x, -1), ((y + h) * stride + x + w, 1)):
+            np.add.at(matrix, (offset, cols), sign * weight)
+    return matrix
+
+
+# Berechnet flache Integralbilder und die Varianz-Normierung für Trainingsbeispiele.
+def sample_integrals(samples):
+    """
+    Berechnet flache Integralbilder und die Varianz-Normierung (wie bei der Erkennung in OpenCV:
+    über das um 1 Pixel verkleinerte Fenster).
+    :param samples: Array (N, Höhe, Breite) uint8.
+    :return: (Integralbilder (N, (Höhe + 1) * (Breite + 1)) float32, Normierung (N,) float32,
+              Bool-Array der Beispiele, die bei der Erkennung nicht verworfen werden)
+    """
+
+    n, h, w = samples.shape
+    data = samples.astype(np.float64)
+    integral = np.zeros((n, h + 1, w + 1))
+    integral[:, 1:, 1:] = data.cumsum(axis=1).cumsum(axis=2)
+    squared = np.zeros((n, h + 1, w + 1))
+    squared[:, 1:, 1:] = (data * data).cumsum(axis=1).cumsum(axis=2)
+
+    area = (w - 2) * (h - 2)
+    window_sum = integral[:, 1, 1] - integral[:, 1, w - 1] - integral[:, h - 1, 1] + integral[:, h - 1, w - 1]
+    window_sq = squared[:, 1, 1] - squared[:, 1, w - 1] - squared[:, h - 1, 1] + squared[:, h - 1, w - 1]
+    nf = area * window_sq - window_sum * window_sum
+    valid = nf > 0
+    inv_norm = np.zeros(n, dtype=np.float32)
+    inv_norm[valid] = 1.0 / np.sqrt(nf[valid])
+    valid &= area * inv_norm < 0.1 # Fenster mit sehr geringer Varianz verwirft OpenCV bei der Erkennung
+    return integral.reshape(n, -1).astype(np.float32), inv_norm, valid
+
+
+# Öffnet eine Datei des Arbeitsverzeichnisses im Worker-Prozess (einmal pro Prozess und Datei).
+def _open_cached(path, dtype=None, shape=None, mode="r"):
+    key = (path, mode)
+    if key not in _worker_cache and path.endswith(".dat"):
+        # Memory-Maps früherer Stufen schließen (die Dateien sind bereits gelöscht); Dateiname endet auf -<Stufe>.dat
+        stage = path.rsplit("-", 1)[-1]
+        for old in [k for k in _worker_cache if k[0].endswith(".dat") and k[0].rsplit("-", 1)[-1] != stage]:
+            del _worker_cache[old]
+    array = _worker_cache.get(key)
+    if array is None or (shape is not None and array.shape != tuple(shape)):
+        if dtype is None:
+            array = np.load(path, mmap_mode="r")
+        else:
+            array = np.memmap(path, dtype=dtype, mode=mode, shape=tuple(shape))
+        _worker_cache[key] = array
+    return array
+
+
+# Worker: berechnet Feature-Werte und Sortierreihenfolge für einen Bereich von Features.
+def _prepare_features(workdir, stage, start, stop, num_samples, window_size):
+    """
+    Berechnet Feature-Werte (Integralbilder x Koeffizientenmatrix, vektorisiert) und die Sortierreihenfolge
+    der Beispiele für die Features start bis stop und schreibt beide in die Memory-Maps der Stufe.
+    :return: Anzahl der bearbeiteten Features.
+    """
+
+    features = _open_cached(os.path.join(workdir, "features.npy"))
+    integrals = np.load(os.path.join(workdir, f"integrals-{stage}.npy"))
+    inv_norm = np.load(os.path.join(workdir, f"invnorm-{stage}.npy"))
+    num_features = len(features)
+    values = np.memmap(os.path.join(workdir, f"values-{stage}.dat"), dtype=np.float32, mode="r+",
+                       shape=(num_features, num_samples))
+    order = np.memmap(os.path.join(workdir, f"order-{stage}.dat"), dtype=np.int32, mode="r+",
+                      shape=(num_features, num_samples))
+
+    matrix = feature_matrix(np.asarray(features[start:stop]), window_size)
+    chunk_values = (integrals @ matrix).T * inv_norm[None, :]
+    values[start:stop] = chunk_values
+    order[start:stop] = np.argsort(chunk_values, axis=1, kind="stable")
+    values.flush()
+    order.flush()
+    return stop - start
+
+
+# Worker: sucht den besten Entscheidungsstumpf (Gentle AdaBoost) in einem Bereich von Features.
+def _best_stump(workdir, stage, start, stop, num_samples, num_features, weights, labels, chunk_size=512):
+    """
+    Sucht den besten Entscheidungsstumpf für die Features start bis stop.
+    Gentle AdaBoost: Blattwerte sind die gewichteten Mittelwerte der Labels, gesucht wird die Schwelle mit dem
+    kleinsten gewichteten quadratischen Fehler (= größte Summe S²/W über beide Seiten).
+    :return: (Güte, Feature-Index, Schwelle, linker Blattwert, rechter Blattwert) oder None.
+    """
+
+    values = _open_cached(os.path.join(workdir, f"values-{stage}.dat"), np.float32, (num_features, num_samples))
+    order = _open_cached(os.path.join(workdir, f"order-{stage}.dat"), np.int32, (num_features, num_samples))
+    weighted = weights * labels
+    total_w, total_s = weights.sum(), weighted.sum()
+    best = None
+
+    for first in range(start, stop, chunk_size):
+        last = min(first + chunk_size, stop)
+        idx = np.asarray(order[first:last])
+        sorted_values = np.take_along_axis(np.asarray(values[first:last]), idx, axis=1)
+        left_w = np.cumsum(weights[idx], axis=1)[:, :-1]
+        left_s = np.cumsum(weighted[idx], axis=1)[:, :-1]
+        right_w = total_w - left_w
+        right_s = total_s - left_s
+        with np.errstate(divide="ignore", invalid="ignore"):
+            score = left_s * left_s / left_w + right_s * right_s / right_w
+        # Nur zwischen verschiedenen Werten trennen, und beide Seiten brauchen Gewicht
+        score[(sorted_values[:, 1:] <= sorted_values[:, :-1]) | (left_w <= 0) | (right_w <= 0)] = -np.inf
+        flat = int(np.argmax(score))
+        row, col = divmod(flat, score.shape[1])
+        if not np.isfinite(score[row, col]) or (best is not None and score[row, col] <= best[0]):
+            continue
+        threshold = 0.5 * (float(sorted_values[row, col]) + float(sorted_values[row, col + 1]))
+        best = (float(score[row, col]), first + row, threshold,
+                float(left_s[row, col] / left_w[row, col]), float(right_s[row, col] / right_w[row, col]))
+    return best
+
+
+# Trainiert einen Haar-Cascade aus positiven Ausschnitten und Negativbildern.
+class CascadeTrainer:
+    """
+    Trainiert einen Haar-Cascade (Gentle AdaBoost mit Entscheidungsstümpfen) aus einem Ordner mit positiven
+    Ausschnitten und einem Ordner mit Negativbildern (ohne das gesuchte Objekt).
+
+    Die Feature-Werte aller Beispiele werden pro Stufe vektorisiert berechnet (Integralbilder x Koeffizientenmatrix)
+    und zusammen mit der Sortierreihenfolge in Memory-Maps im Arbeitsverzeichnis abgelegt, sodass sie nicht in den
+    Arbeitsspeicher passen müssen. Die Suche nach dem besten Stumpf läuft parallel in einem Prozess-Pool.
+    Zwischen den Stufen werden schwierige Negativbeispiele gesucht: Fenster aus den Negativbildern, die der
+    bisherige Cascade noch durchlässt. Nach jeder Stufe wird die XML-Datei (OpenCV-Format) geschrieben.
+    """
+
+    # Initialisiert den Trainer.
+    def __init__(self, positive_dir, negative_dir, output_path, window_size=(24, 24), num_stages=20,
+                 num_neg=None, min_hit_rate=0.995, max_false_alarm=0.5, max_weak_count=100,
+                 feature_step=1, mirror=True, workers=None, workdir=None, progress=None, seed=0):
+        """
+        Initialisiert den Trainer.
+        :param positive_dir: Ordner mit positiven Ausschnitten (werden auf die Fenstergröße skaliert).
+        :param negative_dir: Ordner mit Negativbildern.
+        :param output_path: Zielpfad der XML-Datei.
+        :param window_size: Fenstergröße (Breite, Höhe).
+        :param num_stages: Maximale Anzahl der Stufen.
+        :param num_neg: Negativbeispiele pro Stufe (Standard: so viele wie positive Beispiele).
+        :param min_hit_rate: Mindestanteil der positiven Beispiele, die jede Stufe besteht.
+        :param max_false_alarm: Höchstanteil der Negativbeispiele, die eine Stufe bestehen dürfen.
+        :param max_weak_count: Maximale Anzahl schwacher Klassifizierer pro Stufe.
+        :param feature_step: Schrittweite der Feature-Aufzählung (größer = weniger Features, schneller).
+        :param mirror: Positive Beispiele zusätzlich gespiegelt verwenden.
+        :param workers: Anzahl der Prozesse (Standard: Anzahl CPU-Kerne).
+        :param workdir: Arbeitsverzeichnis für die Memory-Maps (Standard: temporäres Verzeichnis).
+        :param progress: Optionale Funktion progress(nachricht), Standard: print.
+        :param seed: Startwert des Zufallsgenerators (Auswahl der Negativfenster).
+        """
+
+        self.positive_dir = positive_dir
+        self.negative_dir = negative_dir
+        self.output_path = output_path
+        self.window_size = (int(window_size[0]), int(window_size[1]))
+        self.num_stages = num_stages
+        self.num_neg = num_neg
+        self.min_hit_rate = min_hit_rate
+        self.max_false_alarm = max_false_alarm
+        self.max_weak_count = max_weak_count
+        self.feature_step = feature_step
+        self.mirror = mirror
+        self.workers = workers or os.cpu_count() or 1
+        self.workdir = workdir
+        self.progress = progress or print
+        self.rng = np.random.default_rng(seed)
+        self.features = enumerate_features(self.window_size, feature_step)
+        self.stages = [] # Pro Stufe: {"threshold": float, "weak": [(Feature-Index, Schwelle, links, rechts)]}
+        self.stage_times = [] # Pro Stufe: {"stage", "features_s", "boost_s", "mining_s", "weak", "hit_rate", "false_alarm"}
+
+    # Listet alle Bilddateien eines Ordners.
+    @staticmethod
+    def _list_images(folder):
+        return sorted(f for f in glob.glob(os.path.join(folder, "**", "*"), recursive=True)
+                      if f.lower().endswith(IMAGE_EXTENSIONS))
+
+    # Lädt die positiven Beispiele.
+    def load_positives(self):
+        """
+        Lädt die positiven Ausschnitte als Graustufenbilder in Fenstergröße.
+        :return: Array (N, Höhe, Breite) uint8.
+        """
+
+        samples = []
+        for path in self._list_images(self.positive_dir):
+            image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                print(f"Fehler: Datei {path} konnte nicht geladen werden.")
+                continue
+            sample = cv2.resize(image, self.window_size, interpolation=cv2.INTER_AREA)
+            samples.append(sample)
+            if self.mirror:
+                samples.append(cv2.flip(sample, 1))
+        return np.array(samples, dtype=np.uint8).reshape(-1, self.window_size[1], self.window_size[0])
+
+    # Sucht Negativbeispiele, die der bisherige Cascade noch durchlässt.
+    def mine_negatives(self, count, cascade_path=None, max_seconds=600):
+        """
+        Sucht Negativbeispiele. Ohne Cascade werden zufällige Fenster (Position und Größe) gezogen, sonst werden die
+        Negativbilder mit dem bisherigen Cascade durchsucht und nur Fenster übernommen, die er durchlässt.
+        :param count: Gewünschte Anzahl.
+        :param cascade_path: XML-Datei des bisherigen Cascades oder None.
+        :param max_seconds: Zeitlimit für die Suche.
+        :return: (Array (M, Höhe, Breite) uint8 mit M <= count, Anteil der geprüften Fenster, die durchgelassen wurden)
+        """
+
+        win_w, win_h = self.window_size
+        files = self._list_images(self.negative_dir)
+        if not files:
+            raise ValueError(f"Keine Negativbilder in {self.negative_dir}")
+        detector = cv2.CascadeClassifier(cascade_path) if cascade_path else None
+        samples, scanned, t0 = [], 0, time.perf_counter()
+
+        for round_idx in range(1000):
+            for path in self.rng.permutation(files):
+                image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+                if image is None or image.shape[0] < win_h or image.shape[1] < win_w:
+                    continue
+                if detector is None:
+                    # Zufällige Fenster, damit auch große Maßstäbe vertreten sind
+                    n = max(1, count // len(files) + 1)
+                    max_scale = min(image.shape[1] / win_w, image.shape[0] / win_h)
+                    scales = np.exp(self.rng.uniform(0, np.log(max_scale), n))
+                    rects = [(int(self.rng.integers(0, image.shape[1] - int(win_w * s) + 1)),
+                              int(self.rng.integers(0, image.shape[0] - int(win_h * s) + 1)),
+                              int(win_w * s), int(win_h * s)) for s in scales]
+                    scanned += n
+                else:
+                    # Gesamtzahl der Fenster grob schätzen (Schrittweite 2, scaleFactor 1.1) für die Durchlassrate
+                    rects = detector.detectMultiScale(image, scaleFactor=1.1, minNeighbors=0)
+                    scanned += int(image.shape[0] * image.shape[1] / 4 / (1 - 1 / 1.1 ** 2))
+                    rects = [tuple(r) for r in rects]
+                    if len(rects) > count // 4 + 1: # Nicht alle Beispiele aus einem Bild
+                        rects = [rects[i] for i in self.rng.choice(len(rects), count // 4 + 1, replace=False)]
+                for x, y, w, h in rects:
+                    samples.append(cv2.resize(image[y:y + h, x:x + w], self.window_size, interpolation=cv2.INTER_LINEAR))
+                    if len(samples) >= count:
+                        break
+                if len(samples) >= count or time.perf_counter() - t0 > max_seconds:
+                    break
+            if len(samples) >= count or time.perf_counter() - t0 > max_seconds or (detector is not None and not samples):
+                break
+
+        samples = np.array(samples[:count], dtype=np.uint8).reshape(-1, win_h, win_w)
+        return samples, len(samples) / max(scanned, 1)
+
+    # Bewertet Beispiele mit allen bisher trainierten Stufen.
+    def _passes_cascade(self, samples):
+        """
+        :param samples: Array (N, Höhe, Breite) uint8.
+        :return: Bool-Array: True für Beispiele, die alle bisherigen Stufen bestehen.
+        """
+
+        integrals, inv_norm, valid = sample_integrals(samples)
+        passed = valid.copy()
+        for stage in self.stages:
+            features = self.features[[weak[0] for weak in stage["weak"]]]
+            values = (integrals @ feature_matrix(features, self.window_size)) * inv_norm[:, None]
+            thresholds = np.array([weak[1] for weak in stage["weak"]])
+            left = np.array([weak[2] for weak in stage["weak"]])
+            right = np.array([weak[3] for weak in stage["weak"]])
+            stage_sum = np.where(values < thresholds, left, right).sum(axis=1)
+            passed &= stage_sum >= stage["threshold"] - 1e-5
+        return passed
+
+    # Trainiert eine Stufe.
+    def _train_stage(self, pool, workdir, stage_idx, positives, negatives):
+        """
+        Trainiert eine Stufe mit Gentle AdaBoost, bis höchstens max_false_alarm der Negativbeispiele durchkommen
+        (bei mindestens min_hit_rate der positiven Beispiele) oder max_weak_count erreicht ist.
+        :return: (Stufe als Dictionary, Trefferquote, Falschalarmrate, Zeit für Features in s, Zeit für Boosting in s)
+        """
+
+        t0 = time.perf_counter()
+        samples = np.concatenate([positives, negatives])
+        labels = np.concatenate([np.ones(len(positives)), -np.ones(len(negatives))])
+        integrals, inv_norm, _ = sample_integrals(samples)
+        np.save(os.path.join(workdir, f"integrals-{stage_idx}.npy"), integrals)
+        np.save(os.path.join(workdir, f"invnorm-{stage_idx}.npy"), inv_norm)
+
+        num_samples, num_features = len(samples), len(self.features)
+        for name in ("values", "order"):
+            np.memmap(os.path.join(workdir, f"{name}-{stage_idx}.dat"), dtype=np.float32 if name == "values" else np.int32,
+                      mode="w+", shape=(num_features, num_samples)).flush()
+
+        # Feature-Werte in Blöcken berechnen, die gut in den Speicher passen (etwa 64 MiB pro Block)
+        block = max(256, min(num_features, (16 << 20) // max(num_samples, 1)))
+        ranges = [(start, min(start + block, num_features)) for start in range(0, num_features, block)]
+        for _ in pool.map(_prepare_features, *zip(*[(workdir, stage_idx, a, b, num_samples, self.window_size) for a, b in ranges])):
+            pass
+        t1 = time.perf_counter()
+
+        # Boosting: pro Runde sucht jeder Prozess den besten Stumpf in seinem Bereich
+        split = np.linspace(0, num_features, self.workers + 1).astype(int)
+        worker_ranges = [(split[i], split[i + 1]) for i in range(self.workers) if split[i] < split[i + 1]]
+        values = np.memmap(os.path.join(workdir, f"values-{stage_idx}.dat"), dtype=np.float32, mode="r",
+                           shape=(num_features, num_samples))
+        weights = np.where(labels > 0, 0.5 / len(positives), 0.5 / len(negatives))
+        scores = np.zeros(num_samples)
+        weak, hit_rate, false_alarm, threshold = [], 1.0, 1.0, 0.0
+        is_pos = labels > 0
+
+        while len(weak) < self.max_weak_count:
+            results = pool.map(_best_stump, *zip(*[(workdir, stage_idx, a, b, num_samples, num_features, weights, labels)
+                                                    for a, b in worker_ranges]))
+            results = [r for r in results if r is not None]
+            if not results:
+                break
+            _, feature, feature_threshold, left, right = max(results)
+            output = np.where(values[feature] < feature_threshold, left, right)
+            scores += output
+            weights = weights * np.exp(-labels * output)
+            weights /= weights.sum()
+            weak.append((int(feature), feature_threshold, left, right))
+
+            # Stufenschwelle so wählen, dass mindestens min_hit_rate der positiven Beispiele bestehen
+            pos_scores = np.sort(scores[is_pos])
+            threshold = float(pos_scores[int((1.0 - self.min_hit_rate) * len(pos_scores))])
+            hit_rate = float(np.mean(scores[is_pos] >= threshold))
+            false_alarm = float(np.mean(scores[~is_pos] >= threshold))
+            self.progress(f"  Stufe {stage_idx}: {len(weak)} schwache Klassifizierer, "
+                          f"Trefferquote {hit_rate:.4f}, Falschalarmrate {false_alarm:.4f}")
+            if false_alarm <= self.max_false_alarm:
+                break
+
+        del values
+        for name in (f"values-{stage_idx}.dat", f"order-{stage_idx}.dat", f"integrals-{stage_idx}.npy", f"invnorm-{stage_idx}.npy"):
+            try:
+                os.remove(os.path.join(workdir, name)) # Speicherplatz sofort freigeben
+            except OSError:
+                pass
+        t2 = time.perf_counter()
+        return {"threshold": threshold, "weak": weak}, hit_rate, false_alarm, t1 - t0, t2 - t1
+
+    # Startet das Training.
+    def train(self):
+        """
+        Trainiert den Cascade Stufe für Stufe und schreibt nach jeder Stufe die XML-Datei.
+        :return: Pfad zur XML-Datei oder None, falls keine Stufe trainiert werden konnte.
+        """
+
+        positives = self.load_positives()
+        if len(positives) == 0:
+            raise ValueError(f"Keine positiven Beispiele in {self.positive_dir}")
+        num_neg = self.num_neg or len(positives)
+        self.progress(f"{len(positives)} positive Beispiele, {num_neg} Negativbeispiele pro Stufe, "
+                      f"{len(self.features)} Features, {self.workers} Prozesse")
+
+        workdir = self.workdir or tempfile.mkdtemp(prefix="cascadetrainer-")
+        os.makedirs(workdir, exist_ok=True)
+        np.save(os.path.join(workdir, "features.npy"), self.features)
+        t_start = time.perf_counter()
+        try:
+            # spawn statt fork: das Training läuft auch aus einem Thread der GUI (fork kopiert nur diesen Thread
+            # samt gehaltener Locks von Qt/OpenCV in die Kindprozesse)
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                for stage_idx in range(self.num_stages):
+                    t0 = time.perf_counter()
+                    stage_positives = positives[self._passes_cascade(positives)] if self.stages else positives
+                    negatives, acceptance = self.mine_negatives(num_neg, self.output_path if self.stages else None)
+                    if self.stages:
+                        negatives = negatives[self._passes_cascade(negatives)]
+                    mining_s = time.perf_counter() - t0
+                    self.progress(f"Stufe {stage_idx}: {len(stage_positives)} positive, {len(negatives)} negative Beispiele, "
+                                  f"Durchlassrate der Negativfenster {acceptance:.2e}")
+                    if len(negatives) < max(10, num_neg // 10):
+                        self.progress("Nicht mehr genug Negativbeispiele: der Cascade verwirft die Negativbilder fast vollständig.")
+                        break
+
+                    stage, hit_rate, false_alarm, features_s, boost_s = self._train_stage(
+                        pool, workdir, stage_idx, stage_positives, negatives)
+                    self.stages.append(stage)
+                    self.stage_times.append({"stage": stage_idx, "weak": len(stage["weak"]), "hit_rate": hit_rate,
+                                             "false_alarm": false_alarm, "mining_s": round(mining_s, 2),
+                                             "features_s": round(features_s, 2), "boost_s": round(boost_s, 2)})
+                    self.write_xml(self.output_path)
+                    self.progress(f"Stufe {stage_idx} fertig: {len(stage['weak'])} schwache Klassifizierer, "
+                                  f"Suche {mining_s:.1f} s, Features {features_s:.1f} s, Boosting {boost_s:.1f} s, "
+                                  f"gesamt {time.perf_counter() - t_start:.1f} s")
+        finally:
+            if self.workdir is None:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        return self.output_path if self.stages else None
+
+    # Schreibt den Cascade im XML-Format von OpenCV.
+    def write_xml(self, path):
+        """
+        Schreibt den Cascade im XML-Format von opencv_traincascade (ladbar mit cv2.CascadeClassifier).
+        Es werden nur die verwendeten Features gespeichert.
+        :param path: Zielpfad.
+        :return: None
+        """
+
+        used = sorted({weak[0] for stage in self.stages for weak in stage["weak"]})
+        index = {feature: i for i, feature in enumerate(used)}
+
+        def add(parent, tag, text=None):
+            element = ET.SubElement(parent, tag)
+            if text is not None:
+                element.text = str(text)
+            return element
+
+        root = ET.Element("opencv_storage")
+        cascade = add(root, "cascade")
+        add(cascade, "stageType", "BOOST")
+        add(cascade, "featureType", "HAAR")
+        add(cascade, "height", self.window_size[1])
+        add(cascade, "width", self.window_size[0])
+        stage_params = add(cascade, "stageParams")
+        add(stage_params, "boostType", "GAB")
+        add(stage_params, "minHitRate", repr(self.min_hit_rate))
+        add(stage_params, "maxFalseAlarm", repr(self.max_false_alarm))
+        add(stage_params, "weightTrimRate", "1.")
+        add(stage_params, "maxDepth", 1)
+        add(stage_params, "maxWeakCount", self.max_weak_count)
+        feature_params = add(cascade, "featureParams")
+        add(feature_params, "maxCatCount", 0)
+        add(feature_params, "featSize", 1)
+        add(feature_params, "mode", "BASIC")
+        add(cascade, "stageNum", len(self.stages))
+
+        stages = add(cascade, "stages")
+        for stage in self.stages:
+            element = add(stages, "_")
+            add(element, "maxWeakCount", len(stage["weak"]))
+            add(element, "stageThreshold", f"{stage['threshold']:.9e}")
+            classifiers = add(element, "weakClassifiers")
+            for feature, threshold, left, right in stage["weak"]:
+                weak = add(classifiers, "_")
+                add(weak, "internalNodes", f"0 -1 {index[feature]} {threshold:.9e}")
+                add(weak, "leafValues", f"{left:.9e} {right:.9e}")
+
+        features = add(cascade, "features")
+        for feature in used:
+            rects = add(add(features, "_"), "rects")
+            for x, y, w, h, weight in self.features[feature]:
+                if weight != 0:
+                    add(rects, "_", f"{int(x)} {int(y)} {int(w)} {int(h)} {weight:.1f}")
+
+        ET.indent(root)
+        with atomic_write(path, "wb") as file: # Atomar ersetzen, damit die Datei jederzeit ladbar ist
+            ET.ElementTree(root).write(file, encoding="utf-8", xml_declaration=True)
+
+
+# Trainiert einen Cascade über die Kommandozeile.
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Haar-Cascade aus positiven Ausschnitten und Negativbildern trainieren")
+    parser.add_argument("positives", help="Ordner mit positiven Ausschnitten")
+    parser.add_argument("negatives", help="Ordner mit Negativbildern (ohne das gesuchte Objekt)")
+    parser.add_argument("output", help="Zielpfad der XML-Datei")
+    parser.add_argument("--width", type=int, default=24)
+    parser.add_argument("--height", type=int, default=24)
+    parser.add_argument("--stages", type=int, default=20)
+    parser.add_argument("--num-neg", type=int, default=None)
+    parser.add_argument("--min-hit-rate", type=float, default=0.995)
+    parser.add_argument("--max-false-alarm", type=float, default=0.5)
+    parser.add_argument("--max-weak-count", type=int, default=100)
+    parser.add_argument("--feature-step", type=int, default=1, help="Schrittweite der Features (2 = etwa 1/8 der Features)")
+    parser.add_argument("--no-mirror", action="store_true", help="Positive Beispiele nicht spiegeln")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--workdir", default=None, help="Arbeitsverzeichnis für die Memory-Maps (Standard: temporär)")
+    args = parser.parse_args()
+
+    trainer = CascadeTrainer(args.positives, args.negatives, args.output, (args.width, args.height), args.stages,
+                             args.num_neg, args.min_hit_rate, args.max_false_alarm, args.max_weak_count,
+                             args.feature_step, not args.no_mirror, args.workers, args.workdir)
+    result = trainer.train()
+    print(f"Ergebnis: {result}")
+    for entry in trainer.stage_times:
+        print(json.dumps(entry))
@@ -1,5 +1,35 @@
+import asyncio
+import os
+import threading
+import time
+from collections import namedtuple
 import cv2
+from boundedexecutor import BoundedExecutor
 from filemanager import FileManager
+from haarevaluator import HaarEvaluator
+from cascadecompiler import load_cascade
+from twotiercascade import TwoTierCascade, suggest_stage_count
+from cascadetrainer import CascadeTrainer
+from motiongate import MotionGate
+from orientationdetector import OrientationDetector
+from scalemap import ScaleMap
+from detectionmask import DetectionMask
+from latencytuner import LatencyTuner
+from cascadeanalyzer import CostModel
+import boxops
+from profiler import profiler
+from metrics import metrics
+
+
+# Unveränderlicher Schnappschuss der Erkennungsparameter eines Klassifizierers.
+# Kann gefahrlos zwischen Threads geteilt werden, da er nach dem Erstellen nicht mehr verändert wird.
+# engine: "opencv" (cv2.CascadeClassifier) oder "numpy" (HaarEvaluator mit Statistik pro Stufe)
+# prescreen_stages: Stufen des Vorfilters für die zweistufige Erkennung (0 = aus, nur mit "opencv")
+# maxSize: Größte gesuchte Objektgröße ((0, 0) = unbegrenzt, z. B. pro Bildstreifen aus dem ScaleMap)
+DetectionParams = namedtuple("DetectionParams", ["classifier_id", "path", "scaleFactor", "minNeighbors", "minSize", "engine",
+                                                 "prescreen_stages", "maxSize"],
+                             defaults=("opencv", 0, (0, 0)))
+
 
 # Klasse zum Verwalten von Klassifizierern und zum Erkennen von Objekten in einem Frame.
 class ClassifierManager:
@@ -8,15 +38,32 @@ class ClassifierManager:
     """
 
     # Initialisiert den Klassifizierer-Manager.
-    def __init__(self):
+    def __init__(self, max_workers=None, max_pending=None):
         """
         Initialisiert den Klassifizierer-Manager.
+        :param max_workers: Anzahl der Worker-Threads für detect_async()/detect_many() (Standard: Anzahl CPU-Kerne).
+        :param max_pending: Anzahl der zusätzlich wartenden Aufträge (Standard: 2 * max_workers).
         """
 
         try:
-            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml") # Standard-Gesichtsklassifizierer wird geladen
+            self.current_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml" # Pfad des aktuell geladenen Klassifizierers
+            self.face_cascade = cv2.CascadeClassifier(self.current_path) # Standard-Gesichtsklassifizierer wird geladen
             self.file_manager = FileManager()
             self.current_classifier = "face"
+            self.engine = "opencv" # Erkennungs-Engine ("opencv" oder "numpy")
+            self.motion_gate_options = None # Optionen des Bewegungsfilters für detect_faces() (None = aus)
+            self.motion_gates = {} # Bewegungsfilter pro Klassifizierer (eigenes Hintergrundmodell und letztes Ergebnis)
+            self.orientation = None # Gespiegelte/gedrehte Durchläufe für detect_faces() (None = aus)
+            self.scale_map = None # Maßstab pro Bildstreifen für detect_faces() (None = aus)
+            self.masks = {} # Ein-/Ausschlussbereiche pro Klassifizierer für detect_faces()
+            self.latency_tuner = None # Latenz-Regler für detect_faces() (None = aus)
+            self.cost_model = None # Kostenmodell für estimate_cost() (wird beim ersten Aufruf geladen)
+
+            # Klassifizierer-Instanzen pro Thread (cv2.CascadeClassifier ist nicht threadsicher)
+            self._local = threading.local()
+            max_workers = max_workers or os.cpu_count() or 1
+            max_pending = max_pending if max_pending is not None else 2 * max_workers
+            self.executor = BoundedExecutor(max_workers, max_pending)
 
             # Dictionary für native OpenCV-Klassifizierer
             self.classifiers = {
@@ -24,43 +71,51 @@ class ClassifierManager:
                 "file": "haarcascade_frontalface_default.xml",
                 "scaleFactor": 1.05,
                 "minNeighbors": 3,
-                "minSize": (30, 30)
+                "minSize": (30, 30),
+                "tuneBounds": {"scaleFactor": (1.05, 1.4), "minSize": (30, 120)} # Grenzen für den Latenz-Regler
                 },
                 "eye": {
                 "file": "haarcascade_eye.xml",
                 "scaleFactor": 1.1,
                 "minNeighbors": 5,
-                "minSize": (20, 20)
+                "minSize": (20, 20),
+                "tuneBounds": {"scaleFactor": (1.1, 1.4), "minSize": (20, 80)} # Grenzen für den Latenz-Regler
                 },
                 "smile": {
                 "file": "haarcascade_smile.xml",
                 "scaleFactor": 1.1,
                 "minNeighbors": 15,
-                "minSize": (25, 25)
+                "minSize": (25, 25),
+                "tuneBounds": {"scaleFactor": (1.1, 1.4), "minSize": (25, 100)} # Grenzen für den Latenz-Regler
                 },
                 "upperbody": {
                 "file": "haarcascade_upperbody.xml",
                 "scaleFactor": 1.05,
                 "minNeighbors": 3,
-                "minSize": (50, 50)
+                "minSize": (50, 50),
+                "tuneBounds": {"scaleFactor": (1.05, 1.4), "minSize": (50, 200)} # Grenzen für den Latenz-Regler
                 },
                 "fullbody": {
                 "file": "haarcascade_fullbody.xml",
                 "scaleFactor": 1.05,
                 "minNeighbors": 3,
-                "minSize": (50, 50)
+                "minSize": (50, 50),
+                "tuneBounds": {"scaleFactor": (1.05, 1.4), "minSize": (50, 200)} # Grenzen für den Latenz-Regler
                 },
                 "profileface": {
                 "file": "haarcascade_profileface.xml",
                 "scaleFactor": 1.1,
                 "minNeighbors": 3,
-                "minSize": (30, 30)
+                "minSize": (30, 30),
+                "mirror": True, # Nur in eine Richtung trainiert: gespiegelter Durchlauf findet die andere Seite
+                "tuneBounds": {"scaleFactor": (1.1, 1.4), "minSize": (30, 120)} # Grenzen für den Latenz-Regler
                 },
                 "custom": {
                 "file": "",
                 "scaleFactor": 1.05,
                 "minNeighbors": 3,
-                "minSize": (30, 30)
+                "minSize": (30, 30),
+                "tuneBounds": {"scaleFactor": (1.05, 1.4), "minSize": (30, 120)} # Grenzen für den Latenz-Regler
                 }
             }
 
@@ -116,8 +171,7 @@ class ClassifierManager:
         try:
             file_path = self.file_manager.open_file_classifier()
             if file_path:
-                self.face_cascade = cv2.CascadeClassifier(file_path)
-                self.custom_classifier_name = file_path.split("/")[-1]
+                self.use_custom_classifier(file_path)
             else:
                 if hasattr(self, 'custom_classifier_name'):
                     return self.custom_classifier_name
@@ -130,6 +184,20 @@ class ClassifierManager:
             return "Fehler beim Laden"
     
 
+    # Übernimmt eine Haar-Cascade XML-Datei als benutzerdefinierten Klassifizierer.
+    def use_custom_classifier(self, file_path):
+        """
+        :param file_path: Pfad zur XML-Datei.
+        :return: Name des Klassifizierers.
+        """
+
+        self.face_cascade = cv2.CascadeClassifier(file_path)
+        self.classifiers["custom"]["file"] = file_path
+        self.current_path = file_path
+        self.custom_classifier_name = file_path.split("/")[-1]
+        return self.custom_classifier_name
+
+
     # Lädt einen nativen OpenCV-Klassifizierer basierend auf einer angegebenen ID.
     def load_classifier(self, classifier_id):
         """
@@ -145,16 +213,18 @@ class ClassifierManager:
 
             # Den Dateipfad für den gewünschten Klassifizierer erstellen
             classifier_info = self.classifiers[classifier_id]
-            classifier_path = cv2.data.haarcascades + classifier_info["file"]
+            classifier_path = self.get_classifier_path(classifier_id)
             print(f"Lade Klassifizierer '{classifier_info['file']}'...")
 
             # Versuchen, den Klassifizierer zu laden
         
             self.face_cascade = cv2.CascadeClassifier(classifier_path)
             self.current_classifier = classifier_id
+            self.current_path = classifier_path
     
         except cv2.error as e:
-            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+            self.current_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+            self.face_cascade = cv2.CascadeClassifier(self.current_path)
             self.current_classifier = "face"
             print(f"Laden des Klassifizierers '{classifier_info['file']}' fehlgeschlagen")
             return "Laden fehlgeschlagen! Standard wird zurückgesetzt"
@@ -166,33 +236,555 @@ class ClassifierManager:
 
 
     # Trainiert einen benutzerdefinierten Haar-Cascade Klassifizierer.
-    def train_classifier(self):
-        pass
+    def train_classifier(self, positive_dir=None, negative_dir=None, output_path=None, progress=None, load=True, **options):
+        """
+        Trainiert einen benutzerdefinierten Haar-Cascade Klassifizierer (siehe CascadeTrainer) und lädt ihn
+        anschließend als benutzerdefinierten Klassifizierer. Fehlende Ordner und Zielpfad werden per Dialog abgefragt.
+        Das Training kann lange dauern und sollte nicht im GUI-Thread laufen; die GUI übergibt dann load=False und
+        übernimmt das Ergebnis selbst im GUI-Thread (use_custom_classifier()).
+        :param positive_dir: Ordner mit positiven Ausschnitten.
+        :param negative_dir: Ordner mit Negativbildern.
+        :param output_path: Zielpfad der XML-Datei.
+        :param progress: Optionale Funktion progress(nachricht) für Fortschritt und Zeiten pro Stufe.
+        :param load: Das Ergebnis als benutzerdefinierten Klassifizierer übernehmen.
+        :param options: Weitere Parameter für CascadeTrainer (z. B. num_stages, feature_step, workers).
+        :return: Pfad zur XML-Datei oder None, falls abgebrochen oder ein Fehler auftritt
+        """
+
+        try:
+            positive_dir = positive_dir or self.file_manager.open_folder("Ordner mit positiven Beispielen auswählen")
+            negative_dir = negative_dir or self.file_manager.open_folder("Ordner mit Negativbildern auswählen")
+            output_path = output_path or self.file_manager.save_file_classifier()
+            if not (positive_dir and negative_dir and output_path):
+                print("Training abgebrochen.")
+                return None
+
+            trainer = CascadeTrainer(positive_dir, negative_dir, output_path, progress=progress, **options)
+            result = trainer.train()
+            if result and load:
+                self.use_custom_classifier(result)
+            return result
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Trainieren des Klassifizierers: {e}")
+            return None
+
+
+    # Liefert den Dateipfad eines Klassifizierers.
+    def get_classifier_path(self, classifier_id):
+        """
+        Liefert den Dateipfad eines Klassifizierers.
+        :param classifier_id: ID des Klassifizierers (z. B. "face", "custom").
+        :return: Pfad zur XML-Datei.
+        """
+
+        file = self.classifiers[classifier_id]["file"]
+        if classifier_id == "custom":
+            return file if file else self.current_path # Ohne eigene Datei wird der aktuell geladene Klassifizierer verwendet
+        return cv2.data.haarcascades + file
+
+
+    # Erstellt einen unveränderlichen Schnappschuss der aktuellen Parameter.
+    def snapshot_params(self, classifier_id=None):
+        """
+        Erstellt einen unveränderlichen Schnappschuss der aktuellen Parameter eines Klassifizierers.
+        Spätere Änderungen über die Slider wirken sich nicht auf bereits erstellte Schnappschüsse aus.
+        :param classifier_id: ID des Klassifizierers (Standard: aktueller Klassifizierer).
+        :return: DetectionParams
+        """
+
+        classifier_id = classifier_id or self.current_classifier
+        classifier_info = dict(self.classifiers[classifier_id]) # Kopie, damit alle Werte aus demselben Stand stammen
+        return DetectionParams(
+            classifier_id,
+            self.get_classifier_path(classifier_id),
+            float(classifier_info["scaleFactor"]),
+            int(classifier_info["minNeighbors"]),
+            tuple(classifier_info["minSize"]),
+            self.engine,
+            int(classifier_info.get("prescreenStages", 0))
+        )
+
+
+    # Wählt die Erkennungs-Engine.
+    def set_engine(self, engine):
+        """
+        Wählt die Erkennungs-Engine für alle folgenden Schnappschüsse.
+        :param engine: "opencv" (cv2.CascadeClassifier) oder "numpy" (HaarEvaluator, langsamer, mit Statistik pro Stufe).
+        :return: True, wenn die Engine gültig ist, sonst False.
+        """
+
+        if engine not in ("opencv", "numpy"):
+            print(f"Unbekannte Engine: '{engine}'")
+            return False
+        self.engine = engine
+        return True
+
+
+    # Aktiviert oder deaktiviert die zweistufige Erkennung für einen Klassifizierer.
+    def set_two_tier(self, classifier_id=None, stages=None, sample_frames=None):
+        """
+        Aktiviert die zweistufige Erkennung (Vorfilter mit den ersten Stufen, vollständige Prüfung nur in
+        Kandidatenregionen) für einen Klassifizierer. Wirkt nur mit der Engine "opencv".
+        :param classifier_id: ID des Klassifizierers (Standard: aktueller Klassifizierer).
+        :param stages: Anzahl der Stufen des Vorfilters; 0 deaktiviert, None lässt die Anzahl vorschlagen.
+        :param sample_frames: Beispielbilder für den Vorschlag (ohne Beispielbilder wird die Struktur verwendet).
+        :return: Verwendete Anzahl der Stufen oder None, falls ein Fehler auftritt
+        """
+
+        try:
+            classifier_id = classifier_id or self.current_classifier
+            if stages is None:
+                classifier_info = self.classifiers[classifier_id]
+                stages, _ = suggest_stage_count(self.get_classifier_path(classifier_id), sample_frames,
+                                                scaleFactor=classifier_info["scaleFactor"],
+                                                minSize=tuple(classifier_info["minSize"]))
+            self.classifiers[classifier_id]["prescreenStages"] = int(stages)
+            return int(stages)
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Einstellen der zweistufigen Erkennung: {e}")
+            return None
+
+
+    # Aktiviert oder deaktiviert den Bewegungsfilter für detect_faces().
+    def set_motion_gate(self, enabled=True, **options):
+        """
+        Aktiviert den Bewegungsfilter für detect_faces(): bei unbewegter Szene wird die Erkennung übersprungen,
+        bei Bewegung nur in den bewegten Bereichen gesucht. Gilt für einen Bildstrom (z. B. die Kamera der Anwendung);
+        jeder Klassifizierer erhält einen eigenen Filter, damit mehrere Klassifizierer im selben Strom sich ihr
+        letztes Ergebnis nicht gegenseitig überschreiben.
+        :param enabled: True aktiviert, False deaktiviert.
+        :param options: Optionen für MotionGate (z. B. full_scan_interval, threshold).
+        :return: MotionGate des aktuellen Klassifizierers oder None
+        """
+
+        self.motion_gate_options = dict(options) if enabled else None
+        self.motion_gates = {}
+        return self.get_motion_gate()
+
+
+    # Liefert den Bewegungsfilter eines Klassifizierers.
+    def get_motion_gate(self, classifier_id=None):
+        """
+        :param classifier_id: ID des Klassifizierers (Standard: aktueller Klassifizierer).
+        :return: MotionGate (wird beim ersten Aufruf angelegt) oder None, falls der Bewegungsfilter aus ist
+        """
+
+        if self.motion_gate_options is None:
+            return None
+        classifier_id = classifier_id or self.current_classifier
+        gate = self.motion_gates.get(classifier_id)
+        if gate is None:
+            gate = self.motion_gates[classifier_id] = MotionGate(**self.motion_gate_options)
+        return gate
+
+
+    # Aktiviert oder deaktiviert die gespiegelten und gedrehten Durchläufe für detect_faces().
+    def set_orientation_passes(self, enabled=True, **options):
+        """
+        Aktiviert zusätzliche Durchläufe für detect_faces(): horizontal gespiegelt (nur Klassifizierer mit "mirror",
+        z. B. Profilgesichter) und optional um ±N Grad gedreht. Die Durchläufe laufen parallel und teilen sich eine
+        Graustufen-Umwandlung; die Ergebnisse werden zusammengeführt.
+        Der bisherige OrientationDetector wird erst nach dem Austausch beendet; ein Frame, der ihn noch verwendet,
+        rechnet seine Durchläufe im eigenen Thread zu Ende.
+        :param enabled: True aktiviert, False deaktiviert.
+        :param options: Optionen für OrientationDetector (z. B. mirror, angles=(20,), nms_threshold).
+        :return: OrientationDetector oder None
+        """
+
+        try:
+            previous, self.orientation = self.orientation, OrientationDetector(**options) if enabled else None
+            if previous is not None:
+                previous.close()
+            return self.orientation
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Einstellen der Durchläufe: {e}")
+            self.orientation = None
+            return None
+
+
+    # Aktiviert oder deaktiviert den Maßstab pro Bildstreifen für detect_faces().
+    def set_scale_map(self, camera, enabled=True, learn_frames=0, **options):
+        """
+        Aktiviert die streifenweise Suche für eine fest montierte Kamera: jeder horizontale Streifen wird nur mit der dort
+        erwarteten Objektgröße (minSize/maxSize) durchsucht. Ein gespeicherter Maßstab der Kamera wird geladen.
+        Bei aktiven gedrehten Durchläufen wird der Maßstab nicht verwendet.
+        :param camera: Kennung der Kamera (Schlüssel in ~/.haarcascades/scalemaps.json).
+        :param enabled: True aktiviert, False deaktiviert.
+        :param learn_frames: > 0: Maßstab aus den nächsten Frames neu lernen und speichern.
+        :param options: Optionen für ScaleMap (z. B. bands, margin).
+        :return: ScaleMap oder None
+        """
+
+        try:
+            if not enabled:
+                self.scale_map = None
+                return None
+            scale_map = ScaleMap(**options)
+            scale_map.load(camera)
+            if learn_frames > 0:
+                scale_map.start_learning(learn_frames, camera)
+            self.scale_map = scale_map
+            return scale_map
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Einstellen des Maßstabs: {e}")
+            self.scale_map = None
+            return None
+
+
+    # Aktiviert oder deaktiviert die Ein- und Ausschlussbereiche eines Klassifizierers für detect_faces().
+    def set_mask(self, camera, classifier_id, enabled=True, **options):
+        """
+        Aktiviert die Bereiche einer Kamera für einen Klassifizierer: gesucht wird nur in den Rechtecken um die
+        Einschlussbereiche, Treffer mit Mittelpunkt in einem Ausschlussbereich werden verworfen. Gespeicherte Bereiche
+        werden geladen. Bei aktiven gedrehten Durchläufen wird nur der Ausschluss angewendet.
+        :param camera: Kennung der Kamera (Schlüssel in ~/.haarcascades/masks.json).
+        :param classifier_id: ID des Klassifizierers.
+        :param enabled: True aktiviert, False deaktiviert.
+        :param options: Optionen für DetectionMask (z. B. path).
+        :return: DetectionMask oder None
+        """
+
+        try:
+            if not enabled:
+                self.masks.pop(classifier_id, None)
+                return None
+            mask = DetectionMask(**options)
+            mask.load(camera, classifier_id)
+            self.masks[classifier_id] = mask
+            return mask
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Einstellen der Bereiche: {e}")
+            self.masks.pop(classifier_id, None)
+            return None
+
+
+    # Aktiviert oder deaktiviert den Latenz-Regler für detect_faces().
+    def enable_latency_tuner(self, budget_ms=50.0, enabled=True, **options):
+        """
+        Aktiviert den Latenz-Regler: detect_faces() misst die Latenz und passt scaleFactor und minSize
+        innerhalb von "tuneBounds" an, damit das Zeitbudget eingehalten wird. Die zuletzt auf diesem Rechner
+        verwendeten Einstellungen werden aus der Preset-Datei übernommen.
+        :param budget_ms: Zeitbudget pro Erkennung in ms.
+        :param enabled: False deaktiviert den Regler (die Parameter bleiben auf dem zuletzt eingestellten Stand).
+        :param options: Optionen für LatencyTuner (z. B. presets_path, window).
+        :return: LatencyTuner oder None
+        """
+
+        try:
+            if not enabled:
+                self.latency_tuner = None
+                return None
+            self.latency_tuner = LatencyTuner(budget_ms, **options)
+            applied = self.latency_tuner.apply_presets(self.classifiers)
+            if applied:
+                print(f"Presets übernommen: {', '.join(applied)}")
+            return self.latency_tuner
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Aktivieren des Latenz-Reglers: {e}")
+            return None
+
+
+    # Schätzt die Dauer der Erkennung für einen Klassifizierer.
+    def estimate_cost(self, classifier_id=None, image_size=(640, 480)):
+        """
+        Schätzt die Dauer einer Erkennung mit den aktuellen Parametern eines Klassifizierers aus der Struktur des
+        Cascades (Kostenmodell, beim ersten Aufruf auf diesem Rechner einmalig in einigen Sekunden kalibriert).
+        :param classifier_id: ID des Klassifizierers (Standard: aktueller Klassifizierer).
+        :param image_size: Bildgröße (Breite, Höhe).
+        :return: Geschätzte Dauer in ms oder None, falls ein Fehler auftritt
+        """
+
+        try:
+            if self.cost_model is None:
+                self.cost_model = CostModel()
+                if self.cost_model.coefficients is None:
+                    self.cost_model.calibrate()
+            params = self.snapshot_params(classifier_id)
+            return self.cost_model.predict_ms(params.path, image_size, params.scaleFactor, params.minSize)
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Schätzen der Kosten: {e}")
+            return None
+
+
+    # Liefert die Fenstergröße eines Klassifizierers.
+    def get_window_size(self, classifier_id=None):
+        """
+        :param classifier_id: ID des Klassifizierers (Standard: aktueller Klassifizierer).
+        :return: Fenstergröße (Breite, Höhe) des Cascades oder (24, 24), falls sie nicht ermittelt werden kann.
+        """
+
+        try:
+            cascade = self._get_cascade(self.get_classifier_path(classifier_id or self.current_classifier))
+            size = cascade.getOriginalWindowSize()
+            return (int(size[0]), int(size[1])) if size[0] > 0 else (24, 24)
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Ermitteln der Fenstergröße: {e}")
+            return (24, 24)
+
+
+    # Liefert die Klassifizierer-Instanz des aufrufenden Threads.
+    def _get_cascade(self, path, engine="opencv", prescreen_stages=0):
+        """
+        Liefert die Klassifizierer-Instanz des aufrufenden Threads (wird beim ersten Aufruf geladen). Ändert sich die
+        Datei (Änderungszeit oder Größe, z. B. neu trainiert unter demselben Pfad), wird sie neu geladen.
+        :param path: Pfad zur XML-Datei.
+        :param engine: "opencv" oder "numpy".
+        :param prescreen_stages: Stufen des Vorfilters (> 0: TwoTierCascade, nur mit "opencv").
+        :return: cv2.CascadeClassifier, TwoTierCascade oder HaarEvaluator (None, falls die Datei nicht geladen werden kann)
+        """
+
+        cascades = getattr(self._local, "cascades", None)
+        if cascades is None:
+            cascades = self._local.cascades = {}
+
+        if engine != "opencv":
+            prescreen_stages = 0
+        key = (engine, path, prescreen_stages)
+        try:
+            stat = os.stat(path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = None
+        cached = cascades.get(key)
+        cascade = cached[1] if cached is not None and cached[0] == stamp else None
+        if cascade is None:
+            if prescreen_stages:
+                try:
+                    cascade = TwoTierCascade(path, prescreen_stages)
+                except Exception as e: # Fehlerbehandlung (z. B. mehr Stufen als der Cascade hat)
+                    print(f"Fehler beim Laden des zweistufigen Klassifizierers: {e}")
+                    return None
+            elif engine == "numpy":
+                try:
+                    cascade = HaarEvaluator(load_cascade(path)) # Bevorzugt die kompilierte Form, falls aktuell
+                except Exception as e: # Fehlerbehandlung
+                    print(f"Fehler beim Laden des Klassifizierers für die NumPy-Engine: {e}")
+                    return None
+            else:
+                cascade = cv2.CascadeClassifier(path)
+            if not cascade.empty(): # Fehlgeschlagene Ladeversuche nicht zwischenspeichern
+                cascades[key] = (stamp, cascade) # Ersetzt eine veraltete Instanz derselben Datei
+        return cascade
+
+
+    # Liefert die Statistik pro Stufe der letzten Erkennung mit der NumPy-Engine.
+    def get_stage_stats(self, classifier_id=None):
+        """
+        Liefert die Statistik pro Stufe (überlebende Fenster, Zeit) der letzten Erkennung des aufrufenden Threads
+        mit der NumPy-Engine.
+        :param classifier_id: ID des Klassifizierers (Standard: aktueller Klassifizierer).
+        :return: Dictionary aus HaarEvaluator.last_stats oder None.
+        """
+
+        cascades = getattr(self._local, "cascades", {})
+        cached = cascades.get(("numpy", self.get_classifier_path(classifier_id or self.current_classifier), 0))
+        return cached[1].last_stats if cached is not None else None
+
+
+    # Erkennt Objekte mit einem Parameter-Schnappschuss (threadsicher).
+    def detect(self, frame, params):
+        """
+        Erkennt Objekte in einem Frame mit einem Parameter-Schnappschuss.
+        Threadsicher: verwendet eine eigene Klassifizierer-Instanz pro Thread und keinen geteilten Zustand.
+        :param frame: Frame (BGR oder Graustufen), in dem Objekte erkannt werden sollen.
+        :param params: DetectionParams aus snapshot_params().
+        :return: Liste der erkannten Objekte oder None, falls ein Fehler auftritt
+        """
+
+        if frame is None:
+            return None
+
+        try:
+            gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            cascade = self._get_cascade(params.path, params.engine, params.prescreen_stages)
+            if cascade is None:
+                return None
+            with profiler.span("detectMultiScale", shape=gray.shape):
+                return cascade.detectMultiScale(
+                    gray,
+                    scaleFactor=params.scaleFactor,
+                    minNeighbors=params.minNeighbors,
+                    minSize=params.minSize,
+                    maxSize=params.maxSize
+                )
+        except cv2.error as e:
+            return None
+
+
+    # Erkennt Objekte in mehreren Frames parallel.
+    def detect_many(self, frames, classifier_id=None, params=None):
+        """
+        Erkennt Objekte in mehreren Frames parallel auf dem Thread-Pool.
+        Alle Frames verwenden denselben Parameter-Schnappschuss.
+        Nicht aus einem Worker-Thread des Pools aufrufen (Verklemmungsgefahr bei vollem Pool).
+        :param frames: Liste von Frames.
+        :param classifier_id: ID des Klassifizierers (Standard: aktueller Klassifizierer).
+        :param params: Optionaler DetectionParams-Schnappschuss (hat Vorrang vor classifier_id).
+        :return: Liste mit den Ergebnissen von detect() in der Reihenfolge der Frames.
+        """
+
+        params = params or self.snapshot_params(classifier_id)
+        futures = [self.executor.submit(self.detect, frame, params) for frame in frames]
+        return [future.result() for future in futures]
+
+
+    # Erkennt Objekte asynchron (für asyncio-Anwendungen).
+    async def detect_async(self, frame, classifier_id=None, params=None):
+        """
+        Erkennt Objekte asynchron auf dem Thread-Pool, ohne die Ereignisschleife zu blockieren.
+        Ist der Pool ausgelastet, wird gewartet, bis wieder ein Platz frei ist.
+        :param frame: Frame, in dem Objekte erkannt werden sollen.
+        :param classifier_id: ID des Klassifizierers (Standard: aktueller Klassifizierer).
+        :param params: Optionaler DetectionParams-Schnappschuss (hat Vorrang vor classifier_id).
+        :return: Ergebnis von detect().
+        """
+
+        params = params or self.snapshot_params(classifier_id)
+        future = self.executor.submit(self.detect, frame, params, blocking=False)
+        while future is None: # Pool voll: Ereignisschleife freigeben und erneut versuchen
+            await asyncio.sleep(0.002)
+            future = self.executor.submit(self.detect, frame, params, blocking=False)
+        return await asyncio.wrap_future(future)
+
+
+    # Beendet den Thread-Pool.
+    def shutdown(self):
+        """
+        Beendet den Thread-Pool für detect_async()/detect_many() und den der zusätzlichen Durchläufe.
+        :return: None
+        """
+
+        try:
+            self.executor.shutdown(wait=False)
+            if self.orientation is not None:
+                self.orientation.close()
+        except Exception as e: # Fehlerbehandlung
+            print("Fehler beim Beenden des Thread-Pools")
+
+
+    # Rechnet minSize eines Schnappschusses auf einen verkleinerten Frame um.
+    def _scaled_params(self, params, scale):
+        if scale == 1.0:
+            return params
+        return params._replace(minSize=tuple(max(int(round(size / scale)), 1) for size in params.minSize))
+
+
+    # Stellt die Erkennung eines Frames zusammen (zusätzliche Durchläufe, Skalierungskarte, Erkennungsbereiche).
+    def _detector(self, frame, params):
+        """
+        :param frame: Frame, für den die Erkennung zusammengestellt wird (None = nur detect()).
+        :param params: DetectionParams.
+        :return: (Funktion detect_fn(image) -> Objekte, aktive DetectionMask oder None)
+        """
+
+        detect_fn = lambda image: self.detect(image, params)
+        orientation, scale_map = self.orientation, self.scale_map
+        mask = self.masks.get(params.classifier_id)
+        if mask is not None and mask.is_empty():
+            mask = None
+        if frame is None:
+            return detect_fn, None
+        shape = frame.shape[:2]
+        window = self.get_window_size(params.classifier_id) if scale_map is not None else None
+
+        # Suche ohne Drehung: Streifen des Maßstabs und Einschlussbereiche (gespiegelt für den gespiegelten Durchlauf).
+        # Ausschnitte des Bewegungsfilters haben eine andere Größe: dort gelten die Einschlussbereiche nicht, der
+        # Maßstab erkennt sie am Seitenverhältnis selbst.
+        def upright(image, mirrored=False):
+            area = mask if mask is not None and image.shape[:2] == shape else None
+            if area is not None and mirrored:
+                area = area.mirrored()
+            if scale_map is not None:
+                return scale_map.detect(image, params, self.detect, window, area, learn=not mirrored)
+            if area is not None:
+                return area.detect(image, detect_fn, params.minSize)
+            return detect_fn(image)
+
+        if orientation is not None:
+            # Gedrehte Durchläufe durchsuchen das ganze gedrehte Bild; Ausschlussbereiche gelten über mask.keep()
+            mirror = self.classifiers.get(params.classifier_id, {}).get("mirror", False)
+            return (lambda image: orientation.detect(image, detect_fn, mirror, upright)), mask
+        return upright, mask
+
+
+    # Liefert die Bausteine der Erkennung eines Klassifizierers (zum Erkennen von Änderungen).
+    def detection_state(self, classifier_id=None):
+        """
+        :param classifier_id: ID des Klassifizierers (Standard: aktueller Klassifizierer).
+        :return: Tupel (zusätzliche Durchläufe, Skalierungskarte, Erkennungsbereiche); ändert es sich, sind
+                 zwischengespeicherte Ergebnisse mit gleichen Parametern veraltet.
+        """
+
+        return self.orientation, self.scale_map, self.masks.get(classifier_id or self.current_classifier)
+
+
+    # Erkennt Objekte in einem Einzelbild auf demselben Weg wie detect_faces(), aber ohne Bewegungsfilter.
+    def detect_image(self, image, params=None, scale=1.0):
+        """
+        Erkennt Objekte in einem Einzelbild (Galerie, Vorschau) mit zusätzlichen Durchläufen, Skalierungskarte und
+        Erkennungsbereichen wie detect_faces(). Bewegungsfilter, Metriken und Latenz-Regler bleiben außen vor, sie
+        beziehen sich auf die fortlaufenden Frames der Anzeige. Kann in Worker-Threads laufen.
+        :param image: Bild (BGR, RGB oder Graustufen).
+        :param params: DetectionParams (Standard: Schnappschuss des aktuellen Klassifizierers).
+        :param scale: Verkleinerungsfaktor des Bildes gegenüber dem Original (siehe detect_faces()).
+        :return: NumPy-Array (N, 4) oder None, falls ein Fehler auftritt
+        """
+
+        if image is None:
+            return None
+        try:
+            params = self._scaled_params(params or self.snapshot_params(), scale)
+            detect_fn, mask = self._detector(image, params)
+            objects = detect_fn(image)
+            if objects is None:
+                return None
+            objects = boxops.as_boxes(objects)
+            if mask is not None:
+                objects = objects[mask.keep(objects, image.shape[1], image.shape[0])]
+            return boxops.remap(objects, scale) if scale != 1.0 else objects
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Erkennen im Einzelbild: {e}")
+            return None
 
 
     # Erkennt Objekte in einem gegebenen Frame.
-    def detect_faces(self, frame, classifier_id = "face"):
+    def detect_faces(self, frame, classifier_id = "face", scale=1.0):
         """
         Erkennt Objekte in einem gegebenen Frame.
         :param frame: Frame, in dem Objekte erkannt werden sollen.
         :param classifier_id: ID des Klassifizierers, der verwendet werden soll.
+        :param scale: Verkleinerungsfaktor des Frames gegenüber dem Original (z. B. 4 bei IMREAD_REDUCED_GRAYSCALE_4):
+                      minSize wird umgerechnet und die Rechtecke werden in Pixel des Originals zurückgerechnet.
         :return: Liste der erkannten Objekte oder None, falls ein Fehler auftritt
         """
 
         try:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            classifier_info = self.classifiers[classifier_id]
-            objects = self.face_cascade.detectMultiScale(
-                gray, 
-                scaleFactor=classifier_info["scaleFactor"], 
-                minNeighbors=classifier_info["minNeighbors"], 
-                minSize=classifier_info["minSize"]
-            )
-            #print(f"{classifier_info['scaleFactor']}, {classifier_info['minNeighbors']}, {classifier_info['minSize']}")
+            params = self._scaled_params(self.snapshot_params(classifier_id), scale)
+            with profiler.span("detect", classifier=classifier_id, params=params, scale=scale):
+                t0 = time.perf_counter()
+                detect_fn, mask = self._detector(frame, params)
+                motion_gate = self.get_motion_gate(classifier_id) if frame is not None else None
+                if motion_gate is not None:
+                    objects = motion_gate.detect(frame, detect_fn, params.minSize, params)
+                else:
+                    objects = detect_fn(frame)
+                if mask is not None and objects is not None:
+                    objects = boxops.as_boxes(objects)
+                    objects = objects[mask.keep(objects, frame.shape[1], frame.shape[0])]
+                if objects is not None:
+                    elapsed_ms = (time.perf_counter() - t0) * 1000
+                    labels = (("classifier", classifier_id),)
+                    metrics.inc("frames_detected", labels)
+                    metrics.observe("detection_latency_ms", elapsed_ms, labels)
+                    metrics.observe("objects_per_frame", len(objects), labels)
+                    # Vom Bewegungsfilter übersprungene Frames (nur der Filter lief) verfälschen die Latenz nicht
+                    if self.latency_tuner is not None and (motion_gate is None or motion_gate.last_scan != "skipped"):
+                        self.latency_tuner.observe(classifier_id, elapsed_ms, self.classifiers[classifier_id])
+                if scale != 1.0 and objects is not None:
+                    objects = boxops.remap(objects, scale)
             return objects
-        
-        except cv2.error as e:
+        except (KeyError, cv2.error) as e: # Unbekannter Klassifizierer oder fehlerhafter Frame
             #print(f"Fehler beim Erkennen von Objekten: {e}")
             return None
         
-        
\ No newline at end of file
+        
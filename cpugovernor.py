@@ -0,0 +1,259 @@
+import math
+import os
+import time
+import cv2
+
+
+# Regelt Bildrate, Erkennungsabstand und OpenCV-Threads nach einem CPU-Budget oder einer Ziel-Bildrate.
+class CpuGovernor:
+    """
+    Regelt die Last der Anwendung nach einem CPU-Anteil (z. B. 0.25 = ein Viertel aller Kerne) oder einer Ziel-Bildrate.
+    Stellgrößen: Intervall des Frame-Timers, Erkennungsabstand (nur jeder n-te Frame wird ausgewertet) und
+    die Anzahl der OpenCV-Threads (cv2.setNumThreads). Grundlage sind die gemessenen Kosten der einzelnen
+    Schritte pro Frame und die CPU-Zeit des Prozesses. Werden längere Zeit keine Objekte erkannt, wird auf eine
+    niedrige Leerlauf-Bildrate umgeschaltet, bis wieder ein Objekt erscheint.
+    """
+
+    # Initialisiert den Regler.
+    def __init__(self, cpu_share=None, target_fps=None, base_interval_ms=10, max_interval_ms=200, idle_interval_ms=500,
+                 idle_after=30.0, max_stride=4, period=1.0):
+        """
+        Initialisiert den Regler (ohne cpu_share und target_fps wird nur der Leerlauf geregelt).
+        :param cpu_share: Ziel-Anteil der gesamten CPU (0 bis 1).
+        :param target_fps: Ziel-Bildrate (hat Vorrang vor cpu_share).
+        :param base_interval_ms: Kürzestes Timer-Intervall (bisher fest 10 ms).
+        :param max_interval_ms: Längstes Timer-Intervall außerhalb des Leerlaufs.
+        :param idle_interval_ms: Timer-Intervall im Leerlauf.
+        :param idle_after: Sekunden ohne erkannte Objekte bis zum Leerlauf (0 = nie).
+        :param max_stride: Größter Erkennungsabstand (1 = jeder Frame).
+        :param period: Abstand der Regelentscheidungen in Sekunden.
+        """
+
+        self.cpu_share = cpu_share
+        self.target_fps = target_fps
+        self.base_interval_ms = base_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.idle_interval_ms = idle_interval_ms
+        self.idle_after = idle_after
+        self.max_stride = max_stride
+        self.period = period
+        self.cpu_count = os.cpu_count() or 1
+        self.default_threads = cv2.getNumThreads()
+
+        self.interval_ms = self._start_interval()
+        self.stride = 1
+        self.threads = self.default_threads
+        self.idle = False
+        self.frame_index = 0
+        self.last_seen = time.monotonic()
+        self.stage_ms = {} # Gleitender Mittelwert der Kosten pro Schritt (ms pro Frame, in dem der Schritt lief)
+        self.frames_in_period = 0
+        self.period_start = (time.monotonic(), time.process_time())
+        self.measured_share = 0.0
+        self.measured_fps = 0.0
+        self.reason = "Start"
+        self.apply_threads()
+
+    # Liefert das Timer-Intervall zu Beginn (Start, Neustart, Ende des Leerlaufs).
+    def _start_interval(self):
+        if self.target_fps is None:
+            return self.base_interval_ms
+        return max(self.base_interval_ms, int(1000 / self.target_fps)) # Nie kürzer als das Grund-Intervall des Modus
+
+    # Setzt den Regler beim Start der Kamera oder beim Laden eines Bildes zurück.
+    def restart(self, base_interval_ms):
+        """
+        Setzt den Regler zurück (z. B. beim Wechsel zwischen Kamera und Datei mit unterschiedlichem Grund-Intervall).
+        :param base_interval_ms: Kürzestes Timer-Intervall des Modus (live 10 ms, Datei 50 ms).
+        :return: Timer-Intervall, mit dem gestartet werden soll
+        """
+
+        self.base_interval_ms = base_interval_ms
+        self.interval_ms = self._start_interval()
+        self.stride = 1
+        self.idle = False
+        self.last_seen = time.monotonic()
+        self.frames_in_period = 0
+        self.period_start = (time.monotonic(), time.process_time())
+        return self.interval_ms
+
+    # Stellt die Anzahl der OpenCV-Threads passend zum Budget ein.
+    def apply_threads(self):
+        """
+        Begrenzt die OpenCV-Threads auf die Kerne, die das CPU-Budget erlaubt (ohne Budget: OpenCV-Standard).
+        :return: Anzahl der Threads
+        """
+
+        if self.cpu_share:
+            self.threads = max(1, min(self.cpu_count, math.ceil(self.cpu_share * self.cpu_count)))
+        else:
+            self.threads = self.default_threads
+        cv2.setNumThreads(self.threads)
+        return self.threads
+
+    # Prüft, ob im aktuellen Frame die Erkennung laufen soll.
+    def should_detect(self):
+        """
+        Prüft, ob im aktuellen Frame die Erkennung laufen soll (jeder stride-te Frame, im Leerlauf jeder Frame,
+        da der Timer dann ohnehin langsam läuft). Einmal pro Frame vor der Erkennung aufrufen.
+        :return: True oder False
+        """
+
+        self.frame_index += 1
+        return self.idle or self.frame_index % self.stride == 0
+
+    # Trägt die gemessenen Kosten eines Schritts ein.
+    def record(self, stage, ms):
+        """
+        Trägt die gemessenen Kosten eines Schritts ein (z. B. "capture", "detect", "draw").
+        :param stage: Name des Schritts.
+        :param ms: Dauer in Millisekunden.
+        :return: None
+        """
+
+        previous = self.stage_ms.get(stage)
+        self.stage_ms[stage] = ms if previous is None else 0.8 * previous + 0.2 * ms
+
+    # Schließt einen Frame ab und trifft ggf. eine neue Entscheidung.
+    def end_frame(self, num_objects=0):
+        """
+        Schließt einen Frame ab. Nach Ablauf einer Periode werden CPU-Anteil und Bildrate gemessen und
+        Timer-Intervall und Erkennungsabstand angepasst.
+        :param num_objects: Anzahl der erkannten Objekte im Frame.
+        :return: True, wenn eine neue Entscheidung getroffen wurde (einmal pro Periode), sonst False.
+        """
+
+        now = time.monotonic()
+        self.frames_in_period += 1
+        if num_objects:
+            self.last_seen = now
+        wall_start, cpu_start = self.period_start
+        elapsed = now - wall_start
+        if elapsed < self.period:
+            return False
+
+        cpu = time.process_time()
+        self.measured_share = (cpu - cpu_start) / elapsed / self.cpu_count
+        self.measured_fps = self.frames_in_period / elapsed
+        self.frames_in_period = 0
+        self.period_start = (now, cpu)
+        self.decide(now)
+        return True
+
+    # Passt Timer-Intervall und Erkennungsabstand an.
+    def decide(self, now=None):
+        """
+        Passt Timer-Intervall und Erkennungsabstand an die Messwerte der letzten Periode an.
+        :param now: Aktuelle Zeit (time.monotonic()).
+        :return: None
+        """
+
+        now = time.monotonic() if now is None else now
+        idle = bool(self.idle_after) and now - self.last_seen >= self.idle_after
+        if idle:
+            self.idle = True
+            self.interval_ms = self.idle_interval_ms
+            self.reason = f"Leerlauf (seit {int(now - self.last_seen)} s kein Objekt)"
+            return
+        if self.idle: # Objekt erschienen: Leerlauf beenden
+            self.idle = False
+            self.interval_ms = self._start_interval()
+            self.reason = "Objekt erkannt, Leerlauf beendet"
+
+        detect_ms = self.stage_ms.get("detect", 0.0)
+        other_ms = sum(ms for stage, ms in self.stage_ms.items() if stage != "detect")
+
+        if self.target_fps:
+            # Ziel-Bildrate: kleinsten Erkennungsabstand wählen, bei dem die Kosten pro Frame in das Intervall passen
+            interval = max(self.base_interval_ms, 1000.0 / self.target_fps)
+            available = max(interval - other_ms, 1e-3)
+            self.stride = max(1, min(self.max_stride, math.ceil(detect_ms / available)))
+            frame_ms = other_ms + detect_ms / self.stride
+            self.interval_ms = int(min(max(interval, frame_ms), self.max_interval_ms))
+            self.reason = f"Ziel {self.target_fps:g} FPS, Kosten {frame_ms:.0f} ms/Frame"
+        elif self.cpu_share:
+            # CPU-Budget: bei Überschreitung zuerst den Erkennungsabstand, dann das Intervall erhöhen (Hysterese 0.8 bis 1.1)
+            ratio = self.measured_share / self.cpu_share
+            if ratio > 1.1:
+                if self.stride < self.max_stride:
+                    self.stride += 1
+                else:
+                    self.interval_ms = int(min(self.interval_ms * min(ratio, 2.0) + 1, self.max_interval_ms))
+                self.reason = f"CPU {self.measured_share:.0%} über Budget {self.cpu_share:.0%}"
+            elif ratio < 0.8:
+                if self.interval_ms > self.base_interval_ms:
+                    self.interval_ms = int(max(self.interval_ms * max(ratio, 0.5), self.base_interval_ms))
+                elif self.stride > 1:
+                    self.stride -= 1
+                self.reason = f"CPU {self.measured_share:.0%} unter Budget {self.cpu_share:.0%}"
+            else:
+                self.reason = f"CPU {self.measured_share:.0%} im Budget {self.cpu_share:.0%}"
+        else:
+            self.reason = "ohne Budget"
+
+    # Beschreibt die aktuelle Entscheidung für die Statusleiste.
+    def describe(self):
+        """
+        :return: Kurzer Text mit Intervall, Erkennungsabstand, Threads, gemessener Last und Grund der letzten Entscheidung.
+        """
+
+        return (f"Regler: {self.interval_ms} ms, Erkennung jeder {self.stride}. Frame, {self.threads} Threads, "
+                f"CPU {self.measured_share:.0%}, {self.measured_fps:.1f} FPS - {self.reason}")
+
+    # Setzt die OpenCV-Threads zurück.
+    def close(self):
+        """
+        Setzt die Anzahl der OpenCV-Threads auf den Ausgangswert zurück.
+        :return: None
+        """
+
+        cv2.setNumThreads(self.default_threads)
+
+
+# Simuliert die Frame-Schleife der Anwendung mit Regler und gibt die Entscheidungen aus.
+if __name__ == "__main__":
+    import argparse
+    import json
+    from classifiermanager import ClassifierManager
+
+    parser = argparse.ArgumentParser(description="CPU-Regler: Frame-Schleife mit Budget simulieren")
+    parser.add_argument("image", help="Beispielbild (wird als Kamerabild wiederholt)")
+    parser.add_argument("--cpu-share", type=float, default=None, help="Ziel-Anteil der gesamten CPU (0 bis 1)")
+    parser.add_argument("--fps", type=float, default=None, help="Ziel-Bildrate")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--idle-after", type=float, default=0, help="Sekunden ohne Objekt bis zum Leerlauf (0 = nie)")
+    args = parser.parse_args()
+
+    manager = ClassifierManager()
+    params = manager.snapshot_params("face")
+    image = cv2.imread(args.image)
+    governor = CpuGovernor(args.cpu_share, args.fps, idle_after=args.idle_after)
+
+    # Schleife wie App.update_frame: Timer-Intervall abwarten, Frame kopieren, ggf. erkennen, Rechtecke zeichnen
+    t_end, objects, timeline = time.monotonic() + args.seconds, [], []
+    wall_start, cpu_start, frames = time.monotonic(), time.process_time(), 0
+    while time.monotonic() < t_end:
+        t0 = time.perf_counter()
+        frame = image.copy()
+        governor.record("capture", (time.perf_counter() - t0) * 1000)
+        if governor.should_detect():
+            t1 = time.perf_counter()
+            objects = manager.detect(frame, params)
+            governor.record("detect", (time.perf_counter() - t1) * 1000)
+        t2 = time.perf_counter()
+        for (x, y, w, h) in objects:
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        governor.record("draw", (time.perf_counter() - t2) * 1000)
+        frames += 1
+        if governor.end_frame(len(objects)):
+            timeline.append(governor.describe())
+        time.sleep(max(governor.interval_ms / 1000 - (time.perf_counter() - t0), 0))
+
+    for line in timeline:
+        print(line)
+    elapsed = time.monotonic() - wall_start
+    print(json.dumps({"cpu_share": round((time.process_time() - cpu_start) / elapsed / governor.cpu_count, 3),
+                      "fps": round(frames / elapsed, 1), "interval_ms": governor.interval_ms, "stride": governor.stride,
+                      "threads": governor.threads}))
+    governor.close()
+    manager.shutdown()
@@ -0,0 +1,492 @@
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import threading
+import time
+import cv2
+import numpy as np
+from cameramanager import CameraManager
+from classifiermanager import ClassifierManager
+from metrics import metrics, process_rss_bytes
+from profiler import profiler
+
+
+# Virtuelle Kamera für Tests und Dauerläufe ohne Gerät.
+class VirtualCamera:
+    """
+    Virtuelle Kamera mit der Schnittstelle des CameraManagers (start_camera, get_frame, stop_camera): liefert einen
+    über ein Bild wandernden Ausschnitt im Takt fps. Mit fail_every liefert sie nach so vielen Frames einmal keinen
+    Frame (simulierter Kameraausfall), danach lässt sie sich wieder öffnen.
+    """
+
+    # Initialisiert die virtuelle Kamera.
+    def __init__(self, image_path=None, size=(640, 480), fps=15.0, fail_every=0):
+        """
+        :param image_path: Bild, über das der Ausschnitt wandert (ohne Bild: erzeugtes Muster).
+        :param size: Größe der Frames (Breite, Höhe).
+        :param fps: Bildrate.
+        :param fail_every: Nach so vielen Frames einen Ausfall simulieren (0 = nie).
+        """
+
+        width, height = size
+        image = cv2.imread(image_path) if image_path else None
+        if image is None:
+            image = np.zeros((2 * height, 2 * width, 3), dtype=np.uint8)
+            for i in range(40): # Kanten und Flächen, damit der Klassifizierer arbeiten muss
+                x, y = (i * 97) % (2 * width), (i * 61) % (2 * height)
+                cv2.rectangle(image, (x, y), (x + 40 + i, y + 30 + i), (i * 6 % 255, 128, 255 - i * 6 % 255), -1)
+        scale = max(1.25 * width / image.shape[1], 1.25 * height / image.shape[0], 1.0) # Platz zum Wandern
+        self.image = cv2.resize(image, None, fx=scale, fy=scale) if scale > 1.0 else image
+        self.size = size
+        self.interval = 1.0 / fps
+        self.fail_every = fail_every
+        self.opened = False
+        self.index = 0
+        self.next_time = 0.0
+
+    # Öffnet die virtuelle Kamera.
+    def start_camera(self, camera_id=None):
+        self.opened = True
+        self.next_time = time.monotonic()
+        return self
+
+    # Liefert den nächsten Frame im Takt der Bildrate.
+    def get_frame(self):
+        if not self.opened:
+            return None, False
+        delay = self.next_time - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_time = max(self.next_time + self.interval, time.monotonic() - self.interval)
+        self.index += 1
+        if self.fail_every and self.index % self.fail_every == 0:
+            self.opened = False
+            return None, False
+        width, height = self.size
+        range_x, range_y = self.image.shape[1] - width, self.image.shape[0] - height
+        phase = self.index * 0.02 # Langsame Kreisbewegung des Ausschnitts
+        x = int(range_x * (0.5 + 0.5 * np.sin(phase)))
+        y = int(range_y * (0.5 + 0.5 * np.cos(phase)))
+        return self.image[y:y + height, x:x + width].copy(), True
+
+    # Schließt die virtuelle Kamera.
+    def stop_camera(self):
+        self.opened = False
+
+
+# Schreibt Ergebnisse als JSON-Zeilen in eine Datei.
+class JsonlSink:
+    """
+    Hängt jede Meldung als JSON-Zeile an eine Datei an. Ab max_bytes wird die Datei in <Pfad>.1 umbenannt
+    (eine ältere Datei wird überschrieben), damit ein unbeaufsichtigter Betrieb die Platte nicht füllt.
+    """
+
+    # Öffnet die Datei.
+    def __init__(self, path, max_bytes=100 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.counters = {"sent": 0, "errors": 0}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "ab")
+
+    # Schreibt eine Meldung.
+    def publish(self, data):
+        """
+        :param data: JSON-Zeile als Bytes (mit Zeilenumbruch).
+        :return: None
+        """
+
+        if self.file.tell() + len(data) > self.max_bytes:
+            self.file.close()
+            os.replace(self.path, self.path + ".1")
+            self.file = open(self.path, "ab")
+        self.file.write(data)
+        self.counters["sent"] += 1
+
+    # Schreibt gepufferte Zeilen auf die Platte.
+    def flush(self):
+        self.file.flush()
+
+    # Schließt die Datei.
+    def close(self):
+        self.file.close()
+
+
+# Verteilt Ergebnisse als JSON-Zeilen an alle Verbindungen eines Unix-Sockets.
+class UnixSocketSink:
+    """
+    Lauscht auf einem Unix-Socket; jede verbundene Anwendung erhält alle Meldungen als JSON-Zeilen.
+    Verbindungen, die nicht innerhalb von send_timeout lesen, werden getrennt (ein langsamer Leser hält den
+    Dienst nicht auf).
+    """
+
+    # Öffnet den Socket.
+    def __init__(self, path, send_timeout=0.2):
+        self.path = path
+        self.send_timeout = send_timeout
+        self.counters = {"sent": 0, "errors": 0, "clients": 0}
+        self.clients = []
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            os.remove(path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(8)
+        self.thread = threading.Thread(target=self._accept, name="haar-unix-sink", daemon=True)
+        self.thread.start()
+
+    # Nimmt Verbindungen an.
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except OSError: # Socket wurde geschlossen
+                return
+            client.settimeout(self.send_timeout)
+            with self.lock:
+                self.clients.append(client)
+                self.counters["clients"] += 1
+
+    # Sendet eine Meldung an alle Verbindungen.
+    def publish(self, data):
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.sendall(data)
+                self.counters["sent"] += 1
+            except OSError: # Getrennt oder zu langsam
+                self.counters["errors"] += 1
+                with self.lock:
+                    self.clients.remove(client)
+                client.close()
+
+    # Schließt Socket und Verbindungen.
+    def close(self):
+        self.server.close()
+        with self.lock:
+            for client in self.clients:
+                client.close()
+            self.clients = []
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# Sendet Ergebnisse als UDP-Datagramme (eine JSON-Zeile pro Datagramm).
+class UdpSink:
+    """
+    Sendet jede Meldung als ein UDP-Datagramm (standardmäßig an localhost). Zu große Meldungen werden verworfen.
+    """
+
+    # Öffnet den Socket.
+    def __init__(self, host="127.0.0.1", port=9999):
+        self.address = (host, port)
+        self.counters = {"sent": 0, "errors": 0}
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    # Sendet eine Meldung.
+    def publish(self, data):
+        if len(data) > 65507: # Größtes UDP-Datagramm
+            self.counters["errors"] += 1
+            return
+        try:
+            self.socket.sendto(data, self.address)
+            self.counters["sent"] += 1
+        except OSError: # Kein Empfänger (ICMP) oder Puffer voll
+            self.counters["errors"] += 1
+
+    # Schließt den Socket.
+    def close(self):
+        self.socket.close()
+
+
+# Erstellt eine Ausgabe aus ihrer Beschreibung.
+def open_sink(spec):
+    """
+    :param spec: "jsonl:<Pfad>" (oder Pfad mit Endung .jsonl), "unix:<Pfad>" oder "udp://<Host>:<Port>".
+    :return: JsonlSink, UnixSocketSink oder UdpSink
+    """
+
+    if spec.startswith("unix:"):
+        return UnixSocketSink(spec[len("unix:"):])
+    if spec.startswith("udp:"):
+        host, _, port = spec[len("udp:"):].lstrip("/").rpartition(":")
+        return UdpSink(host or "127.0.0.1", int(port))
+    if spec.startswith("jsonl:"):
+        return JsonlSink(spec[len("jsonl:"):])
+    if spec.endswith(".jsonl"):
+        return JsonlSink(spec)
+    raise ValueError(f"Unbekannte Ausgabe: {spec}")
+
+
+# Erkennung im Dauerbetrieb ohne Oberfläche.
+class DetectionDaemon:
+    """
+    Live-Erkennung ohne PySide6 und ohne Anzeige (z. B. für unbeaufsichtigte Standorte): liest Frames von einer
+    Kamera, einem Video/Stream oder einer virtuellen Kamera, erkennt auf dem Thread-Pool des ClassifierManagers
+    und verteilt die Ergebnisse als JSON-Zeilen an die Ausgaben (Datei, Unix-Socket, UDP).
+    Sind alle Worker belegt, wird der Frame verworfen (keine wachsende Warteschlange). Liefert die Kamera keinen
+    Frame mehr, wird sie mit wachsendem Abstand (bis max_backoff) neu geöffnet. SIGTERM/SIGINT beenden sauber:
+    laufende Erkennungen werden abgewartet, ausstehende Meldungen geschrieben, Kamera und Ausgaben geschlossen.
+    Alle stats_interval Sekunden werden CPU-Anteil und RSS gemessen und als Meldung "stats" verteilt; summary()
+    wertet die Messungen für Dauerläufe aus (Anstieg des Speichers pro Stunde).
+    """
+
+    # Initialisiert den Dienst.
+    def __init__(self, source=0, classifiers=("face",), sinks=(), workers=None, stats_interval=60.0,
+                 max_backoff=30.0, classifier_manager=None):
+        """
+        Initialisiert den Dienst.
+        :param source: Kameraindex, Pfad/URL eines Videos oder VirtualCamera.
+        :param classifiers: IDs der Klassifizierer, die in jedem Frame laufen.
+        :param sinks: Ausgaben (JsonlSink, UnixSocketSink, UdpSink).
+        :param workers: Anzahl der Worker-Threads (Standard: Anzahl CPU-Kerne).
+        :param stats_interval: Abstand der Messungen von CPU und Speicher in Sekunden.
+        :param max_backoff: Größter Abstand zwischen zwei Versuchen, die Kamera neu zu öffnen, in Sekunden.
+        :param classifier_manager: ClassifierManager (Standard: neue Instanz mit workers Threads).
+        """
+
+        workers = workers or os.cpu_count() or 1
+        self.classifier_manager = classifier_manager or ClassifierManager(max_workers=workers, max_pending=0)
+        self.source = source
+        self.camera = source if isinstance(source, VirtualCamera) else CameraManager()
+        self.source_name = "virtual" if isinstance(source, VirtualCamera) else str(source)
+        self.classifiers = list(classifiers)
+        self.sinks = list(sinks)
+        self.stats_interval = stats_interval
+        self.max_backoff = max_backoff
+        self.stop_event = threading.Event()
+        self.messages = queue.Queue(maxsize=1000)
+        self.pending = set() # Laufende Erkennungen
+        self.pending_lock = threading.Lock()
+        self.samples = [] # (Zeit, CPU-Sekunden, RSS) der Messungen
+        self.counters = {"frames": 0, "detected": 0, "busy": 0, "reconnects": 0, "messages_dropped": 0,
+                         "sink_errors": 0, "errors": 0}
+        self.publisher_thread = None
+        self.stats_thread = None
+
+    # Öffnet die Kamera, bei Fehlschlag mit wachsendem Abstand erneut.
+    def _open_camera(self, attempt=0):
+        """
+        :param attempt: Anzahl der bisherigen Versuche (für den Abstand).
+        :return: True, wenn die Kamera geöffnet wurde, False, wenn der Dienst vorher beendet wurde
+        """
+
+        delay = 0.5 if attempt else 0.0
+        while not self.stop_event.wait(delay):
+            if self.camera.start_camera(self.source) is not None:
+                return True
+            attempt += 1
+            delay = min(0.5 * 2 ** attempt, self.max_backoff)
+            print(f"Kamera {self.source_name} nicht verfügbar, neuer Versuch in {delay:.1f} s")
+        return False
+
+    # Übergibt eine Meldung an die Ausgaben (ohne zu warten).
+    def _emit(self, message):
+        try:
+            self.messages.put_nowait(message)
+        except queue.Full: # Ausgaben kommen nicht hinterher
+            self.counters["messages_dropped"] += 1
+
+    # Erkennt Objekte in einem Frame (läuft auf dem Thread-Pool).
+    def _process(self, seq, timestamp, frame):
+        try:
+            t0 = time.perf_counter()
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) # Eine Umwandlung für alle Klassifizierer
+            objects = {}
+            for classifier_id in self.classifiers:
+                found = self.classifier_manager.detect_faces(gray, classifier_id)
+                objects[classifier_id] = [] if found is None else np.asarray(found).reshape(-1, 4).tolist()
+            with self.pending_lock: # Mehrere Worker zählen
+                self.counters["detected"] += 1
+            self._emit({"type": "detection", "seq": seq, "ts": round(timestamp, 3), "source": self.source_name,
+                        "latency_ms": round((time.perf_counter() - t0) * 1000, 1), "objects": objects})
+        except Exception as e: # Fehlerbehandlung
+            self.counters["errors"] += 1
+            metrics.inc("frames_dropped", (("reason", "error"),))
+            print(f"Fehler bei der Erkennung: {e}")
+
+    # Schreibt die Meldungen in alle Ausgaben (eigener Thread).
+    def _publish_loop(self):
+        while True:
+            message = self.messages.get()
+            if message is None:
+                break
+            data = (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8") # Einmal serialisieren
+            for sink in self.sinks:
+                try:
+                    sink.publish(data)
+                except Exception as e: # Eine fehlerhafte Ausgabe hält die anderen nicht auf
+                    self.counters["sink_errors"] += 1
+                    print(f"Fehler beim Schreiben in {type(sink).__name__}: {e}")
+            if self.messages.empty():
+                for sink in self.sinks:
+                    if hasattr(sink, "flush"):
+                        sink.flush()
+
+    # Misst CPU-Anteil und Speicher in festen Abständen (eigener Thread).
+    def _stats_loop(self):
+        self._sample()
+        while not self.stop_event.wait(self.stats_interval):
+            self._sample()
+            t_prev, cpu_prev, _ = self.samples[-2]
+            t_now, cpu_now, rss = self.samples[-1]
+            self._emit({"type": "stats", "ts": round(time.time(), 3), "cpu_share": round((cpu_now - cpu_prev) / (t_now - t_prev), 3),
+                        "rss_mb": round(rss / 2 ** 20, 1), **{key: value for key, value in self.counters.items()}})
+
+    # Nimmt eine Messung auf.
+    def _sample(self):
+        times = os.times()
+        self.samples.append((time.monotonic(), times.user + times.system, process_rss_bytes() or 0))
+
+    # Führt den Dienst aus, bis stop() aufgerufen wird.
+    def run(self, duration=None):
+        """
+        Liest Frames und verteilt die Erkennung, bis stop() aufgerufen wird (oder duration abgelaufen ist).
+        :param duration: Optionale Laufzeit in Sekunden.
+        :return: None
+        """
+
+        self.publisher_thread = threading.Thread(target=self._publish_loop, name="haar-publisher", daemon=True)
+        self.publisher_thread.start()
+        self.stats_thread = threading.Thread(target=self._stats_loop, name="haar-stats", daemon=True)
+        self.stats_thread.start()
+        if duration:
+            timer = threading.Timer(duration, self.stop)
+            timer.daemon = True
+            timer.start()
+
+        seq = 0
+        try:
+            opened = self._open_camera()
+            while opened and not self.stop_event.is_set():
+                with profiler.span("capture"):
+                    frame, ret = self.camera.get_frame() or (None, False)
+                if not ret: # Kamera getrennt oder Video zu Ende: neu öffnen
+                    metrics.inc("camera_reconnects")
+                    self.counters["reconnects"] += 1
+                    self._emit({"type": "camera", "ts": round(time.time(), 3), "source": self.source_name, "state": "lost"})
+                    self.camera.stop_camera()
+                    opened = self._open_camera(attempt=1)
+                    if opened:
+                        self._emit({"type": "camera", "ts": round(time.time(), 3), "source": self.source_name, "state": "restarted"})
+                    continue
+
+                metrics.inc("frames_captured")
+                self.counters["frames"] += 1
+                seq += 1
+                future = self.classifier_manager.executor.submit(self._process, seq, time.time(), frame, blocking=False)
+                if future is None: # Alle Worker belegt: Frame verwerfen statt Rückstau aufzubauen
+                    metrics.inc("frames_dropped", (("reason", "busy"),))
+                    self.counters["busy"] += 1
+                    continue
+                with self.pending_lock:
+                    self.pending.add(future)
+                future.add_done_callback(self._done)
+        finally:
+            self._shutdown()
+
+    # Entfernt eine fertige Erkennung aus der Liste der laufenden.
+    def _done(self, future):
+        with self.pending_lock:
+            self.pending.discard(future)
+
+    # Fordert das Beenden an (z. B. aus einem Signal-Handler).
+    def stop(self):
+        self.stop_event.set()
+
+    # Beendet den Dienst sauber.
+    def _shutdown(self):
+        try:
+            self.stop_event.set()
+            self.camera.stop_camera()
+            with self.pending_lock:
+                pending = list(self.pending)
+            for future in pending: # Laufende Erkennungen abwarten, damit ihre Ergebnisse noch verteilt werden
+                try:
+                    future.result(timeout=30)
+                except Exception:
+                    pass
+            if self.stats_thread is not None:
+                self.stats_thread.join(timeout=5)
+            self._sample()
+            self.messages.put(None) # Ausstehende Meldungen schreiben, dann Thread beenden
+            if self.publisher_thread is not None:
+                self.publisher_thread.join(timeout=10)
+            for sink in self.sinks:
+                sink.close()
+            self.classifier_manager.shutdown()
+            metrics.close()
+            profiler.close()
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Beenden des Dienstes: {e}")
+
+    # Wertet die Messungen von CPU und Speicher aus.
+    def summary(self, warmup=0.1):
+        """
+        :param warmup: Anteil der Laufzeit zu Beginn, der für den eingeschwungenen Zustand nicht zählt.
+        :return: Dictionary mit Laufzeit, Zählern, CPU-Anteil (gesamt und eingeschwungen) und RSS (Beginn, Ende,
+                 Maximum, Anstieg pro Stunde im eingeschwungenen Zustand).
+        """
+
+        if len(self.samples) < 2:
+            return {"duration_s": 0.0, **self.counters}
+        samples = np.asarray(self.samples, dtype=np.float64)
+        t, cpu, rss = samples[:, 0] - samples[0, 0], samples[:, 1], samples[:, 2] / 2 ** 20
+        steady = t >= warmup * t[-1]
+        if steady.sum() < 2:
+            steady[:] = True
+        t_s, cpu_s, rss_s = t[steady], cpu[steady], rss[steady]
+        slope = float(np.polyfit(t_s / 3600, rss_s, 1)[0]) if len(t_s) >= 3 and t_s[-1] > t_s[0] else 0.0
+        return {"duration_s": round(float(t[-1]), 1), **self.counters,
+                "fps": round(self.counters["detected"] / max(float(t[-1]), 1e-9), 2),
+                "cpu_share": round(float((cpu[-1] - cpu[0]) / max(t[-1], 1e-9)), 3),
+                "cpu_share_steady": round(float((cpu_s[-1] - cpu_s[0]) / max(t_s[-1] - t_s[0], 1e-9)), 3),
+                "rss_start_mb": round(float(rss[0]), 1), "rss_end_mb": round(float(rss[-1]), 1),
+                "rss_max_mb": round(float(rss.max()), 1), "rss_slope_mb_per_h": round(slope, 2), "samples": len(samples),
+                "sinks": {type(sink).__name__: sink.counters for sink in self.sinks}}
+
+
+# Startet den Dienst über die Kommandozeile.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live-Erkennung ohne Oberfläche mit Ausgabe als JSON-Zeilen")
+    parser.add_argument("--source", default="0", help="Kameraindex, Pfad/URL eines Videos oder virtual[:bild.png]")
+    parser.add_argument("--classifier", action="append", default=None, help="Klassifizierer (mehrfach möglich, Standard: face)")
+    parser.add_argument("--sink", action="append", default=[],
+                        help="Ausgabe: jsonl:<Pfad>, unix:<Pfad> oder udp://127.0.0.1:9999 (mehrfach möglich)")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl der Worker-Threads")
+    parser.add_argument("--fps", type=float, default=15.0, help="Bildrate der virtuellen Kamera")
+    parser.add_argument("--size", default="640x480", help="Bildgröße der virtuellen Kamera")
+    parser.add_argument("--fail-every", type=int, default=0, help="Virtuelle Kamera: Ausfall nach so vielen Frames")
+    parser.add_argument("--stats-interval", type=float, default=60.0, help="Abstand der Messungen von CPU und Speicher in s")
+    parser.add_argument("--duration", type=float, default=None, help="Laufzeit in s (z. B. 14400 für einen Dauerlauf)")
+    parser.add_argument("--report", default=None, help="Auswertung von CPU und Speicher zusätzlich als JSON-Datei")
+    parser.add_argument("--metrics-port", type=int, default=None, help="OpenMetrics-Endpunkt auf localhost")
+    args = parser.parse_args()
+
+    if args.source.startswith("virtual"):
+        width, height = (int(value) for value in args.size.split("x"))
+        source = VirtualCamera(args.source.partition(":")[2] or None, (width, height), args.fps, args.fail_every)
+    else:
+        source = int(args.source) if args.source.isdigit() else args.source
+    daemon = DetectionDaemon(source, args.classifier or ["face"], [open_sink(spec) for spec in args.sink],
+                             args.workers, args.stats_interval)
+    metrics.start_from_environment()
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    # SIGTERM und SIGINT beenden den Dienst sauber
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: daemon.stop())
+    daemon.run(args.duration)
+
+    summary = daemon.summary()
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=2)
+    print(json.dumps(summary, indent=2))
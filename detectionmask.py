@@ -0,0 +1,333 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+import boxops
+from atomicfile import atomic_write
+
+# Gespeicherte Bereiche pro Kamera und Klassifizierer
+MASKS_PATH = os.path.join(os.path.expanduser("~"), ".haarcascades", "masks.json")
+
+
+# Ein- und Ausschlussbereiche (Polygone) für die Erkennung.
+class DetectionMask:
+    """
+    Polygonale Ein- und Ausschlussbereiche einer Kamera für einen Klassifizierer (z. B. Decke und Wände auslassen,
+    ein Plakat mit Gesichtern ausschließen). Punkte werden relativ zur Bildgröße gespeichert (0..1), pro Kamera und
+    Klassifizierer in ~/.haarcascades/masks.json.
+    Gesucht wird nur in den umschließenden Rechtecken der Einschlussbereiche (überlappende Rechtecke werden
+    zusammengefasst); Treffer, deren Mittelpunkt außerhalb der Einschlusspolygone oder in einem Ausschlussbereich liegt,
+    werden verworfen. Ohne Einschlussbereich wird das ganze Bild durchsucht.
+    Rechtecke und Rasterbilder werden pro Bildgröße (und minSize) zwischengespeichert, höchstens cache_size Einträge
+    (die zuletzt verwendeten bleiben).
+    """
+
+    # Initialisiert die Bereiche.
+    def __init__(self, path=MASKS_PATH, cache_size=8):
+        """
+        Initialisiert leere Bereiche.
+        :param path: JSON-Datei der gespeicherten Bereiche (None = nicht speichern).
+        :param cache_size: Höchstzahl zwischengespeicherter Rechtecklisten und Rasterbilder.
+        """
+
+        self.path = path
+        self.cache_size = cache_size
+        self.key = None
+        self.include = [] # Polygone als NumPy-Arrays (K, 2), relativ zur Bildgröße
+        self.exclude = []
+        self.cache = OrderedDict() # (Breite, Höhe, minSize) -> Rechtecke bzw. (Breite, Höhe) -> Rasterbild
+        self.lock = threading.Lock() # Live-Erkennung und Galerie-Worker teilen sich den Zwischenspeicher
+        self.mirror = None # Horizontal gespiegelte Bereiche (für gespiegelte Durchläufe, bei Bedarf erzeugt)
+        self.counters = {"frames": 0, "ms": 0.0, "scanned_pixels": 0, "total_pixels": 0, "dropped": 0}
+
+    # Fügt ein Polygon hinzu.
+    def add_polygon(self, points, kind="include", frame_size=None):
+        """
+        :param points: Eckpunkte [(x, y), ...] in Pixeln (mit frame_size) oder relativ zur Bildgröße.
+        :param kind: "include" (Einschluss) oder "exclude" (Ausschluss).
+        :param frame_size: (Breite, Höhe) des Frames, falls die Punkte in Pixeln angegeben sind.
+        :return: True, wenn das Polygon hinzugefügt wurde (mindestens drei Punkte), sonst False
+        """
+
+        polygon = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(polygon) < 3:
+            return False
+        if frame_size is not None:
+            polygon = polygon / np.asarray(frame_size, dtype=np.float64)
+        (self.include if kind == "include" else self.exclude).append(np.clip(polygon, 0, 1))
+        self.cache, self.mirror = OrderedDict(), None
+        return True
+
+    # Entfernt alle Bereiche.
+    def clear(self):
+        self.include, self.exclude, self.cache, self.mirror = [], [], OrderedDict(), None
+
+    # Liefert die horizontal gespiegelten Bereiche.
+    def mirrored(self):
+        """
+        :return: DetectionMask mit an der senkrechten Bildmitte gespiegelten Polygonen (für ein gespiegeltes Bild).
+        """
+
+        mirror = self.mirror
+        if mirror is None:
+            mirror = DetectionMask(path=None, cache_size=self.cache_size)
+            mirror.include = [np.column_stack((1 - polygon[:, 0], polygon[:, 1])) for polygon in self.include]
+            mirror.exclude = [np.column_stack((1 - polygon[:, 0], polygon[:, 1])) for polygon in self.exclude]
+            self.mirror = mirror
+        return mirror
+
+    # Liest einen Eintrag des Zwischenspeichers (zuletzt verwendet).
+    def _cached(self, key):
+        with self.lock:
+            value = self.cache.get(key)
+            if value is not None:
+                self.cache.move_to_end(key)
+            return value
+
+    # Legt einen Eintrag im Zwischenspeicher ab und verdrängt die am längsten nicht verwendeten.
+    def _store(self, key, value):
+        with self.lock:
+            self.cache[key] = value
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return value
+
+    # Prüft, ob Bereiche festgelegt sind.
+    def is_empty(self):
+        return not self.include and not self.exclude
+
+    # Wandelt ein Polygon in Pixel um.
+    def _pixels(self, polygon, width, height):
+        return np.round(polygon * (width, height)).astype(np.int32)
+
+    # Liefert die zu durchsuchenden Rechtecke.
+    def rectangles(self, width, height, min_size=(0, 0)):
+        """
+        :param width: Breite des Frames.
+        :param height: Höhe des Frames.
+        :param min_size: minSize des Klassifizierers (kleinere Rechtecke werden vergrößert).
+        :return: Liste von Rechtecken (x, y, w, h) ohne Überlappung der Einschlussbereiche (ganzes Bild ohne Einschluss).
+        """
+
+        key = (width, height, tuple(min_size))
+        rectangles = self._cached(key)
+        if rectangles is not None:
+            return rectangles
+        if not self.include:
+            rectangles = [(0, 0, width, height)]
+        else:
+            boxes = []
+            for polygon in self.include:
+                x, y, w, h = cv2.boundingRect(self._pixels(polygon, width, height))
+                grow_w, grow_h = max(min_size[0] - w, 0), max(min_size[1] - h, 0) # Mindestens minSize groß
+                x, y = max(x - grow_w // 2, 0), max(y - grow_h // 2, 0)
+                boxes.append([x, y, min(w + grow_w, width - x), min(h + grow_h, height - y)])
+
+            # Überlappende Rechtecke zusammenfassen, bis keine Überlappung mehr besteht
+            merged = True
+            while merged and len(boxes) > 1:
+                merged = False
+                for i in range(len(boxes)):
+                    for j in range(i + 1, len(boxes)):
+                        a, b = boxes[i], boxes[j]
+                        if a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]:
+                            x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+                            x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+                            boxes[i] = [x0, y0, x1 - x0, y1 - y0]
+                            del boxes[j]
+                            merged = True
+                            break
+                    if merged:
+                        break
+            rectangles = [tuple(box) for box in boxes]
+        return self._store(key, rectangles)
+
+    # Liefert das Rasterbild der erlaubten Mittelpunkte.
+    def _raster(self, width, height):
+        key = (width, height)
+        raster = self._cached(key)
+        if raster is None:
+            if self.include:
+                raster = np.zeros((height, width), dtype=np.uint8)
+                cv2.fillPoly(raster, [self._pixels(polygon, width, height) for polygon in self.include], 1)
+            else:
+                raster = np.ones((height, width), dtype=np.uint8)
+            if self.exclude:
+                cv2.fillPoly(raster, [self._pixels(polygon, width, height) for polygon in self.exclude], 0)
+            self._store(key, raster)
+        return raster
+
+    # Prüft, welche Objekte erhalten bleiben.
+    def keep(self, objects, width, height):
+        """
+        :param objects: Objekte (x, y, w, h) in Pixeln des Frames.
+        :param width: Breite des Frames.
+        :param height: Höhe des Frames.
+        :return: Boolesches NumPy-Array: True, wenn der Mittelpunkt im Einschluss und in keinem Ausschluss liegt.
+        """
+
+        boxes = boxops.as_boxes(objects)
+        if not len(boxes) or self.is_empty():
+            return np.ones(len(boxes), dtype=bool)
+        centers_x = np.clip(boxes[:, 0] + boxes[:, 2] // 2, 0, width - 1)
+        centers_y = np.clip(boxes[:, 1] + boxes[:, 3] // 2, 0, height - 1)
+        return self._raster(width, height)[centers_y, centers_x] > 0
+
+    # Erkennt Objekte nur in den Einschlussbereichen.
+    def detect(self, image, detect_fn, min_size=(0, 0)):
+        """
+        :param image: Frame (BGR oder Graustufen).
+        :param detect_fn: Funktion detect_fn(image) -> Objekte, z. B. ClassifierManager.detect mit Schnappschuss.
+        :param min_size: minSize des Klassifizierers.
+        :return: Erkannte Objekte als NumPy-Array (N, 4) oder None, falls detect_fn None liefert.
+        """
+
+        t0 = time.perf_counter()
+        height, width = image.shape[:2]
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) # Eine Umwandlung für alle Rechtecke
+        found = []
+        rectangles = self.rectangles(width, height, min_size)
+        for x, y, w, h in rectangles:
+            objects = detect_fn(gray[y:y + h, x:x + w])
+            if objects is None:
+                return None
+            found.append(boxops.remap(objects, offset=(x, y)))
+        found = np.concatenate(found) if found else np.empty((0, 4), dtype=np.int32)
+        keep = self.keep(found, width, height)
+        self.counters["frames"] += 1
+        self.counters["dropped"] += int(len(found) - keep.sum())
+        self.counters["scanned_pixels"] += sum(w * h for _, _, w, h in rectangles)
+        self.counters["total_pixels"] += width * height
+        self.counters["ms"] += (time.perf_counter() - t0) * 1000
+        return found[keep]
+
+    # Zeichnet die Bereiche in ein Bild.
+    def draw(self, image, include_color=(0, 200, 255), exclude_color=(255, 0, 0), thickness=2):
+        """
+        :param image: Bild (wird verändert).
+        :return: None
+        """
+
+        height, width = image.shape[:2]
+        for polygons, color in ((self.include, include_color), (self.exclude, exclude_color)):
+            if polygons:
+                cv2.polylines(image, [self._pixels(polygon, width, height) for polygon in polygons], True, color, thickness)
+
+    # Liefert den Schlüssel aus Kamera und Klassifizierer.
+    def _key(self, camera, classifier_id):
+        return f"{camera}|{classifier_id}"
+
+    # Lädt die Bereiche einer Kamera für einen Klassifizierer.
+    def load(self, camera, classifier_id):
+        """
+        :param camera: Kennung der Kamera.
+        :param classifier_id: ID des Klassifizierers.
+        :return: True, wenn Bereiche gefunden wurden, sonst False
+        """
+
+        self.key = self._key(camera, classifier_id)
+        self.clear()
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                entry = json.load(file).get(self.key)
+        except (OSError, ValueError, TypeError):
+            entry = None
+        if not entry:
+            return False
+        self.include = [np.asarray(polygon, dtype=np.float64) for polygon in entry.get("include", [])]
+        self.exclude = [np.asarray(polygon, dtype=np.float64) for polygon in entry.get("exclude", [])]
+        self.mirror = None
+        return True
+
+    # Speichert die Bereiche.
+    def save(self, camera=None, classifier_id=None):
+        """
+        Speichert die Bereiche unter Kamera und Klassifizierer (Standard: zuletzt geladen); leere Bereiche löschen den Eintrag.
+        :return: True, wenn gespeichert wurde, sonst False
+        """
+
+        key = self._key(camera, classifier_id) if camera is not None else self.key
+        if self.path is None or key is None:
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                masks = json.load(file)
+        except (OSError, ValueError):
+            masks = {}
+        if self.is_empty():
+            masks.pop(key, None)
+        else:
+            masks[key] = {"include": [np.round(polygon, 5).tolist() for polygon in self.include],
+                          "exclude": [np.round(polygon, 5).tolist() for polygon in self.exclude]}
+        try:
+            with atomic_write(self.path, "w", encoding="utf-8") as file:
+                json.dump(masks, file, indent=2)
+            self.key = key
+            return True
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Speichern der Bereiche: {e}")
+            return False
+
+    # Liefert die Zähler.
+    def get_stats(self):
+        """
+        :return: Dictionary mit Anzahl der Frames, Anteil der ausgelassenen Pixel, verworfenen Treffern und mittlerer Dauer.
+        """
+
+        frames = max(self.counters["frames"], 1)
+        return {"frames": self.counters["frames"], "include": len(self.include), "exclude": len(self.exclude),
+                "cached": len(self.cache),
+                "skipped_fraction": round(1 - self.counters["scanned_pixels"] / max(self.counters["total_pixels"], 1), 3),
+                "dropped": self.counters["dropped"], "ms": round(self.counters["ms"] / frames, 1)}
+
+
+# Misst Anteil der ausgelassenen Pixel und Beschleunigung für Bereiche, die auf der Kommandozeile angegeben werden.
+if __name__ == "__main__":
+    import argparse
+    from classifiermanager import ClassifierManager
+
+    parser = argparse.ArgumentParser(description="Erkennungsbereiche: ausgelassene Pixel und Beschleunigung messen")
+    parser.add_argument("image", help="Testbild")
+    parser.add_argument("--include", action="append", default=[],
+                        help="Einschlusspolygon relativ zur Bildgröße, z. B. 0,0.4;1,0.4;1,1;0,1 (mehrfach möglich)")
+    parser.add_argument("--exclude", action="append", default=[], help="Ausschlusspolygon (wie --include)")
+    parser.add_argument("--classifier", default="face")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    def polygon(text):
+        return [tuple(float(value) for value in point.split(",")) for point in text.split(";")]
+
+    mask = DetectionMask(path=None)
+    for text in args.include or ["0,0.35;1,0.35;1,1;0,1"]: # Standard: obere 35 % (Decke) auslassen
+        mask.add_polygon(polygon(text), "include")
+    for text in args.exclude:
+        mask.add_polygon(polygon(text), "exclude")
+
+    manager = ClassifierManager()
+    params = manager.snapshot_params(args.classifier)
+    gray = cv2.cvtColor(cv2.imread(args.image), cv2.COLOR_BGR2GRAY)
+    detect_fn = lambda image: manager.detect(image, params)
+    full = detect_fn(gray) # Aufwärmen
+
+    def timed(fn):
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            result = fn()
+        return (time.perf_counter() - t0) * 1000 / args.repeat, result
+
+    full_ms, full = timed(lambda: detect_fn(gray))
+    masked_ms, masked = timed(lambda: mask.detect(gray, detect_fn, params.minSize))
+    full = boxops.as_boxes(full)
+    expected = full[mask.keep(full, gray.shape[1], gray.shape[0])] # Treffer der vollen Suche innerhalb der Bereiche
+    matched = int((boxops.iou_matrix(expected, masked).max(axis=1) >= 0.5).sum()) if len(expected) and len(masked) else 0
+    manager.shutdown()
+    print(json.dumps({"image": gray.shape[::-1], "rectangles": mask.rectangles(gray.shape[1], gray.shape[0], params.minSize),
+                      "skipped_fraction": mask.get_stats()["skipped_fraction"],
+                      "full_ms": round(full_ms, 1), "masked_ms": round(masked_ms, 1), "speedup": round(full_ms / masked_ms, 2),
+                      "found_full": len(full), "found_full_inside": len(expected), "found_masked": len(masked),
+                      "inside_also_found_masked": matched}, indent=2))
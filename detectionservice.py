@@ -0,0 +1,428 @@
+import argparse
+import json
+import os
+import queue
+import signal
+import socketserver
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import cv2
+import numpy as np
+from classifiermanager import ClassifierManager
+
+
+# Auftrag für den Erkennungsdienst (ein Bild einer Anfrage).
+class DetectionJob:
+    """
+    Auftrag für den Erkennungsdienst (ein Bild einer Anfrage).
+    """
+
+    # Initialisiert den Auftrag.
+    def __init__(self, frame, params):
+        """
+        Initialisiert den Auftrag.
+        :param frame: Graustufen- oder BGR-Bild als NumPy-Array.
+        :param params: DetectionParams-Schnappschuss.
+        """
+
+        self.frame = frame
+        self.params = params
+        self.result = None
+        self.done = threading.Event()
+        self.t_enqueued = time.perf_counter()
+
+
+# Lokaler Erkennungsdienst mit Micro-Batching.
+class DetectionService:
+    """
+    Lokaler Erkennungsdienst (HTTP auf localhost oder Unix-Socket) mit Micro-Batching.
+    Anfragen werden gesammelt, bis max_batch erreicht oder das Latenzbudget (batch_window_ms) abgelaufen ist,
+    und dann auf dem vorgewärmten Thread-Pool des ClassifierManagers ausgeführt.
+    Ist die Warteschlange voll, wird die Anfrage sofort mit 503 abgelehnt.
+    """
+
+    # Initialisiert den Erkennungsdienst.
+    def __init__(self, classifier_manager=None, max_batch=8, batch_window_ms=5, max_queue=64, request_timeout=10.0):
+        """
+        Initialisiert den Erkennungsdienst.
+        :param classifier_manager: ClassifierManager (Standard: neue Instanz).
+        :param max_batch: Maximale Anzahl an Bildern pro Batch.
+        :param batch_window_ms: Latenzbudget in ms, in dem Anfragen zu einem Batch gesammelt werden.
+        :param max_queue: Maximale Länge der Warteschlange (danach 503).
+        :param request_timeout: Maximale Wartezeit einer Anfrage in Sekunden (danach 504).
+        """
+
+        self.classifier_manager = classifier_manager or ClassifierManager()
+        self.max_batch = max_batch
+        self.batch_window = batch_window_ms / 1000
+        self.request_timeout = request_timeout
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.server = None
+        self.running = False
+        self.batcher_thread = None
+
+        # Metriken
+        self.metrics_lock = threading.Lock()
+        self.t_start = time.time()
+        self.num_requests = 0
+        self.num_rejected = 0
+        self.num_timeouts = 0
+        self.num_completed = 0
+        self.num_batches = 0
+        self.num_batched_jobs = 0
+        self.latencies = deque(maxlen=1000) # Latenzen der letzten Anfragen in ms
+
+    # Lädt alle Klassifizierer in jedem Worker-Thread vor.
+    def warm_up(self):
+        """
+        Lädt alle verfügbaren Klassifizierer in jedem Worker-Thread, damit die erste Anfrage nicht warten muss.
+        :return: None
+        """
+
+        executor = self.classifier_manager.executor
+        snapshots = []
+        for classifier_id, classifier_info in self.classifier_manager.classifiers.items():
+            if classifier_id != "custom" or classifier_info["file"]:
+                snapshots.append(self.classifier_manager.snapshot_params(classifier_id))
+
+        # Barriere sorgt dafür, dass jeder Auftrag in einem eigenen Worker-Thread läuft
+        barrier = threading.Barrier(executor.max_workers)
+
+        def load_all():
+            try:
+                barrier.wait(timeout=5)
+            except threading.BrokenBarrierError:
+                pass
+            for params in snapshots:
+                self.classifier_manager._get_cascade(params.path, params.engine, params.prescreen_stages)
+
+        futures = [executor.submit(load_all) for _ in range(executor.max_workers)]
+        for future in futures:
+            future.result()
+        print(f"{executor.max_workers} Worker mit {len(snapshots)} Klassifizierern vorgewärmt.")
+
+    # Nimmt einen Auftrag an (oder lehnt ihn bei voller Warteschlange ab).
+    def submit(self, frame, params):
+        """
+        Nimmt einen Auftrag an.
+        :param frame: Bild als NumPy-Array.
+        :param params: DetectionParams-Schnappschuss.
+        :return: DetectionJob oder None, falls die Warteschlange voll ist.
+        """
+
+        job = DetectionJob(frame, params)
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            with self.metrics_lock:
+                self.num_rejected += 1
+            return None
+        with self.metrics_lock:
+            self.num_requests += 1
+        return job
+
+    # Sammelt Aufträge zu Batches und verteilt sie auf den Thread-Pool.
+    def _batch_loop(self):
+        """
+        Sammelt Aufträge zu Batches und verteilt sie auf den Thread-Pool.
+        :return: None
+        """
+
+        executor = self.classifier_manager.executor
+        while self.running:
+            try:
+                first = self.jobs.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            # Weitere Aufträge sammeln, bis der Batch voll oder das Latenzbudget abgelaufen ist
+            batch = [first]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.jobs.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            with self.metrics_lock:
+                self.num_batches += 1
+                self.num_batched_jobs += len(batch)
+
+            # Batch in gleich große Teile pro Worker aufteilen (submit blockiert, wenn der Pool voll ist)
+            chunk_size = max(1, -(-len(batch) // executor.max_workers))
+            for i in range(0, len(batch), chunk_size):
+                executor.submit(self._run_chunk, batch[i:i + chunk_size])
+
+    # Führt einen Teil eines Batches in einem Worker-Thread aus.
+    def _run_chunk(self, chunk):
+        """
+        Führt die Erkennung für einen Teil eines Batches aus.
+        :param chunk: Liste von DetectionJob.
+        :return: None
+        """
+
+        for job in chunk:
+            try:
+                job.result = self.classifier_manager.detect(job.frame, job.params)
+            except Exception as e: # Fehlerbehandlung
+                print(f"Fehler bei der Erkennung im Dienst: {e}")
+                job.result = None
+            latency = (time.perf_counter() - job.t_enqueued) * 1000
+            with self.metrics_lock:
+                self.latencies.append(latency)
+                self.num_completed += 1
+            job.done.set()
+
+    # Liefert die aktuellen Metriken.
+    def get_metrics(self):
+        """
+        Liefert Warteschlangenlänge, Zähler und Latenz-Perzentile.
+        :return: Dictionary mit Metriken.
+        """
+
+        with self.metrics_lock:
+            latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+            metrics = {
+                "queue_depth": self.jobs.qsize(),
+                "max_queue": self.jobs.maxsize,
+                "in_flight": self.num_requests - self.num_completed,
+                "requests": self.num_requests,
+                "rejected": self.num_rejected,
+                "timeouts": self.num_timeouts,
+                "batches": self.num_batches,
+                "avg_batch_size": round(self.num_batched_jobs / self.num_batches, 2) if self.num_batches else 0,
+                "workers": self.classifier_manager.executor.max_workers,
+                "uptime_s": round(time.time() - self.t_start, 1)
+            }
+        for p in (50, 95, 99):
+            metrics[f"latency_p{p}_ms"] = round(float(np.percentile(latencies, p)), 2)
+        return metrics
+
+    # Startet den Dienst.
+    def start(self, host="127.0.0.1", port=8765, unix_socket=None):
+        """
+        Startet den Batch-Thread und den HTTP-Server (TCP auf localhost oder Unix-Socket).
+        :param host: Adresse für TCP (Standard: nur localhost).
+        :param port: Port für TCP.
+        :param unix_socket: Pfad zu einem Unix-Socket (hat Vorrang vor host/port).
+        :return: None
+        """
+
+        self.warm_up()
+        self.running = True
+        self.batcher_thread = threading.Thread(target=self._batch_loop, name="haar-batcher", daemon=True)
+        self.batcher_thread.start()
+
+        handler = type("BoundDetectionRequestHandler", (DetectionRequestHandler,), {"service": self})
+        if unix_socket:
+            if os.path.exists(unix_socket):
+                os.remove(unix_socket)
+            self.server = ThreadingUnixHTTPServer(unix_socket, handler)
+            print(f"Erkennungsdienst läuft auf Unix-Socket {unix_socket}")
+        else:
+            self.server = ThreadingHTTPServer((host, port), handler)
+            print(f"Erkennungsdienst läuft auf http://{host}:{port}")
+
+    # Verarbeitet Anfragen, bis der Dienst beendet wird.
+    def serve_forever(self):
+        """
+        Verarbeitet Anfragen, bis der Dienst beendet wird (Strg+C).
+        :return: None
+        """
+
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            print("Erkennungsdienst wird beendet...")
+        finally:
+            self.stop()
+
+    # Beendet den Dienst.
+    def stop(self):
+        """
+        Beendet HTTP-Server, Batch-Thread und Thread-Pool.
+        :return: None
+        """
+
+        try:
+            self.running = False
+            if self.server is not None:
+                self.server.server_close()
+                if isinstance(self.server, ThreadingUnixHTTPServer) and os.path.exists(self.server.server_address):
+                    os.remove(self.server.server_address)
+            if self.batcher_thread is not None:
+                self.batcher_thread.join(timeout=1)
+            self.classifier_manager.shutdown()
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Beenden des Erkennungsdienstes: {e}")
+
+
+# HTTP-Server auf einem Unix-Socket (ein Thread pro Verbindung).
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+# HTTP-Handler des Erkennungsdienstes.
+class DetectionRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP-Handler des Erkennungsdienstes.
+
+    Endpunkte: POST /detect?classifier=face[&scaleFactor=..&minNeighbors=..&minSize=..]
+                    Body: JPEG/PNG (Content-Type image/*) oder Rohdaten
+                    (application/octet-stream mit width, height und optional channels als Query-Parameter)
+               GET /metrics
+               GET /health
+    """
+
+    service = None # Wird in DetectionService.start() gesetzt
+    protocol_version = "HTTP/1.1"
+
+    # Keine Ausgabe pro Anfrage in der Konsole
+    def log_message(self, format, *args):
+        pass
+
+    # Sendet eine JSON-Antwort.
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Beantwortet GET-Anfragen (Metriken und Status).
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/metrics":
+            self._send_json(200, self.service.get_metrics())
+        elif path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "Unbekannter Pfad"})
+
+    # Beantwortet POST-Anfragen (Erkennung).
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/detect":
+            self._send_json(404, {"error": "Unbekannter Pfad"})
+            return
+
+        try:
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            params = self._build_params(query)
+            frame = self._decode_frame(body, self.headers.get("Content-Type", ""), query)
+        except KeyError as e:
+            self._send_json(404, {"error": f"Unbekannter Klassifizierer: {e}"})
+            return
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        job = self.service.submit(frame, params)
+        if job is None: # Gegendruck: Warteschlange voll
+            self._send_json(503, {"error": "Überlastet, bitte später erneut versuchen",
+                                  "queue_depth": self.service.jobs.qsize()}, {"Retry-After": "1"})
+            return
+
+        if not job.done.wait(self.service.request_timeout):
+            with self.service.metrics_lock:
+                self.service.num_timeouts += 1
+            self._send_json(504, {"error": "Zeitüberschreitung bei der Erkennung"})
+            return
+        if job.result is None:
+            self._send_json(500, {"error": "Erkennung fehlgeschlagen"})
+            return
+
+        boxes = [[int(v) for v in box] for box in job.result]
+        latency = (time.perf_counter() - job.t_enqueued) * 1000
+        self._send_json(200, {"classifier": params.classifier_id, "boxes": boxes, "latency_ms": round(latency, 2)})
+
+    # Dekodiert das Bild aus dem Body der Anfrage.
+    def _decode_frame(self, body, content_type, query):
+        """
+        Dekodiert JPEG/PNG oder Rohdaten direkt in ein Graustufenbild.
+        :return: Graustufenbild als NumPy-Array.
+        """
+
+        if not body:
+            raise ValueError("Leerer Body")
+
+        if content_type.startswith("application/octet-stream"):
+            try:
+                width, height = int(query["width"]), int(query["height"])
+                channels = int(query.get("channels", 1))
+            except (KeyError, ValueError):
+                raise ValueError("Rohdaten benötigen width, height (und optional channels)")
+            if channels not in (1, 3) or len(body) != width * height * channels:
+                raise ValueError("Größe der Rohdaten passt nicht zu width/height/channels")
+            frame = np.frombuffer(body, dtype=np.uint8).reshape(height, width, channels)
+            return frame[:, :, 0] if channels == 1 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        frame = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if frame is None:
+            raise ValueError("Bild konnte nicht dekodiert werden (JPEG/PNG erwartet)")
+        return frame
+
+    # Erstellt den Parameter-Schnappschuss aus der Klassifizierer-Tabelle und den Query-Parametern.
+    def _build_params(self, query):
+        """
+        Erstellt den Parameter-Schnappschuss aus der Klassifizierer-Tabelle und optionalen Query-Parametern.
+        :return: DetectionParams
+        """
+
+        classifier_id = query.get("classifier", "face")
+        params = self.service.classifier_manager.snapshot_params(classifier_id)
+        if classifier_id == "custom" and not self.service.classifier_manager.classifiers["custom"]["file"]:
+            raise KeyError(classifier_id)
+        try:
+            if "scaleFactor" in query:
+                params = params._replace(scaleFactor=float(query["scaleFactor"]))
+            if "minNeighbors" in query:
+                params = params._replace(minNeighbors=int(query["minNeighbors"]))
+            if "minSize" in query:
+                params = params._replace(minSize=(int(query["minSize"]), int(query["minSize"])))
+        except ValueError:
+            raise ValueError("Ungültige Parameter")
+        return params
+
+
+# Startet den Erkennungsdienst über die Kommandozeile.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler Haar-Cascade-Erkennungsdienst mit Micro-Batching")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse (Standard: nur localhost)")
+    parser.add_argument("--port", type=int, default=8765, help="Port (Standard: 8765)")
+    parser.add_argument("--unix-socket", default=None, help="Pfad zu einem Unix-Socket statt TCP")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl der Worker-Threads")
+    parser.add_argument("--max-batch", type=int, default=8, help="Maximale Batch-Größe")
+    parser.add_argument("--batch-window-ms", type=float, default=5, help="Latenzbudget für das Sammeln eines Batches")
+    parser.add_argument("--max-queue", type=int, default=64, help="Maximale Warteschlangenlänge (danach 503)")
+    parser.add_argument("--custom", default=None, help="Pfad zu einem eigenen Klassifizierer (classifier=custom)")
+    parser.add_argument("--two-tier", nargs="*", default=None, metavar="KLASSIFIZIERER[=K]",
+                        help="Zweistufige Erkennung für diese Klassifizierer (ohne =K wird die Stufenanzahl vorgeschlagen)")
+    args = parser.parse_args()
+
+    manager = ClassifierManager(max_workers=args.workers)
+    if args.custom:
+        manager.classifiers["custom"]["file"] = args.custom
+    for entry in args.two_tier or []:
+        classifier_id, _, stages = entry.partition("=")
+        stages = manager.set_two_tier(classifier_id, int(stages) if stages else None)
+        print(f"Zweistufige Erkennung für '{classifier_id}': {stages} Stufen im Vorfilter")
+
+    service = DetectionService(manager, max_batch=args.max_batch, batch_window_ms=args.batch_window_ms, max_queue=args.max_queue)
+    service.start(args.host, args.port, args.unix_socket)
+
+    # SIGTERM wie Strg+C behandeln, damit der Dienst sauber beendet wird
+    def handle_sigterm(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    service.serve_forever()
@@ -0,0 +1,512 @@
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
+from atomicfile import atomic_write
+
+# Standardordner der Ereignisse
+EVENTS_DIR = os.path.join(os.path.expanduser("~"), ".haarcascades", "events")
+
+# Spalten eines Segments: Dateiname -> (Datentyp, Werte pro Zeile)
+FRAME_COLUMNS = {"ts.f8": (np.float64, 1), "stream.u2": (np.uint16, 1), "classifier.u2": (np.uint16, 1),
+                 "count.u2": (np.uint16, 1), "box_start.u4": (np.uint32, 1)}
+BOX_COLUMNS = {"boxes.u2": (np.uint16, 4)}
+ROLLUP_COLUMNS = {"minute.i8": (np.int64, 1), "rollup_stream.u2": (np.uint16, 1), "rollup_classifier.u2": (np.uint16, 1),
+                  "frames.u4": (np.uint32, 1), "objects.u4": (np.uint32, 1), "peak.u2": (np.uint16, 1)}
+
+
+# Speichert Erkennungsergebnisse pro Frame spaltenweise in Tagessegmenten (nur Anhängen, Lesen per Memory-Mapping).
+class EventStore:
+    """
+    Speichert die Erkennungsergebnisse jedes Frames (Zeitstempel, Quelle, Klassifizierer, Rechtecke) spaltenweise:
+    pro Tag ein Segment-Ordner mit einer Binärdatei je Spalte (z. B. ts.f8, count.u2, boxes.u2), an die nur angehängt
+    wird. Geschrieben wird gebündelt in einem Hintergrund-Thread; append() kehrt sofort zurück (bei vollem Puffer
+    wird verworfen und gezählt). Gelesen wird per np.memmap: Zeitbereiche über binäre Suche im aufsteigenden
+    Zeitstempel, Aggregationen über die Minuten-Zusammenfassung (Frames, Objekte, Höchstwert pro Minute, Quelle und
+    Klassifizierer), sodass Abfragen über Monate nur wenige hundert Kilobyte pro Tag lesen.
+    Nach einem Abbruch mitten im Schreiben können die Spalten unterschiedlich lang sein: beim Öffnen werden alle
+    Spalten eines Segments auf die Zeilen gekürzt, die in jeder Spalte vollständig vorliegen (ebenso nach einem
+    Schreibfehler im laufenden Betrieb), damit neue Zeilen nicht gegeneinander verschoben angehängt werden.
+    """
+
+    # Initialisiert den Speicher und startet den Schreib-Thread.
+    def __init__(self, root=EVENTS_DIR, batch_size=512, flush_interval=1.0, max_pending=20000):
+        """
+        Initialisiert den Speicher und startet den Schreib-Thread.
+        :param root: Ordner der Segmente.
+        :param batch_size: Höchstzahl der Einträge pro Schreibvorgang.
+        :param flush_interval: Spätestens nach dieser Zeit (Sekunden) wird geschrieben.
+        :param max_pending: Größe des Puffers; ist er voll, werden Einträge verworfen.
+        """
+
+        self.root = root
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        os.makedirs(root, exist_ok=True)
+        self.catalog_path = os.path.join(root, "catalog.json")
+        self.catalog = self._load_catalog() # {"stream": [Namen], "classifier": [Namen]}
+        self.recovered = self._recover() # Segment -> verworfene Zeilen nach einem Abbruch
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock() # Schützt rollups, last_ts und die Zähler
+        self.rollups = {} # (Minute, Quelle, Klassifizierer) -> [Frames, Objekte, Höchstwert] der noch offenen Minuten
+        self.last_ts = {} # Segment -> letzter geschriebener Zeitstempel
+        self.maps = {} # Pfad -> (Zeilen, np.memmap)
+        self.counters = {"appended": 0, "written": 0, "dropped": 0, "batches": 0, "write_ms": 0.0}
+        self.thread = threading.Thread(target=self._run, name="haar-eventstore", daemon=True)
+        self.thread.start()
+
+    # Lädt die Zuordnung von Namen (Quelle, Klassifizierer) zu Nummern.
+    def _load_catalog(self):
+        try:
+            with open(self.catalog_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {"stream": [], "classifier": []}
+
+    # Liefert die Nummer eines Namens (legt ihn bei Bedarf an).
+    def _id(self, kind, name, create=True):
+        names = self.catalog[kind]
+        name = str(name)
+        if name in names:
+            return names.index(name)
+        if not create:
+            return None
+        names.append(name)
+        with atomic_write(self.catalog_path, "w", encoding="utf-8", prefix=".catalog-") as file:
+            json.dump(self.catalog, file)
+        return len(names) - 1
+
+    # Liefert die Anzahl vollständiger Zeilen einer Spaltendatei.
+    def _rows(self, path, dtype, width=1):
+        try:
+            return os.path.getsize(path) // (np.dtype(dtype).itemsize * width)
+        except OSError:
+            return 0
+
+    # Kürzt eine Spaltendatei auf eine Anzahl Zeilen.
+    def _truncate(self, path, rows, dtype, width=1):
+        size = rows * np.dtype(dtype).itemsize * width
+        if os.path.exists(path) and os.path.getsize(path) != size:
+            with open(path, "r+b") as file:
+                file.truncate(size)
+
+    # Bringt die Spalten aller Segmente auf eine gemeinsame Zeilenzahl (nach einem Abbruch beim Schreiben).
+    def _recover(self):
+        """
+        :return: Dictionary Segment -> Anzahl der verworfenen (unvollständigen) Frames
+        """
+
+        recovered = {}
+        try:
+            segments = sorted(name for name in os.listdir(self.root) if name.isdigit())
+        except OSError:
+            return recovered
+        for segment in segments:
+            directory = os.path.join(self.root, segment)
+            rows = {name: self._rows(os.path.join(directory, name), dtype) for name, (dtype, _) in FRAME_COLUMNS.items()}
+            box_rows = self._rows(os.path.join(directory, "boxes.u2"), np.uint16, 4)
+            committed = min(rows.values())
+            if committed: # Nur Frames, deren Rechtecke vollständig geschrieben sind
+                starts = np.fromfile(os.path.join(directory, "box_start.u4"), np.uint32, committed).astype(np.int64)
+                counts = np.fromfile(os.path.join(directory, "count.u2"), np.uint16, committed).astype(np.int64)
+                committed = int(np.searchsorted(starts + counts, box_rows, side="right"))
+                box_rows = int(starts[committed - 1] + counts[committed - 1]) if committed else 0
+            else:
+                box_rows = 0
+            for name, (dtype, _) in FRAME_COLUMNS.items():
+                self._truncate(os.path.join(directory, name), committed, dtype)
+            self._truncate(os.path.join(directory, "boxes.u2"), box_rows, np.uint16, 4)
+            rollup_rows = min(self._rows(os.path.join(directory, name), dtype) for name, (dtype, _) in ROLLUP_COLUMNS.items())
+            for name, (dtype, _) in ROLLUP_COLUMNS.items():
+                self._truncate(os.path.join(directory, name), rollup_rows, dtype)
+            if max(rows.values()) != committed:
+                recovered[segment] = max(rows.values()) - committed
+                print(f"Ereignisspeicher: {recovered[segment]} unvollständige Frames in {segment} verworfen")
+        return recovered
+
+    # Übergibt das Ergebnis eines Frames.
+    def append(self, objects, classifier_id="face", stream="default", timestamp=None):
+        """
+        Übergibt das Erkennungsergebnis eines Frames (kehrt sofort zurück).
+        :param objects: Erkannte Objekte (x, y, w, h) oder None.
+        :param classifier_id: ID des Klassifizierers.
+        :param stream: Quelle (z. B. Kameraname oder Dateipfad).
+        :param timestamp: Unix-Zeit (Standard: jetzt).
+        :return: True, wenn angenommen, False, wenn der Puffer voll ist.
+        """
+
+        boxes = np.asarray(objects if objects is not None and len(objects) else np.empty((0, 4)), dtype=np.int64).reshape(-1, 4)
+        try:
+            self.queue.put_nowait((time.time() if timestamp is None else float(timestamp), stream, classifier_id, boxes))
+        except queue.Full:
+            with self.lock:
+                self.counters["dropped"] += 1
+            return False
+        with self.lock:
+            self.counters["appended"] += 1
+        return True
+
+    # Schreib-Thread: sammelt Einträge und schreibt sie gebündelt.
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, flushes = [], []
+            item = self.queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None: # close()
+                    stop = True
+                    break
+                if isinstance(item, threading.Event): # flush(): bisher Gesammeltes sofort schreiben
+                    flushes.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+            for event in flushes:
+                event.set()
+
+    # Schreibt einen Block von Einträgen in die Segmente.
+    def _write_batch(self, batch):
+        """
+        :param batch: Liste von (Zeitstempel, Quelle, Klassifizierer, Rechtecke).
+        :return: None
+        """
+
+        if not batch:
+            return
+        try:
+            t0 = time.perf_counter()
+            batch.sort(key=lambda entry: entry[0])
+            segments = {}
+            for entry in batch:
+                segments.setdefault(time.strftime("%Y%m%d", time.gmtime(entry[0])), []).append(entry)
+            for segment, entries in segments.items():
+                self._write_segment(segment, entries)
+            with self.lock:
+                self.counters["written"] += len(batch)
+                self.counters["batches"] += 1
+                self.counters["write_ms"] += (time.perf_counter() - t0) * 1000
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Schreiben der Ereignisse: {e}")
+
+    # Hängt Einträge eines Tages an die Spaltendateien an.
+    def _write_segment(self, segment, entries):
+        directory = os.path.join(self.root, segment)
+        os.makedirs(directory, exist_ok=True)
+        box_path = os.path.join(directory, "boxes.u2")
+        box_start = os.path.getsize(box_path) // 8 if os.path.exists(box_path) else 0
+
+        # Zeitstempel bleiben pro Segment aufsteigend (verspätete Einträge erhalten den letzten Zeitstempel)
+        last_ts = self.last_ts.get(segment)
+        if last_ts is None:
+            ts_path = os.path.join(directory, "ts.f8")
+            size = os.path.getsize(ts_path) if os.path.exists(ts_path) else 0
+            last_ts = float(np.fromfile(ts_path, np.float64, offset=size - 8)[0]) if size >= 8 else -np.inf
+        timestamps = np.maximum.accumulate(np.maximum([entry[0] for entry in entries], last_ts))
+        self.last_ts[segment] = float(timestamps[-1])
+
+        counts = np.array([min(len(entry[3]), 65535) for entry in entries], dtype=np.uint16)
+        starts = box_start + np.concatenate(([0], np.cumsum(counts[:-1], dtype=np.int64)))
+        boxes = np.concatenate([entry[3][:65535] for entry in entries]) if counts.sum() else np.empty((0, 4))
+        streams = np.array([self._id("stream", entry[1]) for entry in entries], dtype=np.uint16)
+        classifiers = np.array([self._id("classifier", entry[2]) for entry in entries], dtype=np.uint16)
+        columns = {"ts.f8": timestamps, "stream.u2": streams, "classifier.u2": classifiers, "count.u2": counts,
+                   "box_start.u4": starts, "boxes.u2": np.clip(boxes, 0, 65535)}
+        self._append_columns(directory, columns, {**FRAME_COLUMNS, **BOX_COLUMNS})
+
+        # Minuten-Zusammenfassung: abgeschlossene Minuten schreiben, die aktuelle offen halten
+        minutes = (timestamps // 60).astype(np.int64)
+        with self.lock:
+            for minute, stream, classifier, count in zip(minutes.tolist(), streams.tolist(), classifiers.tolist(), counts.tolist()):
+                rollup = self.rollups.setdefault((minute, stream, classifier), [0, 0, 0])
+                rollup[0] += 1
+                rollup[1] += count
+                rollup[2] = max(rollup[2], count)
+            closed = sorted(key for key in self.rollups if key[0] < minutes[-1])
+            rows = [(key, self.rollups.pop(key)) for key in closed]
+        self._write_rollups(rows)
+
+    # Schreibt abgeschlossene Minuten der Zusammenfassung.
+    def _write_rollups(self, rows):
+        if not rows:
+            return
+        by_segment = {}
+        for key, values in rows:
+            by_segment.setdefault(time.strftime("%Y%m%d", time.gmtime(key[0] * 60)), []).append((key, values))
+        for segment, entries in by_segment.items():
+            directory = os.path.join(self.root, segment)
+            os.makedirs(directory, exist_ok=True)
+            columns = {"minute.i8": [key[0] for key, _ in entries], "rollup_stream.u2": [key[1] for key, _ in entries],
+                       "rollup_classifier.u2": [key[2] for key, _ in entries],
+                       "frames.u4": [values[0] for _, values in entries], "objects.u4": [values[1] for _, values in entries],
+                       "peak.u2": [values[2] for _, values in entries]}
+            self._append_columns(directory, columns, ROLLUP_COLUMNS)
+
+    # Hängt Werte an mehrere Spalten an; bei einem Fehler werden alle Spalten auf den vorherigen Stand gekürzt.
+    def _append_columns(self, directory, columns, layout):
+        sizes = {}
+        try:
+            for name, values in columns.items():
+                path = os.path.join(directory, name)
+                sizes[path] = os.path.getsize(path) if os.path.exists(path) else 0
+                with open(path, "ab") as file:
+                    file.write(np.ascontiguousarray(values, dtype=layout[name][0]).tobytes())
+        except BaseException:
+            for path, size in sizes.items(): # Keine halb geschriebenen Zeilen stehen lassen
+                try:
+                    with open(path, "r+b") as file:
+                        file.truncate(size)
+                except OSError:
+                    pass
+            raise
+
+    # Wartet, bis alle übergebenen Einträge geschrieben sind.
+    def flush(self, timeout=10.0):
+        """
+        Wartet, bis alle bisher übergebenen Einträge geschrieben sind (offene Minuten bleiben im Speicher,
+        werden von Abfragen aber berücksichtigt).
+        :param timeout: Höchstwartezeit in Sekunden.
+        :return: True, wenn geschrieben wurde, sonst False
+        """
+
+        event = threading.Event()
+        self.queue.put(event)
+        return event.wait(timeout)
+
+    # Öffnet eine Spaltendatei per Memory-Mapping.
+    def _column(self, segment, name, dtype, width=1):
+        path = os.path.join(self.root, segment, name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.empty((0, width) if width > 1 else 0, dtype=dtype)
+        rows = size // (np.dtype(dtype).itemsize * width)
+        if rows == 0:
+            return np.empty((0, width) if width > 1 else 0, dtype=dtype)
+        cached = self.maps.get(path)
+        if cached is None or cached[0] != rows: # Neu oder seit dem letzten Öffnen gewachsen
+            cached = self.maps[path] = (rows, np.memmap(path, dtype=dtype, mode="r", shape=(rows, width) if width > 1 else (rows,)))
+        return cached[1]
+
+    # Liefert die Segmente, die einen Zeitbereich überlappen.
+    def _segments(self, start, end):
+        first = time.strftime("%Y%m%d", time.gmtime(max(start, 0)))
+        last = time.strftime("%Y%m%d", time.gmtime(max(end, 0)))
+        try:
+            names = sorted(name for name in os.listdir(self.root) if name.isdigit() and first <= name <= last)
+        except OSError:
+            return []
+        return names
+
+    # Liefert die Nummern für Filter nach Quelle und Klassifizierer.
+    def _filter_ids(self, stream, classifier_id):
+        stream_id = None if stream is None else self._id("stream", stream, create=False)
+        classifier = None if classifier_id is None else self._id("classifier", classifier_id, create=False)
+        return stream_id, classifier, (stream is not None and stream_id is None) or (classifier_id is not None and classifier is None)
+
+    # Liefert die Frames eines Zeitbereichs.
+    def frames(self, start, end, stream=None, classifier_id=None, with_boxes=False):
+        """
+        Liefert die Frames im Zeitbereich [start, end) (nur die betroffenen Ausschnitte der Segmente werden gelesen).
+        :param start: Beginn (Unix-Zeit).
+        :param end: Ende (Unix-Zeit).
+        :param stream: Nur diese Quelle (Standard: alle).
+        :param classifier_id: Nur dieser Klassifizierer (Standard: alle).
+        :param with_boxes: Zusätzlich die Rechtecke jedes Frames liefern.
+        :return: Dictionary mit NumPy-Arrays "timestamp" und "count" (und Liste "boxes" mit Arrays (N, 4)).
+        """
+
+        stream_id, classifier, unknown = self._filter_ids(stream, classifier_id)
+        result = {"timestamp": [], "count": [], "boxes": []}
+        for segment in ([] if unknown else self._segments(start, end)):
+            ts = self._column(segment, "ts.f8", np.float64)
+            lengths = [len(ts)] + [len(self._column(segment, name, dtype)) for name, (dtype, _) in FRAME_COLUMNS.items() if name != "ts.f8"]
+            rows = min(lengths) # Während eines laufenden Schreibvorgangs können Spalten kurz unterschiedlich lang sein
+            lo, hi = np.searchsorted(ts[:rows], [start, end], side="left")
+            if lo == hi:
+                continue
+            mask = np.ones(hi - lo, dtype=bool)
+            if stream_id is not None:
+                mask &= self._column(segment, "stream.u2", np.uint16)[lo:hi] == stream_id
+            if classifier is not None:
+                mask &= self._column(segment, "classifier.u2", np.uint16)[lo:hi] == classifier
+            counts = self._column(segment, "count.u2", np.uint16)[lo:hi][mask]
+            result["timestamp"].append(np.asarray(ts[lo:hi][mask]))
+            result["count"].append(np.asarray(counts))
+            if with_boxes:
+                boxes = self._column(segment, "boxes.u2", np.uint16, 4)
+                starts = self._column(segment, "box_start.u4", np.uint32)[lo:hi][mask]
+                result["boxes"] += [np.asarray(boxes[s:s + c]) for s, c in zip(starts.tolist(), counts.tolist())]
+        return {"timestamp": np.concatenate(result["timestamp"]) if result["timestamp"] else np.empty(0),
+                "count": np.concatenate(result["count"]) if result["count"] else np.empty(0, dtype=np.uint16),
+                **({"boxes": result["boxes"]} if with_boxes else {})}
+
+    # Liefert die Minuten-Zusammenfassung eines Zeitbereichs.
+    def minutes(self, start, end, stream=None, classifier_id=None):
+        """
+        Liefert pro Minute die Anzahl der Frames, die Summe der Objekte und den Höchstwert (Objekte in einem Frame).
+        Minuten zählen vollständig, wenn ihr Beginn in [start, end) liegt; noch offene Minuten werden einbezogen.
+        :return: Dictionary mit NumPy-Arrays "minute" (Unix-Zeit des Minutenbeginns), "frames", "objects", "peak".
+        """
+
+        stream_id, classifier, unknown = self._filter_ids(stream, classifier_id)
+        first, last = int(np.ceil(start / 60)), int(np.ceil(end / 60)) # Minuten mit Beginn in [start, end)
+        parts = []
+        for segment in ([] if unknown else self._segments(start, end)):
+            minute = self._column(segment, "minute.i8", np.int64)
+            rows = min([len(minute)] + [len(self._column(segment, name, dtype)) for name, (dtype, _) in ROLLUP_COLUMNS.items()])
+            lo, hi = np.searchsorted(minute[:rows], [first, last], side="left")
+            if lo == hi:
+                continue
+            mask = np.ones(hi - lo, dtype=bool)
+            if stream_id is not None:
+                mask &= self._column(segment, "rollup_stream.u2", np.uint16)[lo:hi] == stream_id
+            if classifier is not None:
+                mask &= self._column(segment, "rollup_classifier.u2", np.uint16)[lo:hi] == classifier
+            parts.append(np.stack([minute[lo:hi][mask],
+                                   self._column(segment, "frames.u4", np.uint32)[lo:hi][mask].astype(np.int64),
+                                   self._column(segment, "objects.u4", np.uint32)[lo:hi][mask].astype(np.int64),
+                                   self._column(segment, "peak.u2", np.uint16)[lo:hi][mask].astype(np.int64)], axis=1))
+        with self.lock: # Noch offene Minuten aus dem Speicher
+            pending = [(key[0], *values) for key, values in self.rollups.items() if first <= key[0] < last
+                       and (stream_id is None or key[1] == stream_id) and (classifier is None or key[2] == classifier)]
+        if pending:
+            parts.append(np.array(pending, dtype=np.int64))
+        if not parts:
+            return {"minute": np.empty(0, dtype=np.int64), "frames": np.empty(0, dtype=np.int64),
+                    "objects": np.empty(0, dtype=np.int64), "peak": np.empty(0, dtype=np.int64)}
+
+        # Mehrere Zeilen derselben Minute (mehrere Quellen/Klassifizierer) zusammenfassen
+        rows = np.concatenate(parts)
+        unique, inverse = np.unique(rows[:, 0], return_inverse=True)
+        frames = np.bincount(inverse, rows[:, 1], len(unique)).astype(np.int64)
+        objects = np.bincount(inverse, rows[:, 2], len(unique)).astype(np.int64)
+        peak = np.zeros(len(unique), dtype=np.int64)
+        np.maximum.at(peak, inverse, rows[:, 3])
+        return {"minute": unique * 60, "frames": frames, "objects": objects, "peak": peak}
+
+    # Liefert Objekte pro Zeitabschnitt.
+    def objects_per_interval(self, start, end, interval=60, stream=None, classifier_id=None):
+        """
+        Fasst die Minuten zu Abschnitten von interval Sekunden (Vielfaches von 60) zusammen.
+        :return: Dictionary mit NumPy-Arrays "start", "mean" (Objekte pro Frame), "objects" (Summe), "peak", "frames".
+        """
+
+        interval = max(int(interval // 60), 1) * 60
+        data = self.minutes(start, end, stream, classifier_id)
+        buckets = data["minute"] // interval
+        unique, inverse = np.unique(buckets, return_inverse=True)
+        frames = np.bincount(inverse, data["frames"], len(unique))
+        objects = np.bincount(inverse, data["objects"], len(unique))
+        peak = np.zeros(len(unique), dtype=np.int64)
+        np.maximum.at(peak, inverse, data["peak"])
+        return {"start": unique * interval, "mean": np.divide(objects, frames, out=np.zeros_like(objects), where=frames > 0),
+                "objects": objects.astype(np.int64), "peak": peak, "frames": frames.astype(np.int64)}
+
+    # Liefert die höchste Belegung eines Zeitbereichs.
+    def peak_occupancy(self, start, end, stream=None, classifier_id=None):
+        """
+        Liefert den Frame mit den meisten Objekten: Minute über die Zusammenfassung, Zeitpunkt über die Frames dieser Minute.
+        :return: (Zeitstempel, Anzahl der Objekte) oder (None, 0), falls keine Daten vorliegen
+        """
+
+        data = self.minutes(start, end, stream, classifier_id)
+        if not len(data["peak"]):
+            return None, 0
+        index = int(np.argmax(data["peak"]))
+        minute = int(data["minute"][index])
+        frames = self.frames(max(minute, start), min(minute + 60, end), stream, classifier_id)
+        if not len(frames["count"]): # Noch nicht geschriebene Frames
+            return float(minute), int(data["peak"][index])
+        best = int(np.argmax(frames["count"]))
+        return float(frames["timestamp"][best]), int(frames["count"][best])
+
+    # Liefert die Zähler des Speichers.
+    def get_stats(self):
+        """
+        :return: Dictionary mit angenommenen, geschriebenen und verworfenen Einträgen, Anzahl und mittlerer Dauer der
+                 Schreibvorgänge sowie der Größe auf dem Datenträger.
+        """
+
+        with self.lock:
+            stats = dict(self.counters)
+        stats["write_ms"] = round(stats["write_ms"] / max(stats["batches"], 1), 2)
+        stats["bytes"] = sum(os.path.getsize(os.path.join(directory, name))
+                             for directory, _, names in os.walk(self.root) for name in names)
+        return stats
+
+    # Schreibt alles und beendet den Schreib-Thread.
+    def close(self):
+        """
+        Schreibt alle wartenden Einträge und die offenen Minuten der Zusammenfassung und beendet den Schreib-Thread.
+        :return: None
+        """
+
+        if not self.thread.is_alive():
+            return
+        self.queue.put(None)
+        self.thread.join()
+        with self.lock:
+            rows = sorted(self.rollups.items())
+            self.rollups = {}
+        self._write_rollups(rows)
+
+
+# Erzeugt Testdaten über mehrere Tage und misst Schreibrate und Abfragezeiten.
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Ereignisspeicher: Testdaten erzeugen, Schreibrate und Abfragen messen")
+    parser.add_argument("--root", default=None, help="Ordner (Standard: temporärer Ordner)")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--fps", type=float, default=1.0, help="Frames pro Sekunde der Testdaten")
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix="haar-events-")
+    store = EventStore(root)
+    rng = np.random.default_rng(0)
+    start = 1_700_000_000.0 - 1_700_000_000.0 % 86400
+    frames_per_day = int(86400 * args.fps)
+    t0 = time.perf_counter()
+    for day in range(args.days):
+        timestamps = start + day * 86400 + np.arange(frames_per_day) / args.fps
+        hour = (timestamps % 86400) / 3600
+        counts = rng.poisson(np.clip(4 * np.sin((hour - 6) / 12 * np.pi), 0, None)) # Tagesverlauf
+        for chunk in range(0, frames_per_day, 4096):
+            batch = [(float(ts), "kamera0", "face", rng.integers(0, 600, (int(count), 4))) for ts, count in
+                     zip(timestamps[chunk:chunk + 4096], counts[chunk:chunk + 4096])]
+            store._write_batch(batch)
+    write_s = time.perf_counter() - t0
+    store.close()
+
+    # Abfragen mit neuem Speicher (nichts im Speicher vorgeladen)
+    store = EventStore(root)
+    end = start + args.days * 86400
+
+    def timed(fn):
+        t0 = time.perf_counter()
+        result = fn()
+        return result, round((time.perf_counter() - t0) * 1000, 2)
+
+    hourly, hourly_cold_ms = timed(lambda: store.objects_per_interval(start, end, 3600)) # Erste Abfrage: Dateien öffnen
+    hourly, hourly_ms = timed(lambda: store.objects_per_interval(start, end, 3600))
+    peak, peak_ms = timed(lambda: store.peak_occupancy(start, end))
+    per_minute, minute_ms = timed(lambda: store.objects_per_interval(end - 86400, end, 60, classifier_id="face"))
+    hour_frames, frames_ms = timed(lambda: store.frames(end - 3600, end, with_boxes=True))
+    stats = store.get_stats()
+    store.close()
+    print(json.dumps({"root": root, "frames": frames_per_day * args.days, "write_frames_per_s": round(frames_per_day * args.days / write_s),
+                      "bytes_per_frame": round(stats["bytes"] / (frames_per_day * args.days), 1), "mb": round(stats["bytes"] / 1e6, 1),
+                      "hourly_over_all_days_cold_ms": hourly_cold_ms, "hourly_over_all_days_ms": hourly_ms, "hours": len(hourly["start"]),
+                      "peak_over_all_days_ms": peak_ms, "peak": peak,
+                      "per_minute_last_day_ms": minute_ms, "minutes": len(per_minute["start"]),
+                      "frames_with_boxes_last_hour_ms": frames_ms, "frames_last_hour": len(hour_frames["count"])}, indent=2))
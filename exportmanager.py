@@ -0,0 +1,219 @@
+import json
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from asyncwriter import AsyncImageWriter
+
+
+# Berechnet einen 64-Bit-Wahrnehmungs-Hash (Differenz-Hash) eines Bildausschnitts.
+def perceptual_hash(image):
+    """
+    Berechnet einen 64-Bit-Differenz-Hash (dHash): Graustufen, 9x8 Pixel, ein Bit pro Vergleich benachbarter Pixel.
+    Ähnliche Bilder haben Hashes mit kleinem Hamming-Abstand.
+    :param image: Bild (BGR, RGB oder Graustufen).
+    :return: Hash als int.
+    """
+
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).reshape(-1)
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+# Exportiert erkannte Objekte als Bildausschnitte (z. B. für Trainingsdaten).
+class CropExporter:
+    """
+    Exportiert erkannte Objekte als Bildausschnitte mit Rand und einheitlicher Größe.
+    Fast gleiche Ausschnitte aus aufeinanderfolgenden Frames werden über einen Wahrnehmungs-Hash verworfen.
+    Ausschneiden und Hashen laufen im aufrufenden Thread (wenige Mikrosekunden pro Objekt), Kodieren und
+    Schreiben im AsyncImageWriter; ist dieser ausgelastet, werden Ausschnitte verworfen und gezählt,
+    die Erkennung wird nie blockiert. Zu jedem geschriebenen Ausschnitt wird eine Zeile in manifest.jsonl ergänzt.
+    """
+
+    # Initialisiert den Export.
+    def __init__(self, output_dir, classifier_id="face", padding=0.2, size=(64, 64), extension=".png",
+                 hash_distance=10, dedupe_frames=5, writer=None):
+        """
+        Initialisiert den Export.
+        :param output_dir: Zielordner (wird angelegt).
+        :param classifier_id: ID des Klassifizierers (für Dateinamen und Manifest).
+        :param padding: Rand um jedes Objekt in Vielfachen seiner Größe (pro Seite).
+        :param size: Einheitliche Größe (Breite, Höhe) der Ausschnitte oder None für Originalgröße.
+        :param extension: Dateiformat (".png" oder ".jpg").
+        :param hash_distance: Ausschnitte mit höchstens diesem Hamming-Abstand gelten als Duplikat (-1 = aus).
+                              Dasselbe Gesicht in aufeinanderfolgenden Frames: meist <= 7, verschiedene Gesichter: meist >= 14.
+        :param dedupe_frames: Anzahl der vorherigen Frames, gegen die Duplikate geprüft werden.
+        :param writer: Optionaler gemeinsamer AsyncImageWriter (Standard: eigener Writer).
+        """
+
+        self.output_dir = output_dir
+        self.classifier_id = classifier_id
+        self.padding = padding
+        self.size = tuple(size) if size else None
+        self.extension = extension
+        self.hash_distance = hash_distance
+        self.dedupe_frames = dedupe_frames
+        self.writer = writer or AsyncImageWriter()
+        self.own_writer = writer is None
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.manifest_lock = threading.Lock()
+        self.manifest = open(os.path.join(output_dir, "manifest.jsonl"), "a", encoding="utf-8")
+        self.recent_hashes = [] # Hashes der letzten Frames (Liste von Listen)
+        self.frame_index = 0
+        self.counters = {"frames": 0, "objects": 0, "duplicates": 0, "submitted": 0, "process_ms": 0.0}
+
+    # Prüft, ob ein Hash einem Hash der letzten Frames oder des aktuellen Frames ähnelt.
+    def _is_duplicate(self, crop_hash, frame_hashes):
+        if self.hash_distance < 0:
+            return False
+        for hashes in self.recent_hashes + [frame_hashes]:
+            for other in hashes:
+                if bin(crop_hash ^ other).count("1") <= self.hash_distance:
+                    return True
+        return False
+
+    # Schneidet die erkannten Objekte aus einem Frame aus und übergibt sie an den Writer.
+    def process(self, frame, objects, rgb=False, source="", timestamp=None, labels=None):
+        """
+        Schneidet die erkannten Objekte aus einem Frame aus und übergibt neue (nicht doppelte) Ausschnitte an den Writer.
+        Muss vor dem Zeichnen der Rechtecke in den Frame aufgerufen werden.
+        :param frame: Frame (BGR, bei rgb=True RGB).
+        :param objects: Erkannte Objekte (x, y, w, h) aus detect()/detect_faces().
+        :param rgb: True, wenn der Frame in RGB vorliegt.
+        :param source: Quelle für das Manifest (z. B. Datei oder Kamera).
+        :param timestamp: Zeitstempel des Frames (Standard: aktuelle Zeit).
+        :param labels: Optional Klassifizierer-ID pro Objekt (Standard: classifier_id des Exports).
+        :return: Anzahl der übergebenen Ausschnitte.
+        """
+
+        t0 = time.perf_counter()
+        timestamp = time.time() if timestamp is None else timestamp
+        frame_index = self.frame_index
+        self.frame_index += 1
+        height, width = frame.shape[:2]
+        frame_hashes, submitted = [], 0
+
+        for i, (x, y, w, h) in enumerate(objects if objects is not None else []):
+            pad_x, pad_y = int(w * self.padding), int(h * self.padding)
+            x0, y0 = max(int(x) - pad_x, 0), max(int(y) - pad_y, 0)
+            x1, y1 = min(int(x + w) + pad_x, width), min(int(y + h) + pad_y, height)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            crop = frame[y0:y1, x0:x1]
+            crop = cv2.resize(crop, self.size, interpolation=cv2.INTER_AREA) if self.size else crop.copy()
+
+            crop_hash = perceptual_hash(crop)
+            self.counters["objects"] += 1
+            if self._is_duplicate(crop_hash, frame_hashes):
+                self.counters["duplicates"] += 1
+                continue
+            frame_hashes.append(crop_hash)
+
+            classifier_id = labels[i] if labels is not None else self.classifier_id
+            name = f"{classifier_id}_{int(timestamp * 1000)}_{frame_index:06d}_{i:02d}{self.extension}"
+            entry = {"file": name, "source": str(source), "frame": frame_index, "timestamp": round(timestamp, 3),
+                     "classifier": classifier_id, "box": [int(x), int(y), int(w), int(h)],
+                     "crop_box": [x0, y0, x1 - x0, y1 - y0], "hash": f"{crop_hash:016x}"}
+            if self.writer.write(os.path.join(self.output_dir, name), crop, rgb,
+                                 lambda path, size, entry=entry: self._add_to_manifest(entry)):
+                submitted += 1
+
+        self.recent_hashes.append(frame_hashes)
+        del self.recent_hashes[:-self.dedupe_frames]
+        self.counters["frames"] += 1
+        self.counters["submitted"] += submitted
+        self.counters["process_ms"] += (time.perf_counter() - t0) * 1000
+        return submitted
+
+    # Ergänzt das Manifest (läuft im Worker nach erfolgreichem Schreiben).
+    def _add_to_manifest(self, entry):
+        with self.manifest_lock:
+            if not self.manifest.closed:
+                self.manifest.write(json.dumps(entry) + "\n")
+
+    # Liefert die Zähler des Exports.
+    def get_stats(self):
+        """
+        :return: Dictionary mit Frames, Objekten, Duplikaten, übergebenen Ausschnitten, mittlerer Zeit pro Frame im
+                 aufrufenden Thread (ms) und den Zählern des Writers.
+        """
+
+        stats = dict(self.counters)
+        stats["process_ms"] = round(stats["process_ms"] / max(stats["frames"], 1), 3)
+        stats["writer"] = self.writer.get_stats()
+        return stats
+
+    # Beendet den Export.
+    def close(self):
+        """
+        Wartet auf alle Schreibaufträge (nur beim eigenen Writer) und schließt das Manifest.
+        :return: get_stats()
+        """
+
+        if self.own_writer:
+            self.writer.close(wait=True)
+        with self.manifest_lock:
+            self.manifest.close()
+        return self.get_stats()
+
+
+# Exportiert Ausschnitte aus einem Video, einer Kamera oder einem Bildordner über die Kommandozeile.
+if __name__ == "__main__":
+    import argparse
+    import glob
+    from classifiermanager import ClassifierManager
+
+    parser = argparse.ArgumentParser(description="Erkannte Objekte als Ausschnitte exportieren (Trainingsdaten)")
+    parser.add_argument("source", help="Videodatei, Kamera-Index oder Bildordner")
+    parser.add_argument("output", help="Zielordner")
+    parser.add_argument("--classifier", default="face", help="Klassifizierer-ID oder Pfad zu einer XML-Datei")
+    parser.add_argument("--padding", type=float, default=0.2)
+    parser.add_argument("--size", type=int, default=64, help="Kantenlänge der Ausschnitte (0 = Originalgröße)")
+    parser.add_argument("--format", default=".png", choices=[".png", ".jpg"])
+    parser.add_argument("--hash-distance", type=int, default=10, help="Höchster Hamming-Abstand für Duplikate (-1 = aus)")
+    parser.add_argument("--every", type=int, default=1, help="Nur jeden n-ten Frame auswerten")
+    args = parser.parse_args()
+
+    manager = ClassifierManager()
+    classifier_id = args.classifier
+    if classifier_id.endswith(".xml"):
+        manager.classifiers["custom"]["file"] = classifier_id
+        classifier_id = "custom"
+    params = manager.snapshot_params(classifier_id)
+    exporter = CropExporter(args.output, os.path.splitext(os.path.basename(args.classifier))[0], args.padding,
+                            (args.size, args.size) if args.size else None, args.format, args.hash_distance)
+
+    # Frames als (Quelle, Frame) liefern
+    def frames():
+        if os.path.isdir(args.source):
+            for path in sorted(glob.glob(os.path.join(args.source, "*"))):
+                image = cv2.imread(path)
+                if image is not None:
+                    yield path, image
+        else:
+            capture = cv2.VideoCapture(int(args.source) if args.source.isdigit() else args.source)
+            while True:
+                ret, frame = capture.read()
+                if not ret:
+                    break
+                yield args.source, frame
+            capture.release()
+
+    t0, detect_s, count = time.perf_counter(), 0.0, 0
+    for index, (source, frame) in enumerate(frames()):
+        if index % args.every:
+            continue
+        t1 = time.perf_counter()
+        objects = manager.detect(frame, params)
+        detect_s += time.perf_counter() - t1
+        exporter.process(frame, objects, source=source)
+        count += 1
+
+    stats = exporter.close()
+    elapsed = time.perf_counter() - t0
+    stats.update(frames_per_s=round(count / max(elapsed, 1e-9), 1), detect_ms=round(detect_s * 1000 / max(count, 1), 2))
+    print(json.dumps(stats))
+    manager.shutdown()
@@ -2,6 +2,12 @@ import os
 from tkinter import filedialog
 import cv2
 
+# Verkleinerungsfaktoren, die der Decoder direkt unterstützt (JPEG dekodiert dabei nur einen Bruchteil der Pixel)
+REDUCED_GRAYSCALE = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2, 4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+                     8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+REDUCED_COLOR = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4,
+                 8: cv2.IMREAD_REDUCED_COLOR_8}
+
 
 # FileManager-Klasse zum Verwalten von Dateioperationen.
 # Unterstützt die Auswahl von Bild- und XML-Dateien.
@@ -52,6 +58,44 @@ class FileManager:
 
     
 
+    # Öffnet ein Dialogfeld zur Auswahl eines Ordners.
+    def open_folder(self, title="Ordner auswählen"):
+        """
+        Öffnet ein Dialogfeld zur Auswahl eines Ordners.
+
+        :param title: Titel des Dialogfelds (Standard: "Ordner auswählen").
+        :return: Pfad zum ausgewählten Ordner oder None, falls abgebrochen.
+        """
+
+        try:
+            folder = filedialog.askdirectory(title=title)
+            if folder:
+                print(f"Ordner ausgewählt: {folder}")
+                return folder
+            print("Kein Ordner ausgewählt.")
+            return None
+        except Exception as e: # Fehlerbehandlung
+            print("Fehler beim Öffnen des Ordners")
+            return None
+
+
+    # Öffnet ein Dialogfeld zur Auswahl des Speicherorts einer Klassifizierungsdatei (XML).
+    def save_file_classifier(self, title="Speicherort für Klassifizierer auswählen"):
+        """
+        Öffnet ein Dialogfeld zur Auswahl des Speicherorts einer Klassifizierungsdatei (XML).
+
+        :param title: Titel des Dialogfelds.
+        :return: Pfad zur Zieldatei oder None, falls abgebrochen.
+        """
+
+        try:
+            file_path = filedialog.asksaveasfilename(title=title, defaultextension=".xml", filetypes=self.filetypes_classifier)
+            return file_path or None
+        except Exception as e: # Fehlerbehandlung
+            print("Fehler beim Auswählen des Speicherorts")
+            return None
+
+
     # Allgemeine Methode zum Öffnen eines Dialogfelds zur Dateiauswahl.
     def _open_file(self, title, filetypes):
 
@@ -104,6 +148,72 @@ class FileManager:
            
         
         
+    # Wählt den Verkleinerungsfaktor für die Erkennung anhand von minSize.
+    def choose_reduction(self, min_size, window=(24, 24)):
+        """
+        Wählt den größten Verkleinerungsfaktor (1, 2, 4 oder 8), bei dem Objekte der Größe minSize noch mindestens
+        so groß wie das Fenster des Klassifizierers sind (kleinere Objekte findet der Klassifizierer ohnehin nicht).
+        :param min_size: minSize (Breite, Höhe) des Klassifizierers in Pixeln des Originals.
+        :param window: Fenstergröße des Klassifizierers (Breite, Höhe).
+        :return: Faktor
+        """
+
+        factor = 1
+        for candidate in (2, 4, 8):
+            if min_size[0] / candidate >= window[0] and min_size[1] / candidate >= window[1]:
+                factor = candidate
+        return factor
+
+
+    # Lädt ein Bild verkleinert: Graustufen für die Erkennung und ein Farbbild in Anzeigegröße.
+    def load_image_reduced(self, file_path, min_size=(30, 30), window=(24, 24), display_size=(1280, 720)):
+        """
+        Lädt ein Bild für Anzeige und Erkennung, ohne das Original in voller Auflösung im Speicher zu halten:
+        die Erkennung erhält ein direkt verkleinert dekodiertes Graustufenbild (IMREAD_REDUCED_GRAYSCALE_*,
+        Faktor aus minSize), die Anzeige ein verkleinert dekodiertes Farbbild in Anzeigegröße (RGB).
+        Das Original wird erst beim Export geladen (load_image()).
+        :param file_path: Pfad zur Bilddatei.
+        :param min_size: minSize des Klassifizierers in Pixeln des Originals.
+        :param window: Fenstergröße des Klassifizierers.
+        :param display_size: Größe des Anzeigebereichs (Breite, Höhe).
+        :return: Dictionary {"gray", "gray_scale" (Original / Graustufenbild), "display" (RGB),
+                 "display_scale" (Original / Anzeigebild), "size" (Breite, Höhe des Originals, geschätzt)}
+                 oder None, falls fehlgeschlagen.
+        """
+
+        try:
+            if not os.path.exists(file_path):
+                print(f"Fehler: Datei {file_path} nicht gefunden.")
+                return None
+
+            factor = self.choose_reduction(min_size, window)
+            gray = cv2.imread(file_path, REDUCED_GRAYSCALE[factor])
+            if gray is None:
+                print(f"Fehler: Datei {file_path} konnte nicht geladen werden.")
+                return None
+            width, height = gray.shape[1] * factor, gray.shape[0] * factor # Größe des Originals (auf den Faktor gerundet)
+
+            # Anzeige: größten Faktor wählen, bei dem das Bild noch mindestens den Anzeigebereich füllt
+            display_factor = 1
+            for candidate in (2, 4, 8):
+                if width / candidate >= display_size[0] or height / candidate >= display_size[1]:
+                    display_factor = candidate
+            display = cv2.imread(file_path, REDUCED_COLOR[display_factor])
+            if display is None:
+                return None
+            fit = min(display_size[0] / display.shape[1], display_size[1] / display.shape[0], 1.0)
+            if fit < 1.0:
+                display = cv2.resize(display, (max(int(display.shape[1] * fit), 1), max(int(display.shape[0] * fit), 1)),
+                                     interpolation=cv2.INTER_AREA)
+            display = cv2.cvtColor(display, cv2.COLOR_BGR2RGB)
+            print(f"Bild verkleinert geladen: {file_path} (Erkennung 1/{factor}, Anzeige {display.shape[1]}x{display.shape[0]})")
+            return {"gray": gray, "gray_scale": factor, "display": display,
+                    "display_scale": width / display.shape[1], "size": (width, height)}
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Laden des Bildes: {e}")
+            return None
+
+
     # Speichert einen Screenshot des aktuellen Frames mit grünen Rechtecken.
     def save_screenshot(self, image):
         """
@@ -132,4 +242,68 @@ class FileManager:
                 return False
         except Exception as e: # Fehlerbehandlung
             print("Fehler beim Speichern des Bildes")
-            return False
\ No newline at end of file
+            return False
+
+# Vergleicht den Spitzen-Speicherbedarf (RSS) beim Laden großer Bilder: volle Auflösung gegen verkleinerte Dekodierung.
+if __name__ == "__main__":
+    import argparse
+    import json
+    import resource
+    import subprocess
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description="Spitzen-Speicherbedarf beim Laden und Auswerten eines großen Bildes")
+    parser.add_argument("image", help="Bilddatei (z. B. ein 50-MP-JPEG)")
+    parser.add_argument("--classifier", default="face")
+    parser.add_argument("--min-size", type=int, default=None, help="minSize in Pixeln des Originals (Standard: Klassifizierer)")
+    parser.add_argument("--mode", choices=["full", "reduced"], default=None, help="Nur einen Ablauf im aktuellen Prozess messen")
+    args = parser.parse_args()
+
+    if args.mode is None: # Jeden Ablauf in einem eigenen Prozess messen (Spitzenwert des Prozesses)
+        results = {}
+        for mode in ("full", "reduced"):
+            command = [sys.executable, __file__, args.image, "--mode", mode, "--classifier", args.classifier]
+            if args.min_size:
+                command += ["--min-size", str(args.min_size)]
+            output = subprocess.run(command, capture_output=True, text=True).stdout.strip().splitlines()
+            results[mode] = json.loads(output[-1])
+        # Zusätzlicher Speicher gegenüber dem Prozess nach dem Laden des Klassifizierers
+        extra = {mode: results[mode]["peak_rss_mb"] - results[mode]["base_rss_mb"] for mode in ("full", "reduced")}
+        results["extra_rss_mb"] = {mode: round(value, 1) for mode, value in extra.items()}
+        results["extra_rss_reduction"] = round(extra["full"] / max(extra["reduced"], 1.0), 1)
+        print(json.dumps(results, indent=2))
+        sys.exit(0)
+
+    import numpy as np
+    import boxops
+    from classifiermanager import ClassifierManager
+
+    manager = ClassifierManager()
+    if args.min_size:
+        manager.classifiers[args.classifier]["minSize"] = (args.min_size, args.min_size)
+    manager.detect(np.zeros((64, 64), dtype=np.uint8), manager.snapshot_params(args.classifier)) # Klassifizierer laden
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    file_manager = FileManager()
+    t0 = time.perf_counter()
+
+    if args.mode == "full":
+        # Bisheriger Ablauf: BGR laden, RGB für die Anzeige, Erkennung, BGR-Kopie mit Rechtecken für Screenshots
+        image = cv2.cvtColor(file_manager.load_image(args.image), cv2.COLOR_BGR2RGB)
+        objects = manager.detect_faces(image, args.classifier)
+        boxops.draw(image, objects)
+        current = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        size = image.shape[1::-1]
+    else:
+        # Verkleinert: Graustufen für die Erkennung, Farbbild in Anzeigegröße, Rechtecke in Anzeige-Pixeln
+        loaded = file_manager.load_image_reduced(args.image, manager.classifiers[args.classifier]["minSize"],
+                                                 manager.get_window_size(args.classifier))
+        objects = manager.detect_faces(loaded["gray"], args.classifier, loaded["gray_scale"])
+        image = loaded["display"]
+        boxops.draw(image, boxops.remap(objects, 1 / loaded["display_scale"]))
+        current = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        size = loaded["size"]
+
+    print(json.dumps({"mode": args.mode, "size": list(size), "objects": len(objects),
+                      "time_ms": round((time.perf_counter() - t0) * 1000, 1), "base_rss_mb": round(base_rss, 1),
+                      "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}))
@@ -0,0 +1,440 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+from boundedexecutor import BoundedExecutor
+
+# Dateiendungen, die in der Galerie angezeigt werden
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
+
+
+# Blättert durch einen Bildordner; Nachbarbilder werden im Hintergrund dekodiert und ausgewertet.
+class GalleryManager:
+    """
+    Galerie für einen Bildordner. Die nächsten und vorherigen Bilder werden im Hintergrund dekodiert (in RGB, wie
+    die Anzeige sie braucht) und mit dem aktuellen Parameter-Schnappschuss ausgewertet (ClassifierManager.detect_image(),
+    also mit denselben Durchläufen und Bereichen wie die Anzeige). Die Ergebnisse liegen in einem LRU-Cache mit
+    Speichergrenze, sodass der Wechsel zum nächsten Bild ohne Dekodier- und Erkennungspause möglich ist. Der
+    aufrufende (GUI-)Thread wartet nie auf einen Auftrag: fehlt ein Bild, wird es nur dekodiert, die Objekte folgen
+    über objects(). Einträge im Cache werden nie verändert, sondern unter dem Lock ersetzt.
+    Vorschaubilder kommen aus einer verkleinerten Dekodierung (cv2.IMREAD_REDUCED_COLOR_*).
+    """
+
+    # Initialisiert die Galerie.
+    def __init__(self, classifier_manager=None, prefetch=3, cache_bytes=512 * 1024 * 1024, workers=2, thumb_height=64):
+        """
+        Initialisiert die Galerie.
+        :param classifier_manager: ClassifierManager für die Erkennung im Voraus (None = nur dekodieren).
+        :param prefetch: Anzahl der Bilder, die vor und hinter dem aktuellen Bild vorbereitet werden.
+        :param cache_bytes: Speichergrenze des Bild-Caches in Bytes.
+        :param workers: Anzahl der Worker-Threads.
+        :param thumb_height: Höhe der Vorschaubilder in Pixeln.
+        """
+
+        self.classifier_manager = classifier_manager
+        self.prefetch = prefetch
+        self.cache_bytes = cache_bytes
+        self.thumb_height = thumb_height
+        self.executor = BoundedExecutor(workers, 2 * prefetch + 2)
+        self.lock = threading.Lock()
+        self.files = []
+        self.folder = None
+        self.index = 0
+        self.params = None # Parameter-Schnappschuss für die Erkennung im Voraus
+        self.cache = OrderedDict() # Pfad -> {"image", "objects", "params", "bytes"}
+        self.cached_bytes = 0
+        self.pending = {} # Pfad -> Future
+        self.generation = 0 # Wird von invalidate() erhöht; ältere Aufträge speichern keine Objekte
+        self.thumbs = OrderedDict() # Pfad -> Vorschaubild (RGB)
+        self.counters = {"hits": 0, "in_progress": 0, "misses": 0, "decoded": 0, "detected": 0, "evicted": 0,
+                         "decode_ms": 0.0, "detect_ms": 0.0}
+
+    # Öffnet einen Bildordner.
+    def open(self, folder, params=None):
+        """
+        Öffnet einen Bildordner und beginnt mit dem Vorbereiten der ersten Bilder.
+        :param folder: Pfad zum Ordner.
+        :param params: DetectionParams für die Erkennung im Voraus (None = ohne Erkennung).
+        :return: Anzahl der Bilder im Ordner
+        """
+
+        try:
+            files = sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                           if name.lower().endswith(IMAGE_EXTENSIONS))
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Öffnen des Ordners: {e}")
+            return 0
+        self.clear()
+        self.folder, self.files, self.index, self.params = folder, files, 0, params
+        self._schedule()
+        return len(files)
+
+    # Setzt den Parameter-Schnappschuss für die Erkennung im Voraus.
+    def set_params(self, params):
+        """
+        Setzt den Parameter-Schnappschuss (z. B. nach einer Slider-Änderung). Vorbereitete Ergebnisse mit anderen
+        Parametern werden im Hintergrund neu berechnet.
+        :param params: DetectionParams oder None.
+        :return: None
+        """
+
+        if params != self.params:
+            self.params = params
+            self._schedule()
+
+    # Verwirft alle Erkennungsergebnisse (z. B. nach einem Wechsel der zusätzlichen Durchläufe).
+    def invalidate(self):
+        """
+        Verwirft die Erkennungsergebnisse im Cache (die dekodierten Bilder bleiben) und plant die Auswertung neu.
+        :return: None
+        """
+
+        with self.lock:
+            self.generation += 1
+            for path, entry in self.cache.items():
+                if entry["params"] is not None:
+                    self.cache[path] = dict(entry, objects=None, params=None)
+        self._schedule()
+
+    # Liefert den Pfad des aktuellen Bildes.
+    def current_path(self):
+        """
+        :return: Pfad des aktuellen Bildes oder None.
+        """
+
+        return self.files[self.index] if self.files else None
+
+    # Wechselt zu einem Bild.
+    def goto(self, index):
+        """
+        Wechselt zu einem Bild und bereitet die Nachbarbilder vor.
+        :param index: Index des Bildes (wird auf den gültigen Bereich begrenzt).
+        :return: Eintrag des Bildes (siehe get()) oder None
+        """
+
+        if not self.files:
+            return None
+        self.index = min(max(index, 0), len(self.files) - 1)
+        entry = self.get(self.index)
+        self._schedule()
+        return entry
+
+    # Wechselt zum nächsten Bild.
+    def next(self):
+        """
+        :return: Eintrag des nächsten Bildes (siehe get()) oder None
+        """
+
+        return self.goto(self.index + 1)
+
+    # Wechselt zum vorherigen Bild.
+    def previous(self):
+        """
+        :return: Eintrag des vorherigen Bildes (siehe get()) oder None
+        """
+
+        return self.goto(self.index - 1)
+
+    # Liefert ein Bild mit Erkennungsergebnis (aus dem Cache oder sofort dekodiert, ohne Erkennung).
+    def get(self, index):
+        """
+        Liefert ein Bild, ohne auf laufende Aufträge zu warten: fehlt es im Cache, wird es im aufrufenden Thread nur
+        dekodiert (die Erkennung läuft im Hintergrund, siehe objects()). Das Bild darf nicht verändert werden
+        (es liegt im Cache); zum Zeichnen vorher kopieren.
+        :param index: Index des Bildes.
+        :return: Dictionary {"path", "image" (RGB), "objects" (oder None, falls nicht mit den aktuellen Parametern
+                 ausgewertet)} oder None, falls das Bild nicht geladen werden kann.
+        """
+
+        path = self.files[index]
+        with self.lock:
+            entry = self.cache.get(path)
+            if entry is not None:
+                self.cache.move_to_end(path)
+                self.counters["hits"] += 1
+            elif path in self.pending:
+                self.counters["in_progress"] += 1 # Auftrag läuft: trotzdem selbst dekodieren statt zu warten
+            else:
+                self.counters["misses"] += 1
+
+        if entry is None:
+            entry = self._load(path, None)
+        if entry is None:
+            return None
+        return {"path": path, "image": entry["image"], "objects": self._objects(entry)}
+
+    # Liefert die Objekte eines Bildes, sobald sie mit den aktuellen Parametern ausgewertet sind.
+    def objects(self, index):
+        """
+        :param index: Index des Bildes.
+        :return: NumPy-Array (N, 4) oder None, solange die Auswertung im Hintergrund noch läuft (sie wird bei
+                 Bedarf eingeplant).
+        """
+
+        path = self.files[index]
+        with self.lock:
+            entry = self.cache.get(path)
+            scheduled = path in self.pending
+        objects = self._objects(entry) if entry is not None else None
+        if objects is None and not scheduled:
+            self._schedule()
+        return objects
+
+    # Liefert die Objekte eines Eintrags, falls sie zu den aktuellen Parametern passen.
+    def _objects(self, entry):
+        params = self.params
+        return entry["objects"] if params is not None and entry["params"] == params else None
+
+    # Speichert ein Erkennungsergebnis für ein Bild (z. B. nachdem die Anzeige selbst erkannt hat).
+    def store_objects(self, path, params, objects):
+        """
+        :param path: Pfad des Bildes.
+        :param params: Verwendeter Parameter-Schnappschuss.
+        :param objects: Erkannte Objekte.
+        :return: None
+        """
+
+        with self.lock:
+            entry = self.cache.get(path)
+            if entry is not None:
+                self.cache[path] = dict(entry, objects=objects, params=params)
+
+    # Dekodiert ein Bild und wertet es aus (läuft im Worker oder bei einem Cache-Fehltreffer im aufrufenden Thread).
+    def _load(self, path, params):
+        try:
+            with self.lock:
+                entry = self.cache.get(path)
+                generation = self.generation
+            if entry is None:
+                t0 = time.perf_counter()
+                image = cv2.imread(path)
+                if image is None:
+                    print(f"Fehler: Datei {path} konnte nicht geladen werden.")
+                    return None
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                entry = {"image": image, "objects": None, "params": None, "bytes": image.nbytes}
+                with self.lock:
+                    self.counters["decoded"] += 1
+                    self.counters["decode_ms"] += (time.perf_counter() - t0) * 1000
+
+            if params is not None and self.classifier_manager is not None and entry["params"] != params:
+                t0 = time.perf_counter()
+                objects = self.classifier_manager.detect_image(entry["image"], params)
+                if objects is None:
+                    return None
+                with self.lock:
+                    if generation != self.generation: # Während der Erkennung verworfen: nur das Bild behalten
+                        params, objects = None, None
+                entry = dict(entry, objects=objects, params=params) # Neuer Eintrag: andere Threads lesen den alten
+                with self.lock:
+                    self.counters["detected"] += 1
+                    self.counters["detect_ms"] += (time.perf_counter() - t0) * 1000
+
+            return self._put(path, entry)
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Vorbereiten des Bildes {path}: {e}")
+            return None
+
+    # Legt einen Eintrag in den Cache und verdrängt die am längsten nicht verwendeten Einträge.
+    def _put(self, path, entry):
+        with self.lock:
+            previous = self.cache.pop(path, None)
+            if previous is not None:
+                self.cached_bytes -= previous["bytes"]
+                if entry["params"] is None and previous["params"] is not None:
+                    entry = previous # Nur dekodiert: ein inzwischen ausgewerteter Eintrag bleibt erhalten
+            self.cache[path] = entry
+            self.cached_bytes += entry["bytes"]
+            current = self.files[self.index] if self.files else None
+            for old_path in list(self.cache):
+                if self.cached_bytes <= self.cache_bytes or len(self.cache) <= 1:
+                    break
+                if old_path in (current, path): # Aktuelles und gerade geladenes Bild nie verdrängen
+                    continue
+                self.cached_bytes -= self.cache.pop(old_path)["bytes"]
+                self.counters["evicted"] += 1
+        return entry
+
+    # Plant die Vorbereitung der Nachbarbilder und bricht veraltete Aufträge ab.
+    def _schedule(self):
+        if not self.files:
+            return
+        # Reihenfolge: abwechselnd vorwärts und rückwärts, nähere Bilder zuerst
+        window = [self.index]
+        for distance in range(1, self.prefetch + 1):
+            window += [self.index + distance, self.index - distance]
+        window = [self.files[i] for i in window if 0 <= i < len(self.files)]
+
+        with self.lock:
+            for path, future in list(self.pending.items()):
+                if path not in window and future.cancel():
+                    del self.pending[path]
+            todo = [path for path in window if path not in self.pending and
+                    (path not in self.cache or (self.params is not None and self.cache[path]["params"] != self.params))]
+
+        for path in todo:
+            future = self.executor.submit(self._load, path, self.params, blocking=False)
+            if future is None: # Warteschlange voll: die übrigen Bilder beim nächsten Wechsel
+                break
+            with self.lock:
+                self.pending[path] = future
+            future.add_done_callback(lambda f, p=path: self._done(p, f))
+
+    # Entfernt einen abgeschlossenen Auftrag.
+    def _done(self, path, future):
+        with self.lock:
+            if self.pending.get(path) is future:
+                del self.pending[path]
+
+    # Liefert ein Vorschaubild aus einer verkleinerten Dekodierung.
+    def thumbnail(self, index):
+        """
+        Liefert ein Vorschaubild. JPEG-Dateien werden direkt verkleinert dekodiert (1/2 bis 1/8 der Auflösung),
+        sodass nur ein Bruchteil der Pixel entsteht.
+        :param index: Index des Bildes.
+        :return: Vorschaubild (RGB, Höhe thumb_height) oder None
+        """
+
+        path = self.files[index]
+        with self.lock:
+            thumb = self.thumbs.get(path)
+            if thumb is not None:
+                self.thumbs.move_to_end(path)
+                return thumb
+            entry = self.cache.get(path)
+        try:
+            if entry is not None: # Bereits vollständig dekodiert: daraus verkleinern
+                image = entry["image"]
+            else:
+                image = cv2.imread(path, cv2.IMREAD_REDUCED_COLOR_8)
+                if image is None:
+                    return None
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            width = max(int(image.shape[1] * self.thumb_height / image.shape[0]), 1)
+            thumb = cv2.resize(image, (width, self.thumb_height), interpolation=cv2.INTER_AREA)
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Erstellen des Vorschaubildes: {e}")
+            return None
+        with self.lock:
+            self.thumbs[path] = thumb
+            while len(self.thumbs) > 256:
+                self.thumbs.popitem(last=False)
+        return thumb
+
+    # Setzt die Vorschaubilder um das aktuelle Bild zu einem Streifen zusammen.
+    def thumbnail_strip(self, count=7):
+        """
+        :param count: Anzahl der Vorschaubilder (das aktuelle Bild in der Mitte, grün umrandet).
+        :return: Streifen (RGB) oder None
+        """
+
+        if not self.files:
+            return None
+        start = min(max(self.index - count // 2, 0), max(len(self.files) - count, 0))
+        parts = []
+        for i in range(start, min(start + count, len(self.files))):
+            thumb = self.thumbnail(i)
+            if thumb is None:
+                continue
+            if i == self.index:
+                thumb = cv2.rectangle(thumb.copy(), (0, 0), (thumb.shape[1] - 1, thumb.shape[0] - 1), (0, 255, 0), 3)
+            parts += [thumb, np.zeros((self.thumb_height, 4, 3), dtype=np.uint8)]
+        return np.hstack(parts[:-1]) if parts else None
+
+    # Liefert die Zähler der Galerie.
+    def get_stats(self):
+        """
+        :return: Dictionary mit Cache-Treffern, Fehltreffern während eines laufenden Auftrags, übrigen Fehltreffern,
+                 dekodierten und ausgewerteten Bildern, verdrängten Einträgen, mittlerer Dekodier- und Erkennungszeit
+                 sowie Größe des Caches.
+        """
+
+        with self.lock:
+            stats = dict(self.counters)
+            stats.update(cached=len(self.cache), cached_mb=round(self.cached_bytes / 1024 / 1024, 1),
+                         pending=len(self.pending))
+        stats["decode_ms"] = round(stats["decode_ms"] / max(stats["decoded"], 1), 2)
+        stats["detect_ms"] = round(stats["detect_ms"] / max(stats["detected"], 1), 2)
+        return stats
+
+    # Leert Cache und Warteschlange.
+    def clear(self):
+        """
+        Bricht wartende Aufträge ab und leert den Cache.
+        :return: None
+        """
+
+        with self.lock:
+            for future in self.pending.values():
+                future.cancel()
+            self.pending.clear()
+            self.cache.clear()
+            self.thumbs.clear()
+            self.cached_bytes = 0
+        self.files = []
+
+    # Beendet die Galerie.
+    def close(self):
+        """
+        Leert den Cache und beendet die Worker-Threads.
+        :return: None
+        """
+
+        self.clear()
+        self.executor.shutdown(wait=False)
+
+
+# Blättert durch einen Ordner und misst die Wartezeit beim Wechsel (ohne und mit Vorbereitung im Hintergrund).
+if __name__ == "__main__":
+    import argparse
+    import json
+    from classifiermanager import ClassifierManager
+
+    parser = argparse.ArgumentParser(description="Galerie: Wartezeit beim Blättern mit und ohne Vorbereitung messen")
+    parser.add_argument("folder", help="Bildordner")
+    parser.add_argument("--classifier", default="face")
+    parser.add_argument("--view-ms", type=float, default=300, help="Betrachtungszeit pro Bild")
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--prefetch", type=int, default=3)
+    args = parser.parse_args()
+
+    manager = ClassifierManager()
+    params = manager.snapshot_params(args.classifier)
+
+    # Ohne Vorbereitung: wie bisher jedes Bild beim Wechsel laden, umwandeln und auswerten
+    def run_plain():
+        files = sorted(os.path.join(args.folder, f) for f in os.listdir(args.folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+        waits = []
+        for step in range(args.steps):
+            t0 = time.perf_counter()
+            image = cv2.cvtColor(cv2.imread(files[step % len(files)]), cv2.COLOR_BGR2RGB)
+            manager.detect_image(image, params)
+            waits.append((time.perf_counter() - t0) * 1000)
+            time.sleep(args.view_ms / 1000)
+        return waits
+
+    def run_gallery():
+        gallery = GalleryManager(manager, prefetch=args.prefetch)
+        gallery.open(args.folder, params)
+        waits = []
+        for step in range(args.steps):
+            t0 = time.perf_counter()
+            entry = gallery.goto(step % len(gallery.files))
+            if entry["objects"] is None: # Zum Vergleich mit run_plain() hier auf das Ergebnis warten
+                manager.detect_image(entry["image"], params)
+            gallery.thumbnail_strip()
+            waits.append((time.perf_counter() - t0) * 1000)
+            time.sleep(args.view_ms / 1000)
+        stats = gallery.get_stats()
+        gallery.close()
+        return waits, stats
+
+    manager.detect(np.zeros((100, 100, 3), dtype=np.uint8), params) # Aufwärmen
+    plain = run_plain()
+    waits, stats = run_gallery()
+    print(json.dumps({"plain_ms": {"p50": round(float(np.percentile(plain, 50)), 1), "p95": round(float(np.percentile(plain, 95)), 1)},
+                      "gallery_ms": {"p50": round(float(np.percentile(waits, 50)), 1), "p95": round(float(np.percentile(waits, 95)), 1)},
+                      "stats": stats}, indent=2))
+    manager.shutdown()
@@ -0,0 +1,489 @@
+import time
+import xml.etree.ElementTree as ET
+import cv2
+import numpy as np
+
+
+THRESHOLD_EPS = np.float32(1e-5) # Wie in OpenCV: wird beim Laden von jeder Stufenschwelle abgezogen
+GROUP_EPS = 0.2 # Wie in OpenCV: Toleranz für groupRectangles()
+
+
+# Haar-Cascade als flache NumPy-Arrays (Stufen, schwache Klassifizierer, Knoten, Rechtecke).
+class HaarCascade:
+    """
+    Haar-Cascade als flache NumPy-Arrays.
+
+    Attribute: window_size (tuple): Fenstergröße (Breite, Höhe) des Trainings.
+               stage_thresholds (np.ndarray): Schwelle pro Stufe (float32, bereits um THRESHOLD_EPS verringert).
+               stage_weak_start (np.ndarray): Index des ersten schwachen Klassifizierers pro Stufe (Länge S+1).
+               weak_node_start (np.ndarray): Index des ersten Knotens pro schwachem Klassifizierer (Länge W+1).
+               weak_leaf_start (np.ndarray): Index des ersten Blatts pro schwachem Klassifizierer (Länge W+1).
+               node_left, node_right (np.ndarray): Nachfolger pro Knoten (> 0: Knoten, <= 0: Blatt -Wert).
+               node_feature (np.ndarray): Feature-Index pro Knoten.
+               node_threshold (np.ndarray): Schwelle pro Knoten (float32).
+               leaves (np.ndarray): Blattwerte (float32).
+               feature_rect_start (np.ndarray): Index des ersten Rechtecks pro Feature (Länge F+1).
+               rects (np.ndarray): Rechtecke (x, y, w, h) aller Features.
+               rect_weights (np.ndarray): Gewicht pro Rechteck (float32).
+               feature_tilted (np.ndarray): True für um 45° gedrehte Features.
+    """
+
+    # Namen der Arrays (werden auch vom Cascade-Compiler verwendet)
+    ARRAY_FIELDS = ("stage_thresholds", "stage_weak_start", "weak_node_start", "weak_leaf_start",
+                    "node_left", "node_right", "node_feature", "node_threshold", "leaves",
+                    "feature_rect_start", "rects", "rect_weights", "feature_tilted")
+
+    # Initialisiert den Cascade aus fertigen Arrays.
+    def __init__(self, window_size, arrays):
+        """
+        Initialisiert den Cascade aus fertigen Arrays.
+        :param window_size: Fenstergröße (Breite, Höhe).
+        :param arrays: Dictionary mit allen Arrays aus ARRAY_FIELDS.
+        """
+
+        self.window_size = (int(window_size[0]), int(window_size[1]))
+        for name in self.ARRAY_FIELDS:
+            setattr(self, name, arrays[name])
+
+    # Anzahl der Stufen.
+    @property
+    def num_stages(self):
+        return len(self.stage_thresholds)
+
+    # Liefert alle Arrays als Dictionary.
+    def arrays(self):
+        """
+        Liefert alle Arrays als Dictionary.
+        :return: Dictionary {Name: np.ndarray}
+        """
+
+        return {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+
+    # Lädt einen Haar-Cascade aus einer OpenCV-XML-Datei.
+    @classmethod
+    def from_xml(cls, path):
+        """
+        Lädt einen Haar-Cascade aus einer OpenCV-XML-Datei (Format von opencv_traincascade).
+        :param path: Pfad zur XML-Datei.
+        :return: HaarCascade
+        """
+
+        root = ET.parse(path).getroot()
+        cascade = root.find("cascade")
+        if cascade is None:
+            cascade = root[0] if len(root) else None
+        if cascade is None or cascade.find("stages") is None or cascade.find("features") is None:
+            raise ValueError(f"Kein unterstütztes Cascade-Format (altes haartraining-Format?): {path}")
+        feature_type = cascade.findtext("featureType", "HAAR").strip().upper()
+        if feature_type != "HAAR":
+            raise ValueError(f"Nur Haar-Features werden unterstützt, nicht {feature_type}: {path}")
+
+        window_size = (int(cascade.findtext("width")), int(cascade.findtext("height")))
+
+        stage_thresholds, stage_weak_start = [], [0]
+        weak_node_start, weak_leaf_start = [0], [0]
+        node_left, node_right, node_feature, node_threshold, leaves = [], [], [], [], []
+        for stage in cascade.find("stages"):
+            stage_thresholds.append(np.float32(float(stage.findtext("stageThreshold"))) - THRESHOLD_EPS)
+            weak_classifiers = stage.find("weakClassifiers")
+            for weak in weak_classifiers:
+                values = weak.findtext("internalNodes").split()
+                for i in range(0, len(values), 4):
+                    node_left.append(int(values[i]))
+                    node_right.append(int(values[i + 1]))
+                    node_feature.append(int(values[i + 2]))
+                    node_threshold.append(float(values[i + 3]))
+                leaves.extend(float(v) for v in weak.findtext("leafValues").split())
+                weak_node_start.append(len(node_left))
+                weak_leaf_start.append(len(leaves))
+            stage_weak_start.append(len(weak_node_start) - 1)
+
+        feature_rect_start, rects, rect_weights, feature_tilted = [0], [], [], []
+        for feature in cascade.find("features"):
+            for rect in feature.find("rects"):
+                values = rect.text.split()
+                rects.append([int(v) for v in values[:4]])
+                rect_weights.append(float(values[4]))
+            feature_rect_start.append(len(rects))
+            feature_tilted.append(feature.findtext("tilted", "0").strip() == "1")
+
+        arrays = {
+            "stage_thresholds": np.array(stage_thresholds, dtype=np.float32),
+            "stage_weak_start": np.array(stage_weak_start, dtype=np.int32),
+            "weak_node_start": np.array(weak_node_start, dtype=np.int32),
+            "weak_leaf_start": np.array(weak_leaf_start, dtype=np.int32),
+            "node_left": np.array(node_left, dtype=np.int32),
+            "node_right": np.array(node_right, dtype=np.int32),
+            "node_feature": np.array(node_feature, dtype=np.int32),
+            "node_threshold": np.array(node_threshold, dtype=np.float32),
+            "leaves": np.array(leaves, dtype=np.float32),
+            "feature_rect_start": np.array(feature_rect_start, dtype=np.int32),
+            "rects": np.array(rects, dtype=np.int32).reshape(-1, 4),
+            "rect_weights": np.array(rect_weights, dtype=np.float32),
+            "feature_tilted": np.array(feature_tilted, dtype=bool)
+        }
+        return cls(window_size, arrays)
+
+
+# Vorberechnete Daten einer Stufe für die vektorisierte Auswertung.
+class _StageData:
+    """
+    Vorberechnete Daten einer Stufe: alle Rechteck-Ecken der Stufe und eine Matrix,
+    die die Eckwerte (mit Vorzeichen und Gewicht) zu Feature-Werten pro Knoten aufsummiert.
+    """
+
+    SIGNS = np.array([1, -1, -1, 1], dtype=np.float64) # Vorzeichen der vier Ecken einer Rechtecksumme
+
+    def __init__(self, cascade, stage_idx):
+        weak_first = cascade.stage_weak_start[stage_idx]
+        weak_last = cascade.stage_weak_start[stage_idx + 1]
+        node_first = cascade.weak_node_start[weak_first]
+        node_last = cascade.weak_node_start[weak_last]
+        num_nodes = node_last - node_first
+
+        self.threshold = float(cascade.stage_thresholds[stage_idx])
+        self.node_threshold = cascade.node_threshold[node_first:node_last].astype(np.float64)
+
+        # Rechtecke aller Knoten der Stufe (ein Feature kann mehrfach vorkommen)
+        features = cascade.node_feature[node_first:node_last]
+        rect_first = cascade.feature_rect_start[features]
+        counts = cascade.feature_rect_start[features + 1] - rect_first
+        columns = np.repeat(np.arange(num_nodes), counts)
+        rect_idx = np.repeat(rect_first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        self.rects = cascade.rects[rect_idx].astype(np.int64).reshape(-1, 4)
+        self.tilted = cascade.feature_tilted[np.repeat(features, counts)]
+
+        # Matrix (4 * Rechtecke) x Knoten: Eckwerte -> Feature-Werte
+        weights = cascade.rect_weights[rect_idx].astype(np.float64)
+        self.matrix = np.zeros((4 * len(rect_idx), num_nodes), dtype=np.float64)
+        self.matrix[np.arange(4 * len(rect_idx)), np.repeat(columns, 4)] = np.tile(self.SIGNS, len(rect_idx)) * np.repeat(weights, 4)
+
+        # Stümpfe (ein Knoten pro schwachem Klassifizierer) werden komplett vektorisiert ausgewertet
+        node_counts = np.diff(cascade.weak_node_start[weak_first:weak_last + 1])
+        self.is_stump = bool(np.all(node_counts == 1))
+        leaf_first = cascade.weak_leaf_start[weak_first:weak_last]
+        if self.is_stump:
+            left = cascade.node_left[node_first:node_last]
+            right = cascade.node_right[node_first:node_last]
+            self.left_value = cascade.leaves[leaf_first - left].astype(np.float64)
+            self.right_value = cascade.leaves[leaf_first - right].astype(np.float64)
+        else:
+            self.trees = []
+            for w in range(weak_first, weak_last):
+                n0 = cascade.weak_node_start[w]
+                self.trees.append((n0 - node_first, cascade.weak_node_start[w + 1] - n0, cascade.weak_leaf_start[w]))
+            self.node_left = cascade.node_left[node_first:node_last]
+            self.node_right = cascade.node_right[node_first:node_last]
+            self.leaves = cascade.leaves.astype(np.float64)
+
+    # Berechnet die Offsets der Rechteck-Ecken relativ zur linken oberen Fensterecke.
+    def offsets(self, stride, tilted_base):
+        """
+        :param stride: Zeilenlänge des Integralbilds.
+        :param tilted_base: Offset der gedrehten Integralbilder im gemeinsamen Puffer.
+        :return: Array mit 4 Offsets pro Rechteck (Länge 4 * Rechtecke).
+        """
+
+        x, y, w, h = self.rects[:, 0], self.rects[:, 1], self.rects[:, 2], self.rects[:, 3]
+        upright = np.stack([y * stride + x, y * stride + x + w,
+                            (y + h) * stride + x, (y + h) * stride + x + w], axis=1)
+        rotated = np.stack([y * stride + x, (y + h) * stride + x - h,
+                            (y + w) * stride + x + w, (y + w + h) * stride + x + w - h], axis=1) + tilted_base
+        return np.where(self.tilted[:, None], rotated, upright).reshape(-1)
+
+    # Wertet die Stufe für einen Block von Fenstern aus.
+    def evaluate(self, buffer, base, inv_norm, offsets):
+        """
+        :param buffer: Gemeinsamer Puffer aller Integralbilder (flach).
+        :param base: Index der linken oberen Fensterecke pro Fenster.
+        :param inv_norm: Varianz-Normierung pro Fenster.
+        :param offsets: Ergebnis von offsets().
+        :return: Bool-Array: True für Fenster, die die Stufe bestehen.
+        """
+
+        corners = buffer[base[:, None] + offsets[None, :]]
+        values = (corners @ self.matrix) * inv_norm[:, None]
+        if self.is_stump:
+            stage_sum = np.where(values < self.node_threshold, self.left_value, self.right_value).sum(axis=1)
+        else:
+            stage_sum = np.zeros(len(base))
+            rows = np.arange(len(base))
+            for node_start, node_count, leaf_start in self.trees:
+                idx = np.zeros(len(base), dtype=np.int64)
+                active = np.ones(len(base), dtype=bool)
+                for _ in range(node_count): # Baumtiefe ist höchstens die Anzahl der Knoten
+                    node = node_start + idx
+                    go_left = values[rows, node] < self.node_threshold[node]
+                    nxt = np.where(go_left, self.node_left[node], self.node_right[node])
+                    idx = np.where(active, nxt, idx)
+                    active &= idx > 0
+                    if not active.any():
+                        break
+                stage_sum += self.leaves[leaf_start - idx]
+        return stage_sum >= self.threshold
+
+
+# Vektorisierte Auswertung eines Haar-Cascades mit NumPy (Alternative zu cv2.CascadeClassifier).
+class HaarEvaluator:
+    """
+    Vektorisierte Auswertung eines Haar-Cascades mit NumPy.
+
+    Bildet das Verhalten von cv2.CascadeClassifier.detectMultiScale() nach (Bildpyramide, Schrittweite,
+    Varianz-Normierung, groupRectangles), wertet aber jede Stufe für alle Kandidatenfenster einer Skalierung
+    gleichzeitig aus und behält nach jeder Stufe nur die überlebenden Fenster.
+    Nach jedem Aufruf stehen in last_stats die überlebenden Fenster und die Zeit pro Stufe.
+    """
+
+    # Initialisiert den Evaluator.
+    def __init__(self, cascade, chunk_size=8192):
+        """
+        Initialisiert den Evaluator.
+        :param cascade: HaarCascade oder Pfad zu einer XML-Datei.
+        :param chunk_size: Maximale Anzahl an Fenstern, die gleichzeitig ausgewertet werden (begrenzt den Speicher).
+        """
+
+        if isinstance(cascade, str):
+            cascade = HaarCascade.from_xml(cascade)
+        self.cascade = cascade
+        self.chunk_size = chunk_size
+        self.stages = [_StageData(cascade, s) for s in range(cascade.num_stages)]
+        self.has_tilted = bool(np.any(cascade.feature_tilted))
+        self.last_stats = None
+
+    # Für Kompatibilität mit cv2.CascadeClassifier.
+    def empty(self):
+        return self.cascade.num_stages == 0
+
+    # Berechnet die Skalierungsfaktoren wie cv2.CascadeClassifier.
+    def _scales(self, image_size, scaleFactor, minSize, maxSize):
+        """
+        :return: Liste der Skalierungsfaktoren (float32 wie in OpenCV).
+        """
+
+        win_w, win_h = self.cascade.window_size
+        img_w, img_h = image_size
+        max_w, max_h = maxSize if maxSize[0] and maxSize[1] else (img_w, img_h)
+        scales = []
+        factor = 1.0
+        while True:
+            w, h = round(win_w * factor), round(win_h * factor)
+            if w > max_w or h > max_h or w > img_w or h > img_h:
+                break
+            if w >= minSize[0] and h >= minSize[1]:
+                scales.append(np.float32(factor))
+            factor *= scaleFactor
+        return scales
+
+    # Erstellt den gemeinsamen Puffer der Integralbilder für einen Stapel gleich großer Bilder.
+    def _integrals(self, images):
+        """
+        :param images: Array (N, H, W) vom Typ uint8.
+        :return: (Puffer aus Summen- und ggf. gedrehten Integralbildern, Quadratsummen-Integralbilder, Zeilenlänge, Ebenengröße)
+        """
+
+        n, h, w = images.shape
+        pixels = images.astype(np.float64)
+        integral = np.zeros((n, h + 1, w + 1))
+        integral[:, 1:, 1:] = pixels.cumsum(axis=1).cumsum(axis=2)
+        sq_integral = np.zeros((n, h + 1, w + 1))
+        sq_integral[:, 1:, 1:] = (pixels * pixels).cumsum(axis=1).cumsum(axis=2)
+
+        planes = [integral.reshape(-1)]
+        if self.has_tilted:
+            planes.append(tilted_integral(pixels).reshape(-1))
+        return np.concatenate(planes), sq_integral.reshape(-1), w + 1, (h + 1) * (w + 1)
+
+    # Wertet alle Stufen für einen Stapel von Bildern auf einer Skalierung aus.
+    def _evaluate_scale(self, images, scale, stats):
+        """
+        :param images: Skalierte Bilder (N, H, W).
+        :param scale: Skalierungsfaktor (float32).
+        :param stats: Statistik-Dictionary, wird ergänzt.
+        :return: Liste mit Kandidaten-Rechtecken pro Bild.
+        """
+
+        n, h, w = images.shape
+        win_w, win_h = self.cascade.window_size
+        step = 1 if scale >= 2 else 2
+        buffer, sq_buffer, stride, plane = self._integrals(images)
+        tilted_base = n * plane
+
+        # Fensterraster wie in OpenCV: x in [0, w - win_w], y in [0, h - win_h]
+        xs = np.arange(0, w - win_w + 1, step)
+        ys = np.arange(0, h - win_h + 1, step)
+        if len(xs) == 0 or len(ys) == 0:
+            return [[] for _ in range(n)]
+        frame_idx, y_grid, x_grid = np.meshgrid(np.arange(n), ys, xs, indexing="ij")
+        base = (frame_idx * plane + y_grid * stride + x_grid).reshape(-1)
+
+        # Varianz-Normierung über das um 1 Pixel verkleinerte Fenster
+        area = (win_w - 2) * (win_h - 2)
+        n0 = stride + 1
+        n1, n2, n3 = n0 + win_w - 2, n0 + (win_h - 2) * stride, n0 + (win_h - 2) * stride + win_w - 2
+        window_sum = buffer[base + n0] - buffer[base + n1] - buffer[base + n2] + buffer[base + n3]
+        window_sq = sq_buffer[base + n0] - sq_buffer[base + n1] - sq_buffer[base + n2] + sq_buffer[base + n3]
+        nf = area * window_sq - window_sum * window_sum
+        valid = nf > 0
+        inv_norm = np.zeros_like(nf)
+        inv_norm[valid] = (1.0 / np.sqrt(nf[valid])).astype(np.float32)
+        valid &= area * inv_norm < 0.1 # OpenCV verwirft Fenster mit sehr geringer Varianz
+
+        stats["windows"] += int(valid.sum())
+        alive = np.flatnonzero(valid)
+        for stage_idx, stage in enumerate(self.stages):
+            t0 = time.perf_counter()
+            offsets = stage.offsets(stride, tilted_base)
+            passed = np.empty(len(alive), dtype=bool)
+            for i in range(0, len(alive), self.chunk_size):
+                chunk = alive[i:i + self.chunk_size]
+                passed[i:i + self.chunk_size] = stage.evaluate(buffer, base[chunk], inv_norm[chunk], offsets)
+
+            if stage_idx == 0:
+                # OpenCV überspringt nach einer Ablehnung in Stufe 0 die nächste Position in der Zeile
+                failed = np.zeros(base.shape, dtype=bool)
+                failed[alive[~passed]] = True
+                skipped = _skipped_positions(failed.reshape(n * len(ys), len(xs))).reshape(-1)
+                alive = alive[passed & ~skipped[alive]]
+            else:
+                alive = alive[passed]
+
+            stage_stats = stats["stages"][stage_idx]
+            stage_stats["survivors"] += len(alive)
+            stage_stats["time_ms"] += (time.perf_counter() - t0) * 1000
+            if len(alive) == 0:
+                break
+
+        # Überlebende Fenster in Rechtecke im Originalbild umrechnen
+        candidates = [[] for _ in range(n)]
+        win_size = (round(float(np.float32(win_w) * scale)), round(float(np.float32(win_h) * scale)))
+        frame_of, rest = np.divmod(alive, len(ys) * len(xs))
+        y_of, x_of = np.divmod(rest, len(xs))
+        for f, x, y in zip(frame_of, xs[x_of], ys[y_of]):
+            candidates[f].append([round(float(np.float32(x) * scale)), round(float(np.float32(y) * scale)),
+                                  win_size[0], win_size[1]])
+        return candidates
+
+    # Erkennt Objekte in einem Stapel gleich großer Graustufenbilder.
+    def detect_stack(self, images, scaleFactor=1.1, minNeighbors=3, minSize=(0, 0), maxSize=(0, 0)):
+        """
+        Erkennt Objekte in einem Stapel gleich großer Graustufenbilder mit einem Aufruf.
+        Alle Bilder werden pro Skalierung gemeinsam ausgewertet.
+        :param images: Array (N, H, W) oder Liste gleich großer Graustufenbilder (uint8).
+        :param scaleFactor: Faktor zwischen zwei Skalierungen (z. B. 1.1).
+        :param minNeighbors: Mindestanzahl an Nachbarn für groupRectangles().
+        :param minSize: Minimale Objektgröße (Breite, Höhe).
+        :param maxSize: Maximale Objektgröße (Breite, Höhe), (0, 0) = unbegrenzt.
+        :return: Liste mit einem Array (N, 4) der erkannten Rechtecke (x, y, w, h) pro Bild.
+        """
+
+        images = np.asarray(images, dtype=np.uint8)
+        if images.ndim == 2:
+            images = images[None]
+        n, img_h, img_w = images.shape
+
+        t_start = time.perf_counter()
+        stats = {"scales": 0, "windows": 0,
+                 "stages": [{"stage": s, "survivors": 0, "time_ms": 0.0} for s in range(len(self.stages))]}
+        candidates = [[] for _ in range(n)]
+        for scale in self._scales((img_w, img_h), scaleFactor, minSize, maxSize):
+            size = (round(float(np.float32(img_w) / scale)), round(float(np.float32(img_h) / scale)))
+            if scale == 1:
+                scaled = images
+            else:
+                scaled = np.stack([cv2.resize(image, size, interpolation=cv2.INTER_LINEAR_EXACT) for image in images])
+            for f, rects in enumerate(self._evaluate_scale(scaled, scale, stats)):
+                candidates[f].extend(rects)
+            stats["scales"] += 1
+
+        results = []
+        for rects in candidates:
+            # Wie in OpenCV: Rechtecke, die durch Rundung über den Bildrand ragen, abschneiden
+            rects = [[x, y, min(x + w, img_w) - x, min(y + h, img_h) - y] for x, y, w, h in rects]
+            if minNeighbors > 0 and rects:
+                rects, _ = cv2.groupRectangles(rects, minNeighbors, GROUP_EPS)
+            results.append(np.array(rects, dtype=np.int32).reshape(-1, 4))
+
+        stats["time_ms"] = (time.perf_counter() - t_start) * 1000
+        self.last_stats = stats
+        return results
+
+    # Erkennt Objekte in einem Graustufenbild (gleiche Schnittstelle wie cv2.CascadeClassifier).
+    def detectMultiScale(self, image, scaleFactor=1.1, minNeighbors=3, minSize=(0, 0), maxSize=(0, 0)):
+        """
+        Erkennt Objekte in einem Graustufenbild (gleiche Schnittstelle wie cv2.CascadeClassifier).
+        :return: Array (N, 4) der erkannten Rechtecke (x, y, w, h).
+        """
+
+        return self.detect_stack(image[None], scaleFactor, minNeighbors, minSize, maxSize)[0]
+
+
+# Berechnet, welche Positionen OpenCV nach einer Ablehnung in Stufe 0 überspringt.
+def _skipped_positions(failed):
+    """
+    OpenCV erhöht x nach einer Ablehnung in Stufe 0 zusätzlich um einen Schritt.
+    Eine Position wird also genau dann übersprungen, wenn die Folge von Ablehnungen direkt davor ungerade lang ist.
+    :param failed: Bool-Array (Zeilen, Positionen): in Stufe 0 abgelehnt.
+    :return: Bool-Array gleicher Form: übersprungene Positionen.
+    """
+
+    idx = np.arange(failed.shape[1])
+    last_pass = np.maximum.accumulate(np.where(failed, -1, idx), axis=1)
+    run_length = idx - last_pass # Länge der Ablehnungsfolge, die an dieser Position endet
+    skipped = np.zeros_like(failed)
+    skipped[:, 1:] = run_length[:, :-1] % 2 == 1
+    return skipped
+
+
+# Berechnet das um 45° gedrehte Integralbild (wie cv2.integral3) zeilenweise mit NumPy.
+def tilted_integral(images):
+    """
+    Berechnet das um 45° gedrehte Integralbild T(X, Y) = Summe über y < Y, |x - X + 1| <= Y - y - 1.
+    :param images: Array (N, H, W).
+    :return: Array (N, H + 1, W + 1) vom Typ float64.
+    """
+
+    n, h, w = images.shape
+    pad = h + 1 # Dreiecke reichen links und rechts über den Bildrand hinaus
+    padded = np.zeros((n, h, w + 2 * pad))
+    padded[:, :, pad:pad + w] = images
+    tilted = np.zeros((n, h + 1, w + 1 + 2 * pad))
+    for y in range(1, h + 1):
+        row = tilted[:, y]
+        row[:, 1:-1] = tilted[:, y - 1, :-2] + tilted[:, y - 1, 2:] + padded[:, y - 1, :-1]
+        if y >= 2:
+            row[:, 1:-1] += padded[:, y - 2, :-1] - tilted[:, y - 2, 1:-1]
+    return tilted[:, :, pad:pad + w + 1]
+
+
+# Vergleicht die NumPy-Engine mit OpenCV und gibt die Statistik pro Stufe aus.
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Haar-Cascade mit NumPy auswerten und mit OpenCV vergleichen")
+    parser.add_argument("image", help="Bilddatei")
+    parser.add_argument("--cascade", default=cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    parser.add_argument("--scaleFactor", type=float, default=1.1)
+    parser.add_argument("--minNeighbors", type=int, default=3)
+    parser.add_argument("--minSize", type=int, default=30)
+    args = parser.parse_args()
+
+    gray = cv2.imread(args.image, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise SystemExit(f"Fehler: Datei {args.image} konnte nicht geladen werden.")
+    params = dict(scaleFactor=args.scaleFactor, minNeighbors=args.minNeighbors, minSize=(args.minSize, args.minSize))
+
+    t0 = time.perf_counter()
+    reference = cv2.CascadeClassifier(args.cascade).detectMultiScale(gray, **params)
+    t_opencv = (time.perf_counter() - t0) * 1000
+    evaluator = HaarEvaluator(args.cascade)
+    result = evaluator.detectMultiScale(gray, **params)
+    stats = evaluator.last_stats
+
+    reference = {tuple(r) for r in np.array(reference).reshape(-1, 4).tolist()}
+    result = {tuple(r) for r in result.tolist()}
+    print(f"OpenCV: {len(reference)} Objekte in {t_opencv:.1f} ms, NumPy: {len(result)} Objekte in {stats['time_ms']:.1f} ms, "
+          f"übereinstimmend: {len(reference & result)}")
+    print(f"{stats['scales']} Skalierungen, {stats['windows']} Fenster")
+    print("Stufe  überlebend      Zeit [ms]")
+    for stage in stats["stages"]:
+        print(f"{stage['stage']:5d}  {stage['survivors']:10d}  {stage['time_ms']:10.1f}")
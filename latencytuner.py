@@ -0,0 +1,219 @@
+import json
+import os
+import platform
+import time
+from collections import deque
+import numpy as np
+from atomicfile import atomic_write
+
+# Datei mit den zuletzt verwendeten Einstellungen pro Rechner und Klassifizierer
+PRESETS_PATH = os.path.join(os.path.expanduser("~"), ".haarcascades", "presets.json")
+
+
+# Hält die Latenz der Erkennung durch Anpassen von scaleFactor und minSize in einem Zeitbudget.
+class LatencyTuner:
+    """
+    Regelt scaleFactor und minSize eines Klassifizierers so, dass die Latenz der Erkennung ein Zeitbudget einhält.
+    Liegt das 90. Perzentil der letzten Messungen über dem Budget, wird zuerst scaleFactor erhöht, dann minSize;
+    liegt es deutlich darunter, werden zuerst minSize, dann scaleFactor wieder gesenkt. Die Grenzen kommen aus
+    "tuneBounds" des Klassifizierers. Hysterese (Band zwischen low und high), eine Sperrzeit nach jeder Änderung
+    und das Merken zu langsamer Einstellungen verhindern ein Schwingen.
+    Jede Änderung wird protokolliert und in einer Preset-Datei pro Rechner gespeichert.
+    """
+
+    # Initialisiert den Regler.
+    def __init__(self, budget_ms=50.0, high=1.0, low=0.6, window=15, scale_step=0.05, size_step=1.25, memory_seconds=60.0,
+                 presets_path=PRESETS_PATH, machine=None):
+        """
+        Initialisiert den Regler.
+        :param budget_ms: Zeitbudget der Erkennung pro Frame in ms.
+        :param high: Oberhalb budget_ms * high wird die Erkennung beschleunigt.
+        :param low: Unterhalb budget_ms * low wird die Erkennung wieder genauer.
+        :param window: Anzahl der Messungen pro Entscheidung (nach jeder Änderung wird neu gesammelt).
+        :param scale_step: Schrittweite für scaleFactor.
+        :param size_step: Faktor für minSize.
+        :param memory_seconds: So lange wird nicht zu Einstellungen zurückgekehrt, die das Budget überschritten haben.
+        :param presets_path: Pfad der Preset-Datei (None = nicht speichern).
+        :param machine: Name des Rechners in der Preset-Datei (Standard: platform.node()).
+        """
+
+        self.budget_ms = budget_ms
+        self.high = high
+        self.low = low
+        self.window = window
+        self.scale_step = scale_step
+        self.size_step = size_step
+        self.presets_path = presets_path
+        self.machine = machine or platform.node() or "default"
+        self.latencies = {} # Letzte Messungen pro Klassifizierer
+        self.memory_seconds = memory_seconds
+        self.measured = {} # (ID, scaleFactor, minSize) -> (90. Perzentil, Zeitpunkt)
+        self.log = [] # Alle Änderungen
+        self.pending = [] # Änderungen seit dem letzten pop_changes()
+
+    # Liefert die Grenzen eines Klassifizierers.
+    def bounds(self, classifier_info):
+        """
+        :param classifier_info: Eintrag des Klassifizierers aus ClassifierManager.classifiers.
+        :return: ((scaleFactor min, max), (minSize min, max)); ohne "tuneBounds" ausgehend von den aktuellen Werten.
+        """
+
+        bounds = classifier_info.get("tuneBounds", {})
+        size = classifier_info["minSize"][0]
+        return (tuple(bounds.get("scaleFactor", (classifier_info["scaleFactor"], 1.4))),
+                tuple(bounds.get("minSize", (size, max(4 * size, 120)))))
+
+    # Trägt eine Messung ein und passt die Parameter ggf. an.
+    def observe(self, classifier_id, latency_ms, classifier_info):
+        """
+        Trägt die Latenz einer Erkennung ein und passt scaleFactor bzw. minSize im Eintrag des Klassifizierers an.
+        :param classifier_id: ID des Klassifizierers.
+        :param latency_ms: Gemessene Latenz in ms.
+        :param classifier_info: Eintrag des Klassifizierers (wird verändert).
+        :return: Protokolleintrag der Änderung oder None
+        """
+
+        latencies = self.latencies.setdefault(classifier_id, deque(maxlen=self.window))
+        latencies.append(latency_ms)
+        if len(latencies) < self.window:
+            return None
+
+        p90 = float(np.percentile(latencies, 90))
+        (scale_min, scale_max), (size_min, size_max) = self.bounds(classifier_info)
+        scale = round(float(classifier_info["scaleFactor"]), 3)
+        size = int(classifier_info["minSize"][0])
+        new_scale, new_size = scale, size
+        now = time.monotonic()
+        self.measured[(classifier_id, scale, size)] = (p90, now)
+
+        if p90 > self.budget_ms * self.high: # Zu langsam: erst scaleFactor, dann minSize erhöhen
+            if scale < scale_max:
+                new_scale = round(min(scale + self.scale_step, scale_max), 3)
+            elif size < size_max:
+                new_size = int(min(round(size * self.size_step), size_max))
+        elif p90 < self.budget_ms * self.low: # Reserve: erst minSize, dann scaleFactor senken
+            if size > size_min:
+                new_size = int(max(round(size / self.size_step), size_min))
+            elif scale > scale_min:
+                new_scale = round(max(scale - self.scale_step, scale_min), 3)
+            # Nicht zu einer Einstellung zurückkehren, die kürzlich zu langsam war (verhindert Schwingen)
+            previous = self.measured.get((classifier_id, new_scale, new_size))
+            if previous is not None and now - previous[1] < self.memory_seconds and previous[0] > self.budget_ms * self.high:
+                new_scale, new_size = scale, size
+
+        if (new_scale, new_size) == (scale, size):
+            return None
+
+        classifier_info["scaleFactor"] = new_scale
+        classifier_info["minSize"] = (new_size, new_size)
+        latencies.clear() # Sperrzeit: neue Messungen mit den neuen Parametern abwarten
+        entry = {"time": round(time.time(), 3), "classifier": classifier_id, "p90_ms": round(p90, 1),
+                 "budget_ms": self.budget_ms, "scaleFactor": [scale, new_scale], "minSize": [size, new_size]}
+        self.log.append(entry)
+        self.pending.append(entry)
+        print(f"Latenz-Regler: {self.describe(entry)}")
+        self.save_preset(classifier_id, classifier_info)
+        return entry
+
+    # Beschreibt einen Protokolleintrag.
+    def describe(self, entry):
+        """
+        :return: Kurzer Text zu einem Protokolleintrag (für Konsole und Statusleiste).
+        """
+
+        return (f"{entry['classifier']}: scaleFactor {entry['scaleFactor'][0]} -> {entry['scaleFactor'][1]}, "
+                f"minSize {entry['minSize'][0]} -> {entry['minSize'][1]} "
+                f"(90. Perzentil {entry['p90_ms']} ms, Budget {entry['budget_ms']} ms)")
+
+    # Liefert die Änderungen seit dem letzten Aufruf.
+    def pop_changes(self):
+        """
+        :return: Liste der Protokolleinträge seit dem letzten Aufruf.
+        """
+
+        changes, self.pending = self.pending, []
+        return changes
+
+    # Liest die Preset-Datei.
+    def _read_presets(self):
+        if not self.presets_path:
+            return {}
+        try:
+            with open(self.presets_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except Exception as e: # Fehlerbehandlung (z. B. beschädigte Datei)
+            print(f"Fehler beim Lesen der Presets: {e}")
+            return {}
+
+    # Speichert die aktuellen Einstellungen eines Klassifizierers für diesen Rechner.
+    def save_preset(self, classifier_id, classifier_info):
+        """
+        Speichert scaleFactor, minSize und Budget eines Klassifizierers für diesen Rechner in der Preset-Datei.
+        :return: True, wenn gespeichert wurde, sonst False.
+        """
+
+        if not self.presets_path:
+            return False
+        try:
+            presets = self._read_presets()
+            presets.setdefault(self.machine, {})[classifier_id] = {
+                "scaleFactor": classifier_info["scaleFactor"], "minSize": list(classifier_info["minSize"]),
+                "budget_ms": self.budget_ms}
+            with atomic_write(self.presets_path, "w", encoding="utf-8") as file:
+                json.dump(presets, file, indent=2)
+            return True
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Speichern der Presets: {e}")
+            return False
+
+    # Übernimmt die gespeicherten Einstellungen dieses Rechners.
+    def apply_presets(self, classifiers):
+        """
+        Übernimmt die zuletzt verwendeten Einstellungen dieses Rechners (innerhalb der Grenzen) in die Klassifizierer.
+        :param classifiers: Dictionary ClassifierManager.classifiers (wird verändert).
+        :return: Liste der IDs, für die Einstellungen übernommen wurden.
+        """
+
+        applied = []
+        for classifier_id, preset in self._read_presets().get(self.machine, {}).items():
+            classifier_info = classifiers.get(classifier_id)
+            if classifier_info is None:
+                continue
+            (scale_min, scale_max), (size_min, size_max) = self.bounds(classifier_info)
+            size = int(min(max(preset["minSize"][0], size_min), size_max))
+            classifier_info["scaleFactor"] = round(min(max(float(preset["scaleFactor"]), scale_min), scale_max), 3)
+            classifier_info["minSize"] = (size, size)
+            applied.append(classifier_id)
+        return applied
+
+
+# Regelt die Erkennung auf einem Beispielbild und gibt die Änderungen aus.
+if __name__ == "__main__":
+    import argparse
+    import cv2
+    from classifiermanager import ClassifierManager
+
+    parser = argparse.ArgumentParser(description="Latenz-Regler für scaleFactor und minSize testen")
+    parser.add_argument("image", help="Beispielbild (wird als Kamerabild wiederholt)")
+    parser.add_argument("--budget", type=float, default=50, help="Zeitbudget in ms")
+    parser.add_argument("--classifier", default="face")
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--no-presets", action="store_true", help="Preset-Datei weder lesen noch schreiben")
+    args = parser.parse_args()
+
+    manager = ClassifierManager()
+    tuner = manager.enable_latency_tuner(args.budget, presets_path=None if args.no_presets else PRESETS_PATH)
+    image = cv2.imread(args.image)
+    latencies = []
+    for _ in range(args.frames):
+        t0 = time.perf_counter()
+        manager.detect_faces(image, args.classifier)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    info = manager.classifiers[args.classifier]
+    print(json.dumps({"changes": len(tuner.log), "scaleFactor": info["scaleFactor"], "minSize": info["minSize"][0],
+                      "first_ms": round(float(np.median(latencies[:10])), 1),
+                      "last_ms": round(float(np.median(latencies[-10:])), 1), "budget_ms": args.budget}))
+    manager.shutdown()
@@ -0,0 +1,152 @@
+import argparse
+import http.client
+import json
+import socket
+import threading
+import time
+import numpy as np
+
+
+# HTTP-Verbindung über einen Unix-Socket.
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    HTTP-Verbindung über einen Unix-Socket.
+    """
+
+    # Initialisiert die Verbindung.
+    def __init__(self, path, timeout=30):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    # Verbindet sich mit dem Unix-Socket statt mit TCP.
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+# Lastgenerator zum Messen des Durchsatzes des Erkennungsdienstes.
+class LoadGenerator:
+    """
+    Lastgenerator zum Messen des Durchsatzes des Erkennungsdienstes (detectionservice.py).
+    Mehrere Threads senden für eine feste Dauer ununterbrochen Anfragen mit demselben Bild.
+    """
+
+    # Initialisiert den Lastgenerator.
+    def __init__(self, image_bytes, content_type, host="127.0.0.1", port=8765, unix_socket=None, classifier="face"):
+        """
+        Initialisiert den Lastgenerator.
+        :param image_bytes: Body der Anfrage (JPEG/PNG-Datei).
+        :param content_type: Content-Type des Bodys.
+        :param host: Adresse des Dienstes.
+        :param port: Port des Dienstes.
+        :param unix_socket: Pfad zum Unix-Socket (hat Vorrang vor host/port).
+        :param classifier: ID des Klassifizierers.
+        """
+
+        self.image_bytes = image_bytes
+        self.content_type = content_type
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.classifier = classifier
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.status_counts = {}
+
+    # Erstellt eine neue Verbindung zum Dienst.
+    def _connect(self):
+        if self.unix_socket:
+            return UnixHTTPConnection(self.unix_socket)
+        return http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    # Sendet Anfragen bis zum Ende der Messdauer (ein Thread).
+    def _worker(self, t_end):
+        connection = self._connect()
+        while time.perf_counter() < t_end:
+            t0 = time.perf_counter()
+            try:
+                connection.request("POST", f"/detect?classifier={self.classifier}", body=self.image_bytes,
+                                   headers={"Content-Type": self.content_type})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                status = "Verbindungsfehler"
+                connection.close()
+                connection = self._connect()
+            latency = (time.perf_counter() - t0) * 1000
+            with self.lock:
+                self.status_counts[status] = self.status_counts.get(status, 0) + 1
+                if status == 200:
+                    self.latencies.append(latency)
+        connection.close()
+
+    # Führt die Messung durch.
+    def run(self, concurrency=8, duration=10):
+        """
+        Führt die Messung durch.
+        :param concurrency: Anzahl gleichzeitiger Clients.
+        :param duration: Messdauer in Sekunden.
+        :return: Dictionary mit Durchsatz, Latenz-Perzentilen und Statuscodes.
+        """
+
+        t_start = time.perf_counter()
+        t_end = t_start + duration
+        threads = [threading.Thread(target=self._worker, args=(t_end,)) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - t_start
+
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        result = {
+            "concurrency": concurrency,
+            "duration_s": round(elapsed, 2),
+            "ok": len(self.latencies),
+            "throughput_rps": round(len(self.latencies) / elapsed, 1),
+            "status_counts": {str(key): value for key, value in self.status_counts.items()}
+        }
+        for p in (50, 95, 99):
+            result[f"latency_p{p}_ms"] = round(float(np.percentile(latencies, p)), 2)
+        return result
+
+    # Fragt die Metriken des Dienstes ab.
+    def fetch_metrics(self):
+        """
+        Fragt die Metriken des Dienstes ab (GET /metrics).
+        :return: Dictionary mit Metriken oder None, falls ein Fehler auftritt.
+        """
+
+        try:
+            connection = self._connect()
+            connection.request("GET", "/metrics")
+            metrics = json.loads(connection.getresponse().read())
+            connection.close()
+            return metrics
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            print(f"Fehler beim Abrufen der Metriken: {e}")
+            return None
+
+
+# Startet den Lastgenerator über die Kommandozeile.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lastgenerator für den Haar-Cascade-Erkennungsdienst")
+    parser.add_argument("image", help="JPEG/PNG-Datei, die gesendet wird")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", default=None)
+    parser.add_argument("--classifier", default="face")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Eine oder mehrere Client-Anzahlen")
+    parser.add_argument("--duration", type=float, default=10, help="Messdauer pro Stufe in Sekunden")
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as file:
+        image_bytes = file.read()
+    content_type = "image/png" if args.image.lower().endswith(".png") else "image/jpeg"
+
+    for concurrency in args.concurrency:
+        generator = LoadGenerator(image_bytes, content_type, args.host, args.port, args.unix_socket, args.classifier)
+        print(json.dumps(generator.run(concurrency, args.duration)))
+    print(json.dumps(LoadGenerator(image_bytes, content_type, args.host, args.port, args.unix_socket).fetch_metrics()))
@@ -0,0 +1,369 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from atomicfile import atomic_write
+
+# Grenzen der Histogramme
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+OBJECT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+
+# Zähler und Histogramme eines Threads (nur dieser Thread schreibt).
+class _Shard:
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters = {} # (Name, Labels) -> Wert
+        self.histograms = {} # (Name, Labels) -> [Anzahl pro Bucket, Summe]
+
+
+# Zähler, Histogramme und Messwerte für den Dauerbetrieb, ausgegeben im OpenMetrics-Textformat.
+class Metrics:
+    """
+    Sammelt Zähler und Histogramme (z. B. aufgenommene, ausgewertete und verworfene Frames, Latenz und Objekte pro
+    Frame je Klassifizierer, Kamera-Ausfälle) und Messwerte, die erst beim Abruf gelesen werden (z. B. RSS des Prozesses).
+    Jeder Thread schreibt in einen eigenen Bereich (kein Lock im Frame-Takt); erst render() fasst die Bereiche zusammen.
+    Ausgabe über einen HTTP-Endpunkt auf localhost (OpenMetrics) oder eine regelmäßig neu geschriebene Textdatei
+    (Prometheus-Textformat, z. B. für den Textfile-Collector des node_exporter).
+    """
+
+    # Initialisiert die Sammlung.
+    def __init__(self, prefix="haar_"):
+        """
+        Initialisiert die Sammlung.
+        :param prefix: Präfix aller Metriknamen.
+        """
+
+        self.prefix = prefix
+        self.definitions = {} # Name -> (Typ, Beschreibung, Bucket-Grenzen oder Funktion)
+        self.shards = []
+        self._local = threading.local()
+        self.lock = threading.Lock() # Nur beim Anlegen eines Bereichs und beim Zusammenfassen
+        self.server = None
+        self.writer = None
+        self.stop_event = threading.Event()
+
+    # Legt eine Metrik an.
+    def define(self, name, kind, description, buckets=None, function=None):
+        """
+        :param name: Name ohne Präfix (Zähler ohne _total).
+        :param kind: "counter", "histogram" oder "gauge".
+        :param description: Beschreibung (# HELP).
+        :param buckets: Obere Grenzen der Buckets (nur Histogramme).
+        :param function: Für Messwerte: Funktion ohne Parameter, die den aktuellen Wert liefert (beim Abruf aufgerufen).
+        :return: None
+        """
+
+        self.definitions[name] = (kind, description, tuple(buckets) if buckets else None, function)
+
+    # Liefert den Bereich des aktuellen Threads.
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self.lock:
+                self.shards.append(shard)
+            return shard
+
+    # Erhöht einen Zähler.
+    def inc(self, name, labels=(), value=1):
+        """
+        :param name: Name des Zählers.
+        :param labels: Labels als Tupel von Paaren, z. B. (("classifier", "face"),).
+        :param value: Betrag.
+        :return: None
+        """
+
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    # Trägt einen Wert in ein Histogramm ein.
+    def observe(self, name, value, labels=()):
+        """
+        :param name: Name des Histogramms.
+        :param value: Beobachteter Wert.
+        :param labels: Labels als Tupel von Paaren.
+        :return: None
+        """
+
+        histograms = self._shard().histograms
+        key = (name, labels)
+        entry = histograms.get(key)
+        if entry is None:
+            entry = histograms[key] = [[0] * (len(self.definitions[name][2]) + 1), 0.0]
+        entry[0][bisect_left(self.definitions[name][2], value)] += 1
+        entry[1] += value
+
+    # Fasst die Bereiche aller Threads zusammen.
+    def collect(self):
+        """
+        :return: (Zähler {(Name, Labels): Wert}, Histogramme {(Name, Labels): [Anzahl pro Bucket, Summe]})
+        """
+
+        counters, histograms = {}, {}
+        with self.lock:
+            shards = list(self.shards)
+        for shard in shards:
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, (buckets, total) in list(shard.histograms.items()):
+                entry = histograms.setdefault(key, [[0] * len(buckets), 0.0])
+                entry[0] = [a + b for a, b in zip(entry[0], buckets)]
+                entry[1] += total
+        return counters, histograms
+
+    # Formatiert Labels.
+    def _labels(self, labels, extra=()):
+        pairs = tuple(labels) + tuple(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{str(value)}"' for key, value in pairs) + "}"
+
+    # Erstellt die Textausgabe aller Metriken.
+    def render(self, openmetrics=True):
+        """
+        :param openmetrics: True: OpenMetrics 1.0 (mit # EOF), False: Prometheus-Textformat 0.0.4 (Textfile-Collector).
+        :return: Text
+        """
+
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, description, buckets, function) in self.definitions.items():
+            full = self.prefix + name
+            if kind == "counter":
+                type_name = full if openmetrics else full + "_total"
+                lines += [f"# TYPE {type_name} counter", f"# HELP {type_name} {description}"]
+                for (key, labels), value in sorted(counters.items()):
+                    if key == name:
+                        lines.append(f"{full}_total{self._labels(labels)} {value}")
+            elif kind == "histogram":
+                lines += [f"# TYPE {full} histogram", f"# HELP {full} {description}"]
+                for (key, labels), (counts, total) in sorted(histograms.items()):
+                    if key != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets + ("+Inf",), counts):
+                        cumulative += count
+                        lines.append(f"{full}_bucket{self._labels(labels, (('le', bound),))} {cumulative}")
+                    lines += [f"{full}_sum{self._labels(labels)} {round(total, 6)}",
+                              f"{full}_count{self._labels(labels)} {cumulative}"]
+            else:
+                lines += [f"# TYPE {full} gauge", f"# HELP {full} {description}"]
+                try:
+                    value = function()
+                except Exception: # Messwert nicht verfügbar
+                    value = None
+                if value is not None:
+                    lines.append(f"{full} {value}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    # Stellt die Metriken über HTTP bereit.
+    def serve(self, port=9464, host="127.0.0.1"):
+        """
+        Startet einen HTTP-Endpunkt (GET /metrics) in einem Hintergrund-Thread, standardmäßig nur auf localhost.
+        :param port: Port.
+        :param host: Adresse.
+        :return: True, wenn der Endpunkt läuft, sonst False
+        """
+
+        if self.server is not None:
+            return True
+        metrics = self
+
+        # Beantwortet Abrufe des Endpunkts.
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                accept = self.headers.get("Accept", "")
+                openmetrics = "openmetrics" in accept or "text/plain" not in accept # Ältere Prometheus-Versionen: Textformat
+                body = metrics.render(openmetrics).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args): # Keine Zeile pro Abruf in der Konsole
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((host, port), Handler)
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, name="haar-metrics-http", daemon=True).start()
+            return True
+        except OSError as e: # Fehlerbehandlung
+            print(f"Fehler beim Starten des Metrik-Endpunkts: {e}")
+            self.server = None
+            return False
+
+    # Schreibt die Metriken regelmäßig in eine Textdatei.
+    def write_textfile(self, path, interval=15.0):
+        """
+        Schreibt die Metriken alle interval Sekunden in eine Datei (atomar über eine temporäre Datei und os.replace).
+        :param path: Zielpfad (für den node_exporter mit Endung .prom).
+        :param interval: Abstand in Sekunden.
+        :return: None
+        """
+
+        if self.writer is not None:
+            return
+        self.stop_event.clear()
+
+        def write():
+            try:
+                # Anwendung und Dienst können dieselbe Datei schreiben; der node_exporter liest sie als anderer Benutzer
+                with atomic_write(path, "w", encoding="utf-8") as file:
+                    file.write(self.render(openmetrics=False))
+            except Exception as e: # Fehlerbehandlung
+                print(f"Fehler beim Schreiben der Metrik-Datei: {e}")
+
+        def run():
+            write()
+            while not self.stop_event.wait(interval):
+                write()
+            write() # Letzter Stand beim Beenden
+
+        self.writer = threading.Thread(target=run, name="haar-metrics-file", daemon=True)
+        self.writer.start()
+
+    # Startet Endpunkt bzw. Textdatei aus den Umgebungsvariablen.
+    def start_from_environment(self):
+        """
+        HAAR_METRICS_PORT=9464 startet den HTTP-Endpunkt, HAAR_METRICS_FILE=<Pfad>.prom die Textdatei
+        (Abstand HAAR_METRICS_INTERVAL, Standard 15 s).
+        :return: None
+        """
+
+        if os.environ.get("HAAR_METRICS_PORT"):
+            self.serve(int(os.environ["HAAR_METRICS_PORT"]))
+        if os.environ.get("HAAR_METRICS_FILE"):
+            self.write_textfile(os.environ["HAAR_METRICS_FILE"], float(os.environ.get("HAAR_METRICS_INTERVAL", 15)))
+
+    # Beendet den HTTP-Endpunkt.
+    def stop_server(self):
+        """
+        Beendet den HTTP-Endpunkt (eine laufende Textdatei wird weiter geschrieben).
+        :return: None
+        """
+
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    # Beendet Endpunkt und Textdatei.
+    def close(self):
+        """
+        Beendet den HTTP-Endpunkt und schreibt die Textdatei ein letztes Mal.
+        :return: None
+        """
+
+        self.stop_server()
+        if self.writer is not None:
+            self.stop_event.set()
+            self.writer.join(timeout=5)
+            self.writer = None
+
+
+# Liefert den belegten Arbeitsspeicher (RSS) des Prozesses in Bytes.
+def process_rss_bytes():
+    """
+    :return: RSS in Bytes (Linux: /proc/self/statm, sonst Spitzenwert aus resource) oder None
+    """
+
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # Linux: KiB (macOS: Bytes)
+        except ImportError:
+            return None
+
+
+# Gemeinsame Metriken der Anwendung
+metrics = Metrics()
+START_TIME = time.time()
+metrics.define("frames_captured", "counter", "Aufgenommene Frames (Kamera oder Datei).")
+metrics.define("frames_detected", "counter", "Frames mit Objekterkennung, je Klassifizierer.")
+metrics.define("frames_dropped", "counter", "Frames ohne neue Erkennung oder Anzeige (reason: skipped = Regler, busy = Worker belegt, error = Fehler).")
+metrics.define("camera_reconnects", "counter", "Kamera lieferte keinen Frame und wurde neu verbunden bzw. gestoppt.")
+metrics.define("detection_latency_ms", "histogram", "Dauer der Objekterkennung in Millisekunden, je Klassifizierer.",
+               buckets=LATENCY_BUCKETS_MS)
+metrics.define("objects_per_frame", "histogram", "Erkannte Objekte pro Frame, je Klassifizierer.", buckets=OBJECT_BUCKETS)
+metrics.define("process_resident_memory_bytes", "gauge", "Belegter Arbeitsspeicher (RSS) des Prozesses.",
+               function=process_rss_bytes)
+metrics.define("process_start_time_seconds", "gauge", "Startzeit des Prozesses (Unix-Zeit).", function=lambda: START_TIME)
+
+
+# Misst die Kosten pro Aufruf (eigene Bereiche gegen einen gemeinsamen Lock) und gibt eine Beispielausgabe aus.
+if __name__ == "__main__":
+    import argparse
+    import json
+    import urllib.request
+
+    parser = argparse.ArgumentParser(description="Metriken: Kosten pro Aufruf messen und Ausgabe anzeigen")
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--port", type=int, default=0, help="Endpunkt starten und einmal abrufen (0: aus)")
+    args = parser.parse_args()
+
+    # Vergleich: ein Lock für alle Threads
+    class LockedMetrics(Metrics):
+        def inc(self, name, labels=(), value=1):
+            with self.lock:
+                key = (name, labels)
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def run(instance, calls, threads):
+        labels = (("classifier", "face"),)
+
+        def work():
+            for i in range(calls // threads):
+                instance.inc("frames_captured")
+                instance.inc("frames_detected", labels)
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        t0 = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return (time.perf_counter() - t0) / (calls // threads * threads * 2) * 1e9
+
+    locked = LockedMetrics()
+    locked.counters = {}
+    sample = Metrics()
+    for name, definition in metrics.definitions.items():
+        sample.definitions[name] = definition
+    t0 = time.perf_counter()
+    for i in range(args.calls):
+        sample.observe("detection_latency_ms", i % 300, (("classifier", "face"),))
+    observe_ns = (time.perf_counter() - t0) / args.calls * 1e9
+    result = {"inc_ns_sharded_1_thread": round(run(sample, args.calls, 1)),
+              "inc_ns_locked_1_thread": round(run(locked, args.calls, 1)),
+              f"inc_ns_sharded_{args.threads}_threads": round(run(sample, args.calls, args.threads)),
+              f"inc_ns_locked_{args.threads}_threads": round(run(locked, args.calls, args.threads)),
+              "observe_ns": round(observe_ns)}
+    t0 = time.perf_counter()
+    text = sample.render()
+    result["render_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    print(json.dumps(result, indent=2))
+    if args.port:
+        sample.serve(args.port)
+        with urllib.request.urlopen(f"http://127.0.0.1:{args.port}/metrics") as response:
+            print(response.headers["Content-Type"])
+            text = response.read().decode("utf-8")
+        sample.close()
+    print(text)
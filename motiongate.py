@@ -0,0 +1,237 @@
+import time
+import cv2
+import numpy as np
+import boxops
+
+
+# Überspringt die Erkennung bei unbewegten Szenen und beschränkt sie sonst auf bewegte Bereiche.
+class MotionGate:
+    """
+    Bewegungsfilter vor der Objekterkennung.
+    Jeder Frame wird verkleinert, in Graustufen umgewandelt und mit einem laufenden Hintergrundmodell verglichen
+    (unter 1 ms pro Frame). Ohne Bewegung wird die Erkennung übersprungen und das letzte Ergebnis
+    wiederverwendet; bei Bewegung wird nur in den Begrenzungsrahmen der bewegten Bereiche gesucht.
+    Objekte außerhalb der bewegten Bereiche werden aus dem letzten Ergebnis übernommen.
+    In festem Abstand wird der ganze Frame geprüft, damit verpasste Objekte nicht dauerhaft fehlen.
+    """
+
+    # Initialisiert den Bewegungsfilter.
+    def __init__(self, width=160, threshold=25, min_area=0.002, learning_rate=0.05, margin=0.5,
+                 max_coverage=0.5, full_scan_interval=5.0):
+        """
+        Initialisiert den Bewegungsfilter.
+        :param width: Breite des verkleinerten Graustufenbildes für den Vergleich.
+        :param threshold: Mindestunterschied eines Pixels zum Hintergrund (0 bis 255).
+        :param min_area: Mindestfläche eines bewegten Bereichs als Anteil des Frames (kleinere gelten als Rauschen).
+        :param learning_rate: Anpassungsrate des Hintergrundmodells pro Frame (0 bis 1).
+        :param margin: Vergrößerung der bewegten Bereiche (Anteil ihrer Größe pro Seite, mindestens minSize).
+        :param max_coverage: Decken die bewegten Bereiche mehr als diesen Anteil des Frames ab, wird der ganze Frame geprüft.
+        :param full_scan_interval: Abstand der erzwungenen vollständigen Prüfungen in Sekunden (0 = bei jedem Frame).
+        """
+
+        self.width = width
+        self.threshold = threshold
+        self.min_area = min_area
+        self.learning_rate = learning_rate
+        self.margin = margin
+        self.max_coverage = max_coverage
+        self.full_scan_interval = full_scan_interval
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        self.reset()
+
+    # Setzt Hintergrundmodell, letztes Ergebnis und Zähler zurück.
+    def reset(self):
+        """
+        Setzt Hintergrundmodell, letztes Ergebnis und Zähler zurück (z. B. nach einem Kamerawechsel).
+        :return: None
+        """
+
+        self.background = None
+        self.last_objects = np.empty((0, 4), dtype=np.int32)
+        self.last_key = None
+        self.last_full_scan = 0.0
+        self.last_regions = []
+        self.last_scan = None # Art der letzten Prüfung: "full", "regions" oder "skipped"
+        self.counters = {"frames": 0, "full": 0, "regions": 0, "skipped": 0, "gate_ms": 0.0, "detect_ms": 0.0}
+
+    # Ermittelt die bewegten Bereiche eines Frames.
+    def motion_regions(self, frame, min_size=(0, 0)):
+        """
+        Vergleicht den Frame mit dem Hintergrundmodell und aktualisiert das Modell.
+        :param frame: Frame (BGR, RGB oder Graustufen).
+        :param min_size: Mindestgröße (Breite, Höhe) eines Bereichs in Pixeln des Frames.
+        :return: (Liste der bewegten Bereiche (x, y, w, h) in Pixeln des Frames, abgedeckter Anteil des Frames)
+                 oder (None, 1.0), falls noch kein Hintergrund vorhanden ist.
+        """
+
+        height, width = frame.shape[:2]
+        scale = min(self.width / width, 1.0)
+        # INTER_LINEAR statt INTER_AREA: bei krummen Faktoren etwa zehnmal schneller, das Rauschen glättet der Weichzeichner
+        small = cv2.resize(frame, (max(int(width * scale), 1), max(int(height * scale), 1)), interpolation=cv2.INTER_LINEAR)
+        gray = small if small.ndim == 2 else cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype(np.float32)
+            return None, 1.0
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+        _, mask = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, self.kernel, iterations=2) # Zerfallene Bereiche eines Objekts verbinden
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        min_pixels = self.min_area * gray.size
+        covered = np.zeros(gray.shape, dtype=np.uint8) if count > 1 else None # Abdeckung im verkleinerten Bild
+        regions = []
+        for x, y, w, h, area in stats[1:]:
+            if area < min_pixels:
+                continue
+            # Zurück in Pixel des Frames, vergrößert um margin bzw. mindestens auf minSize
+            x, y, w, h = x / scale, y / scale, w / scale, h / scale
+            pad_x = max(w * self.margin, (min_size[0] - w) / 2, 0)
+            pad_y = max(h * self.margin, (min_size[1] - h) / 2, 0)
+            x0, y0 = max(int(x - pad_x), 0), max(int(y - pad_y), 0)
+            x1, y1 = min(int(x + w + pad_x + 1), width), min(int(y + h + pad_y + 1), height)
+            regions.append((x0, y0, x1 - x0, y1 - y0))
+            covered[int(y0 * scale):int(np.ceil(y1 * scale)), int(x0 * scale):int(np.ceil(x1 * scale))] = 1
+        coverage = float(covered.mean()) if regions else 0.0
+        return regions, coverage
+
+    # Erkennt Objekte mit vorgeschaltetem Bewegungsfilter.
+    def detect(self, frame, detect_fn, min_size=(0, 0), key=None, timestamp=None):
+        """
+        Erkennt Objekte mit vorgeschaltetem Bewegungsfilter.
+        :param frame: Frame (BGR, RGB oder Graustufen).
+        :param detect_fn: Funktion detect_fn(image) -> Objekte (x, y, w, h), z. B. ClassifierManager.detect mit Schnappschuss.
+        :param min_size: minSize des Klassifizierers (kleinere Bereiche werden vergrößert).
+        :param key: Kennung der Parameter (z. B. DetectionParams); bei einer Änderung wird der ganze Frame geprüft.
+        :param timestamp: Zeitstempel des Frames (Standard: time.monotonic()).
+        :return: Erkannte Objekte als NumPy-Array (N, 4) oder None, falls detect_fn None liefert.
+        """
+
+        t0 = time.perf_counter()
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        self.counters["frames"] += 1
+        regions, coverage = self.motion_regions(frame, min_size)
+        self.last_regions = regions or []
+
+        full_scan = (regions is None or key != self.last_key or coverage > self.max_coverage or
+                     timestamp - self.last_full_scan >= self.full_scan_interval)
+        gate_ms = (time.perf_counter() - t0) * 1000
+        self.counters["gate_ms"] += gate_ms
+
+        if not full_scan and not regions: # Keine Bewegung: letztes Ergebnis wiederverwenden
+            self.counters["skipped"] += 1
+            self.last_scan = "skipped"
+            return self.last_objects
+
+        t1 = time.perf_counter()
+        if full_scan:
+            objects = detect_fn(frame)
+            if objects is None:
+                return None
+            objects = np.asarray(objects, dtype=np.int32).reshape(-1, 4)
+            self.last_full_scan = timestamp
+            self.last_key = key
+            self.last_scan = "full"
+            self.counters["full"] += 1
+        else:
+            objects = self._detect_regions(frame, detect_fn, regions, min_size)
+            if objects is None:
+                return None
+            self.last_scan = "regions"
+            self.counters["regions"] += 1
+        self.counters["detect_ms"] += (time.perf_counter() - t1) * 1000
+        self.last_objects = objects
+        return objects
+
+    # Sucht nur in den bewegten Bereichen und übernimmt unbewegte Objekte aus dem letzten Ergebnis.
+    def _detect_regions(self, frame, detect_fn, regions, min_size):
+        found = []
+        for x, y, w, h in regions:
+            if w < min_size[0] or h < min_size[1]:
+                continue
+            objects = detect_fn(frame[y:y + h, x:x + w])
+            if objects is None:
+                return None
+            found.append(boxops.remap(objects, offset=(x, y)))
+
+        # Objekte des letzten Ergebnisses behalten, wenn sie keinen bewegten Bereich berühren
+        found.append(self.last_objects[~boxops.intersects(self.last_objects, regions)])
+        found = np.concatenate(found)
+
+        if len(found) > 1 and len(regions) > 1: # Überlappende Bereiche können dasselbe Objekt doppelt finden
+            found, _ = boxops.group_similar(found, 0.2)
+        return found.astype(np.int32)
+
+    # Liefert die Zähler des Bewegungsfilters.
+    def get_stats(self):
+        """
+        :return: Dictionary mit Anzahl der Frames, vollständigen Prüfungen, Prüfungen in Bereichen, übersprungenen Frames,
+                 Anteil der übersprungenen Frames sowie mittlerer Zeit des Filters und der Erkennung in ms pro Frame.
+        """
+
+        stats = dict(self.counters)
+        frames = max(stats["frames"], 1)
+        stats["skip_ratio"] = round(stats["skipped"] / frames, 3)
+        stats["gate_ms"] = round(stats["gate_ms"] / frames, 3)
+        stats["detect_ms"] = round(stats["detect_ms"] / frames, 3)
+        return stats
+
+
+# Misst die CPU-Zeit pro Stunde bei unbewegter und bewegter Szene (mit und ohne Bewegungsfilter).
+if __name__ == "__main__":
+    import argparse
+    import json
+    from classifiermanager import ClassifierManager
+
+    parser = argparse.ArgumentParser(description="Bewegungsfilter: CPU-Zeit mit und ohne Filter vergleichen")
+    parser.add_argument("image", help="Hintergrundbild der Szene")
+    parser.add_argument("--object", default=None, help="Bild, das für die bewegte Szene durch den Frame geschoben wird")
+    parser.add_argument("--classifier", default="face")
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--fps", type=float, default=30, help="Bildrate für die Hochrechnung auf eine Stunde")
+    parser.add_argument("--interval", type=float, default=5.0, help="Abstand der vollständigen Prüfungen in Sekunden")
+    args = parser.parse_args()
+
+    manager = ClassifierManager()
+    params = manager.snapshot_params(args.classifier)
+    background = cv2.imread(args.image)
+    sprite = cv2.imread(args.object) if args.object else background[:background.shape[0] // 3, :background.shape[1] // 3]
+    sprite = cv2.resize(sprite, (background.shape[1] // 5, background.shape[0] // 5)) # Objekt: ein Fünftel des Frames
+    rng = np.random.default_rng(0)
+
+    # Erzeugt einen Frame mit Sensorrauschen; bei moving=True wird das Objekt über den Frame geschoben
+    def make_frame(i, moving):
+        frame = background.copy()
+        if moving:
+            h, w = sprite.shape[:2]
+            x = (i * 8) % max(frame.shape[1] - w, 1)
+            frame[:h, x:x + w] = sprite
+        noise = rng.integers(-3, 4, frame.shape, dtype=np.int16)
+        return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    # CPU-Zeit pro Frame mit simulierter Zeit (1 / fps pro Frame), damit das Intervall der vollständigen Prüfung stimmt
+    def run(moving, gate):
+        frames = [make_frame(i, moving) for i in range(args.frames)]
+        t0 = time.process_time()
+        for i, frame in enumerate(frames):
+            if gate is None:
+                manager.detect(frame, params)
+            else:
+                gate.detect(frame, lambda image: manager.detect(image, params), params.minSize, params, i / args.fps)
+        return (time.process_time() - t0) / args.frames
+
+    manager.detect(background, params) # Aufwärmen (Klassifizierer laden)
+    results = {}
+    for scene in ("idle", "motion"):
+        moving = scene == "motion"
+        baseline = run(moving, None)
+        gate = MotionGate(full_scan_interval=args.interval)
+        gated = run(moving, gate)
+        results[scene] = {"cpu_s_per_hour": round(baseline * args.fps * 3600, 1),
+                          "cpu_s_per_hour_gated": round(gated * args.fps * 3600, 1),
+                          "reduction": round(1 - gated / baseline, 3), "gate": gate.get_stats()}
+    print(json.dumps(results, indent=2))
+    manager.shutdown()
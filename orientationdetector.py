@@ -0,0 +1,240 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+import boxops
+
+
+# Erkennt Objekte zusätzlich gespiegelt und gedreht (Durchläufe parallel auf einem Thread-Pool).
+class OrientationDetector:
+    """
+    Erkennt Objekte in mehreren Ausrichtungen: normal, horizontal gespiegelt (z. B. Profilgesichter, die in die
+    andere Richtung schauen) und optional um ±N Grad gedreht (geneigte Gesichter).
+    Alle Durchläufe verwenden dasselbe Graustufenbild (eine Umwandlung pro Frame) und laufen parallel:
+    der normale Durchlauf im aufrufenden Thread, die übrigen auf einem eigenen Thread-Pool. Auf einem Rechner mit
+    mehreren Kernen bleibt die Latenz damit nahe an einem einzelnen Durchlauf.
+    Die Rechtecke werden in das Ausgangsbild zurückgerechnet und per Non-Maximum-Suppression zusammengeführt.
+    Der gespiegelte Durchlauf lässt sich pro Aufruf abschalten (nur Profil-Klassifizierer sind nicht symmetrisch).
+    Nach close() laufen noch eintreffende Aufrufe alle Durchläufe im aufrufenden Thread.
+    """
+
+    # Initialisiert die Durchläufe und den Thread-Pool.
+    def __init__(self, mirror=True, angles=(), nms_threshold=0.3, max_workers=None):
+        """
+        Initialisiert die Durchläufe und den Thread-Pool.
+        :param mirror: Zusätzlicher Durchlauf im horizontal gespiegelten Bild.
+        :param angles: Drehwinkel in Grad; jeder Winkel ergibt zwei Durchläufe (+N und -N), z. B. (20,).
+        :param nms_threshold: Rechtecke mit größerer Überlappung (IoU) gelten als dasselbe Objekt.
+        :param max_workers: Threads für die zusätzlichen Durchläufe (Standard: Anzahl der zusätzlichen Durchläufe,
+                            höchstens Anzahl CPU-Kerne).
+        """
+
+        self.passes = [(False, 0.0)] # (gespiegelt, Winkel); der erste Durchlauf läuft im aufrufenden Thread
+        if mirror:
+            self.passes.append((True, 0.0))
+        for angle in angles:
+            if angle:
+                self.passes += [(False, float(abs(angle))), (False, -float(abs(angle)))]
+        self.nms_threshold = nms_threshold
+        extra = len(self.passes) - 1
+        max_workers = max_workers or max(1, min(extra, os.cpu_count() or 1))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="haar-orientation") if extra else None
+        self.lock = threading.Lock() # Aufträge abgeben und Thread-Pool beenden schließen sich aus
+        self.closed = False
+        self.counters = {"frames": 0, "wall_ms": 0.0, "pass_ms": [0.0] * len(self.passes),
+                         "found": [0] * len(self.passes), "merged": 0}
+
+    # Beschreibt einen Durchlauf.
+    def describe_pass(self, index):
+        """
+        :return: Kurzer Name eines Durchlaufs (z. B. "normal", "gespiegelt", "+20°").
+        """
+
+        mirrored, angle = self.passes[index]
+        if mirrored:
+            return "gespiegelt"
+        return f"{angle:+g}°" if angle else "normal"
+
+    # Dreht ein Bild um seinen Mittelpunkt (mit vergrößerter Fläche, damit keine Ecken fehlen).
+    def _rotate(self, gray, angle):
+        """
+        :param gray: Graustufenbild.
+        :param angle: Drehwinkel in Grad (gegen den Uhrzeigersinn).
+        :return: (gedrehtes Bild, affine Matrix 2x3 vom gedrehten Bild zurück in das Ausgangsbild)
+        """
+
+        height, width = gray.shape[:2]
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+        new_width, new_height = int(round(height * sin + width * cos)), int(round(height * cos + width * sin))
+        matrix[0, 2] += new_width / 2 - width / 2
+        matrix[1, 2] += new_height / 2 - height / 2
+        rotated = cv2.warpAffine(gray, matrix, (new_width, new_height), flags=cv2.INTER_LINEAR,
+                                 borderMode=cv2.BORDER_REPLICATE)
+        return rotated, cv2.invertAffineTransform(matrix)
+
+    # Führt einen Durchlauf aus und rechnet die Rechtecke in das Ausgangsbild zurück.
+    def _run_pass(self, index, gray, detect_fn, upright_fn=None):
+        t0 = time.perf_counter()
+        mirrored, angle = self.passes[index]
+        height, width = gray.shape[:2]
+        if mirrored:
+            image = cv2.flip(gray, 1)
+        elif angle:
+            image, inverse = self._rotate(gray, angle)
+        else:
+            image = gray
+
+        objects = upright_fn(image, mirrored) if upright_fn is not None and not angle else detect_fn(image)
+        if objects is None:
+            return None, (time.perf_counter() - t0) * 1000
+        boxes = np.asarray(objects, dtype=np.float64).reshape(-1, 4)
+        if len(boxes) and mirrored:
+            boxes[:, 0] = width - boxes[:, 0] - boxes[:, 2]
+        elif len(boxes) and angle:
+            # Mittelpunkte zurückdrehen, Größe beibehalten (das Objekt selbst ist im gedrehten Bild aufrecht)
+            centers = boxes[:, :2] + boxes[:, 2:] / 2
+            centers = centers @ inverse[:, :2].T + inverse[:, 2]
+            boxes[:, :2] = centers - boxes[:, 2:] / 2
+            boxes[:, 0] = np.clip(boxes[:, 0], 0, np.maximum(width - boxes[:, 2], 0))
+            boxes[:, 1] = np.clip(boxes[:, 1], 0, np.maximum(height - boxes[:, 3], 0))
+        return np.round(boxes).astype(np.int32), (time.perf_counter() - t0) * 1000
+
+    # Führt überlappende Rechtecke zusammen (Non-Maximum-Suppression).
+    def _merge(self, boxes, ranks):
+        """
+        Behält von überlappenden Rechtecken das mit dem kleinsten Rang (frühester Durchlauf, bei Gleichstand das größere).
+        :param boxes: NumPy-Array (N, 4) mit (x, y, w, h).
+        :param ranks: Rang jedes Rechtecks (Index des Durchlaufs).
+        :return: NumPy-Array (M, 4)
+        """
+
+        if len(boxes) < 2:
+            return boxes
+        order = np.lexsort((-boxes[:, 2].astype(np.int64) * boxes[:, 3], ranks))
+        return boxes[np.sort(boxops.nms(boxes, iou_threshold=self.nms_threshold, order=order))]
+
+    # Erkennt Objekte in allen Ausrichtungen.
+    def detect(self, frame, detect_fn, mirror=True, upright_fn=None):
+        """
+        Erkennt Objekte in allen Ausrichtungen und führt die Ergebnisse zusammen.
+        :param frame: Frame (BGR oder Graustufen).
+        :param detect_fn: Funktion detect_fn(gray) -> Objekte (x, y, w, h), z. B. ClassifierManager.detect mit Schnappschuss.
+                          Muss aus mehreren Threads gleichzeitig aufgerufen werden können.
+        :param mirror: False: gespiegelten Durchlauf auslassen (symmetrische Objekte wie frontale Gesichter).
+        :param upright_fn: Optional Funktion upright_fn(gray, mirrored) -> Objekte für die Durchläufe ohne Drehung (die
+                           Bildzeilen bleiben erhalten, z. B. streifenweise Suche mit Maßstab und Erkennungsbereichen);
+                           Standard: detect_fn.
+        :return: Erkannte Objekte als NumPy-Array (N, 4) oder None, falls der normale Durchlauf None liefert.
+        """
+
+        t0 = time.perf_counter()
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) # Eine Umwandlung für alle Durchläufe
+        indices = [index for index in range(1, len(self.passes)) if mirror or not self.passes[index][0]]
+        with self.lock:
+            if self.closed: # Beendet, während dieser Frame noch lief: zusätzliche Durchläufe im aufrufenden Thread
+                futures = None
+            else:
+                futures = [self.executor.submit(self._run_pass, index, gray, detect_fn, upright_fn) for index in indices]
+        results = [(0, self._run_pass(0, gray, detect_fn, upright_fn))]
+        if futures is None:
+            results += [(index, self._run_pass(index, gray, detect_fn, upright_fn)) for index in indices]
+        else:
+            results += [(index, future.result()) for index, future in zip(indices, futures)]
+        if results[0][1][0] is None:
+            return None
+
+        boxes, ranks = [], []
+        for index, (objects, ms) in results:
+            self.counters["pass_ms"][index] += ms
+            if objects is None:
+                continue
+            self.counters["found"][index] += len(objects)
+            boxes.append(objects)
+            ranks.append(np.full(len(objects), index))
+        boxes = np.concatenate(boxes)
+        merged = self._merge(boxes, np.concatenate(ranks))
+
+        self.counters["frames"] += 1
+        self.counters["merged"] += len(boxes) - len(merged)
+        self.counters["wall_ms"] += (time.perf_counter() - t0) * 1000
+        return merged
+
+    # Liefert die Zähler der Durchläufe.
+    def get_stats(self):
+        """
+        :return: Dictionary mit Anzahl der Frames, mittlerer Gesamtzeit, mittlerer Zeit und Anzahl der Funde pro Durchlauf
+                 sowie der Anzahl der zusammengeführten Rechtecke.
+        """
+
+        frames = max(self.counters["frames"], 1)
+        return {"frames": self.counters["frames"], "wall_ms": round(self.counters["wall_ms"] / frames, 2),
+                "passes": {self.describe_pass(i): {"ms": round(self.counters["pass_ms"][i] / frames, 2),
+                                                   "found": self.counters["found"][i]} for i in range(len(self.passes))},
+                "merged": self.counters["merged"]}
+
+    # Beendet den Thread-Pool.
+    def close(self):
+        """
+        Beendet den Thread-Pool der zusätzlichen Durchläufe. Bereits abgegebene Durchläufe laufen zu Ende.
+        :return: None
+        """
+
+        with self.lock:
+            self.closed = True
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+
+
+# Vergleicht einen Durchlauf, alle Durchläufe nacheinander und alle Durchläufe parallel.
+if __name__ == "__main__":
+    import argparse
+    import json
+    from classifiermanager import ClassifierManager
+
+    parser = argparse.ArgumentParser(description="Gespiegelte und gedrehte Durchläufe: Latenz und Funde messen")
+    parser.add_argument("image", help="Testbild")
+    parser.add_argument("--classifier", default="profileface")
+    parser.add_argument("--angles", type=float, nargs="*", default=[20], help="Drehwinkel in Grad (jeweils ±)")
+    parser.add_argument("--no-mirror", action="store_true")
+    parser.add_argument("--tilt", type=float, default=0, help="Testbild vorher um diesen Winkel drehen")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    manager = ClassifierManager()
+    params = manager.snapshot_params(args.classifier)
+    image = cv2.imread(args.image)
+    if args.tilt:
+        matrix = cv2.getRotationMatrix2D((image.shape[1] / 2, image.shape[0] / 2), args.tilt, 1.0)
+        image = cv2.warpAffine(image, matrix, (image.shape[1], image.shape[0]), borderMode=cv2.BORDER_REPLICATE)
+    detect_fn = lambda gray: manager.detect(gray, params)
+    orientation = OrientationDetector(not args.no_mirror, args.angles)
+    sequential = OrientationDetector(not args.no_mirror, args.angles)
+    sequential.executor.shutdown()
+    sequential.executor = None
+
+    # Nacheinander: dieselben Durchläufe ohne Thread-Pool
+    def run_sequential():
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        results = [sequential._run_pass(i, gray, detect_fn)[0] for i in range(len(sequential.passes))]
+        return sequential._merge(np.concatenate(results), np.concatenate([np.full(len(r), i) for i, r in enumerate(results)]))
+
+    def timed(fn):
+        fn() # Aufwärmen (Klassifizierer pro Thread laden)
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            result = fn()
+        return (time.perf_counter() - t0) * 1000 / args.repeat, len(result)
+
+    single_ms, single_found = timed(lambda: manager.detect(image, params))
+    sequential_ms, _ = timed(run_sequential)
+    parallel_ms, parallel_found = timed(lambda: orientation.detect(image, detect_fn))
+    print(json.dumps({"cpu_count": os.cpu_count(), "passes": len(orientation.passes),
+                      "single_ms": round(single_ms, 1), "sequential_ms": round(sequential_ms, 1),
+                      "parallel_ms": round(parallel_ms, 1), "parallel_vs_single": round(parallel_ms / single_ms, 2),
+                      "found_single": single_found, "found_all": parallel_found,
+                      "stats": orientation.get_stats()}, indent=2))
+    orientation.close()
+    manager.shutdown()
@@ -0,0 +1,328 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+# Zielordner für Traces und Profile
+PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".haarcascades", "profiles")
+
+
+# Leerer Abschnitt für den ausgeschalteten Profiler (ein gemeinsames Objekt, keine Zeitmessung).
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+# Ein gemessener Abschnitt (Kontextmanager).
+class _Span:
+    __slots__ = ("profiler", "name", "args", "start")
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter(), **self.args)
+        return False
+
+
+# Zeichnet Abschnitte der Frame-Verarbeitung auf und exportiert sie als Chrome-Trace.
+class Profiler:
+    """
+    Zeichnet Abschnitte der Frame-Verarbeitung (Bildaufnahme, Umwandlung, Erkennung, Zeichnen, Anzeige) mit Thread,
+    Dauer und Zusatzangaben (z. B. Klassifizierer und Parameter) in einem Ringpuffer auf. Die Aufzeichnung kann als
+    Chrome-Trace (JSON, chrome://tracing oder Perfetto) gespeichert werden. Zusätzlich: zeitlich begrenzte
+    cProfile- und tracemalloc-Messungen der laufenden Schleife.
+    Ausgeschaltet kostet ein Abschnitt nur die Prüfung von enabled (span() liefert ein gemeinsames leeres Objekt).
+    """
+
+    # Initialisiert den Profiler.
+    def __init__(self, enabled=False, max_events=200000, output_dir=PROFILE_DIR):
+        """
+        Initialisiert den Profiler.
+        :param enabled: Aufzeichnung sofort starten.
+        :param max_events: Größe des Ringpuffers (älteste Abschnitte werden verworfen).
+        :param output_dir: Zielordner für Traces und Profile.
+        """
+
+        self.enabled = enabled
+        self.events = deque(maxlen=max_events) # (Name, Start, Dauer, Thread-ID, Zusatzangaben)
+        self.output_dir = output_dir
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.thread_names = {}
+        self.frame_index = 0
+        self.cprofile = None # (cProfile.Profile, Ende)
+        self.tracemalloc_until = None # (Schnappschuss zu Beginn, Ende)
+        self.lock = threading.Lock()
+
+    # Erstellt den Profiler aus der Umgebungsvariable HAAR_PROFILE.
+    @classmethod
+    def from_environment(cls, variable="HAAR_PROFILE"):
+        """
+        HAAR_PROFILE=1 startet die Aufzeichnung; ein Pfad (z. B. HAAR_PROFILE=/tmp/trace.json) startet sie und legt
+        fest, wohin close() den Chrome-Trace schreibt.
+        :return: Profiler
+        """
+
+        value = os.environ.get(variable, "")
+        profiler = cls(enabled=value not in ("", "0"))
+        profiler.exit_path = value if value.endswith(".json") else None
+        return profiler
+
+    # Liefert einen Abschnitt für einen with-Block.
+    def span(self, name, **args):
+        """
+        Liefert einen Abschnitt für einen with-Block, z. B. with profiler.span("detect", classifier="face"): ...
+        :param name: Name des Abschnitts.
+        :param args: Zusatzangaben (erscheinen im Trace).
+        :return: Kontextmanager
+        """
+
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, args)
+
+    # Trägt einen Abschnitt mit bereits gemessenen Zeiten ein.
+    def record(self, name, start, end, **args):
+        """
+        :param name: Name des Abschnitts.
+        :param start: Beginn (time.perf_counter()).
+        :param end: Ende (time.perf_counter()).
+        :param args: Zusatzangaben.
+        :return: None
+        """
+
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        if thread.ident not in self.thread_names:
+            self.thread_names[thread.ident] = thread.name
+        self.events.append((name, start, end - start, thread.ident, args)) # deque.append ist threadsicher
+
+    # Schließt einen Frame ab (Frame-Nummer im Trace, Ende zeitlich begrenzter Messungen prüfen).
+    def tick(self):
+        """
+        Einmal pro Frame im Thread der Schleife aufrufen. Beendet abgelaufene cProfile- und tracemalloc-Messungen.
+        :return: Pfad einer gerade geschriebenen Datei oder None
+        """
+
+        self.frame_index += 1
+        if self.cprofile is None and self.tracemalloc_until is None:
+            return None
+        now = time.monotonic()
+        if self.cprofile is not None and now >= self.cprofile[1]:
+            return self.stop_cprofile()
+        if self.tracemalloc_until is not None and now >= self.tracemalloc_until[1]:
+            return self.stop_tracemalloc()
+        return None
+
+    # Schreibt die Aufzeichnung als Chrome-Trace.
+    def export_chrome_trace(self, path=None):
+        """
+        Schreibt die aufgezeichneten Abschnitte als Chrome-Trace (Trace Event Format, vollständige Ereignisse "X").
+        :param path: Zielpfad (Standard: <output_dir>/trace_<Datum>.json).
+        :return: Pfad der Datei oder None, falls ein Fehler auftritt
+        """
+
+        try:
+            path = path or self._path("trace", ".json")
+            events = [{"name": name, "ph": "X", "ts": round((start - self.origin) * 1e6, 1), "dur": round(duration * 1e6, 1),
+                       "pid": self.pid, "tid": tid, "args": self._plain(args)}
+                      for name, start, duration, tid, args in list(self.events)]
+            events += [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                       for tid, name in list(self.thread_names.items())]
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file, default=str)
+            return path
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Schreiben des Traces: {e}")
+            return None
+
+    # Wandelt Zusatzangaben in JSON-taugliche Werte um (z. B. DetectionParams erst beim Export, nicht pro Abschnitt).
+    def _plain(self, args):
+        return {key: value._asdict() if hasattr(value, "_asdict") else value for key, value in args.items()}
+
+    # Fasst die Aufzeichnung pro Abschnitt zusammen.
+    def summary(self):
+        """
+        :return: Dictionary Name -> {"count", "mean_ms", "p95_ms", "total_ms"} über alle aufgezeichneten Abschnitte.
+        """
+
+        durations = {}
+        for name, _, duration, _, _ in list(self.events):
+            durations.setdefault(name, []).append(duration * 1000)
+        result = {}
+        for name, values in durations.items():
+            values.sort()
+            result[name] = {"count": len(values), "mean_ms": round(sum(values) / len(values), 3),
+                            "p95_ms": round(values[int(0.95 * (len(values) - 1))], 3), "total_ms": round(sum(values), 1)}
+        return result
+
+    # Startet eine zeitlich begrenzte cProfile-Messung.
+    def start_cprofile(self, seconds=10.0):
+        """
+        Startet cProfile im aufrufenden Thread (z. B. dem GUI-Thread mit der Frame-Schleife). Nach Ablauf schreibt
+        tick() die Statistik (.prof für snakeviz/pstats und eine Textübersicht).
+        :param seconds: Dauer der Messung.
+        :return: True, wenn gestartet wurde, sonst False (läuft bereits).
+        """
+
+        if self.cprofile is not None:
+            return False
+        profile = cProfile.Profile()
+        profile.enable()
+        self.cprofile = (profile, time.monotonic() + seconds)
+        return True
+
+    # Beendet die cProfile-Messung und schreibt die Statistik.
+    def stop_cprofile(self):
+        """
+        :return: Pfad der .prof-Datei oder None
+        """
+
+        if self.cprofile is None:
+            return None
+        profile, _ = self.cprofile
+        self.cprofile = None
+        profile.disable()
+        try:
+            path = self._path("cprofile", ".prof")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            profile.dump_stats(path)
+            with open(path[:-5] + ".txt", "w", encoding="utf-8") as file:
+                pstats.Stats(profile, stream=file).sort_stats("cumulative").print_stats(40)
+            return path
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Schreiben des Profils: {e}")
+            return None
+
+    # Startet eine zeitlich begrenzte tracemalloc-Messung.
+    def start_tracemalloc(self, seconds=10.0, frames=5):
+        """
+        Startet tracemalloc und nimmt einen Schnappschuss; nach Ablauf schreibt tick() die größten Zuwächse.
+        :param seconds: Dauer der Messung.
+        :param frames: Tiefe der gespeicherten Aufrufstapel.
+        :return: True, wenn gestartet wurde, sonst False (läuft bereits).
+        """
+
+        if self.tracemalloc_until is not None:
+            return False
+        tracemalloc.start(frames)
+        self.tracemalloc_until = (tracemalloc.take_snapshot(), time.monotonic() + seconds)
+        return True
+
+    # Beendet die tracemalloc-Messung und schreibt die größten Zuwächse.
+    def stop_tracemalloc(self, limit=30):
+        """
+        :param limit: Anzahl der ausgegebenen Einträge.
+        :return: Pfad der Textdatei oder None
+        """
+
+        if self.tracemalloc_until is None:
+            return None
+        start, _ = self.tracemalloc_until
+        self.tracemalloc_until = None
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            path = self._path("tracemalloc", ".txt")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(f"Aktuell {current / 1024 / 1024:.1f} MB, Spitze {peak / 1024 / 1024:.1f} MB (Python-Objekte)\n\n")
+                for stat in snapshot.compare_to(start, "lineno")[:limit]:
+                    file.write(f"{stat}\n")
+            return path
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Schreiben der Speichermessung: {e}")
+            return None
+
+    # Erstellt einen Dateinamen im Zielordner.
+    def _path(self, kind, extension):
+        return os.path.join(self.output_dir, f"{kind}_{time.strftime('%Y%m%d-%H%M%S')}{extension}")
+
+    # Beendet laufende Messungen und schreibt ggf. den Trace (HAAR_PROFILE=<Pfad>.json).
+    def close(self):
+        """
+        Beendet laufende cProfile- und tracemalloc-Messungen; bei HAAR_PROFILE=<Pfad>.json wird der Trace geschrieben.
+        :return: None
+        """
+
+        self.stop_cprofile()
+        self.stop_tracemalloc()
+        if self.enabled and getattr(self, "exit_path", None):
+            self.export_chrome_trace(self.exit_path)
+
+
+# Gemeinsamer Profiler der Anwendung (Umgebungsvariable HAAR_PROFILE, umschaltbar im Menü)
+profiler = Profiler.from_environment()
+
+
+# Misst die Kosten eines Abschnitts aus- und eingeschaltet und schreibt einen Beispiel-Trace einer Erkennungsschleife.
+if __name__ == "__main__":
+    import argparse
+    import cv2
+
+    parser = argparse.ArgumentParser(description="Profiler: Kosten pro Abschnitt messen und Beispiel-Trace schreiben")
+    parser.add_argument("image", nargs="?", default=None, help="Bild für die Beispielschleife (ohne: nur Kosten messen)")
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--trace", default=os.path.join(PROFILE_DIR, "beispiel.json"))
+    args = parser.parse_args()
+
+    # Kosten eines Abschnitts: ausgeschaltet, eingeschaltet und leere Schleife
+    count = 200000
+    test = Profiler()
+    t0 = time.perf_counter()
+    for _ in range(count):
+        pass
+    loop_ns = (time.perf_counter() - t0) / count * 1e9
+    t0 = time.perf_counter()
+    for _ in range(count):
+        with test.span("leer"):
+            pass
+    disabled_ns = (time.perf_counter() - t0) / count * 1e9 - loop_ns
+    test.enabled = True
+    t0 = time.perf_counter()
+    for _ in range(count):
+        with test.span("leer"):
+            pass
+    enabled_ns = (time.perf_counter() - t0) / count * 1e9 - loop_ns
+    result = {"span_disabled_ns": round(disabled_ns), "span_enabled_ns": round(enabled_ns)}
+
+    if args.image:
+        import boxops
+        from classifiermanager import ClassifierManager
+        from profiler import profiler # Dieselbe Instanz wie in classifiermanager (nicht die aus __main__)
+        manager = ClassifierManager()
+        image = cv2.imread(args.image)
+        profiler.enabled = True
+        for _ in range(args.frames):
+            with profiler.span("capture"):
+                frame = image.copy()
+            with profiler.span("convert"):
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            objects = manager.detect_faces(rgb, "face")
+            with profiler.span("draw"):
+                boxops.draw(rgb, objects)
+            profiler.tick()
+        result["trace"] = profiler.export_chrome_trace(args.trace)
+        result["summary"] = profiler.summary()
+        manager.shutdown()
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,243 @@
+import json
+import os
+import threading
+import time
+import cv2
+import boxops
+from boundedexecutor import BoundedExecutor
+
+
+# Nimmt annotierte Frames als Video auf (Kodierung im Hintergrund).
+class VideoRecorder:
+    """
+    Nimmt Frames als Video auf. Die Frames werden über eine begrenzte Warteschlange an einen einzelnen
+    Hintergrund-Worker mit cv2.VideoWriter übergeben (ein Worker, damit die Reihenfolge erhalten bleibt).
+    Ist die Warteschlange voll, wird der Frame verworfen und gezählt, statt Kamera und Erkennung aufzuhalten.
+    Die Videos haben eine feste Bildrate; der Worker richtet die Frames nach ihren Zeitstempeln aus
+    (Lücken werden mit dem vorherigen Frame gefüllt), damit die Videozeit der echten Zeit entspricht.
+    Optional: Aufteilung in Segmente und ein zeitsynchrones Erkennungsprotokoll (JSONL).
+    """
+
+    # Initialisiert die Aufnahme.
+    def __init__(self, output_path, fps=25.0, fourcc="mp4v", segment_seconds=0, max_pending=32,
+                 draw_boxes=False, log_detections=True, max_fill=None):
+        """
+        Initialisiert die Aufnahme (die Datei wird beim ersten Frame geöffnet).
+        :param output_path: Zielpfad des Videos (z. B. aufnahme.mp4). Bei Segmenten und nach einer Änderung der
+                            Bildgröße wird eine Nummer angehängt.
+        :param fps: Bildrate des Videos.
+        :param fourcc: Codec als FourCC (z. B. "mp4v", "MJPG", "XVID").
+        :param segment_seconds: Länge eines Segments in Sekunden (0 = eine Datei).
+        :param max_pending: Anzahl der wartenden Frames, danach wird verworfen.
+        :param draw_boxes: Rechtecke im Worker in den Frame zeichnen (für Rohframes mit objects).
+        :param log_detections: Erkennungsprotokoll <Video>.jsonl schreiben.
+        :param max_fill: Maximale Anzahl der Füllframes pro Lücke (Standard: 2 Sekunden).
+        """
+
+        self.output_path = output_path
+        self.fps = float(fps)
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.segment_seconds = segment_seconds
+        self.draw_boxes = draw_boxes
+        self.log_detections = log_detections
+        self.max_fill = int(2 * self.fps) if max_fill is None else max_fill
+        self.executor = BoundedExecutor(1, max_pending)
+        self.lock = threading.Lock()
+
+        # Zustand des Workers
+        self.writer = None
+        self.log = None
+        self.segment = -1
+        self.segment_start = 0.0
+        self.segment_frames = 0 # Geschriebene Videoframes im aktuellen Segment
+        self.frame_size = None
+        self.last_frame = None
+        self.paths = []
+
+        self.counters = {"submitted": 0, "dropped": 0, "frames": 0, "filled": 0, "skipped": 0, "errors": 0,
+                         "submit_ms": 0.0, "encode_ms": 0.0}
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    # Übergibt einen Frame an die Aufnahme.
+    def write(self, frame, objects=None, rgb=False, timestamp=None, labels=None):
+        """
+        Übergibt einen Frame an die Aufnahme (kehrt sofort zurück).
+        Der Frame darf danach nicht mehr verändert werden (ggf. vorher kopieren).
+        :param frame: Frame (BGR, bei rgb=True RGB).
+        :param objects: Erkannte Objekte (x, y, w, h) für das Protokoll bzw. zum Zeichnen.
+        :param rgb: True, wenn der Frame in RGB vorliegt (wird im Worker umgewandelt).
+        :param timestamp: Zeitstempel des Frames (Standard: aktuelle Zeit).
+        :param labels: Optional Klassifizierer-ID pro Objekt (für das Protokoll bei mehreren Klassifizierern).
+        :return: True, wenn der Frame angenommen wurde, False, wenn er verworfen wurde.
+        """
+
+        t0 = time.perf_counter()
+        timestamp = time.time() if timestamp is None else timestamp
+        boxes = [[int(v) for v in box] for box in objects] if objects is not None else []
+        labels = list(labels) if labels is not None else None
+        future = self.executor.submit(self._write_frame, frame, boxes, rgb, timestamp, labels, blocking=False)
+        with self.lock:
+            self.counters["dropped" if future is None else "submitted"] += 1
+            self.counters["submit_ms"] += (time.perf_counter() - t0) * 1000
+        return future is not None
+
+    # Öffnet ein neues Segment (läuft im Worker).
+    def _open_segment(self, timestamp, frame_size):
+        self._close_segment()
+        self.segment += 1
+        if self.segment_seconds or self.segment > 0: # Nach Größenwechsel neue Datei, nie die bisherige überschreiben
+            root, extension = os.path.splitext(self.output_path)
+            path = f"{root}_{self.segment:03d}{extension}"
+        else:
+            path = self.output_path
+        self.writer = cv2.VideoWriter(path, self.fourcc, self.fps, frame_size)
+        if not self.writer.isOpened():
+            raise IOError(f"Video konnte nicht geöffnet werden: {path}")
+        if self.log_detections:
+            self.log = open(os.path.splitext(path)[0] + ".jsonl", "w", encoding="utf-8")
+        self.segment_start = timestamp
+        self.segment_frames = 0
+        self.frame_size = frame_size
+        self.last_frame = None
+        self.paths.append(path)
+
+    # Schließt das aktuelle Segment (läuft im Worker).
+    def _close_segment(self):
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    # Schreibt einen Frame in das Video (läuft im Worker).
+    def _write_frame(self, frame, boxes, rgb, timestamp, labels=None):
+        try:
+            t0 = time.perf_counter()
+            frame_size = (frame.shape[1], frame.shape[0])
+            if (self.writer is None or frame_size != self.frame_size or
+                    (self.segment_seconds and timestamp - self.segment_start >= self.segment_seconds)):
+                self._open_segment(timestamp, frame_size)
+
+            if rgb:
+                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            if self.draw_boxes and boxes:
+                frame = frame.copy() if not rgb else frame
+                boxops.draw(frame, boxes, (0, 255, 0), 2)
+
+            # Zielposition im Video aus dem Zeitstempel; Lücken mit dem vorherigen Frame füllen
+            target = int(round((timestamp - self.segment_start) * self.fps))
+            if target < self.segment_frames and self.segment_frames > 0:
+                with self.lock:
+                    self.counters["skipped"] += 1 # Schneller als die Bildrate: Frame fällt weg, Protokoll bleibt
+            else:
+                fill = min(target - self.segment_frames, self.max_fill) if self.last_frame is not None else 0
+                for _ in range(fill):
+                    self.writer.write(self.last_frame)
+                self.writer.write(frame)
+                self.segment_frames += fill + 1
+                self.last_frame = frame
+                with self.lock:
+                    self.counters["filled"] += fill
+                    self.counters["frames"] += 1
+
+            if self.log is not None:
+                entry = {"timestamp": round(timestamp, 4), "segment": self.segment,
+                         "video_time": round((self.segment_frames - 1) / self.fps, 4),
+                         "video_frame": self.segment_frames - 1, "objects": boxes}
+                if labels is not None:
+                    entry["labels"] = labels
+                self.log.write(json.dumps(entry) + "\n")
+            with self.lock:
+                self.counters["encode_ms"] += (time.perf_counter() - t0) * 1000
+        except Exception as e: # Fehlerbehandlung
+            with self.lock:
+                self.counters["errors"] += 1
+            print(f"Fehler beim Schreiben des Videos: {e}")
+
+    # Liefert die Zähler der Aufnahme.
+    def get_stats(self):
+        """
+        :return: Dictionary mit übergebenen, verworfenen, geschriebenen, gefüllten und übersprungenen Frames,
+                 mittlerer Zeit im aufrufenden Thread (submit_ms) und im Worker (encode_ms) sowie den Dateien.
+        """
+
+        with self.lock:
+            stats = dict(self.counters)
+        stats["submit_ms"] = round(stats["submit_ms"] / max(stats["submitted"] + stats["dropped"], 1), 4)
+        stats["encode_ms"] = round(stats["encode_ms"] / max(stats["submitted"], 1), 3)
+        stats["files"] = list(self.paths)
+        return stats
+
+    # Beendet die Aufnahme.
+    def close(self, wait=True):
+        """
+        Beendet die Aufnahme und schließt Video und Protokoll.
+        :param wait: Wartende Frames noch schreiben (sonst werden sie verworfen).
+        :return: get_stats()
+        """
+
+        self.executor.shutdown(wait=True, cancel_pending=not wait)
+        self._close_segment()
+        return self.get_stats()
+
+
+# Misst den Aufwand der Aufnahme im Erkennungspfad (ohne und mit Aufnahme).
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import tempfile
+    from classifiermanager import ClassifierManager
+
+    parser = argparse.ArgumentParser(description="Aufnahme annotierter Frames: Aufwand im Erkennungspfad messen")
+    parser.add_argument("source", help="Videodatei, Kamera-Index oder Bildordner")
+    parser.add_argument("--output", default=None, help="Zielvideo (Standard: temporäre Datei)")
+    parser.add_argument("--classifier", default="face")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--fps", type=float, default=25)
+    parser.add_argument("--fourcc", default="mp4v")
+    parser.add_argument("--segment", type=float, default=0, help="Segmentlänge in Sekunden (0 = eine Datei)")
+    args = parser.parse_args()
+
+    # Frames laden (Bildordner: alle Bilder auf die Größe des ersten Bildes bringen)
+    if os.path.isdir(args.source):
+        images = [cv2.imread(path) for path in sorted(glob.glob(os.path.join(args.source, "*")))]
+        images = [image for image in images if image is not None]
+        images = [cv2.resize(image, (images[0].shape[1], images[0].shape[0])) for image in images]
+    else:
+        capture = cv2.VideoCapture(int(args.source) if args.source.isdigit() else args.source)
+        images = []
+        while len(images) < args.frames:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            images.append(frame)
+        capture.release()
+    frames = [images[i % len(images)] for i in range(args.frames)]
+
+    manager = ClassifierManager()
+    params = manager.snapshot_params(args.classifier)
+    output = args.output or os.path.join(tempfile.mkdtemp(prefix="recording-"), "aufnahme.mp4")
+
+    # Erkennungspfad wie in App.update_frame: Kopie, Erkennung, Rechtecke zeichnen (+ Aufnahme)
+    def run(recorder):
+        t0, start = time.perf_counter(), time.time()
+        for i, frame in enumerate(frames):
+            frame = frame.copy()
+            objects = manager.detect(frame, params)
+            for (x, y, w, h) in objects:
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            if recorder is not None:
+                recorder.write(frame, objects, timestamp=start + i / args.fps) # Jeder Frame wird kodiert
+        return (time.perf_counter() - t0) * 1000 / len(frames)
+
+    run(None) # Aufwärmen
+    baseline_ms = run(None)
+    recorder = VideoRecorder(output, args.fps, args.fourcc, args.segment)
+    recording_ms = run(recorder)
+    stats = recorder.close()
+    stats.update(baseline_ms=round(baseline_ms, 3), recording_ms=round(recording_ms, 3),
+                 overhead_percent=round(100 * (recording_ms - baseline_ms) / baseline_ms, 2),
+                 submit_percent=round(100 * stats["submit_ms"] / baseline_ms, 3))
+    print(json.dumps(stats))
+    manager.shutdown()
@@ -0,0 +1,409 @@
+import json
+import os
+import time
+import cv2
+import numpy as np
+import boxops
+from atomicfile import atomic_write
+
+# Gespeicherte Maßstäbe pro Kamera
+SCALEMAPS_PATH = os.path.join(os.path.expanduser("~"), ".haarcascades", "scalemaps.json")
+
+
+# Erwartete Objektgröße pro horizontalem Bildstreifen (fest montierte Kamera, Perspektive).
+class ScaleMap:
+    """
+    Erwartete Objektgröße pro horizontalem Bildstreifen für eine fest montierte Kamera: oben im Bild sind Personen
+    klein, unten groß. Statt über das ganze Bild alle Größen ab minSize zu suchen, wird jeder Streifen mit engem
+    minSize/maxSize durchsucht (Streifen um die halbe maximale Objektgröße erweitert, Treffer zählen nur mit
+    Mittelpunkt im eigenen Streifen).
+    Der Maßstab wird gelernt (Objektgrößen aus vollständigen Durchläufen, Gerade Größe ~ Bildzeile plus Streuung pro
+    Streifen) oder vorgegeben (Größe oben und unten, set_line()). Positionen und Größen werden relativ zur Bildhöhe
+    gespeichert, pro Kamera in ~/.haarcascades/scalemaps.json, und daher für jede Auflösung der Kamera auf die Höhe
+    des aktuellen Frames umgerechnet. Bilder mit anderem Seitenverhältnis als bei der Kalibrierung (z. B. Ausschnitte
+    des Bewegungsfilters, gedrehte Durchläufe) werden unverändert vollständig durchsucht.
+    """
+
+    # Initialisiert den Maßstab.
+    def __init__(self, bands=6, margin=1.15, min_samples=30, aspect_tolerance=0.02, path=SCALEMAPS_PATH):
+        """
+        Initialisiert den Maßstab.
+        :param bands: Anzahl der Streifen.
+        :param margin: Spielraum: minSize wird durch margin geteilt, maxSize mit margin multipliziert.
+        :param min_samples: Mindestanzahl an Objekten, bevor aus dem Lernen ein Maßstab berechnet wird.
+        :param aspect_tolerance: Relative Abweichung des Seitenverhältnisses, bis zu der ein Frame als ganzes Bild der
+                                 Kamera gilt (sonst Ausschnitt: vollständige Suche).
+        :param path: JSON-Datei der gespeicherten Maßstäbe (None = nicht speichern).
+        """
+
+        self.band_count = bands
+        self.margin = margin
+        self.min_samples = min_samples
+        self.aspect_tolerance = aspect_tolerance
+        self.path = path
+        self.camera = None
+        self.bands = None # Liste von (oben, unten, kleinste Größe, größte Größe), relativ zur Bildhöhe
+        self.frame_height = None # Bildhöhe bei der Kalibrierung
+        self.frame_width = None # Bildbreite bei der Kalibrierung (None = Seitenverhältnis unbekannt)
+        self.samples = [] # (Mittelpunkt y, Größe) relativ zur Bildhöhe
+        self.learn_frames = 0 # Noch zu lernende Frames (0 = Maßstab verwenden)
+        self.learn_result = None # Ergebnis des letzten Lernens ("fitted" oder "insufficient")
+        self.pending = [] # Ergebnisse des Lernens seit dem letzten pop_results()
+        self.counters = {"frames": 0, "banded": 0, "full": 0, "ms": 0.0, "band_found": 0, "dropped": 0}
+
+    # Beginnt das Lernen.
+    def start_learning(self, frames=300, camera=None):
+        """
+        Sammelt die Objekte der nächsten frames vollständigen Durchläufe; danach wird der Maßstab berechnet und
+        (mit camera) gespeichert.
+        :param frames: Anzahl der Frames.
+        :param camera: Kennung der Kamera (z. B. Name aus dem CameraManager).
+        :return: None
+        """
+
+        self.samples = []
+        self.learn_frames = frames
+        self.learn_result = None
+        self.camera = camera if camera is not None else self.camera
+
+    # Trägt erkannte Objekte ein (Lernen).
+    def observe(self, objects, frame_height, frame_width=None):
+        """
+        :param objects: Erkannte Objekte (x, y, w, h).
+        :param frame_height: Höhe des Frames in Pixeln.
+        :param frame_width: Breite des Frames in Pixeln (für das Seitenverhältnis).
+        :return: None
+        """
+
+        boxes = boxops.as_boxes(objects).astype(np.float64)
+        if not len(boxes):
+            return
+        self.frame_height, self.frame_width = frame_height, frame_width
+        centers = (boxes[:, 1] + boxes[:, 3] / 2) / frame_height
+        sizes = np.sqrt(boxes[:, 2] * boxes[:, 3]) / frame_height
+        self.samples += list(zip(centers.tolist(), sizes.tolist()))
+
+    # Berechnet die Streifen aus einer Geraden Größe ~ Bildzeile.
+    def _bands_from_line(self, intercept, slope, samples=None):
+        edges = np.linspace(0, 1, self.band_count + 1)
+        bands = []
+        for top, bottom in zip(edges[:-1], edges[1:]):
+            predicted = sorted((intercept + slope * top, intercept + slope * bottom))
+            low, high = max(predicted[0], 0.0), max(predicted[1], 0.0)
+            if samples is not None: # Streuung der gelernten Objekte im Streifen einbeziehen
+                inside = samples[(samples[:, 0] >= top) & (samples[:, 0] < bottom), 1]
+                if len(inside) >= 5:
+                    low, high = min(low, float(np.percentile(inside, 5))), max(high, float(np.percentile(inside, 95)))
+            bands.append((float(top), float(bottom), low / self.margin, high * self.margin))
+        return bands
+
+    # Berechnet den Maßstab aus den gelernten Objekten.
+    def fit(self):
+        """
+        Passt eine Gerade Größe = a + b * Zeile an die gelernten Objekte an und leitet daraus die Grenzen pro Streifen ab.
+        :return: True, wenn ein Maßstab berechnet wurde, False bei zu wenigen Objekten.
+        """
+
+        if len(self.samples) < self.min_samples:
+            return False
+        samples = np.array(self.samples)
+        slope, intercept = np.polyfit(samples[:, 0], samples[:, 1], 1)
+        self.bands = self._bands_from_line(intercept, slope, samples)
+        return True
+
+    # Legt den Maßstab über die Objektgröße oben und unten im Bild fest.
+    def set_line(self, top_size, bottom_size, frame_height, frame_width=None):
+        """
+        Legt den Maßstab von Hand fest (z. B. aus zwei eingezeichneten Rechtecken).
+        :param top_size: Objektgröße in Pixeln am oberen Bildrand.
+        :param bottom_size: Objektgröße in Pixeln am unteren Bildrand.
+        :param frame_height: Höhe des Frames in Pixeln.
+        :param frame_width: Breite des Frames in Pixeln (für das Seitenverhältnis).
+        :return: None
+        """
+
+        self.frame_height, self.frame_width = frame_height, frame_width
+        intercept = top_size / frame_height
+        self.bands = self._bands_from_line(intercept, bottom_size / frame_height - intercept)
+        self.learn_frames = 0
+
+    # Prüft, ob ein Bild ein ganzer Frame der Kamera ist (gleiches Seitenverhältnis wie bei der Kalibrierung).
+    def covers(self, height, width):
+        """
+        :param height: Höhe des Bildes.
+        :param width: Breite des Bildes.
+        :return: True, wenn der Maßstab (auf die Höhe umgerechnet) für das Bild gilt.
+        """
+
+        if self.bands is None:
+            return False
+        if not self.frame_width or not self.frame_height: # Ältere Einträge ohne Breite: nur die Höhe ist bekannt
+            return True
+        aspect = self.frame_width / self.frame_height
+        return abs(width / height - aspect) <= self.aspect_tolerance * aspect
+
+    # Beendet das Lernen: berechnet und speichert den Maßstab oder meldet zu wenige Objekte.
+    def _finish_learning(self):
+        if self.fit():
+            self.learn_result = "fitted"
+            if self.camera is not None:
+                self.save(self.camera)
+        else:
+            self.learn_result = "insufficient"
+        self.pending.append({"result": self.learn_result, "samples": len(self.samples),
+                             "min_samples": self.min_samples, "camera": self.camera})
+
+    # Liefert die Ergebnisse des Lernens seit dem letzten Aufruf.
+    def pop_results(self):
+        """
+        :return: Liste von Dictionaries mit Ergebnis ("fitted" oder "insufficient"), Anzahl der Objekte, Mindestanzahl
+                 und Kamera.
+        """
+
+        results, self.pending = self.pending, []
+        return results
+
+    # Beschreibt ein Ergebnis des Lernens für die Statusleiste.
+    def describe(self, result):
+        """
+        :param result: Eintrag aus pop_results().
+        :return: Text
+        """
+
+        if result["result"] == "fitted":
+            return f"Maßstab für {result['camera']} gelernt ({result['samples']} Objekte, {len(self.bands)} Streifen)."
+        return (f"Maßstab für {result['camera']} nicht gelernt: nur {result['samples']} von {result['min_samples']} "
+                f"Objekten erkannt, es wird weiter das ganze Bild durchsucht.")
+
+    # Liefert die Suchbereiche eines Frames in Pixeln.
+    def windows(self, height, width, window=(24, 24), min_size=(0, 0)):
+        """
+        :param height: Höhe des Frames.
+        :param width: Breite des Frames.
+        :param window: Fenstergröße des Klassifizierers (kleinere Objekte sind nicht erkennbar).
+        :param min_size: minSize des Klassifizierers (untere Grenze für alle Streifen).
+        :return: Liste von (erste Zeile, letzte Zeile des Ausschnitts, oben, unten des Streifens, minSize, maxSize)
+        """
+
+        result = []
+        for index, (top, bottom, low, high) in enumerate(self.bands):
+            min_px = max(int(low * height), window[0], min_size[0])
+            max_px = int(np.ceil(high * height))
+            if max_px < min_px:
+                continue # In diesem Streifen sind keine erkennbaren Objekte zu erwarten
+            max_px = min(max_px, height, width)
+            y0, y1 = int(top * height), int(bottom * height) if index < len(self.bands) - 1 else height
+            row0, row1 = max(y0 - max_px // 2 - 1, 0), min(y1 + max_px // 2 + 1, height)
+            result.append((row0, row1, y0, y1, (min_px, min_px), (max_px, max_px)))
+        return result
+
+    # Erkennt Objekte streifenweise.
+    def detect(self, image, params, detect_fn, window=(24, 24), mask=None, learn=True):
+        """
+        Erkennt Objekte streifenweise mit engem minSize/maxSize, die Streifen werden auf die Höhe des Bildes
+        umgerechnet. Beim Lernen, ohne Maßstab oder bei anderem Seitenverhältnis (Ausschnitt) wird das ganze Bild
+        durchsucht.
+        :param image: Frame (BGR oder Graustufen).
+        :param params: DetectionParams-Schnappschuss.
+        :param detect_fn: Funktion detect_fn(image, params) -> Objekte, z. B. ClassifierManager.detect.
+        :param window: Fenstergröße des Klassifizierers.
+        :param mask: Optional DetectionMask: jeder Streifen wird nur innerhalb der Rechtecke der Einschlussbereiche durchsucht.
+        :param learn: False: das Bild zählt nicht zum Lernen (z. B. gespiegelter Durchlauf desselben Frames).
+        :return: Erkannte Objekte als NumPy-Array (N, 4) oder None, falls detect_fn None liefert.
+        """
+
+        t0 = time.perf_counter()
+        height, width = image.shape[:2]
+        self.counters["frames"] += 1
+        if self.learn_frames > 0 or not self.covers(height, width):
+            objects = detect_fn(image, params)
+            self.counters["full"] += 1
+            if self.learn_frames > 0 and learn and objects is not None:
+                self.observe(objects, height, width)
+                self.learn_frames -= 1
+                if self.learn_frames == 0:
+                    self._finish_learning()
+            return objects
+
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) # Eine Umwandlung für alle Streifen
+        found = []
+        windows = self.windows(height, width, window, params.minSize)
+        rectangles = mask.rectangles(width, height, params.minSize) if mask is not None else [(0, 0, width, height)]
+        for row0, row1, y0, y1, min_size, max_size in windows:
+            for x, y, w, h in rectangles:
+                top, bottom = max(row0, y), min(row1, y + h)
+                if bottom - top < min_size[1] or w < min_size[0]: # Streifen berührt den Bereich nicht (ausreichend)
+                    continue
+                objects = detect_fn(gray[top:bottom, x:x + w], params._replace(minSize=min_size, maxSize=max_size))
+                if objects is None:
+                    return None
+                boxes = boxops.remap(objects, offset=(x, top))
+                centers = boxes[:, 1] + boxes[:, 3] / 2
+                keep = (centers >= y0) & (centers < y1)
+                self.counters["dropped"] += int(len(boxes) - keep.sum())
+                found.append(boxes[keep])
+        found = np.concatenate(found) if found else np.empty((0, 4), dtype=np.int32)
+        if len(found) > 1: # Objekte auf einer Streifengrenze können in beiden Streifen erscheinen
+            found = found[np.sort(boxops.nms(found, iou_threshold=0.5))]
+        self.counters["banded"] += 1
+        self.counters["band_found"] += len(found)
+        self.counters["ms"] += (time.perf_counter() - t0) * 1000
+        return found
+
+    # Lädt den Maßstab einer Kamera.
+    def load(self, camera):
+        """
+        :param camera: Kennung der Kamera.
+        :return: True, wenn ein Maßstab gefunden wurde, sonst False
+        """
+
+        self.camera = camera
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                entry = json.load(file).get(str(camera))
+        except (OSError, ValueError, TypeError):
+            entry = None
+        if not entry:
+            return False
+        self.bands = [tuple(band) for band in entry["bands"]]
+        self.frame_height = entry["frame_height"]
+        self.frame_width = entry.get("frame_width")
+        self.band_count = len(self.bands)
+        return True
+
+    # Speichert den Maßstab einer Kamera.
+    def save(self, camera=None):
+        """
+        :param camera: Kennung der Kamera (Standard: zuletzt verwendete).
+        :return: True, wenn gespeichert wurde, sonst False
+        """
+
+        camera = camera if camera is not None else self.camera
+        if self.path is None or self.bands is None or camera is None:
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                maps = json.load(file)
+        except (OSError, ValueError):
+            maps = {}
+        maps[str(camera)] = {"bands": [list(band) for band in self.bands], "frame_height": self.frame_height,
+                             "frame_width": self.frame_width, "samples": len(self.samples),
+                             "updated": time.strftime("%Y-%m-%d %H:%M:%S")}
+        try:
+            self._write(maps)
+            return True
+        except Exception as e: # Fehlerbehandlung
+            print(f"Fehler beim Speichern des Maßstabs: {e}")
+            return False
+
+    # Löscht den Maßstab einer Kamera.
+    def remove(self, camera=None):
+        """
+        :param camera: Kennung der Kamera (Standard: zuletzt verwendete).
+        :return: None
+        """
+
+        camera = camera if camera is not None else self.camera
+        self.bands = None
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                maps = json.load(file)
+            if maps.pop(str(camera), None) is not None:
+                self._write(maps)
+        except (OSError, ValueError, TypeError):
+            pass
+
+    # Schreibt die Maßstäbe (ein Abbruch hinterlässt keine halb geschriebene Datei).
+    def _write(self, maps):
+        with atomic_write(self.path, "w", encoding="utf-8") as file:
+            json.dump(maps, file, indent=2)
+
+    # Liefert die Zähler.
+    def get_stats(self):
+        """
+        :return: Dictionary mit Lernstand, Ergebnis des letzten Lernens, Streifen (in Pixeln der Kalibrierung) und
+                 mittlerer Dauer der Streifensuche.
+        """
+
+        height = self.frame_height or 0
+        return {"learning": self.learn_frames, "samples": len(self.samples), "min_samples": self.min_samples,
+                "learn_result": self.learn_result, "frames": self.counters["frames"],
+                "banded": self.counters["banded"], "full": self.counters["full"],
+                "banded_ms": round(self.counters["ms"] / max(self.counters["banded"], 1), 1),
+                "bands": [(int(top * height), int(bottom * height), int(low * height), int(np.ceil(high * height)))
+                          for top, bottom, low, high in (self.bands or [])]}
+
+
+# Erzeugt eine Gang-Szene mit perspektivisch skalierten Gesichtern und vergleicht vollständige und streifenweise Suche.
+if __name__ == "__main__":
+    import argparse
+    from classifiermanager import ClassifierManager
+
+    parser = argparse.ArgumentParser(description="Maßstab pro Bildstreifen: Lernen und Latenz gegen vollständige Suche")
+    parser.add_argument("video", nargs="?", default=None, help="Aufnahme einer fest montierten Kamera (ohne: künstliche Gang-Szene)")
+    parser.add_argument("--faces", default="lfw_mosaic.png", help="Gesichter-Mosaik (10 x 10) für die künstliche Szene")
+    parser.add_argument("--background", default=None, help="Hintergrundbild der künstlichen Szene")
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--learn", type=int, default=10, help="Frames zum Lernen")
+    parser.add_argument("--bands", type=int, default=6)
+    parser.add_argument("--margin", type=float, default=1.15)
+    parser.add_argument("--classifier", default="face")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+
+    # Künstliche Gang-Szene: Gesichter oben klein (36 px), unten groß (150 px), 1280 x 720
+    def synthetic_frames(count):
+        mosaic = cv2.imread(args.faces)
+        background = cv2.imread(args.background) if args.background else None
+        for _ in range(count):
+            frame = cv2.resize(background, (1280, 720)) if background is not None else np.full((720, 1280, 3), 90, np.uint8)
+            for row in range(6):
+                center_y = 40 + row * 125 + rng.integers(-10, 10)
+                size = int(36 + (150 - 36) * center_y / 720)
+                for x in rng.choice(np.arange(0, 1280 - size, size + 10), size=3, replace=False):
+                    cell = mosaic[100 * rng.integers(10):][:100, 100 * rng.integers(10):][:, :100]
+                    top = int(np.clip(center_y - size // 2, 0, 720 - size))
+                    frame[top:top + size, x:x + size] = cv2.resize(cell, (size, size))
+            yield frame
+
+    def video_frames(count):
+        capture = cv2.VideoCapture(args.video)
+        for _ in range(count):
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield frame
+        capture.release()
+
+    frames = list((video_frames if args.video else synthetic_frames)(args.learn + args.frames))
+    manager = ClassifierManager()
+    params = manager.snapshot_params(args.classifier)
+    window = manager.get_window_size(args.classifier)
+    scale_map = ScaleMap(bands=args.bands, margin=args.margin, path=None)
+    scale_map.start_learning(args.learn)
+    for frame in frames[:args.learn]:
+        scale_map.detect(frame, params, manager.detect, window)
+    learned = scale_map.bands is not None
+    manager.detect(frames[0], params) # Aufwärmen
+
+    full_ms, banded_ms, full_found, banded_found, matched = [], [], 0, 0, 0
+    for frame in frames[args.learn:]:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        t0 = time.perf_counter()
+        full = boxops.as_boxes(manager.detect(gray, params))
+        full_ms.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        banded = scale_map.detect(gray, params, manager.detect, window)
+        banded_ms.append((time.perf_counter() - t0) * 1000)
+        full_found += len(full)
+        banded_found += len(banded)
+        if len(full) and len(banded):
+            matched += int((boxops.iou_matrix(full, banded).max(axis=1) >= 0.5).sum())
+    manager.shutdown()
+    print(json.dumps({"source": args.video or "künstliche Gang-Szene 1280x720", "learned": learned,
+                      "bands": scale_map.get_stats()["bands"],
+                      "full_ms": round(float(np.median(full_ms)), 1), "banded_ms": round(float(np.median(banded_ms)), 1),
+                      "speedup": round(float(np.median(full_ms) / np.median(banded_ms)), 2),
+                      "found_full": full_found, "found_banded": banded_found,
+                      "full_also_found_banded": round(matched / max(full_found, 1), 3)}, indent=2, ensure_ascii=False))
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+import pytest
+import boxops
+
+
+# Zufällige, teils stark überlappende Rechtecke (Cluster wie bei detectMultiScale ohne Gruppierung).
+def make_boxes(n, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.integers(50, 590, size=(max(n // 8, 1), 2))
+    picked = centers[rng.integers(len(centers), size=n)] + rng.integers(-12, 12, size=(n, 2))
+    sizes = rng.integers(24, 120, size=n)
+    return np.column_stack([picked - sizes[:, None] // 2, sizes, sizes]).astype(np.int32)
+
+
+# Gierige NMS als Referenz: Reihenfolge abarbeiten, alles mit IoU > Schwelle zu einem behaltenen Rechteck verwerfen.
+def reference_nms(boxes, order, iou_threshold):
+    keep = []
+    for i in order:
+        if all(boxops.iou_matrix(boxes[i:i + 1], boxes[j:j + 1])[0, 0] <= iou_threshold for j in keep):
+            keep.append(i)
+    return keep
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("iou_threshold", [0.3, 0.5])
+def test_nms_matches_greedy_reference(seed, iou_threshold):
+    boxes = make_boxes(200, seed)
+    order = np.argsort(-(boxes[:, 2] * boxes[:, 3]), kind="stable")
+    assert boxops.nms(boxes, iou_threshold=iou_threshold).tolist() == reference_nms(boxes, order, iou_threshold)
+
+
+def test_nms_matches_nmsboxes_with_scores():
+    boxes = make_boxes(300, 7)
+    scores = np.random.default_rng(7).random(len(boxes)).astype(np.float32)
+    expected = np.asarray(cv2.dnn.NMSBoxes(boxes, scores, 0.0, 0.4)).reshape(-1)
+    assert boxops.nms(boxes, scores, iou_threshold=0.4).tolist() == expected.tolist()
+
+
+def test_nms_order_takes_precedence_and_drops_missing_indices():
+    boxes = np.array([[0, 0, 100, 100], [10, 10, 100, 100], [300, 300, 50, 50]])
+    assert boxops.nms(boxes, iou_threshold=0.3, order=[1, 0]).tolist() == [1]
+    assert boxops.nms(np.empty((0, 4))).tolist() == []
+
+
+@pytest.mark.parametrize("min_neighbors", [1, 2, 3])
+def test_group_similar_matches_grouprectangles(min_neighbors):
+    boxes = make_boxes(400, min_neighbors)
+    expected, weights = cv2.groupRectangles(boxes, min_neighbors, 0.2)
+    merged, counts = boxops.group_similar(boxes, 0.2, min_neighbors)
+    assert merged.tolist() == np.asarray(expected).reshape(-1, 4).tolist()
+    assert counts.tolist() == np.asarray(weights).reshape(-1).tolist()
+
+
+def test_group_similar_keeps_single_boxes_without_min_neighbors():
+    boxes = np.array([[0, 0, 50, 50], [2, 2, 50, 50], [400, 400, 40, 40]])
+    merged, counts = boxops.group_similar(boxes, 0.2, 0)
+    assert sorted(counts.tolist()) == [1, 2]
+    assert [400, 400, 40, 40] in merged.tolist()
+    # cv2.groupRectangles selbst verwirft mit groupThreshold=1 Einzeltreffer
+    assert [400, 400, 40, 40] not in np.asarray(cv2.groupRectangles(boxes, 1, 0.2)[0]).reshape(-1, 4).tolist()
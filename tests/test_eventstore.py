@@ -0,0 +1,96 @@
+import os
+import numpy as np
+import pytest
+from eventstore import EventStore, FRAME_COLUMNS, ROLLUP_COLUMNS
+
+START = 1_700_000_000.0 # 2023-11-14, Segment 20231114
+SEGMENT = "20231114"
+
+
+def boxes_of(index):
+    return np.array([[index, index + 1, 20, 20]] * (index % 3), dtype=np.int32).reshape(-1, 4)
+
+
+# Schreibt frames Frames mit 0, 1 oder 2 Rechtecken und schließt den Speicher.
+def write_frames(root, frames, offset=0):
+    store = EventStore(str(root))
+    for index in range(offset, offset + frames):
+        store.append(boxes_of(index), "face", "kamera0", START + index)
+    assert store.flush()
+    store.close()
+
+
+def column_rows(root, name, dtype, width=1):
+    return os.path.getsize(os.path.join(root, SEGMENT, name)) // (np.dtype(dtype).itemsize * width)
+
+
+def append_bytes(root, name, data):
+    with open(os.path.join(root, SEGMENT, name), "ab") as file:
+        file.write(data)
+
+
+def assert_frames(store, frames):
+    result = store.frames(START, START + 3600, with_boxes=True)
+    assert result["timestamp"].tolist() == [START + index for index in range(frames)]
+    assert [boxes.tolist() for boxes in result["boxes"]] == [boxes_of(index).tolist() for index in range(frames)]
+
+
+def test_reopen_without_crash_keeps_everything(tmp_path):
+    write_frames(tmp_path, 10)
+    store = EventStore(str(tmp_path))
+    assert store.recovered == {}
+    assert_frames(store, 10)
+    store.close()
+
+
+@pytest.mark.parametrize("torn", [
+    {"ts.f8": np.float64(START + 10).tobytes()}, # Zeitstempel geschrieben, Rest fehlt
+    {"ts.f8": np.float64(START + 10).tobytes(), "stream.u2": b"\x00\x00", "classifier.u2": b"\x00"}, # halbe Zeile
+    {name: np.zeros(1, dtype).tobytes() for name, (dtype, _) in FRAME_COLUMNS.items() if name != "box_start.u4"},
+])
+def test_torn_frame_columns_are_truncated(tmp_path, torn):
+    write_frames(tmp_path, 10)
+    for name, data in torn.items():
+        append_bytes(tmp_path, name, data)
+
+    store = EventStore(str(tmp_path))
+    assert store.recovered == {SEGMENT: 1}
+    assert {column_rows(tmp_path, name, dtype) for name, (dtype, _) in FRAME_COLUMNS.items()} == {10}
+    assert_frames(store, 10)
+    store.close()
+
+
+def test_frame_without_its_boxes_is_dropped(tmp_path):
+    write_frames(tmp_path, 6) # Frame 5 hat zwei Rechtecke
+    path = os.path.join(tmp_path, SEGMENT, "boxes.u2")
+    with open(path, "r+b") as file:
+        file.truncate(os.path.getsize(path) - 8 - 3) # Letztes Rechteck und ein Teil des vorletzten fehlen
+
+    store = EventStore(str(tmp_path))
+    assert store.recovered == {SEGMENT: 1}
+    assert column_rows(tmp_path, "boxes.u2", np.uint16, 4) == sum(len(boxes_of(index)) for index in range(5))
+    assert_frames(store, 5)
+    store.close()
+
+
+def test_appends_after_recovery_stay_aligned(tmp_path):
+    write_frames(tmp_path, 10)
+    append_bytes(tmp_path, "count.u2", np.uint16(2).tobytes())
+    append_bytes(tmp_path, "boxes.u2", np.zeros(6, np.uint16).tobytes())
+    write_frames(tmp_path, 10, offset=10) # Öffnet (und repariert) neu, hängt an
+
+    store = EventStore(str(tmp_path))
+    assert store.recovered == {}
+    assert_frames(store, 20)
+    store.close()
+
+
+def test_torn_rollup_columns_are_truncated(tmp_path):
+    write_frames(tmp_path, 10)
+    rows = column_rows(tmp_path, "minute.i8", np.int64)
+    append_bytes(tmp_path, "minute.i8", np.int64(START // 60 + 5).tobytes())
+    append_bytes(tmp_path, "frames.u4", b"\x01\x00")
+
+    store = EventStore(str(tmp_path))
+    assert {column_rows(tmp_path, name, dtype) for name, (dtype, _) in ROLLUP_COLUMNS.items()} == {rows}
+    store.close()
@@ -0,0 +1,44 @@
+import os
+import cv2
+import numpy as np
+import pytest
+from haarevaluator import HaarEvaluator
+
+IMAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "face_animation.jpg")
+
+
+@pytest.fixture(scope="module")
+def gray():
+    image = cv2.imread(IMAGE, cv2.IMREAD_GRAYSCALE)
+    return cv2.resize(image, (240, 240), interpolation=cv2.INTER_AREA) # Klein halten, NumPy wertet alle Fenster aus
+
+
+def as_set(objects):
+    return sorted(map(tuple, np.asarray(objects).reshape(-1, 4).tolist()))
+
+
+@pytest.mark.parametrize("cascade", ["haarcascade_frontalface_default.xml", "haarcascade_frontalface_alt_tree.xml",
+                                     "haarcascade_profileface.xml", "haarcascade_eye.xml"])
+@pytest.mark.parametrize("min_neighbors", [0, 3])
+def test_detect_matches_cascadeclassifier(gray, cascade, min_neighbors):
+    path = cv2.data.haarcascades + cascade
+    params = dict(scaleFactor=1.1, minNeighbors=min_neighbors, minSize=(24, 24))
+    expected = cv2.CascadeClassifier(path).detectMultiScale(gray, **params)
+    assert as_set(HaarEvaluator(path).detectMultiScale(gray, **params)) == as_set(expected)
+
+
+def test_max_size_and_scale_factor_match(gray):
+    path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+    params = dict(scaleFactor=1.25, minNeighbors=0, minSize=(30, 30), maxSize=(90, 90))
+    expected = cv2.CascadeClassifier(path).detectMultiScale(gray, **params)
+    assert as_set(HaarEvaluator(path).detectMultiScale(gray, **params)) == as_set(expected)
+
+
+def test_detect_stack_matches_single_images(gray):
+    path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+    evaluator = HaarEvaluator(path)
+    images = [gray, cv2.flip(gray, 1), np.full_like(gray, 128)]
+    stacked = evaluator.detect_stack(images, 1.1, 0, (24, 24))
+    assert [as_set(objects) for objects in stacked] == [as_set(evaluator.detectMultiScale(image, 1.1, 0, (24, 24)))
+                                                        for image in images]
+    assert evaluator.last_stats["scales"] > 0
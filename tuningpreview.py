@@ -0,0 +1,221 @@
+import time
+import cv2
+
+# Anzeigenamen der Stufen
+STAGE_PREVIEW = "Vorschau"
+STAGE_REFINING = "Vorschau, verfeinere..."
+STAGE_FULL = "Volle Auflösung"
+
+
+# Zeigt beim Verstellen der Regler erst eine schnelle Erkennung im verkleinerten Bild und verfeinert im Hintergrund.
+class ProgressivePreview:
+    """
+    Grob-zu-fein-Vorschau für ein geladenes Bild beim Einstellen von scaleFactor, minNeighbors und minSize:
+    Reglerereignisse werden entprellt (erst nach debounce_ms ohne weitere Änderung wird gerechnet), dann wird im auf
+    preview_side Pixel verkleinerten Bild erkannt (wenige zehn Millisekunden) und die Erkennung in voller Auflösung auf
+    dem Thread-Pool des ClassifierManagers nachgereicht. Ändern sich die Parameter erneut, wird eine noch wartende
+    Verfeinerung abgebrochen und das Ergebnis einer laufenden verworfen. Solange sich nichts ändert, wird nicht
+    erneut erkannt. Beide Stufen erkennen über ClassifierManager.detect_image(), also mit denselben zusätzlichen
+    Durchläufen, Maßstab und Erkennungsbereichen wie die Anzeige.
+    poll() liefert die Rechtecke in Pixeln des Originals und die angezeigte Stufe.
+    """
+
+    # Initialisiert die Vorschau.
+    def __init__(self, classifier_manager, debounce_ms=60, max_wait_ms=250, preview_side=320):
+        """
+        Initialisiert die Vorschau.
+        :param classifier_manager: ClassifierManager (detect_image() mit Parameter-Schnappschuss und Thread-Pool).
+        :param debounce_ms: Ruhezeit nach der letzten Änderung, bevor die Vorschau berechnet wird.
+        :param max_wait_ms: Spätestens nach dieser Zeit wird auch während des Ziehens eine Vorschau berechnet.
+        :param preview_side: Längere Seite des Vorschaubildes in Pixeln.
+        """
+
+        self.classifier_manager = classifier_manager
+        self.debounce = debounce_ms / 1000
+        self.max_wait = max_wait_ms / 1000
+        self.preview_side = preview_side
+        self.image = None # Graustufenbild für die volle Erkennung
+        self.scale = 1.0 # Verkleinerungsfaktor von image gegenüber dem Original
+        self.preview = None # (verkleinertes Bild, Faktor gegenüber image)
+        self.params = None # Zuletzt angezeigte Parameter
+        self.pending = None # Geänderte Parameter, die noch entprellt werden
+        self.changed_at = 0.0
+        self.first_change_at = 0.0
+        self.generation = 0
+        self.future = None
+        self.objects = None
+        self.stage = None
+        self.counters = {"previews": 0, "refinements": 0, "cancelled": 0, "discarded": 0, "preview_ms": 0.0, "full_ms": 0.0}
+
+    # Legt das Bild fest.
+    def set_image(self, gray, scale=1.0):
+        """
+        Legt das Bild fest (z. B. nach dem Laden oder nach neuem Dekodieren mit anderem Faktor).
+        :param gray: Graustufenbild (verkleinert dekodiert oder Original).
+        :param scale: Verkleinerungsfaktor des Bildes gegenüber dem Original.
+        :return: None
+        """
+
+        self.image = gray
+        self.scale = scale
+        factor = max(gray.shape[:2]) / self.preview_side
+        if factor > 1.5: # Vorschau lohnt sich erst bei deutlich größerem Bild
+            size = (max(int(round(gray.shape[1] / factor)), 1), max(int(round(gray.shape[0] / factor)), 1))
+            self.preview = (cv2.resize(gray, size, interpolation=cv2.INTER_AREA), factor)
+        else:
+            self.preview = None
+        self._cancel()
+        self.params = self.pending = None
+        self.objects = self.stage = None
+
+    # Erkennt beim nächsten poll() erneut (z. B. nach einem Wechsel der zusätzlichen Durchläufe oder Bereiche).
+    def refresh(self):
+        """
+        Verwirft die angezeigten Rechtecke, ohne das Bild neu zu verkleinern; poll() erkennt dann sofort neu.
+        :return: None
+        """
+
+        self._cancel()
+        self.params = self.pending = None
+
+    # Bricht eine laufende oder wartende Verfeinerung ab.
+    def _cancel(self):
+        self.generation += 1
+        if self.future is not None and not self.future.done():
+            if self.future.cancel():
+                self.counters["cancelled"] += 1
+            else: # Läuft bereits: Ergebnis wird nicht mehr abgeholt
+                self.counters["discarded"] += 1
+        self.future = None
+
+    # Erkennt im verkleinerten Bild.
+    def _detect_preview(self, params):
+        t0 = time.perf_counter()
+        image, factor = self.preview if self.preview is not None else (self.image, 1.0)
+        # minSize wird auf das Vorschaubild umgerechnet (Objekte unter Fenstergröße * Faktor erscheinen erst in
+        # voller Auflösung), die Rechtecke kommen in Pixeln des Originals zurück
+        objects = self.classifier_manager.detect_image(image, params, factor * self.scale)
+        self.counters["preview_ms"] += (time.perf_counter() - t0) * 1000
+        self.counters["previews"] += 1
+        return objects
+
+    # Erkennt in voller Auflösung (läuft auf dem Thread-Pool).
+    def _detect_full(self, params, generation):
+        if generation != self.generation: # Veraltet, bevor die Arbeit begonnen hat
+            return None
+        t0 = time.perf_counter()
+        objects = self.classifier_manager.detect_image(self.image, params, self.scale)
+        self.counters["full_ms"] += (time.perf_counter() - t0) * 1000
+        return objects
+
+    # Liefert die anzuzeigenden Rechtecke und die Stufe.
+    def poll(self, params):
+        """
+        Einmal pro Timer-Takt aufrufen. Erkennt nur, wenn sich die Parameter geändert haben.
+        :param params: Aktueller DetectionParams-Schnappschuss.
+        :return: (Rechtecke in Pixeln des Originals oder None, Stufe STAGE_PREVIEW/STAGE_REFINING/STAGE_FULL oder None)
+        """
+
+        if self.image is None:
+            return None, None
+        now = time.monotonic()
+
+        # Neue Parameter: Verfeinerung abbrechen, Zeitpunkt merken (entprellen)
+        target = self.pending or self.params
+        if params != target:
+            if self.pending is None:
+                self.first_change_at = now
+            self.pending = params
+            self.changed_at = now
+            self._cancel()
+
+        # Erste Anzeige eines Bildes ohne Wartezeit, sonst erst nach Ruhezeit bzw. spätestens nach max_wait
+        if self.pending is not None and (self.params is None or now - self.changed_at >= self.debounce
+                                         or now - self.first_change_at >= self.max_wait):
+            params, self.pending = self.pending, None
+            self.params = params
+            objects = self._detect_preview(params)
+            self.objects, self.stage = objects, STAGE_PREVIEW if self.preview is not None else STAGE_FULL
+            if self.preview is not None and objects is not None:
+                generation = self.generation
+                self.future = self.classifier_manager.executor.submit(self._detect_full, params, generation, blocking=False)
+                if self.future is not None:
+                    self.stage = STAGE_REFINING
+
+        # Fertige Verfeinerung übernehmen (nur, wenn sie zu den angezeigten Parametern gehört)
+        if self.future is not None and self.future.done():
+            future, self.future = self.future, None
+            objects = None if future.cancelled() else future.result()
+            if objects is not None and self.pending is None:
+                self.objects, self.stage = objects, STAGE_FULL
+                self.counters["refinements"] += 1
+            else:
+                self.counters["discarded"] += 1
+                self.stage = STAGE_PREVIEW
+        return self.objects, self.stage
+
+    # Liefert die Zähler.
+    def get_stats(self):
+        """
+        :return: Dictionary mit Anzahl und mittlerer Dauer der Vorschauen und Verfeinerungen sowie abgebrochenen und
+                 verworfenen Verfeinerungen.
+        """
+
+        return {"previews": self.counters["previews"], "refinements": self.counters["refinements"],
+                "cancelled": self.counters["cancelled"], "discarded": self.counters["discarded"],
+                "preview_ms": round(self.counters["preview_ms"] / max(self.counters["previews"], 1), 1),
+                "full_ms": round(self.counters["full_ms"] / max(self.counters["refinements"] + self.counters["discarded"], 1), 1)}
+
+
+# Simuliert das Ziehen eines Reglers: Zeit bis zur ersten Anzeige und bis zur vollen Auflösung.
+if __name__ == "__main__":
+    import argparse
+    import json
+    from classifiermanager import ClassifierManager
+
+    parser = argparse.ArgumentParser(description="Grob-zu-fein-Vorschau: Reglerbewegung simulieren")
+    parser.add_argument("image", help="Testbild")
+    parser.add_argument("--classifier", default="face")
+    parser.add_argument("--steps", type=int, default=10, help="Reglerschritte (minNeighbors 1..steps)")
+    parser.add_argument("--step-ms", type=float, default=30, help="Abstand der Reglerereignisse")
+    parser.add_argument("--tick-ms", type=float, default=10, help="Timer-Takt der Anwendung")
+    args = parser.parse_args()
+
+    manager = ClassifierManager()
+    gray = cv2.cvtColor(cv2.imread(args.image), cv2.COLOR_BGR2GRAY)
+    base = manager.snapshot_params(args.classifier)
+
+    # Bisher: jede Änderung führt im nächsten Takt zu einer Erkennung in voller Auflösung
+    t0 = time.perf_counter()
+    for step in range(1, args.steps + 1):
+        manager.detect(gray, base._replace(minNeighbors=step))
+    direct_ms = (time.perf_counter() - t0) * 1000
+
+    preview = ProgressivePreview(manager)
+    preview.set_image(gray)
+    preview.poll(base)
+    while preview.stage != STAGE_FULL:
+        time.sleep(args.tick_ms / 1000)
+        preview.poll(base)
+    t0 = time.perf_counter()
+    first_shown = full_shown = None
+    next_step, step = t0, 1
+    while full_shown is None:
+        now = time.perf_counter()
+        if step <= args.steps and now >= next_step:
+            params = base._replace(minNeighbors=step)
+            step += 1
+            next_step = now + args.step_ms / 1000
+        objects, stage = preview.poll(params)
+        if step > args.steps and preview.params == params:
+            if first_shown is None:
+                first_shown = (time.perf_counter() - t0) * 1000
+            if stage == STAGE_FULL:
+                full_shown = (time.perf_counter() - t0) * 1000
+        time.sleep(args.tick_ms / 1000)
+    drag_ms = (args.steps - 1) * args.step_ms
+    print(json.dumps({"image": gray.shape[::-1], "steps": args.steps, "drag_ms": drag_ms,
+                      "direct_all_steps_ms": round(direct_ms, 1), "direct_per_step_ms": round(direct_ms / args.steps, 1),
+                      "preview_after_release_ms": round(first_shown - drag_ms, 1),
+                      "full_after_release_ms": round(full_shown - drag_ms, 1), "stats": preview.get_stats()}, indent=2))
+    manager.shutdown()
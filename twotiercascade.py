@@ -0,0 +1,297 @@
+import copy
+import hashlib
+import os
+import time
+import xml.etree.ElementTree as ET
+import cv2
+import numpy as np
+import boxops
+from atomicfile import atomic_write
+from cascadecompiler import CACHE_DIR, load_cascade
+from haarevaluator import GROUP_EPS, HaarEvaluator
+
+
+# Erstellt eine verkürzte Kopie einer Cascade-XML-Datei mit den ersten k Stufen.
+def truncate_cascade_xml(xml_path, k, out_path=None):
+    """
+    Erstellt eine verkürzte Kopie einer Cascade-XML-Datei mit den ersten k Stufen.
+    Die Datei wird im Cache-Verzeichnis abgelegt und nur neu geschrieben, wenn die Quelle neuer ist.
+    :param xml_path: Pfad zur XML-Datei.
+    :param k: Anzahl der Stufen, die behalten werden.
+    :param out_path: Zielpfad (Standard: Cache-Verzeichnis).
+    :return: Pfad zur verkürzten XML-Datei.
+    """
+
+    if out_path is None:
+        digest = hashlib.sha1(os.path.abspath(xml_path).encode("utf-8")).hexdigest()[:12]
+        name = os.path.splitext(os.path.basename(xml_path))[0]
+        out_path = os.path.join(CACHE_DIR, f"{name}-{digest}-k{k}.xml")
+    if os.path.exists(out_path) and os.path.getmtime(out_path) >= os.path.getmtime(xml_path):
+        return out_path
+
+    tree = ET.parse(xml_path)
+    root = tree.getroot()
+    cascade = root.find("cascade")
+    if cascade is None:
+        cascade = root[0]
+    stages = cascade.find("stages")
+    if stages is None or k < 1 or k > len(stages):
+        raise ValueError(f"Ungültige Stufenanzahl {k} für {xml_path}")
+
+    truncated = copy.deepcopy(tree)
+    cascade = truncated.getroot().find("cascade")
+    if cascade is None:
+        cascade = truncated.getroot()[0]
+    stages = cascade.find("stages")
+    for stage in list(stages)[k:]:
+        stages.remove(stage)
+    cascade.find("stageNum").text = str(k)
+
+    with atomic_write(out_path, "wb") as file:
+        truncated.write(file, encoding="utf-8", xml_declaration=True)
+    return out_path
+
+
+# Schlägt die Anzahl der Stufen für den Vorfilter vor.
+def suggest_stage_count(xml_path, sample_frames=None, target_fraction=0.001, scaleFactor=1.1, minSize=(30, 30)):
+    """
+    Schlägt die Anzahl der Stufen für den Vorfilter vor: die kleinste Anzahl k, nach der höchstens
+    target_fraction aller Fenster überleben. Die Überlebensraten werden mit der NumPy-Engine auf den
+    Beispielbildern gemessen. Ohne Beispielbilder wird die Struktur des Cascades verwendet
+    (Stufen, die zusammen höchstens ein Viertel der schwachen Klassifizierer enthalten; auf dem Benchmark-Set
+    lag das Optimum für den Gesichtsklassifizierer bei 13 Stufen = 29 %).
+    :param xml_path: Pfad zur XML-Datei.
+    :param sample_frames: Liste von Beispielbildern (BGR oder Graustufen) oder None.
+    :param target_fraction: Anteil der Fenster, der den Vorfilter höchstens passieren soll.
+    :param scaleFactor: scaleFactor für die Messung.
+    :param minSize: minSize für die Messung.
+    :return: (k, Liste der Überlebensraten pro Stufe oder None)
+    """
+
+    cascade = load_cascade(xml_path)
+    num_stages = cascade.num_stages
+    if not sample_frames:
+        weak_counts = np.diff(cascade.stage_weak_start)
+        share = np.cumsum(weak_counts) / weak_counts.sum()
+        k = int(np.searchsorted(share, 0.25, side="right"))
+        return int(np.clip(k, 1, num_stages - 1)), None
+
+    evaluator = HaarEvaluator(cascade)
+    windows = 0
+    survivors = np.zeros(num_stages)
+    for frame in sample_frames:
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        evaluator.detectMultiScale(gray, scaleFactor, 0, minSize)
+        windows += evaluator.last_stats["windows"]
+        survivors += [stage["survivors"] for stage in evaluator.last_stats["stages"]]
+
+    rates = survivors / max(windows, 1)
+    k = int(np.argmax(rates <= target_fraction)) + 1 if np.any(rates <= target_fraction) else num_stages - 1
+    return int(np.clip(k, 1, num_stages - 1)), rates.tolist()
+
+
+# Zweistufiger Cascade: schneller Vorfilter mit den ersten k Stufen, vollständige Prüfung nur in Kandidatenregionen.
+class TwoTierCascade:
+    """
+    Zweistufiger Cascade: Ein verkürzter Cascade (erste k Stufen) sucht im ganzen Bild mit gröberer Bildpyramide
+    nach Kandidaten. Die Kandidaten werden nach Größe in Bänder eingeteilt, vergrößert und pro Band zu
+    zusammenhängenden Regionen verschmolzen. Der vollständige Cascade prüft nur diese Regionen und nur
+    Objektgrößen in der Nähe der Kandidatengrößen (kurze Bildpyramide pro Region).
+    Gleiche Schnittstelle wie cv2.CascadeClassifier.detectMultiScale(); last_stats enthält Zeiten und Regionen.
+    """
+
+    # Initialisiert den zweistufigen Cascade.
+    def __init__(self, xml_path, k, prescreen_scale_factor=1.2, prescreen_neighbors=2, size_tolerance=1.3,
+                 margin=0.25, max_cost_fraction=0.25):
+        """
+        Initialisiert den zweistufigen Cascade.
+        :param xml_path: Pfad zur XML-Datei.
+        :param k: Anzahl der Stufen des Vorfilters.
+        :param prescreen_scale_factor: scaleFactor des Vorfilters (mindestens der scaleFactor der Prüfung).
+        :param prescreen_neighbors: minNeighbors des Vorfilters (niedrig halten für hohe Trefferquote).
+        :param size_tolerance: Breite eines Größenbands; geprüft werden Größen bis zu diesem Faktor um die Kandidaten.
+        :param margin: Vergrößerung jedes Kandidaten in Vielfachen seiner Größe (pro Seite).
+        :param max_cost_fraction: Kosten die Regionen mehr als diesen Anteil eines vollständigen Durchlaufs
+                                  (geschätzt über die Anzahl der Fenster), wird direkt das ganze Bild geprüft.
+                                  Fenster in Kandidatenregionen durchlaufen mehr Stufen als der Durchschnitt,
+                                  deshalb liegt der Wert deutlich unter 1.
+        """
+
+        self.k = k
+        self.prescreen_scale_factor = prescreen_scale_factor
+        self.prescreen_neighbors = prescreen_neighbors
+        self.size_tolerance = size_tolerance
+        self.margin = margin
+        self.max_cost_fraction = max_cost_fraction
+        self.full = cv2.CascadeClassifier(xml_path)
+        self.prescreen = cv2.CascadeClassifier(truncate_cascade_xml(xml_path, k))
+        self.window_size = tuple(int(v) for v in load_cascade(xml_path).window_size)
+        self.last_stats = None
+
+    # Für Kompatibilität mit cv2.CascadeClassifier.
+    def empty(self):
+        return self.full.empty() or self.prescreen.empty()
+
+    # Verschmilzt vergrößerte Kandidaten eines Größenbands zu zusammenhängenden Regionen.
+    def _regions(self, candidates, shape):
+        """
+        :param candidates: Array (N, 4) der Kandidaten.
+        :param shape: Bildgröße (Höhe, Breite).
+        :return: Array (M, 4) der Regionen (x, y, w, h).
+        """
+
+        h, w = shape
+        pad = (candidates[:, 2:4] * self.margin).astype(np.int64)
+        x0 = np.clip(candidates[:, 0] - pad[:, 0], 0, w)
+        y0 = np.clip(candidates[:, 1] - pad[:, 1], 0, h)
+        x1 = np.clip(candidates[:, 0] + candidates[:, 2] + pad[:, 0], 0, w)
+        y1 = np.clip(candidates[:, 1] + candidates[:, 3] + pad[:, 1], 0, h)
+
+        # Überdeckung aller Rechtecke mit einem 2D-Differenzenarray zeichnen (ohne Schleife über die Rechtecke)
+        diff = np.zeros((h + 1, w + 1), dtype=np.int32)
+        np.add.at(diff, (y0, x0), 1)
+        np.add.at(diff, (y0, x1), -1)
+        np.add.at(diff, (y1, x0), -1)
+        np.add.at(diff, (y1, x1), 1)
+        coverage = (diff.cumsum(axis=0).cumsum(axis=1)[:h, :w] > 0).astype(np.uint8)
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(coverage, connectivity=8)
+        return stats[1:count, :4]
+
+    # Schätzt die Anzahl der Fenster eines Durchlaufs (Fläche / Skalierung² über alle Stufen der Bildpyramide).
+    def _window_cost(self, width, height, scaleFactor, low, high):
+        """
+        :param width: Breite des Bildausschnitts.
+        :param height: Höhe des Bildausschnitts.
+        :param scaleFactor: scaleFactor der Bildpyramide.
+        :param low: Kleinste Objektbreite.
+        :param high: Größte Objektbreite (0 = unbegrenzt).
+        :return: Geschätzte Anzahl der Fenster.
+        """
+
+        win_w, win_h = self.window_size
+        high = min(high or width, width, height * win_w // win_h)
+        if high < max(low, win_w):
+            return 0.0
+        scales = scaleFactor ** np.arange(int(np.log(high / win_w) / np.log(scaleFactor)) + 1)
+        scales = scales[scales * win_w >= low]
+        return float((np.maximum(width / scales - win_w, 0) * np.maximum(height / scales - win_h, 0)).sum())
+
+    # Erkennt Objekte (gleiche Schnittstelle wie cv2.CascadeClassifier).
+    def detectMultiScale(self, image, scaleFactor=1.1, minNeighbors=3, minSize=(0, 0), maxSize=(0, 0)):
+        """
+        Erkennt Objekte mit Vorfilter und anschließender Prüfung der Kandidatenregionen.
+        :return: Array (N, 4) der erkannten Rechtecke (x, y, w, h).
+        """
+
+        t0 = time.perf_counter()
+        candidates = self.prescreen.detectMultiScale(image, scaleFactor=max(scaleFactor, self.prescreen_scale_factor),
+                                                     minNeighbors=self.prescreen_neighbors, minSize=minSize, maxSize=maxSize)
+        candidates = np.array(candidates, dtype=np.int64).reshape(-1, 4)
+        t1 = time.perf_counter()
+
+        height, width = image.shape[:2]
+        win_w, win_h = self.window_size
+        stats = {"k": self.k, "candidates": len(candidates), "regions": 0, "cost_fraction": 0.0}
+        jobs = []
+        if len(candidates):
+            # Größenbänder: Kandidaten mit ähnlicher Größe teilen sich eine kurze Bildpyramide
+            band = np.floor(np.log(candidates[:, 2] / win_w) / np.log(self.size_tolerance)).astype(np.int64)
+            for b in np.unique(band):
+                members = candidates[band == b]
+                low = max(int(members[:, 2].min() / self.size_tolerance), minSize[0], win_w)
+                high = int(members[:, 2].max() * self.size_tolerance)
+                if maxSize[0]:
+                    high = min(high, maxSize[0])
+                if high >= low:
+                    jobs.extend((region, low, high) for region in self._regions(members, (height, width)))
+
+        full_cost = self._window_cost(width, height, scaleFactor, max(minSize[0], win_w), maxSize[0])
+        cost = sum(self._window_cost(r[2], r[3], scaleFactor, low, high) for r, low, high in jobs)
+        cost_fraction = cost / max(full_cost, 1.0)
+        stats.update(regions=len(jobs), cost_fraction=round(cost_fraction, 4))
+
+        if cost_fraction > self.max_cost_fraction: # Lohnt sich nicht: ganzes Bild prüfen
+            objects = self.full.detectMultiScale(image, scaleFactor=scaleFactor, minNeighbors=minNeighbors,
+                                                 minSize=minSize, maxSize=maxSize)
+            objects = np.array(objects, dtype=np.int32).reshape(-1, 4)
+        else:
+            found = [boxops.as_boxes(None)]
+            for (x, y, w, h), low, high in jobs:
+                hits = self.full.detectMultiScale(image[y:y + h, x:x + w], scaleFactor=scaleFactor,
+                                                  minNeighbors=minNeighbors,
+                                                  minSize=(low, low * win_h // win_w),
+                                                  maxSize=(high, high * win_h // win_w))
+                found.append(boxops.remap(hits, offset=(x, y)))
+            # Überlappende Regionen benachbarter Bänder können dasselbe Objekt doppelt liefern: ähnliche Rechtecke
+            # zusammenfassen (Einzeltreffer bleiben erhalten)
+            objects, _ = boxops.group_similar(np.concatenate(found), GROUP_EPS)
+
+        t2 = time.perf_counter()
+        stats.update(prescreen_ms=round((t1 - t0) * 1000, 2), verify_ms=round((t2 - t1) * 1000, 2))
+        self.last_stats = stats
+        return objects
+
+
+# Berechnet die Trefferquote einer Erkennung gegenüber einer Referenz.
+def recall(reference, detections, iou_threshold=0.5):
+    """
+    Anteil der Referenz-Rechtecke, zu denen es eine Erkennung mit IoU >= iou_threshold gibt.
+    :param reference: Array (N, 4) der Referenz-Rechtecke.
+    :param detections: Array (M, 4) der erkannten Rechtecke.
+    :param iou_threshold: Mindest-IoU für einen Treffer.
+    :return: (Anzahl getroffener Referenzen, Anzahl Referenzen)
+    """
+
+    reference = boxops.as_boxes(reference)
+    detections = boxops.as_boxes(detections)
+    if len(reference) == 0 or len(detections) == 0:
+        return 0, len(reference)
+    iou = boxops.iou_matrix(reference, detections)
+    return int((iou.max(axis=1) >= iou_threshold).sum()), len(reference)
+
+
+# Vergleicht vollständigen und zweistufigen Cascade auf einem Bildordner.
+if __name__ == "__main__":
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description="Zweistufigen Cascade (Vorfilter + Prüfung) gegen den vollständigen Cascade messen")
+    parser.add_argument("folder", help="Ordner mit Bildern (Benchmark-Set)")
+    parser.add_argument("--cascade", default=cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    parser.add_argument("--k", type=int, nargs="*", default=None, help="Zu messende Stufenanzahlen (Standard: Vorschlag)")
+    parser.add_argument("--scaleFactor", type=float, default=1.05)
+    parser.add_argument("--minNeighbors", type=int, default=3)
+    parser.add_argument("--minSize", type=int, default=30)
+    args = parser.parse_args()
+
+    files = sorted(f for f in glob.glob(os.path.join(args.folder, "*")) if f.lower().endswith((".jpg", ".jpeg", ".png", ".bmp")))
+    frames = [cv2.imread(f, cv2.IMREAD_GRAYSCALE) for f in files]
+    frames = [f for f in frames if f is not None]
+    params = dict(scaleFactor=args.scaleFactor, minNeighbors=args.minNeighbors, minSize=(args.minSize, args.minSize))
+
+    suggested, rates = suggest_stage_count(args.cascade, frames[:5], scaleFactor=args.scaleFactor, minSize=params["minSize"])
+    print(f"Vorgeschlagenes k: {suggested}")
+    if rates:
+        print("Überlebensrate pro Stufe: " + " ".join(f"{r:.4f}" for r in rates))
+
+    full = cv2.CascadeClassifier(args.cascade)
+    reference, t_full = [], 0.0
+    for frame in frames:
+        t0 = time.perf_counter()
+        reference.append(full.detectMultiScale(frame, **params))
+        t_full += time.perf_counter() - t0
+
+    for k in args.k or [suggested]:
+        two_tier = TwoTierCascade(args.cascade, k)
+        hit, total, t_two, in_regions = 0, 0, 0.0, 0
+        for frame, ref in zip(frames, reference):
+            t0 = time.perf_counter()
+            result = two_tier.detectMultiScale(frame, **params)
+            t_two += time.perf_counter() - t0
+            h, n = recall(ref, result)
+            hit, total = hit + h, total + n
+            in_regions += two_tier.last_stats["cost_fraction"] <= two_tier.max_cost_fraction
+        print(f"k={k:2d}: vollständig {t_full * 1000:.0f} ms, zweistufig {t_two * 1000:.0f} ms, "
+              f"Beschleunigung {t_full / max(t_two, 1e-9):.2f}x, Trefferquote {hit}/{total}, "
+              f"nur Regionen geprüft: {in_regions}/{len(frames)} Bilder")